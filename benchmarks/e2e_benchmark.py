@@ -0,0 +1,404 @@
+#!/usr/bin/env python3
+"""
+MCP 服务器端到端基准测试
+
+通过 MCP 协议调用真实的工具函数（参数解析、数据源、pandas 处理、Markdown 格式化全链路），
+上游 Baostock / AkShare 使用回放模式（src.replay），数据来自合成夹具或事先录制的夹具，
+因此结果可复现、不依赖网络，并可通过 --replay-latency 注入固定的上游延迟。
+
+两种运行方式:
+- inprocess: 在当前进程中导入 src.mcp_server，直接调用 app.call_tool（测量工具本身的开销）
+- stdio: 启动独立的服务器进程，通过 stdio JSON-RPC 调用（包含协议序列化和进程间通信开销）
+
+工作负载:
+- k_data: 单只股票一年的日K线
+- stock_analysis: A股综合分析报告（基本信息、财务、K线、行业）
+- hk_analysis: 港股综合分析报告
+- macro: SHIBOR 和货币供应量序列
+- index_constituents: 沪深300成分股
+- burst: 上述调用混合后按 --concurrency 并发发出
+
+报告每个工作负载的延迟分位数（p50/p90/p99）、吞吐量、进程峰值 RSS，以及（inprocess 模式）
+tracemalloc 统计的峰值分配字节数和净分配块数，结果保存为 JSON，便于对比不同提交。
+
+使用方法:
+    python benchmarks/e2e_benchmark.py
+    python benchmarks/e2e_benchmark.py --mode stdio --iterations 20 --replay-latency 50
+    python benchmarks/e2e_benchmark.py --compare benchmarks/results/e2e-baseline.json
+
+作者: StockReport MCP Project
+许可证: MIT License
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from benchmarks.synthetic_fixtures import build_fixtures
+
+WORKLOADS = {
+    "k_data": [
+        ("get_historical_k_data", {"code": "sh.600000", "start_date": "2024-01-01", "end_date": "2024-12-31"}),
+    ],
+    "stock_analysis": [
+        ("get_stock_analysis", {"code": "sh.600000", "analysis_type": "comprehensive"}),
+    ],
+    "hk_analysis": [
+        ("get_hk_stock_analysis", {"code": "hk.00700", "analysis_type": "comprehensive"}),
+    ],
+    "macro": [
+        ("get_shibor_data", {"start_date": "2024-01-01", "end_date": "2024-12-31"}),
+        ("get_money_supply_data_month", {"start_date": "2020-01", "end_date": "2024-12"}),
+    ],
+    "index_constituents": [
+        ("get_hs300_stocks", {"date": "2024-12-16"}),
+    ],
+}
+BURST = "burst"
+
+
+def _percentile(sorted_values: list, q: float) -> float:
+    """线性插值分位数（sorted_values 已排序）"""
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * q
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def summarize(latencies: list, errors: int, wall_seconds: float) -> dict:
+    values = sorted(latencies)
+    return {
+        "calls": len(values),
+        "errors": errors,
+        "p50_ms": round(_percentile(values, 0.50) * 1000, 2),
+        "p90_ms": round(_percentile(values, 0.90) * 1000, 2),
+        "p99_ms": round(_percentile(values, 0.99) * 1000, 2),
+        "mean_ms": round(sum(values) / len(values) * 1000, 2) if values else 0.0,
+        "max_ms": round(values[-1] * 1000, 2) if values else 0.0,
+        "wall_s": round(wall_seconds, 3),
+        "throughput_rps": round(len(values) / wall_seconds, 2) if wall_seconds > 0 else 0.0,
+    }
+
+
+def _burst_calls(iterations: int, concurrency: int) -> list:
+    mixed = [call for calls in WORKLOADS.values() for call in calls]
+    return [mixed[i % len(mixed)] for i in range(iterations * concurrency)]
+
+
+def _is_error(text: str) -> bool:
+    return text.startswith("Error")
+
+
+# --- In-process Runner ---
+class InProcessRunner:
+    """Calls tools through FastMCP's call_tool in this process."""
+
+    def __init__(self, server_args: list, log_level: str):
+        sys.argv = ["mcp_server"] + server_args
+        from src import mcp_server
+        import logging
+        logging.getLogger().setLevel(getattr(logging, log_level))
+        self.app = mcp_server.app
+
+    async def call(self, name: str, arguments: dict) -> tuple:
+        start = time.perf_counter()
+        result = await self.app.call_tool(name, arguments)
+        elapsed = time.perf_counter() - start
+        text = result[0][0].text if result and result[0] else ""
+        return elapsed, _is_error(text)
+
+    async def run_sequential(self, calls: list, iterations: int) -> dict:
+        latencies, errors = [], 0
+        wall_start = time.perf_counter()
+        for _ in range(iterations):
+            for name, arguments in calls:
+                elapsed, error = await self.call(name, arguments)
+                latencies.append(elapsed)
+                errors += error
+        return summarize(latencies, errors, time.perf_counter() - wall_start)
+
+    async def run_burst(self, calls: list, concurrency: int) -> dict:
+        # 与守护进程 / HTTP 部署一致：同步工具派发到工作线程，并发请求才会真正重叠
+        self.app.run_tools_in_threads = True
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one(name, arguments):
+            async with semaphore:
+                return await self.call(name, arguments)
+
+        wall_start = time.perf_counter()
+        results = await asyncio.gather(*(one(name, arguments) for name, arguments in calls))
+        wall = time.perf_counter() - wall_start
+        self.app.run_tools_in_threads = False
+        return summarize([r[0] for r in results], sum(r[1] for r in results), wall)
+
+    async def measure_allocations(self, calls: list) -> dict:
+        """单独一轮 tracemalloc 统计（tracemalloc 本身会显著拖慢调用，因此不计入延迟）"""
+        blocks_before = sys.getallocatedblocks()
+        tracemalloc.start()
+        try:
+            for name, arguments in calls:
+                await self.call(name, arguments)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return {
+            "alloc_peak_kb": round(peak / 1024, 1),
+            "net_blocks": sys.getallocatedblocks() - blocks_before,
+        }
+
+    def peak_rss_mb(self) -> float:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    def close(self) -> None:
+        pass
+
+
+# --- Stdio Runner ---
+class StdioRunner:
+    """Drives a separate `python -m src.mcp_server` process over stdio JSON-RPC."""
+
+    def __init__(self, server_args: list, log_level: str):
+        self.proc = subprocess.Popen(
+            [sys.executable, "-m", "src.mcp_server"] + server_args + ["--log-level", log_level],
+            cwd=PROJECT_ROOT,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+        self._next_id = 0
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._reader = threading.Thread(target=self._read_loop, daemon=True)
+        self._reader.start()
+        self._rusage = None
+
+        self._request("initialize", {
+            "protocolVersion": "2024-11-05",
+            "capabilities": {},
+            "clientInfo": {"name": "e2e-benchmark", "version": "1.0"},
+        }).wait()
+        self._write({"jsonrpc": "2.0", "method": "notifications/initialized"})
+
+    def _write(self, message: dict) -> None:
+        self.proc.stdin.write((json.dumps(message) + "\n").encode("utf-8"))
+        self.proc.stdin.flush()
+
+    def _read_loop(self) -> None:
+        for line in self.proc.stdout:
+            try:
+                message = json.loads(line)
+            except ValueError:
+                continue
+            with self._lock:
+                pending = self._pending.pop(message.get("id"), None)
+            if pending is not None:
+                pending.finish(message)
+        with self._lock:
+            for pending in self._pending.values():
+                pending.finish({"error": {"message": "server exited"}})
+
+    def _request(self, method: str, params: dict) -> "_Pending":
+        with self._lock:
+            self._next_id += 1
+            pending = _Pending()
+            self._pending[self._next_id] = pending
+            request_id = self._next_id
+        self._write({"jsonrpc": "2.0", "id": request_id, "method": method, "params": params})
+        return pending
+
+    def _tools_call(self, name: str, arguments: dict) -> "_Pending":
+        return self._request("tools/call", {"name": name, "arguments": arguments})
+
+    async def run_sequential(self, calls: list, iterations: int) -> dict:
+        latencies, errors = [], 0
+        wall_start = time.perf_counter()
+        for _ in range(iterations):
+            for name, arguments in calls:
+                pending = self._tools_call(name, arguments)
+                pending.wait()
+                latencies.append(pending.elapsed)
+                errors += pending.is_error
+        return summarize(latencies, errors, time.perf_counter() - wall_start)
+
+    async def run_burst(self, calls: list, concurrency: int) -> dict:
+        # 每次保持 concurrency 个请求在途（stdio 服务器按协议顺序处理，反映单会话的排队开销）
+        latencies, errors = [], 0
+        wall_start = time.perf_counter()
+        for offset in range(0, len(calls), concurrency):
+            batch = [self._tools_call(name, arguments) for name, arguments in calls[offset:offset + concurrency]]
+            for pending in batch:
+                pending.wait()
+                latencies.append(pending.elapsed)
+                errors += pending.is_error
+        return summarize(latencies, errors, time.perf_counter() - wall_start)
+
+    async def measure_allocations(self, calls: list) -> dict:
+        return {}
+
+    def peak_rss_mb(self) -> float:
+        if self._rusage is None:
+            return 0.0
+        return self._rusage.ru_maxrss / 1024
+
+    def close(self) -> None:
+        self.proc.stdin.close()
+        try:
+            self.proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+        # Popen.wait 已回收子进程，ru_maxrss 取自 RUSAGE_CHILDREN（本脚本只启动这一个子进程）
+        self._rusage = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+
+class _Pending:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.elapsed = 0.0
+        self.is_error = False
+        self._event = threading.Event()
+
+    def finish(self, message: dict) -> None:
+        self.elapsed = time.perf_counter() - self.start
+        result = message.get("result") or {}
+        content = result.get("content") or [{}]
+        self.is_error = bool("error" in message or result.get("isError")
+                             or _is_error(content[0].get("text", "")))
+        self._event.set()
+
+    def wait(self, timeout: float = 300) -> None:
+        if not self._event.wait(timeout):
+            raise TimeoutError("No response from server")
+
+
+# --- Reporting ---
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT,
+                              capture_output=True, text=True, timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+def print_report(report: dict, baseline: dict = None) -> None:
+    header = f"{'workload':<20}{'calls':>7}{'err':>5}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'rps':>9}"
+    if baseline:
+        header += f"{'Δp50':>9}"
+    print(header)
+    print("-" * len(header))
+    for name, result in report["workloads"].items():
+        line = (f"{name:<20}{result['calls']:>7}{result['errors']:>5}{result['p50_ms']:>10.1f}"
+                f"{result['p90_ms']:>10.1f}{result['p99_ms']:>10.1f}{result['throughput_rps']:>9.1f}")
+        previous = (baseline or {}).get("workloads", {}).get(name)
+        if previous and previous.get("p50_ms"):
+            line += f"{(result['p50_ms'] / previous['p50_ms'] - 1) * 100:>+8.1f}%"
+        if "alloc_peak_kb" in result:
+            line += f"   alloc peak {result['alloc_peak_kb']:.0f} KB, net blocks {result['net_blocks']}"
+        print(line)
+    print("-" * len(header))
+    print(f"peak RSS: {report['process']['peak_rss_mb']:.1f} MB")
+
+
+async def run(args, runner) -> dict:
+    workloads = {}
+    for name, calls in WORKLOADS.items():
+        if args.workloads and name not in args.workloads:
+            continue
+        await runner.run_sequential(calls, args.warmup)
+        workloads[name] = await runner.run_sequential(calls, args.iterations)
+        workloads[name].update(await runner.measure_allocations(calls))
+
+    if not args.workloads or BURST in args.workloads:
+        calls = _burst_calls(args.iterations, args.concurrency)
+        workloads[BURST] = await runner.run_burst(calls, args.concurrency)
+        workloads[BURST]["concurrency"] = args.concurrency
+    return workloads
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end MCP tool benchmark against replayed upstream data")
+    parser.add_argument("--mode", choices=["inprocess", "stdio"], default="inprocess",
+                        help="call tools in this process or through a stdio server process (default: inprocess)")
+    parser.add_argument("--iterations", type=int, default=10, help="measured iterations per workload (default: 10)")
+    parser.add_argument("--warmup", type=int, default=1, help="unmeasured warm-up iterations (default: 1)")
+    parser.add_argument("--concurrency", type=int, default=8, help="in-flight calls in the burst workload (default: 8)")
+    parser.add_argument("--workloads", nargs="*", choices=list(WORKLOADS) + [BURST], default=None,
+                        help="subset of workloads to run (default: all)")
+    parser.add_argument("--fixtures-dir", default=None,
+                        help="replay fixtures to use (default: freshly generated synthetic fixtures)")
+    parser.add_argument("--k-rows", type=int, default=250, help="rows of synthetic daily K-line data (default: 250)")
+    parser.add_argument("--replay-latency", type=float, default=0, help="injected upstream latency in ms (default: 0)")
+    parser.add_argument("--replay-jitter", type=float, default=0, help="extra random upstream latency in ms (default: 0)")
+    parser.add_argument("--with-cache", action="store_true",
+                        help="enable the shared cache (in a temporary directory) instead of disabling it")
+    parser.add_argument("--log-level", default="WARNING", help="server log level during the run (default: WARNING)")
+    parser.add_argument("--output", default=None,
+                        help="result JSON path (default: benchmarks/results/e2e-<mode>-<timestamp>.json)")
+    parser.add_argument("--compare", default=None, help="previous result JSON to compare p50 latencies against")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="stockreport-bench-") as workdir:
+        fixtures_dir = args.fixtures_dir
+        if fixtures_dir is None:
+            fixtures_dir = os.path.join(workdir, "fixtures")
+            build_fixtures(fixtures_dir, k_rows=args.k_rows)
+
+        # 隔离数据目录，避免读写用户的真实共享缓存
+        os.environ["STOCKREPORT_HOME"] = os.path.join(workdir, "home")
+        os.environ["STOCKREPORT_CACHE_MB"] = "256" if args.with_cache else "0"
+        server_args = ["--data-source", "hybrid", "--upstream", "replay", "--fixtures-dir", fixtures_dir,
+                       "--replay-latency", str(args.replay_latency), "--replay-jitter", str(args.replay_jitter)]
+
+        runner_class = InProcessRunner if args.mode == "inprocess" else StdioRunner
+        runner = runner_class(server_args, args.log_level)
+        try:
+            workloads = asyncio.run(run(args, runner))
+        finally:
+            runner.close()
+
+    report = {
+        "meta": {
+            "benchmark": "e2e",
+            "mode": args.mode,
+            "git_commit": _git_commit(),
+            "python": sys.version.split()[0],
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "iterations": args.iterations,
+            "replay_latency_ms": args.replay_latency,
+            "replay_jitter_ms": args.replay_jitter,
+            "k_rows": args.k_rows,
+            "shared_cache": args.with_cache,
+        },
+        "process": {"peak_rss_mb": round(runner.peak_rss_mb(), 1)},
+        "workloads": workloads,
+    }
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+
+    output = args.output or os.path.join(
+        PROJECT_ROOT, "benchmarks", "results", f"e2e-{args.mode}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
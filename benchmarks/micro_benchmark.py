@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+数据整形热点函数微基准测试
+
+与端到端基准（e2e_benchmark.py）互补：不经过 MCP 协议和上游回放，直接对单个函数输入
+250 到 1,000,000 行的合成数据，测量每次调用耗时、每行耗时和内存分配，
+为这些函数的优化工作提供可度量的基线。
+
+测试对象:
+- baostock_rows: Baostock 结果集逐行读取（baostock_data_source._collect_rows）并构建 DataFrame
+- akshare_standardize: AkshareDataSource._standardize_dataframe（中文列名 → Baostock 列名）
+- markdown: format_df_to_markdown（默认截断到 MAX_MARKDOWN_ROWS 行）
+- markdown_full: format_df_to_markdown 输出全部行（默认最多 100,000 行，避免单次运行过久）
+- financial_section: quarter_utils.format_financial_section
+- stock_analysis_report: analysis.render_stock_analysis 的报告拼接（档案卡在准备阶段由 N 行 K 线和
+  N 行行业表的内存数据源生成，不计时；拼接本身与 N 无关）
+
+运行期间 STOCKREPORT_HOME 指向临时目录，准备阶段写入的档案卡、行业索引等不会进入用户的数据目录。
+
+使用方法:
+    python benchmarks/micro_benchmark.py
+    python benchmarks/micro_benchmark.py --sizes 250 10000 --targets markdown akshare_standardize
+    python benchmarks/micro_benchmark.py --compare benchmarks/results/<之前的结果>.json
+
+作者: StockReport MCP Project
+许可证: MIT License
+"""
+import argparse
+import json
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from itertools import count
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+import numpy as np
+import pandas as pd
+
+from src.baostock_data_source import DEFAULT_K_FIELDS, _collect_rows
+from src.akshare_data_source import AkshareDataSource
+from src.formatting.markdown_formatter import format_df_to_markdown
+from src.industry_index import get_industry_index
+from src.profile_cards import get_profile_card
+from src.replay import ReplayResultSet
+from src.tools.analysis import render_stock_analysis
+from src.tools.quarter_utils import format_financial_section
+
+DEFAULT_SIZES = [250, 10_000, 100_000, 1_000_000]
+# 每个测试对象允许的最大行数（None 表示不限制）
+SIZE_LIMITS = {"markdown_full": 100_000}
+
+
+# --- Synthetic Frames ---
+def _dates(rows: int) -> np.ndarray:
+    return (np.datetime64("2000-01-03") + np.arange(rows)).astype(str)
+
+
+def baostock_k_rows(rows: int) -> list:
+    """Baostock 风格的行：全部字段都是字符串"""
+    rng = np.random.default_rng(0)
+    close = np.round(10 + rng.standard_normal(rows).cumsum() * 0.1, 4).astype(str)
+    volume = rng.integers(1_000_000, 50_000_000, rows).astype(str)
+    ratio = np.round(rng.uniform(0, 30, rows), 6).astype(str)
+    columns = {
+        "date": _dates(rows), "code": np.full(rows, "sh.600000"),
+        "open": close, "high": close, "low": close, "close": close, "preclose": close,
+        "volume": volume, "amount": volume, "adjustflag": np.full(rows, "3"), "turn": ratio,
+        "tradestatus": np.full(rows, "1"), "pctChg": ratio, "peTTM": ratio, "pbMRQ": ratio,
+        "psTTM": ratio, "pcfNcfTTM": ratio, "isST": np.full(rows, "0"),
+    }
+    return np.column_stack([columns[field] for field in DEFAULT_K_FIELDS]).tolist()
+
+
+def k_frame(rows: int) -> pd.DataFrame:
+    """Baostock 返回的 K 线 DataFrame（字符串列）"""
+    return pd.DataFrame(baostock_k_rows(rows), columns=DEFAULT_K_FIELDS)
+
+
+def akshare_hist_frame(rows: int) -> pd.DataFrame:
+    """AkShare stock_zh_a_hist / stock_hk_hist 风格的中文列 DataFrame"""
+    rng = np.random.default_rng(0)
+    close = 10 + rng.standard_normal(rows).cumsum() * 0.1
+    return pd.DataFrame({
+        "日期": pd.to_datetime(_dates(rows)).date,
+        "股票代码": np.full(rows, "600000"),
+        "开盘": close, "收盘": close, "最高": close * 1.01, "最低": close * 0.99,
+        "成交量": rng.integers(1_000_000, 50_000_000, rows),
+        "成交额": rng.uniform(1e7, 1e9, rows),
+        "振幅": rng.uniform(0, 8, rows), "涨跌幅": rng.uniform(-10, 10, rows),
+        "涨跌额": rng.uniform(-1, 1, rows), "换手率": rng.uniform(0, 5, rows),
+    })
+
+
+def industry_frame(rows: int) -> pd.DataFrame:
+    industries = np.array(["J66货币金融服务", "C39计算机、通信和其他电子设备制造业", "C27医药制造业"])
+    return pd.DataFrame({
+        "updateDate": np.full(rows, "2024-12-30"),
+        "code": [f"sh.{i:06d}" for i in range(rows)],
+        "code_name": [f"股票{i}" for i in range(rows)],
+        "industry": industries[np.arange(rows) % len(industries)],
+        "industryClassification": np.full(rows, "证监会行业分类"),
+    })
+
+
+def profit_frame(rows: int) -> pd.DataFrame:
+    return pd.DataFrame({
+        "code": np.full(rows, "sh.600000"), "pubDate": np.full(rows, "2024-10-30"),
+        "statDate": np.full(rows, "2024-09-30"), "roeAvg": np.full(rows, "0.061234"),
+        "npMargin": np.full(rows, "0.312345"), "netProfit": np.full(rows, "45123456789.00"),
+        "epsTTM": np.full(rows, "1.234567"), "totalShare": np.full(rows, "29352080397.00"),
+    })
+
+
+class InMemoryDataSource:
+    """Serves pre-built frames to get_profile_card when building the benchmark's profile card."""
+
+    def __init__(self, rows: int):
+        self.price = k_frame(rows)
+        self.industry = industry_frame(rows)
+        self.basic = pd.DataFrame([{"code": "sh.600000", "code_name": "浦发银行", "ipoDate": "1999-11-10",
+                                    "outDate": "", "type": "1", "status": "1",
+                                    "industry": "J66货币金融服务"}])
+        self.financial = profit_frame(1)
+
+    def get_stock_basic_info(self, code, fields=None):
+        return self.basic
+
+    def get_profit_data(self, code, year, quarter):
+        return self.financial
+
+    get_growth_data = get_balance_data = get_dupont_data = get_profit_data
+
+    def get_historical_k_data(self, code, start_date, end_date, frequency="d", adjust_flag="3", fields=None):
+        return self.price
+
+    def get_stock_industry(self, code=None, date=None):
+        return self.industry
+
+
+# --- Targets ---
+# 每个测试对象: setup(rows) 返回输入（不计时），run(input) 为被测调用
+def _setup_baostock_rows(rows):
+    return ReplayResultSet(fields=DEFAULT_K_FIELDS, rows=baostock_k_rows(rows))
+
+
+def _run_baostock_rows(rs):
+    rs._cursor = -1
+    return pd.DataFrame(_collect_rows(rs), columns=rs.fields)
+
+
+def _setup_akshare_standardize(rows):
+    return AkshareDataSource(health_probe_delay=None), akshare_hist_frame(rows)
+
+
+def _run_akshare_standardize(state):
+    source, frame = state
+    # _standardize_dataframe 会原地添加列，每次使用原始副本（浅拷贝，只复制列引用）；
+    # 与 _get_a_share_historical_data 相同，使用 stock_zh_a_hist 的列名映射（不复权）
+    return source._standardize_dataframe(frame.copy(deep=False), "sh.600000", "stock_zh_a_hist", "3")
+
+
+def _run_financial_section(frame):
+    return format_financial_section(frame, "盈利能力指标", 2024, 3, {
+        "roeAvg": "ROE(净资产收益率)", "npMargin": "销售净利率",
+        "grossProfitMargin": "毛利率", "netProfit": "净利润",
+    })
+
+
+# 每个数据量使用不同的代码，避免读到上一个数据量保存的档案卡
+_report_codes = count(600000)
+
+
+def _seed_industry_stats(source):
+    """
+    预先写入今天的行业快照和全行业指标分布：计时期间不会启动对全部成分股的后台统计，
+    报告中的行业比较也有分布可用
+    """
+    index = get_industry_index()
+    index.refresh(lambda: source.industry)
+    rng = np.random.default_rng(1)
+    index.rebuild_stats((code, {"pe": rng.uniform(5, 60), "pb": rng.uniform(0.5, 8),
+                                "roe": rng.uniform(-0.05, 0.25), "return_6m": rng.uniform(-30, 30)})
+                        for code in index.members())
+
+
+def _setup_stock_analysis_report(rows):
+    code = f"sh.{next(_report_codes)}"
+    source = InMemoryDataSource(rows)
+    _seed_industry_stats(source)
+    card = get_profile_card(source, code)
+    report = render_stock_analysis(card, code, "comprehensive")
+    # 档案卡缺少分段时报告只剩提示文字，计时就失去了意义
+    for heading in ("## 公司基本信息", "## 基本面指标分析 (", "## 技术面分析", "## 行业比较"):
+        if heading not in report:
+            raise RuntimeError(f"stock_analysis_report setup produced an incomplete report (missing '{heading}'):\n"
+                               f"{report}")
+    return card, code
+
+
+TARGETS = {
+    "baostock_rows": (_setup_baostock_rows, _run_baostock_rows),
+    "akshare_standardize": (_setup_akshare_standardize, _run_akshare_standardize),
+    "markdown": (k_frame, format_df_to_markdown),
+    "markdown_full": (k_frame, lambda frame: format_df_to_markdown(frame, max_rows=len(frame))),
+    "financial_section": (profit_frame, _run_financial_section),
+    "stock_analysis_report": (_setup_stock_analysis_report,
+                              lambda state: render_stock_analysis(state[0], state[1], "comprehensive")),
+}
+
+
+# --- Measurement ---
+def measure(setup, run, rows: int, min_time: float, max_repeats: int) -> dict:
+    """重复调用直到累计耗时超过 min_time（至少 3 次，最多 max_repeats 次），再单独测一次内存"""
+    state = setup(rows)
+    run(state)  # warm-up
+
+    timings = []
+    deadline = time.perf_counter() + min_time
+    while len(timings) < max_repeats and (len(timings) < 3 or time.perf_counter() < deadline):
+        start = time.perf_counter()
+        run(state)
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        run(state)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    median = statistics.median(timings)
+    return {
+        "rows": rows,
+        "repeats": len(timings),
+        "median_ms": round(median * 1000, 3),
+        "min_ms": round(min(timings) * 1000, 3),
+        "per_row_ns": round(median / rows * 1e9, 1),
+        "alloc_peak_kb": round(peak / 1024, 1),
+        "alloc_per_row_b": round(peak / rows, 1),
+    }
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT,
+                              capture_output=True, text=True, timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+def print_result(target: str, result: dict, baseline: dict = None) -> None:
+    line = (f"{target:<24}{result['rows']:>10}{result['repeats']:>6}{result['median_ms']:>12.3f}"
+            f"{result['per_row_ns']:>12.1f}{result['alloc_peak_kb']:>14.1f}{result['alloc_per_row_b']:>10.1f}")
+    previous = next((r for r in (baseline or {}).get("results", {}).get(target, [])
+                     if r["rows"] == result["rows"]), None)
+    if previous and previous.get("median_ms"):
+        line += f"{(result['median_ms'] / previous['median_ms'] - 1) * 100:>+9.1f}%"
+    print(line, flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks of the data-shaping hot paths")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                        help=f"row counts of the synthetic frames (default: {' '.join(map(str, DEFAULT_SIZES))})")
+    parser.add_argument("--targets", nargs="+", choices=list(TARGETS), default=list(TARGETS),
+                        help="functions to benchmark (default: all)")
+    parser.add_argument("--min-time", type=float, default=1.0,
+                        help="minimum measured seconds per target and size (default: 1.0)")
+    parser.add_argument("--max-repeats", type=int, default=200, help="maximum repeats per measurement (default: 200)")
+    parser.add_argument("--output", default=None,
+                        help="result JSON path (default: benchmarks/results/micro-<timestamp>.json)")
+    parser.add_argument("--compare", default=None, help="previous result JSON to compare median timings against")
+    args = parser.parse_args()
+
+    # 被测函数内部的 info 日志会主导小数据量下的耗时，这里只保留警告以上
+    logging.basicConfig(level=logging.WARNING)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    header = (f"{'target':<24}{'rows':>10}{'reps':>6}{'median ms':>12}{'ns/row':>12}"
+              f"{'alloc KB':>14}{'B/row':>10}")
+    if baseline:
+        header += f"{'Δmedian':>10}"
+    print(header)
+    print("-" * len(header))
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="stockreport-micro-") as workdir:
+        # 隔离数据目录，准备阶段生成的档案卡和行业索引不写入用户的真实数据目录
+        os.environ["STOCKREPORT_HOME"] = workdir
+        os.environ["STOCKREPORT_CACHE_MB"] = "0"
+        for target in args.targets:
+            setup, run = TARGETS[target]
+            limit = SIZE_LIMITS.get(target)
+            for rows in args.sizes:
+                if limit is not None and rows > limit:
+                    continue
+                result = measure(setup, run, rows, args.min_time, args.max_repeats)
+                results.setdefault(target, []).append(result)
+                print_result(target, result, baseline)
+
+    report = {
+        "meta": {
+            "benchmark": "micro",
+            "git_commit": _git_commit(),
+            "python": sys.version.split()[0],
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "min_time_s": args.min_time,
+        },
+        "results": results,
+    }
+    output = args.output or os.path.join(
+        PROJECT_ROOT, "benchmarks", "results", f"micro-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print("-" * len(header))
+    print(f"results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
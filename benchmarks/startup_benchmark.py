@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+MCP 服务器冷启动基准测试
+
+模拟 MCP 客户端的行为：启动一个新的 stdio 服务器进程，发送 initialize 请求、
+initialized 通知和 tools/list 请求，测量从进程启动到收到 tools/list 响应的时间。
+每轮都会启动全新的进程，以反映客户端每次会话的真实开销。
+
+使用方法:
+    python benchmarks/startup_benchmark.py
+    python benchmarks/startup_benchmark.py --runs 10 --data-source baostock
+
+只依赖标准库，不需要网络（服务器在启动阶段不会访问上游数据源）。
+
+作者: StockReport MCP Project
+许可证: MIT License
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _send(proc: subprocess.Popen, message: dict) -> None:
+    proc.stdin.write((json.dumps(message) + "\n").encode("utf-8"))
+    proc.stdin.flush()
+
+
+def _read_response(proc: subprocess.Popen, request_id: int) -> dict:
+    """读取指定 id 的 JSON-RPC 响应，忽略非 JSON 行（如启动提示）和通知。"""
+    while True:
+        line = proc.stdout.readline()
+        if not line:
+            raise RuntimeError("Server exited before responding")
+        try:
+            message = json.loads(line)
+        except ValueError:
+            continue
+        if message.get("id") == request_id:
+            return message
+
+
+def measure_once(command: list) -> dict:
+    """启动一次服务器并返回各阶段耗时（毫秒）。"""
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        command,
+        cwd=PROJECT_ROOT,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        _send(proc, {
+            "jsonrpc": "2.0", "id": 1, "method": "initialize",
+            "params": {
+                "protocolVersion": "2024-11-05",
+                "capabilities": {},
+                "clientInfo": {"name": "startup-benchmark", "version": "1.0"},
+            },
+        })
+        _read_response(proc, 1)
+        initialized = time.perf_counter()
+
+        _send(proc, {"jsonrpc": "2.0", "method": "notifications/initialized"})
+        _send(proc, {"jsonrpc": "2.0", "id": 2, "method": "tools/list", "params": {}})
+        response = _read_response(proc, 2)
+        listed = time.perf_counter()
+    finally:
+        proc.kill()
+        proc.wait()
+
+    return {
+        "initialize_ms": (initialized - start) * 1000,
+        "tools_list_ms": (listed - start) * 1000,
+        "tool_count": len(response.get("result", {}).get("tools", [])),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure time-to-first-tools/list of the MCP server")
+    parser.add_argument("--runs", type=int, default=5, help="number of cold starts (default: 5)")
+    parser.add_argument("--data-source", choices=["baostock", "akshare", "hybrid"], default=None,
+                        help="data source passed to the server (default: server default)")
+    args = parser.parse_args()
+
+    command = [sys.executable, "-m", "src.mcp_server"]
+    if args.data_source:
+        command += ["--data-source", args.data_source]
+
+    results = [measure_once(command) for _ in range(args.runs)]
+    for i, result in enumerate(results, 1):
+        print(f"run {i}: initialize {result['initialize_ms']:.0f} ms, "
+              f"tools/list {result['tools_list_ms']:.0f} ms ({result['tool_count']} tools)")
+
+    timings = [r["tools_list_ms"] for r in results]
+    print("-" * 50)
+    print(f"time-to-first-tools/list: min {min(timings):.0f} ms, "
+          f"median {statistics.median(timings):.0f} ms, max {max(timings):.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+合成上游夹具生成器
+
+为回放模式（src.replay）生成确定性的 Baostock / AkShare 夹具，数据形状与真实接口一致
+（字段名、字符串化的数值、行数量级），内容由固定随机种子生成。每个函数写入 default.json，
+因此任意参数的调用都能得到结果，端到端基准测试无需网络也无需事先录制。
+
+使用方法:
+    python benchmarks/synthetic_fixtures.py --output /tmp/fixtures --k-rows 250
+
+作者: StockReport MCP Project
+许可证: MIT License
+"""
+import argparse
+import datetime
+import os
+import random
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+import pandas as pd
+
+from src.replay import FixtureStore, ReplayResultSet, DEFAULT_FIXTURE
+
+K_FIELDS = [
+    "date", "code", "open", "high", "low", "close", "preclose",
+    "volume", "amount", "adjustflag", "turn", "tradestatus",
+    "pctChg", "peTTM", "pbMRQ", "psTTM", "pcfNcfTTM", "isST"
+]
+
+INDUSTRIES = ["J66货币金融服务", "C39计算机、通信和其他电子设备制造业", "C27医药制造业",
+              "C15酒、饮料和精制茶制造业", "K70房地产业", "I65软件和信息技术服务业"]
+
+
+def _trading_days(count: int, end: datetime.date = datetime.date(2024, 12, 31)):
+    days = []
+    day = end
+    while len(days) < count:
+        if day.weekday() < 5:
+            days.append(day)
+        day -= datetime.timedelta(days=1)
+    return list(reversed(days))
+
+
+def _a_share_codes(count: int):
+    codes = []
+    for i in range(count):
+        if i % 2:
+            codes.append(f"sh.{600000 + i:06d}")
+        else:
+            codes.append(f"sz.{i:06d}")
+    return codes
+
+
+def k_data_rows(rng: random.Random, count: int, code: str = "sh.600000"):
+    rows = []
+    close = 10.0
+    for day in _trading_days(count):
+        preclose = close
+        close = max(1.0, preclose * (1 + rng.gauss(0, 0.02)))
+        high = max(preclose, close) * (1 + abs(rng.gauss(0, 0.005)))
+        low = min(preclose, close) * (1 - abs(rng.gauss(0, 0.005)))
+        volume = rng.randint(1_000_000, 50_000_000)
+        rows.append([
+            day.isoformat(), code, f"{preclose:.4f}", f"{high:.4f}", f"{low:.4f}", f"{close:.4f}",
+            f"{preclose:.4f}", str(volume), f"{volume * close:.4f}", "3", f"{rng.uniform(0.1, 3):.6f}",
+            "1", f"{(close / preclose - 1) * 100:.6f}", f"{rng.uniform(5, 30):.6f}",
+            f"{rng.uniform(0.5, 5):.6f}", f"{rng.uniform(1, 10):.6f}", f"{rng.uniform(-20, 20):.6f}", "0",
+        ])
+    return rows
+
+
+def _result_set(fields, rows):
+    return ReplayResultSet(fields=fields, rows=rows)
+
+
+def build_fixtures(root: str, k_rows: int = 250, seed: int = 42) -> FixtureStore:
+    """
+    生成全部合成夹具到 root 目录。
+
+    Args:
+        root: 夹具目录
+        k_rows: 日K线行数（默认约一年的交易日）
+        seed: 随机种子
+    """
+    rng = random.Random(seed)
+    store = FixtureStore(root)
+
+    def save(library, function, result):
+        store.save(library, function, (), {}, result=result, key=DEFAULT_FIXTURE)
+
+    # --- Baostock ---
+    save("baostock", "query_history_k_data_plus", _result_set(K_FIELDS, k_data_rows(rng, k_rows)))
+    save("baostock", "query_stock_basic", _result_set(
+        ["code", "code_name", "ipoDate", "outDate", "type", "status"],
+        [["sh.600000", "浦发银行", "1999-11-10", "", "1", "1"]]))
+    save("baostock", "query_profit_data", _result_set(
+        ["code", "pubDate", "statDate", "roeAvg", "npMargin", "gpMargin", "netProfit", "epsTTM",
+         "MBRevenue", "totalShare", "liqaShare"],
+        [["sh.600000", "2024-10-30", "2024-09-30", "0.061234", "0.312345", "", "45123456789.00",
+          "1.234567", "", "29352080397.00", "29352080397.00"]]))
+    save("baostock", "query_operation_data", _result_set(
+        ["code", "pubDate", "statDate", "NRTurnRatio", "NRTurnDays", "INVTurnRatio", "INVTurnDays",
+         "CATurnRatio", "AssetTurnRatio"],
+        [["sh.600000", "2024-10-30", "2024-09-30", "", "", "", "", "", "0.019"]]))
+    save("baostock", "query_growth_data", _result_set(
+        ["code", "pubDate", "statDate", "YOYEquity", "YOYAsset", "YOYNI", "YOYEPSBasic", "YOYPNI"],
+        [["sh.600000", "2024-10-30", "2024-09-30", "0.052", "0.031", "0.021", "0.018", "0.020"]]))
+    save("baostock", "query_balance_data", _result_set(
+        ["code", "pubDate", "statDate", "currentRatio", "quickRatio", "cashRatio", "YOYLiability",
+         "liabilityToAsset", "assetToEquity"],
+        [["sh.600000", "2024-10-30", "2024-09-30", "", "", "", "0.030", "0.918", "12.2"]]))
+    save("baostock", "query_cash_flow_data", _result_set(
+        ["code", "pubDate", "statDate", "CAToAsset", "NCAToAsset", "tangibleAssetToAsset", "ebitToInterest",
+         "CFOToOR", "CFOToNP", "CFOToGr"],
+        [["sh.600000", "2024-10-30", "2024-09-30", "", "", "0.081", "", "0.42", "1.31", "0.40"]]))
+    save("baostock", "query_dupont_data", _result_set(
+        ["code", "pubDate", "statDate", "dupontROE", "dupontAssetStoEquity", "dupontAssetTurn",
+         "dupontPnitoni", "dupontNitogr", "dupontTaxBurden", "dupontIntburden", "dupontEbittogr"],
+        [["sh.600000", "2024-10-30", "2024-09-30", "0.061", "12.2", "0.02", "0.98", "0.31", "0.87", "", ""]]))
+    save("baostock", "query_stock_industry", _result_set(
+        ["updateDate", "code", "code_name", "industry", "industryClassification"],
+        [["2024-12-30", code, f"股票{i}", INDUSTRIES[i % len(INDUSTRIES)], "证监会行业分类"]
+         for i, code in enumerate(_a_share_codes(5000))]))
+    constituents = [["2024-12-16", code, f"股票{i}"] for i, code in enumerate(_a_share_codes(300))]
+    for function in ("query_hs300_stocks", "query_sz50_stocks", "query_zz500_stocks"):
+        save("baostock", function, _result_set(["updateDate", "code", "code_name"], constituents))
+    save("baostock", "query_trade_dates", _result_set(
+        ["calendar_date", "is_trading_day"],
+        [[(datetime.date(2024, 1, 1) + datetime.timedelta(days=i)).isoformat(),
+          "1" if (datetime.date(2024, 1, 1) + datetime.timedelta(days=i)).weekday() < 5 else "0"]
+         for i in range(366)]))
+    save("baostock", "query_shibor_data", _result_set(
+        ["date", "shiborON", "shibor1W", "shibor2W", "shibor1M", "shibor3M", "shibor6M", "shibor9M", "shibor1Y"],
+        [[day.isoformat()] + [f"{rng.uniform(1.2, 2.5):.4f}" for _ in range(8)] for day in _trading_days(250)]))
+    save("baostock", "query_money_supply_data_month", _result_set(
+        ["statYear", "statMonth", "m0Month", "m0YOY", "m0ChainRelative", "m1Month", "m1YOY",
+         "m1ChainRelative", "m2Month", "m2YOY", "m2ChainRelative"],
+        [[str(year), str(month)] + [f"{rng.uniform(1, 3000000):.2f}" for _ in range(9)]
+         for year in range(2015, 2025) for month in range(1, 13)]))
+    for function in ("query_deposit_rate_data", "query_loan_rate_data"):
+        save("baostock", function, _result_set(
+            ["pubDate", "demandDepositRate", "fixedDepositRate3Month", "fixedDepositRate1Year"],
+            [["2015-10-24", "0.350000", "1.100000", "1.500000"]]))
+
+    # --- AkShare ---
+    hk_codes = [f"{i:05d}" for i in range(1, 4501)]
+    save("akshare", "stock_hk_spot_em", pd.DataFrame({
+        "序号": range(1, len(hk_codes) + 1),
+        "代码": hk_codes,
+        "名称": ["腾讯控股" if code == "00700" else f"港股{code}" for code in hk_codes],
+        "最新价": [round(rng.uniform(0.1, 500), 3) for _ in hk_codes],
+        "涨跌额": [round(rng.uniform(-5, 5), 3) for _ in hk_codes],
+        "涨跌幅": [round(rng.uniform(-10, 10), 2) for _ in hk_codes],
+        "今开": [round(rng.uniform(0.1, 500), 3) for _ in hk_codes],
+        "最高": [round(rng.uniform(0.1, 500), 3) for _ in hk_codes],
+        "最低": [round(rng.uniform(0.1, 500), 3) for _ in hk_codes],
+        "昨收": [round(rng.uniform(0.1, 500), 3) for _ in hk_codes],
+        "成交量": [float(rng.randint(0, 10**8)) for _ in hk_codes],
+        "成交额": [float(rng.randint(0, 10**10)) for _ in hk_codes],
+    }))
+    k = k_data_rows(rng, k_rows, "hk.00700")
+    save("akshare", "stock_hk_hist", pd.DataFrame({
+        "日期": [datetime.date.fromisoformat(row[0]) for row in k],
+        "开盘": [float(row[2]) for row in k],
+        "收盘": [float(row[5]) for row in k],
+        "最高": [float(row[3]) for row in k],
+        "最低": [float(row[4]) for row in k],
+        "成交量": [int(row[7]) for row in k],
+        "成交额": [float(row[8]) for row in k],
+        "振幅": [round(rng.uniform(0, 8), 2) for _ in k],
+        "涨跌幅": [float(row[12]) for row in k],
+        "涨跌额": [round(float(row[5]) - float(row[6]), 3) for row in k],
+        "换手率": [float(row[10]) for row in k],
+    }))
+    save("akshare", "tool_trade_date_hist_sina", pd.DataFrame({
+        "trade_date": [datetime.date(2024, 1, 1) + datetime.timedelta(days=i) for i in range(366)
+                       if (datetime.date(2024, 1, 1) + datetime.timedelta(days=i)).weekday() < 5]}))
+    return store
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic upstream fixtures for replay mode")
+    parser.add_argument("--output", required=True, help="fixture directory to write")
+    parser.add_argument("--k-rows", type=int, default=250, help="rows of daily K-line data (default: 250)")
+    parser.add_argument("--seed", type=int, default=42, help="random seed (default: 42)")
+    args = parser.parse_args()
+    build_fixtures(args.output, args.k_rows, args.seed)
+    print(f"Synthetic fixtures written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,31 @@
 # Implementation of the FinancialDataSource interface using AKShare
-import akshare as ak
-import pandas as pd
+from __future__ import annotations
+
 from typing import List, Optional
 import logging
+import threading
+import time
 from datetime import datetime, timedelta
 try:
     from .data_source_interface import FinancialDataSource, DataSourceError, NoDataFoundError, LoginError
+    from .utils import lazy_import
+    from .shared_cache import cached_frame, k_data_ttl, DAY, HOUR
 except ImportError:
     from data_source_interface import FinancialDataSource, DataSourceError, NoDataFoundError, LoginError
+    from utils import lazy_import
+    from shared_cache import cached_frame, k_data_ttl, DAY, HOUR
+
+# akshare is very heavy to import; defer it (and pandas) until the first upstream call
+ak = lazy_import("akshare")
+pd = lazy_import("pandas")
 
 # Get a logger instance for this module
 logger = logging.getLogger(__name__)
 
+# Delay (seconds) before the background health probe starts, so that importing
+# akshare does not compete with the MCP handshake for the GIL
+HEALTH_PROBE_DELAY = 2.0
+
 # Default fields for different data types
 DEFAULT_K_FIELDS = [
     "date", "code", "open", "high", "low", "close", "preclose",
@@ -23,22 +37,90 @@ DEFAULT_BASIC_FIELDS = [
     "code", "tradeStatus", "code_name"
 ]
 
+# AKShare K线接口的列名映射（源列名 -> baostock 标准列名），映射之外的源列会被丢弃
+_HIST_K_SCHEMA = {
+    "日期": "date",
+    "开盘": "open",
+    "最高": "high",
+    "最低": "low",
+    "收盘": "close",
+    "成交量": "volume",
+    "成交额": "amount",
+    "换手率": "turn",
+    "涨跌幅": "pctChg",
+    "涨跌额": "_change",
+}
+AKSHARE_K_SCHEMAS = {
+    "stock_zh_a_hist": _HIST_K_SCHEMA,
+    "stock_hk_hist": _HIST_K_SCHEMA,
+    "stock_us_hist": _HIST_K_SCHEMA,
+}
+# 行情快照接口的列名映射（标准列名 -> 各市场可能的源列名；美股接口的列名与A股、港股不同）
+SPOT_QUOTE_SCHEMA = {
+    "price": ("最新价",),
+    "open": ("今开", "开盘价"),
+    "high": ("最高", "最高价"),
+    "low": ("最低", "最低价"),
+    "preclose": ("昨收", "昨收价"),
+    "pctChg": ("涨跌幅",),
+    "volume": ("成交量",),
+    "amount": ("成交额",),
+}
+# ak.rate_interbank() 的日期列，以及各宏观方法从这张表中返回的列（表中不存在的列忽略）。
+# 这张表只有一个利率列（同业拆借利率），AKShare 没有单独的存款 / 贷款基准利率，
+# 存款利率和贷款利率两个方法返回的是同一组列
+INTERBANK_DATE_COLUMN = "报告日"
+INTERBANK_RATE_COLUMNS = {
+    "deposit rate": [INTERBANK_DATE_COLUMN, "利率"],
+    "loan rate": [INTERBANK_DATE_COLUMN, "利率"],
+    "SHIBOR": [INTERBANK_DATE_COLUMN, "利率", "涨跌"],
+}
+# 未知接口使用的通用映射（兼容英文列名的接口）
+GENERIC_K_SCHEMA = {
+    **_HIST_K_SCHEMA,
+    **{field: field for field in DEFAULT_K_FIELDS},
+    "trade_date": "date",
+    "Date": "date",
+}
+# 用于计算前收盘价的中间列（涨跌额），计算后丢弃
+PRECLOSE_SOURCE = "_change"
+K_NUMERIC_FIELDS = ("open", "high", "low", "close", "preclose", "volume", "amount", "turn", "pctChg",
+                    "_change", "peTTM", "pbMRQ", "psTTM", "pcfNcfTTM")
+
 class AkshareDataSource(FinancialDataSource):
     """
     AKShare数据源实现，支持A股、港股、美股数据查询
     """
     
-    def __init__(self):
-        """初始化AKShare数据源"""
+    def __init__(self, health_probe_delay: Optional[float] = HEALTH_PROBE_DELAY):
+        """
+        初始化AKShare数据源
+
+        AKShare不需要登录；可用性检查在后台线程中进行，不阻塞服务器启动。
+
+        Args:
+            health_probe_delay: 后台健康检查的延迟秒数，None 表示不进行检查
+        """
         logger.info("Initializing AKShare data source")
-        # AKShare不需要登录，但我们可以在这里做一些初始化检查
+        self.health_status = "pending"
+        # 进程内的同业拆借利率表 (下载时间, 表)；共享缓存关闭时三个利率方法仍共用一次下载
+        self._interbank_lock = threading.Lock()
+        self._interbank_rates: Optional[tuple] = None
+        if health_probe_delay is not None:
+            probe = threading.Timer(health_probe_delay, self._probe_health)
+            probe.name = "akshare-health-probe"
+            probe.daemon = True
+            probe.start()
+
+    def _probe_health(self) -> None:
+        """后台健康检查：导入AKShare并测试接口是否可用，失败只记录日志"""
         try:
-            # 测试AKShare是否可用
             ak.tool_trade_date_hist_sina()
+            self.health_status = "ok"
             logger.info("AKShare data source initialized successfully")
         except Exception as e:
-            logger.error(f"Failed to initialize AKShare: {e}")
-            raise DataSourceError(f"Failed to initialize AKShare: {e}")
+            self.health_status = f"error: {e}"
+            logger.error(f"AKShare health probe failed: {e}")
     
     def _convert_code_format(self, code: str, market: str = "A") -> str:
         """
@@ -66,42 +148,52 @@ class AkshareDataSource(FinancialDataSource):
             return code.upper()
         return code
     
-    def _standardize_dataframe(self, df: pd.DataFrame, code: str) -> pd.DataFrame:
+    def _standardize_dataframe(self, df: pd.DataFrame, code: str, endpoint: Optional[str] = None,
+                               adjust_flag: str = "3") -> pd.DataFrame:
         """
-        标准化DataFrame格式，使其与baostock格式兼容
+        标准化DataFrame格式，使其与baostock K线格式一致
+
+        按接口的列名映射原地重命名，丢弃映射之外的源列（不再保留中文列副本），
+        数值列只在不是数值类型时转换一次，列顺序与 DEFAULT_K_FIELDS 一致。
+
+        df 归本方法所有（AKShare 每次返回新的 DataFrame），会被原地修改。列的删除（del）、
+        重命名（inplace）和最后按 Series 重新排列都不复制列数据；df[columns]、rename() 和 drop()
+        在未开启 Copy-on-Write 的 pandas 2.x 中都会复制整张表。
+
+        Args:
+            df: AKShare 接口返回的 DataFrame
+            code: 标准格式的证券代码（如 'sh.600000'、'hk.00700'）
+            endpoint: AKShare 接口名，用于选择列名映射；None 时使用通用映射
+            adjust_flag: 复权标志（与 baostock 相同：'1' 后复权，'2' 前复权，'3' 不复权）
         """
         if df.empty:
             return df
-        
-        # 确保有code列
-        if 'code' not in df.columns and 'symbol' not in df.columns:
-            df['code'] = code
-        elif 'symbol' in df.columns and 'code' not in df.columns:
-            df['code'] = df['symbol']
-        
-        # 标准化日期列
-        if 'date' not in df.columns:
-            for date_col in ['日期', 'trade_date', 'Date']:
-                if date_col in df.columns:
-                    df['date'] = df[date_col]
-                    break
-        
-        # 标准化价格列
-        price_mapping = {
-            '开盘': 'open',
-            '最高': 'high', 
-            '最低': 'low',
-            '收盘': 'close',
-            '成交量': 'volume',
-            '成交额': 'amount'
-        }
-        
-        for chinese_col, english_col in price_mapping.items():
-            if chinese_col in df.columns and english_col not in df.columns:
-                df[english_col] = df[chinese_col]
-        
-        return df
-    
+
+        schema = AKSHARE_K_SCHEMAS.get(endpoint, GENERIC_K_SCHEMA)
+        for column in [column for column in df.columns if column not in schema]:
+            del df[column]
+        df.rename(columns=schema, inplace=True)
+
+        # 数值列：AKShare 通常已经转换过，这里只处理仍是字符串的列
+        for column in K_NUMERIC_FIELDS:
+            if column in df.columns and not pd.api.types.is_numeric_dtype(df[column]):
+                df[column] = pd.to_numeric(df[column], errors="coerce")
+
+        # 前收盘价: 收盘价 - 涨跌额
+        if PRECLOSE_SOURCE in df.columns:
+            if "close" in df.columns:
+                df["preclose"] = df["close"] - df[PRECLOSE_SOURCE]
+            del df[PRECLOSE_SOURCE]
+
+        # 日期统一为 'YYYY-MM-DD' 字符串（与 baostock 一致）
+        if "date" in df.columns and not pd.api.types.is_string_dtype(df["date"]):
+            df["date"] = pd.to_datetime(df["date"], errors="coerce").dt.strftime("%Y-%m-%d")
+
+        df["code"] = code
+        df["adjustflag"] = adjust_flag
+        return pd.DataFrame({field: df[field] for field in DEFAULT_K_FIELDS if field in df.columns}, copy=False)
+
+    @cached_frame("akshare.k_data", k_data_ttl, projection=("fields", DEFAULT_K_FIELDS))
     def get_historical_k_data(
         self,
         code: str,
@@ -114,6 +206,8 @@ class AkshareDataSource(FinancialDataSource):
         """
         获取历史K线数据
         支持A股、港股、美股
+
+        AKShare 接口总是返回整张表；标准化之后按 fields 裁剪列由 cached_frame 的列投影完成
         """
         logger.info(f"Fetching historical K data for {code}, {start_date} to {end_date}")
         
@@ -150,11 +244,7 @@ class AkshareDataSource(FinancialDataSource):
                 raise NoDataFoundError(f"No data found for {code}")
             
             # 标准化DataFrame
-            df = self._standardize_dataframe(df, code)
-            
-            # 添加缺失的列
-            if 'adjustflag' not in df.columns:
-                df['adjustflag'] = adjust_flag
+            df = self._standardize_dataframe(df, code, "stock_zh_a_hist", adjust_flag)
             
             logger.info(f"Retrieved {len(df)} records for {code}")
             return df
@@ -176,7 +266,7 @@ class AkshareDataSource(FinancialDataSource):
                 raise NoDataFoundError(f"No HK stock data found for {code}")
             
             # 标准化DataFrame
-            df = self._standardize_dataframe(df, code)
+            df = self._standardize_dataframe(df, code, "stock_hk_hist")
             
             logger.info(f"Retrieved {len(df)} HK stock records for {code}")
             return df
@@ -197,7 +287,7 @@ class AkshareDataSource(FinancialDataSource):
                 raise NoDataFoundError(f"No US stock data found for {code}")
             
             # 标准化DataFrame
-            df = self._standardize_dataframe(df, code)
+            df = self._standardize_dataframe(df, code, "stock_us_hist")
             
             logger.info(f"Retrieved {len(df)} US stock records for {code}")
             return df
@@ -382,6 +472,15 @@ class AkshareDataSource(FinancialDataSource):
         """获取杜邦分析数据"""
         return self.get_profit_data(code, year, quarter)  # 使用相同的财务数据接口
     
+    def get_financial_snapshot(self, code: str, year: str, quarter: int) -> pd.DataFrame:
+        """获取完整的季度财务快照（各类财务数据都来自同一张财务指标表）"""
+        return self.get_profit_data(code, year, quarter)
+    
+    def get_financial_history(self, code: str, categories: Optional[List[str]] = None,
+                              start_quarter: str = "", end_quarter: str = "") -> pd.DataFrame:
+        """获取多季度财务数据面板"""
+        raise NoDataFoundError(f"Quarterly financial history not available in AKShare for {code}")
+    
     def get_performance_express_report(self, code: str, start_date: str, end_date: str) -> pd.DataFrame:
         """获取业绩快报"""
         if code.startswith("hk.") or code.startswith("us."):
@@ -418,6 +517,7 @@ class AkshareDataSource(FinancialDataSource):
             raise DataSourceError(f"Error fetching industry data: {e}")
     
     # 指数成分股（主要支持A股指数）
+    @cached_frame("akshare.sz50", DAY)
     def get_sz50_stocks(self, date: Optional[str] = None) -> pd.DataFrame:
         """获取上证50成分股"""
         try:
@@ -427,6 +527,7 @@ class AkshareDataSource(FinancialDataSource):
             logger.error(f"Error fetching SZ50 stocks: {e}")
             raise DataSourceError(f"Error fetching SZ50 stocks: {e}")
     
+    @cached_frame("akshare.hs300", DAY)
     def get_hs300_stocks(self, date: Optional[str] = None) -> pd.DataFrame:
         """获取沪深300成分股"""
         try:
@@ -436,6 +537,7 @@ class AkshareDataSource(FinancialDataSource):
             logger.error(f"Error fetching HS300 stocks: {e}")
             raise DataSourceError(f"Error fetching HS300 stocks: {e}")
     
+    @cached_frame("akshare.zz500", DAY)
     def get_zz500_stocks(self, date: Optional[str] = None) -> pd.DataFrame:
         """获取中证500成分股"""
         try:
@@ -445,6 +547,7 @@ class AkshareDataSource(FinancialDataSource):
             logger.error(f"Error fetching ZZ500 stocks: {e}")
             raise DataSourceError(f"Error fetching ZZ500 stocks: {e}")
     
+    @cached_frame("akshare.trade_dates", DAY)
     def get_trade_dates(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> pd.DataFrame:
         """获取交易日历"""
         try:
@@ -476,24 +579,143 @@ class AkshareDataSource(FinancialDataSource):
             logger.error(f"Error fetching all stocks: {e}")
             raise DataSourceError(f"Error fetching all stocks: {e}")
     
-    # 宏观经济数据（部分支持）
-    def get_deposit_rate_data(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> pd.DataFrame:
-        """获取存款利率数据"""
+    def get_universe_changes(self, start_date: str, end_date: str) -> pd.DataFrame:
+        """获取股票池变化"""
+        raise NoDataFoundError("Historical stock universe not available in AKShare")
+    
+    def get_suspended_stocks(self, start_date: str, end_date: str) -> pd.DataFrame:
+        """获取区间内停牌过的证券"""
+        raise NoDataFoundError("Historical stock universe not available in AKShare")
+    
+    @cached_frame("akshare.security_list", DAY)
+    def get_security_list(self, market: str = "a") -> pd.DataFrame:
+        """
+        获取指定市场的证券列表（代码表）
+
+        Args:
+            market: 市场类型 ('a', 'hk', 'us')
+
+        Returns:
+            包含 code, code_name 列的DataFrame，代码为本项目统一格式（如 sh.600000、hk.00700、us.AAPL）
+        """
+        logger.info(f"Fetching security list for market '{market}'")
         try:
-            df = ak.rate_interbank()
-            return df
+            df, codes = self._spot_snapshot(market)
+            return pd.DataFrame({'code': codes, 'code_name': df['名称']})
+
+        except (NoDataFoundError, ValueError):
+            raise
         except Exception as e:
-            logger.error(f"Error fetching deposit rate data: {e}")
-            raise DataSourceError(f"Error fetching deposit rate data: {e}")
-    
-    def get_loan_rate_data(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> pd.DataFrame:
-        """获取贷款利率数据"""
+            logger.error(f"Error fetching security list for market '{market}': {e}")
+            raise DataSourceError(f"Error fetching security list for market '{market}': {e}")
+
+    def get_spot_quotes(self, market: str = "a") -> pd.DataFrame:
+        """
+        获取指定市场全部证券的实时行情快照（一次请求）
+
+        Args:
+            market: 市场类型 ('a', 'hk', 'us')
+
+        Returns:
+            包含 code, code_name 和 SPOT_QUOTE_SCHEMA 中标准列的DataFrame，代码为本项目统一格式
+        """
         try:
+            df, codes = self._spot_snapshot(market)
+            result = pd.DataFrame({'code': codes.to_numpy(), 'code_name': df['名称'].to_numpy()})
+            for target, sources in SPOT_QUOTE_SCHEMA.items():
+                source = next((column for column in sources if column in df.columns), None)
+                if source is not None:
+                    result[target] = pd.to_numeric(df[source], errors="coerce").to_numpy()
+            return result
+
+        except (NoDataFoundError, ValueError):
+            raise
+        except Exception as e:
+            logger.error(f"Error fetching spot quotes for market '{market}': {e}")
+            raise DataSourceError(f"Error fetching spot quotes for market '{market}': {e}")
+
+    def _spot_snapshot(self, market: str):
+        """下载指定市场的行情快照，返回 (原始DataFrame, 统一格式的代码Series)"""
+        if market == "a":
+            df = ak.stock_zh_a_spot_em()
+            codes = df['代码'].astype(str).map(self._a_share_code_with_prefix)
+        elif market == "hk":
+            df = ak.stock_hk_spot_em()
+            codes = "hk." + df['代码'].astype(str)
+        elif market == "us":
+            df = ak.stock_us_spot_em()
+            # 东方财富美股代码带有交易所前缀，如 105.AAPL
+            codes = "us." + df['代码'].astype(str).str.split(".").str[-1]
+        else:
+            raise ValueError(f"Unsupported market: {market}")
+
+        if df.empty:
+            raise NoDataFoundError(f"No securities found for market '{market}'")
+        return df, codes
+
+    @staticmethod
+    def _a_share_code_with_prefix(symbol: str) -> str:
+        """为6位A股代码添加交易所前缀"""
+        if symbol.startswith(("6", "9")):
+            return f"sh.{symbol}"
+        if symbol.startswith(("4", "8")):
+            return f"bj.{symbol}"
+        return f"sz.{symbol}"
+
+    # 宏观经济数据（部分支持）
+    @cached_frame("akshare.rate_interbank", HOUR)
+    def _get_interbank_rates(self) -> pd.DataFrame:
+        """
+        下载同业拆借利率表；存款利率、贷款利率和 SHIBOR 三个方法共用同一份下载
+
+        共享缓存之下还有一层进程内的一小时缓存（共享缓存关闭时，例如回放模式，也只下载一次）；
+        并发调用在锁上等待同一次下载。调用方不得修改返回的表。
+        """
+        with self._interbank_lock:
+            if self._interbank_rates is not None and time.monotonic() - self._interbank_rates[0] < HOUR:
+                return self._interbank_rates[1]
             df = ak.rate_interbank()
+            self._interbank_rates = (time.monotonic(), df)
             return df
+
+    def _select_interbank_rates(self, label: str, start_date: Optional[str], end_date: Optional[str]) -> pd.DataFrame:
+        """从共用的同业拆借利率表中按日期区间过滤并选取 label 对应的列"""
+        try:
+            df = self._get_interbank_rates()
         except Exception as e:
-            logger.error(f"Error fetching loan rate data: {e}")
-            raise DataSourceError(f"Error fetching loan rate data: {e}")
+            logger.error(f"Error fetching {label} data: {e}")
+            raise DataSourceError(f"Error fetching {label} data: {e}")
+
+        if INTERBANK_DATE_COLUMN in df.columns and (start_date or end_date):
+            dates = pd.to_datetime(df[INTERBANK_DATE_COLUMN], errors="coerce")
+            mask = pd.Series(True, index=df.index)
+            if start_date:
+                mask &= dates >= pd.Timestamp(start_date)
+            if end_date:
+                mask &= dates <= pd.Timestamp(end_date)
+            df = df[mask]
+        columns = [column for column in INTERBANK_RATE_COLUMNS[label] if column in df.columns]
+        if columns:
+            df = df[columns]
+        if df.empty:
+            raise NoDataFoundError(f"No {label} data found for the specified criteria.")
+        return df.reset_index(drop=True)
+
+    def get_deposit_rate_data(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> pd.DataFrame:
+        """
+        获取存款利率数据
+
+        AKShare 没有存款基准利率表，返回的是同业拆借利率（报告日、利率），与 get_loan_rate_data 相同
+        """
+        return self._select_interbank_rates("deposit rate", start_date, end_date)
+    
+    def get_loan_rate_data(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> pd.DataFrame:
+        """
+        获取贷款利率数据
+
+        AKShare 没有贷款基准利率表，返回的是同业拆借利率（报告日、利率），与 get_deposit_rate_data 相同
+        """
+        return self._select_interbank_rates("loan rate", start_date, end_date)
     
     def get_required_reserve_ratio_data(self, start_date: Optional[str] = None, end_date: Optional[str] = None, year_type: str = '0') -> pd.DataFrame:
         """获取存款准备金率数据"""
@@ -514,9 +736,9 @@ class AkshareDataSource(FinancialDataSource):
     
     def get_shibor_data(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> pd.DataFrame:
         """获取SHIBOR数据"""
-        try:
-            df = ak.rate_interbank()
-            return df
-        except Exception as e:
-            logger.error(f"Error fetching SHIBOR data: {e}")
-            raise DataSourceError(f"Error fetching SHIBOR data: {e}")
\ No newline at end of file
+        return self._select_interbank_rates("SHIBOR", start_date, end_date)
+    
+    def get_macro_panel(self, series: List[str], start_date: Optional[str] = None, end_date: Optional[str] = None,
+                        frequency: str = "monthly", growth: Optional[List[str]] = None) -> pd.DataFrame:
+        """获取对齐到同一日历的多个宏观序列（AKShare 不支持）"""
+        raise NoDataFoundError("Macro panel not available in AKShare")
\ No newline at end of file
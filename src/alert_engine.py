@@ -0,0 +1,260 @@
+"""
+关注列表提醒模块
+
+智能体登记提醒规则后不必反复调用 get_historical_k_data 轮询：实时行情缓冲（quote_buffer）
+每写入一份市场快照就回调本模块，按规则类型分组做一次向量化判断（同一类型的全部规则的阈值、
+状态都保存在 NumPy 数组中，一次比较覆盖所有关注的证券），满足条件的规则记为已触发。
+
+规则类型:
+- price_above / price_below: 最新价向上 / 向下穿过 threshold（登记时已在另一侧的不算穿过）
+- pct_change: 当日涨跌幅达到 threshold（百分比；正数为涨幅 ≥ threshold，负数为跌幅 ≤ threshold）
+- volume_spike: 两次拉取之间的成交量达到最近 window 次拉取平均值（指数加权）的 threshold 倍
+- ma_cross_above / ma_cross_below: 最新价向上 / 向下穿过最近 window 次拉取价格的指数移动平均
+
+规则在条件由不满足变为满足时触发一次，条件不再满足后重新生效。
+有规则的证券在行情缓冲中固定（QuoteBuffer.pin），不会因关注列表已满或长时间没有读取而停止拉取。
+每条触发记录带有递增的序号 sequence，读取方记下最后一条的序号、下次只取更大的序号即可不重不漏。
+
+规则和触发记录保存在进程内存中（与行情缓冲一致），触发记录最多保留 MAX_TRIGGERED 条；
+因此多个 HTTP 工作进程（--workers > 1）之间不共享规则，提醒工具在这种部署下不可用。
+
+作者: StockReport MCP Project
+许可证: MIT License
+"""
+from __future__ import annotations
+
+import itertools
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Deque, Dict, List, NamedTuple, Optional
+
+try:
+    from .quote_buffer import QuoteBuffer, get_quote_buffer
+    from .utils import lazy_import
+except ImportError:
+    from quote_buffer import QuoteBuffer, get_quote_buffer
+    from utils import lazy_import
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+logger = logging.getLogger(__name__)
+
+# 规则类型 -> 登记时已满足条件是否立即触发（穿越类规则需要先观察到另一侧）
+RULE_KINDS = {
+    "price_above": False,
+    "price_below": False,
+    "pct_change": True,
+    "volume_spike": True,
+    "ma_cross_above": False,
+    "ma_cross_below": False,
+}
+DEFAULT_WINDOW = 20
+# volume_spike / ma_cross_* 至少观察到这么多次拉取后才开始判断
+MIN_OBSERVATIONS = 5
+MAX_RULES = 1000
+MAX_TRIGGERED = 1000
+
+
+class AlertRule(NamedTuple):
+    rule_id: int
+    code: str
+    kind: str
+    threshold: float
+    window: int
+    created: float
+
+
+class TriggeredAlert(NamedTuple):
+    sequence: int
+    triggered: float
+    rule_id: int
+    code: str
+    kind: str
+    threshold: float
+    value: float
+
+
+class _RuleGroup:
+    """同一类型的全部规则，参数和状态按规则对齐保存在数组中"""
+
+    def __init__(self, rules: List[AlertRule], previous: Optional["_RuleGroup"] = None):
+        self.rules = rules
+        self.codes = np.array([rule.code for rule in rules], dtype=str)
+        self.threshold = np.array([rule.threshold for rule in rules], dtype="float64")
+        self.alpha = np.array([2.0 / (rule.window + 1) for rule in rules], dtype="float64")
+        # 条件状态: -1 尚未观察，0 不满足，1 满足
+        self.state = np.full(len(rules), -1, dtype="int8")
+        # 指数加权平均（成交量增量或价格）、上一次的累计成交量、已观察次数
+        self.average = np.full(len(rules), np.nan)
+        self.last_volume = np.full(len(rules), np.nan)
+        self.seen = np.zeros(len(rules), dtype="int64")
+        if previous is not None:
+            # 增删规则时保留其余规则的状态
+            kept = {rule.rule_id: i for i, rule in enumerate(previous.rules)}
+            for i, rule in enumerate(rules):
+                j = kept.get(rule.rule_id)
+                if j is not None:
+                    self.state[i], self.average[i] = previous.state[j], previous.average[j]
+                    self.last_volume[i], self.seen[i] = previous.last_volume[j], previous.seen[j]
+
+
+def _gather(codes: np.ndarray, values: np.ndarray, wanted: np.ndarray) -> np.ndarray:
+    """按 wanted 的顺序取出 codes 对应的 values，快照中没有的为 NaN"""
+    order = np.argsort(codes)
+    ordered = codes[order]
+    position = np.clip(np.searchsorted(ordered, wanted), 0, max(len(ordered) - 1, 0))
+    if not len(ordered):
+        return np.full(len(wanted), np.nan)
+    found = ordered[position] == wanted
+    return np.where(found, values[order][position], np.nan)
+
+
+class AlertEngine:
+    """提醒规则的登记、增量判断和触发记录"""
+
+    def __init__(self, buffer: Optional[QuoteBuffer] = None):
+        """
+        Args:
+            buffer: 有规则的证券在其中固定；None 时不固定（由调用方负责关注）
+        """
+        self._lock = threading.Lock()
+        self._buffer = buffer
+        self._ids = itertools.count(1)
+        self._sequence = itertools.count(1)
+        self._rules: Dict[int, AlertRule] = {}
+        self._groups: Dict[str, _RuleGroup] = {}
+        self._triggered: Deque[TriggeredAlert] = deque(maxlen=MAX_TRIGGERED)
+
+    def add_rule(self, code: str, kind: str, threshold: float, window: int = DEFAULT_WINDOW) -> AlertRule:
+        if kind not in RULE_KINDS:
+            raise ValueError(f"Invalid alert kind '{kind}'. Valid options: {', '.join(RULE_KINDS)}.")
+        if kind in ("volume_spike", "ma_cross_above", "ma_cross_below") and window < 2:
+            raise ValueError("window must be at least 2.")
+        if kind == "volume_spike" and threshold <= 0:
+            raise ValueError("volume_spike threshold must be a positive multiple.")
+        with self._lock:
+            if len(self._rules) >= MAX_RULES:
+                raise ValueError(f"Too many alert rules (maximum {MAX_RULES}); remove some first.")
+            rule = AlertRule(next(self._ids), code, kind, float(threshold), int(window), time.time())
+            self._rules[rule.rule_id] = rule
+            self._rebuild(kind)
+            if self._buffer is not None:
+                self._buffer.pin(code)
+        logger.info(f"Alert rule {rule.rule_id} added: {code} {kind} {threshold}")
+        return rule
+
+    def remove_rule(self, rule_id: int) -> bool:
+        with self._lock:
+            rule = self._rules.pop(rule_id, None)
+            if rule is None:
+                return False
+            self._rebuild(rule.kind)
+            if self._buffer is not None:
+                self._buffer.unpin(rule.code)
+        return True
+
+    def _rebuild(self, kind: str) -> None:
+        rules = [rule for rule in self._rules.values() if rule.kind == kind]
+        if rules:
+            self._groups[kind] = _RuleGroup(rules, self._groups.get(kind))
+        else:
+            self._groups.pop(kind, None)
+
+    def rules(self) -> List[AlertRule]:
+        with self._lock:
+            return sorted(self._rules.values())
+
+    def rules_frame(self) -> pd.DataFrame:
+        df = pd.DataFrame(self.rules(), columns=list(AlertRule._fields))
+        df["created"] = [datetime.fromtimestamp(stamp).strftime("%Y-%m-%d %H:%M:%S") for stamp in df["created"]]
+        return df
+
+    def on_quotes(self, market: str, timestamp: float, columns: Dict[str, np.ndarray]) -> None:
+        """QuoteBuffer 的回调: 用一份市场快照判断全部规则"""
+        codes = columns["code"]
+        fired: List[TriggeredAlert] = []
+        with self._lock:
+            for kind, group in self._groups.items():
+                price = _gather(codes, columns["price"], group.codes)
+                if np.isnan(price).all():
+                    continue
+                valid = ~np.isnan(price)
+                if kind == "price_above":
+                    value, condition = price, price >= group.threshold
+                elif kind == "price_below":
+                    value, condition = price, price <= group.threshold
+                elif kind == "pct_change":
+                    value = _gather(codes, columns["pctChg"], group.codes)
+                    valid &= ~np.isnan(value)
+                    condition = np.where(group.threshold >= 0, value >= group.threshold, value <= group.threshold)
+                elif kind == "volume_spike":
+                    volume = _gather(codes, columns["volume"], group.codes)
+                    delta = volume - group.last_volume
+                    # 累计成交量变小（新的交易日）时本次不计
+                    observed = ~np.isnan(delta) & (delta >= 0)
+                    with np.errstate(divide="ignore", invalid="ignore"):
+                        value = np.where(group.average > 0, delta / group.average, np.nan)
+                    valid &= observed & (group.seen >= MIN_OBSERVATIONS)
+                    condition = value >= group.threshold
+                    group.average = np.where(
+                        observed,
+                        np.where(np.isnan(group.average), delta, group.average + group.alpha * (delta - group.average)),
+                        group.average)
+                    group.seen += observed
+                    group.last_volume = np.where(np.isnan(volume), group.last_volume, volume)
+                else:
+                    value = price
+                    valid &= group.seen >= MIN_OBSERVATIONS
+                    condition = price > group.average if kind == "ma_cross_above" else price < group.average
+                    observed = ~np.isnan(price)
+                    group.average = np.where(
+                        observed,
+                        np.where(np.isnan(group.average), price, group.average + group.alpha * (price - group.average)),
+                        group.average)
+                    group.seen += observed
+                condition = condition & valid
+                fire = condition & ((group.state == 0) | ((group.state == -1) & RULE_KINDS[kind]))
+                group.state = np.where(valid, condition.astype("int8"), group.state)
+                for i in np.flatnonzero(fire):
+                    rule = group.rules[i]
+                    fired.append(TriggeredAlert(next(self._sequence), timestamp, rule.rule_id, rule.code, kind,
+                                                rule.threshold, float(value[i])))
+            self._triggered.extend(fired)
+        for alert in fired:
+            logger.info(f"Alert rule {alert.rule_id} triggered: {alert.code} {alert.kind} ({alert.value:.4g})")
+
+    def triggered(self, after: Optional[int] = None, since: Optional[float] = None) -> pd.DataFrame:
+        """
+        触发的提醒，按序号（即触发顺序）排列
+
+        Args:
+            after: 只返回序号大于 after 的提醒（增量读取）
+            since: 只返回 since（时间戳）及之后触发的提醒
+        """
+        with self._lock:
+            alerts = [alert for alert in self._triggered
+                      if (after is None or alert.sequence > after) and (since is None or alert.triggered >= since)]
+        df = pd.DataFrame(alerts, columns=list(TriggeredAlert._fields))
+        df["triggered"] = [datetime.fromtimestamp(stamp).strftime("%Y-%m-%d %H:%M:%S") for stamp in df["triggered"]]
+        return df
+
+
+_alert_engine: Optional[AlertEngine] = None
+_alert_engine_lock = threading.Lock()
+
+
+def get_alert_engine() -> AlertEngine:
+    """Returns the process-wide AlertEngine, subscribed to the quote buffer."""
+    global _alert_engine
+    if _alert_engine is None:
+        with _alert_engine_lock:
+            if _alert_engine is None:
+                buffer = get_quote_buffer()
+                engine = AlertEngine(buffer)
+                buffer.add_listener(engine.on_quotes)
+                _alert_engine = engine
+    return _alert_engine
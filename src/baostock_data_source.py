@@ -1,14 +1,42 @@
 # Implementation of the FinancialDataSource interface using Baostock
-import baostock as bs
-import pandas as pd
-from typing import List, Optional
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
 import logging
 try:
     from .data_source_interface import FinancialDataSource, DataSourceError, NoDataFoundError, LoginError
-    from .utils import baostock_login_context
+    from .utils import baostock_login_context, lazy_import
+    from .shared_cache import cached_frame, k_data_ttl, DAY
+    from .intraday_download import INTRADAY_FREQUENCIES, needs_chunking, download_intraday, fill_intraday_store
+    from .intraday_store import (INTRADAY_K_FIELDS, IntradayStore, can_serve, columns_to_frame,
+                                 frame_to_columns, get_intraday_store)
+    from .metrics import metrics
+    from .disclosure_index import last_due_quarter, next_quarter, previous_quarter
+    from .constituent_history import INDICES, get_constituent_history
+    from .universe_store import COVERAGE_ATTR, get_universe_store
+    from .macro_store import MACRO_SERIES, build_macro_panel, get_macro_store, parse_panel_series
+    from .financial_store import (SECTIONS_ATTR, SHARED_COLUMNS, Quarter, build_financial_panel,
+                                  format_quarter, get_financial_store, parse_quarter, quarter_range)
 except ImportError:
     from data_source_interface import FinancialDataSource, DataSourceError, NoDataFoundError, LoginError
-    from utils import baostock_login_context
+    from utils import baostock_login_context, lazy_import
+    from shared_cache import cached_frame, k_data_ttl, DAY
+    from intraday_download import INTRADAY_FREQUENCIES, needs_chunking, download_intraday, fill_intraday_store
+    from intraday_store import (INTRADAY_K_FIELDS, IntradayStore, can_serve, columns_to_frame,
+                                frame_to_columns, get_intraday_store)
+    from metrics import metrics
+    from disclosure_index import last_due_quarter, next_quarter, previous_quarter
+    from constituent_history import INDICES, get_constituent_history
+    from universe_store import COVERAGE_ATTR, get_universe_store
+    from macro_store import MACRO_SERIES, build_macro_panel, get_macro_store, parse_panel_series
+    from financial_store import (SECTIONS_ATTR, SHARED_COLUMNS, Quarter, build_financial_panel,
+                                 format_quarter, get_financial_store, parse_quarter, quarter_range)
+
+# baostock and pandas are imported on first use to keep server start-up fast
+bs = lazy_import("baostock")
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
 
 # Get a logger instance for this module
 logger = logging.getLogger(__name__)
@@ -24,6 +52,40 @@ DEFAULT_BASIC_FIELDS = [
     # Add more default fields as needed, e.g., "industry", "listingDate"
 ]
 
+
+# The six Baostock tables that make up one quarterly report: category -> (query, label)
+FINANCIAL_CATEGORIES = {
+    "profit": ("query_profit_data", "Profitability"),
+    "operation": ("query_operation_data", "Operation Capability"),
+    "growth": ("query_growth_data", "Growth Capability"),
+    "balance": ("query_balance_data", "Balance Sheet"),
+    "cash_flow": ("query_cash_flow_data", "Cash Flow"),
+    "dupont": ("query_dupont_data", "DuPont Analysis"),
+}
+# Longest history get_financial_history serves in one call
+MAX_HISTORY_QUARTERS = 40
+# Longest range (in trading days) get_universe_changes / get_suspended_stocks download in one call
+MAX_UNIVERSE_DAYS = 250
+# Most stock lists get_universe_changes / get_suspended_stocks download from Baostock in one call
+# (each is a full ~5500-row list fetched under the global Baostock lock); later days follow on the next call
+MAX_UNIVERSE_DOWNLOADS = 30
+# Stock lists fetched per Baostock login; the global Baostock lock is released between batches so other
+# A-share tools are not blocked for the whole download
+UNIVERSE_DOWNLOAD_BATCH = 5
+# Calendar days searched backwards for the trading day before a universe range
+UNIVERSE_BASELINE_LOOKBACK_DAYS = 20
+# Years get_macro_panel covers when no start date is given
+PANEL_DEFAULT_YEARS = 3
+
+
+def _collect_rows(rs) -> list:
+    """Reads every remaining row of a Baostock result set (fetching further pages as needed)."""
+    data_list = []
+    while rs.next():
+        data_list.append(rs.get_row_data())
+    return data_list
+
+
 # Helper function to reduce repetition in financial data fetching
 
 
@@ -51,9 +113,7 @@ def _fetch_financial_data(
                     raise DataSourceError(
                         f"Baostock API error fetching {data_type_name} data: {rs.error_msg} (code: {rs.error_code})")
 
-            data_list = []
-            while rs.next():
-                data_list.append(rs.get_row_data())
+            data_list = _collect_rows(rs)
 
             if not data_list:
                 logger.warning(
@@ -76,6 +136,22 @@ def _fetch_financial_data(
         raise DataSourceError(
             f"Unexpected error fetching {data_type_name} data for {code}: {e}")
 
+def _merge_financial_sections(sections: Dict[str, Dict[str, object]]) -> pd.DataFrame:
+    """Merges per-table financial records (label -> row) into one wide record with shared columns once."""
+    shared: Dict[str, object] = {}
+    merged: Dict[str, object] = {}
+    layout: Dict[str, List[str]] = {}
+    for label, row in sections.items():
+        for column in SHARED_COLUMNS:
+            if column in row and column not in shared:
+                shared[column] = row[column]
+        own = [column for column in row if column not in SHARED_COLUMNS and column not in merged]
+        merged.update((column, row[column]) for column in own)
+        layout[label] = own
+    result = pd.DataFrame([{**shared, **merged}])
+    result.attrs[SECTIONS_ATTR] = layout
+    return result
+
 # Helper function to reduce repetition for index constituent data fetching
 
 
@@ -101,9 +177,7 @@ def _fetch_index_constituent_data(
                     raise DataSourceError(
                         f"Baostock API error fetching {index_name} constituents: {rs.error_msg} (code: {rs.error_code})")
 
-            data_list = []
-            while rs.next():
-                data_list.append(rs.get_row_data())
+            data_list = _collect_rows(rs)
 
             if not data_list:
                 logger.warning(
@@ -154,9 +228,7 @@ def _fetch_macro_data(
                     raise DataSourceError(
                         f"Baostock API error fetching {data_type_name} data: {rs.error_msg} (code: {rs.error_code})")
 
-            data_list = []
-            while rs.next():
-                data_list.append(rs.get_row_data())
+            data_list = _collect_rows(rs)
 
             if not data_list:
                 logger.warning(
@@ -206,7 +278,99 @@ class BaostockDataSource(FinancialDataSource):
         adjust_flag: str = "3",
         fields: Optional[List[str]] = None,
     ) -> pd.DataFrame:
-        """Fetches historical K-line data using Baostock."""
+        """Fetches historical K-line data using Baostock; minute bars come from the local intraday store."""
+        if frequency in INTRADAY_FREQUENCIES and can_serve(code, adjust_flag, fields):
+            store = get_intraday_store()
+            if store is not None:
+                return self._get_intraday_k_data(store, code, start_date, end_date, frequency, adjust_flag, fields)
+        if frequency in INTRADAY_FREQUENCIES:
+            # Long minute-bar ranges are downloaded in chunks that are cached individually; caching the
+            # concatenated result as well would store every bar twice
+            trading_days = self._trading_days(start_date, end_date)
+            if needs_chunking(trading_days, frequency):
+                return self._download_k_data(code, frequency, adjust_flag, fields, trading_days)
+        return self._query_k_data(code, start_date, end_date, frequency, adjust_flag, fields)
+
+    def _download_k_data(self, code: str, frequency: str, adjust_flag: str, fields: Optional[List[str]],
+                         trading_days: List[str]) -> pd.DataFrame:
+        """Downloads a long minute-bar range split along the trading calendar, in parallel."""
+        logger.info(f"Fetching K-data for {code} ({trading_days[0]} to {trading_days[-1]}) in chunks, "
+                    f"freq={frequency}, adjust={adjust_flag}")
+        try:
+            formatted_fields = self._format_fields(fields, DEFAULT_K_FIELDS)
+            result_df = download_intraday(code, formatted_fields, frequency, adjust_flag, trading_days)
+            logger.info(f"Retrieved {len(result_df)} records for {code}.")
+            return result_df
+        except (LoginError, NoDataFoundError, DataSourceError, ValueError) as e:
+            logger.warning(
+                f"Caught known error fetching K-data for {code}: {type(e).__name__}")
+            raise e
+        except Exception as e:
+            logger.exception(
+                f"Unexpected error fetching K-data for {code}: {e}")
+            raise DataSourceError(
+                f"Unexpected error fetching K-data for {code}: {e}")
+
+    def _get_intraday_k_data(self, store: IntradayStore, code: str, start_date: str, end_date: str,
+                             frequency: str, adjust_flag: str, fields: Optional[List[str]]) -> pd.DataFrame:
+        """Reads minute bars from the intraday store, downloading the closed trading days it lacks first."""
+        fields = list(fields or INTRADAY_K_FIELDS)
+        logger.info(
+            f"Fetching intraday K-data for {code} ({start_date} to {end_date}), freq={frequency}, adjust={adjust_flag}")
+        trading_days = self._trading_days(start_date, end_date)
+        if not trading_days:
+            return self._query_k_data(code, start_date, end_date, frequency, adjust_flag, fields)
+        try:
+            # Only closed sessions are stored; today's bars are still being published
+            today = datetime.now().strftime("%Y-%m-%d")
+            series = store.series(code, frequency, adjust_flag)
+            closed_days = [day for day in trading_days if day < today]
+            missing_days = series.missing_days(closed_days)
+            metrics.record_cache("baostock.intraday_store", not missing_days)
+            if missing_days:
+                fill_intraday_store(series, code, frequency, adjust_flag, closed_days, missing_days)
+
+            frames = []
+            days, counts, columns = series.read(start_date, end_date)
+            if counts.sum():
+                frames.append(columns_to_frame(days, counts, columns, code, adjust_flag, fields))
+            if trading_days[-1] >= today:
+                try:
+                    live = self._query_k_data(code, today, end_date, frequency, adjust_flag, INTRADAY_K_FIELDS)
+                    row_days, live_columns = frame_to_columns(live)
+                    live_days, live_counts = np.unique(row_days, return_counts=True)
+                    frames.append(columns_to_frame(live_days, live_counts, live_columns, code, adjust_flag, fields))
+                except NoDataFoundError:
+                    pass
+
+            if not frames:
+                raise NoDataFoundError(
+                    f"No historical data found for {code} in the specified range (empty result set).")
+            result_df = frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+            logger.info(f"Retrieved {len(result_df)} records for {code}.")
+            return result_df
+
+        except (LoginError, NoDataFoundError, DataSourceError, ValueError) as e:
+            logger.warning(
+                f"Caught known error fetching intraday K-data for {code}: {type(e).__name__}")
+            raise e
+        except Exception as e:
+            logger.exception(
+                f"Unexpected error fetching intraday K-data for {code}: {e}")
+            raise DataSourceError(
+                f"Unexpected error fetching intraday K-data for {code}: {e}")
+
+    @cached_frame("baostock.k_data", k_data_ttl, projection=("fields", DEFAULT_K_FIELDS))
+    def _query_k_data(
+        self,
+        code: str,
+        start_date: str,
+        end_date: str,
+        frequency: str = "d",
+        adjust_flag: str = "3",
+        fields: Optional[List[str]] = None,
+    ) -> pd.DataFrame:
+        """Queries K-line data from Baostock in one request (cached in the shared cache)."""
         logger.info(
             f"Fetching K-data for {code} ({start_date} to {end_date}), freq={frequency}, adjust={adjust_flag}")
         try:
@@ -235,9 +399,7 @@ class BaostockDataSource(FinancialDataSource):
                         raise DataSourceError(
                             f"Baostock API error fetching K-data: {rs.error_msg} (code: {rs.error_code})")
 
-                data_list = []
-                while rs.next():
-                    data_list.append(rs.get_row_data())
+                data_list = _collect_rows(rs)
 
                 if not data_list:
                     logger.warning(
@@ -263,6 +425,17 @@ class BaostockDataSource(FinancialDataSource):
             raise DataSourceError(
                 f"Unexpected error fetching K-data for {code}: {e}")
 
+    def _trading_days(self, start_date: str, end_date: str) -> List[str]:
+        """Trading days in [start_date, end_date]; empty when the calendar is unavailable."""
+        try:
+            calendar = self.get_trade_dates(start_date=start_date, end_date=end_date)
+        except Exception as e:
+            logger.warning(f"Trading calendar unavailable, falling back to a single query: {e}")
+            return []
+        days = calendar.loc[calendar["is_trading_day"] == "1", "calendar_date"]
+        return [day for day in days if start_date <= day <= end_date]
+
+    @cached_frame("baostock.basic_info", DAY)
     def get_stock_basic_info(self, code: str, fields: Optional[List[str]] = None) -> pd.DataFrame:
         """Fetches basic stock information using Baostock."""
         logger.info(f"Fetching basic info for {code}")
@@ -288,9 +461,7 @@ class BaostockDataSource(FinancialDataSource):
                         raise DataSourceError(
                             f"Baostock API error fetching basic info: {rs.error_msg} (code: {rs.error_code})")
 
-                data_list = []
-                while rs.next():
-                    data_list.append(rs.get_row_data())
+                data_list = _collect_rows(rs)
 
                 if not data_list:
                     logger.warning(
@@ -345,9 +516,7 @@ class BaostockDataSource(FinancialDataSource):
                         raise DataSourceError(
                             f"Baostock API error fetching dividend data: {rs.error_msg} (code: {rs.error_code})")
 
-                data_list = []
-                while rs.next():
-                    data_list.append(rs.get_row_data())
+                data_list = _collect_rows(rs)
 
                 if not data_list:
                     logger.warning(
@@ -389,9 +558,7 @@ class BaostockDataSource(FinancialDataSource):
                         raise DataSourceError(
                             f"Baostock API error fetching adjust factor data: {rs.error_msg} (code: {rs.error_code})")
 
-                data_list = []
-                while rs.next():
-                    data_list.append(rs.get_row_data())
+                data_list = _collect_rows(rs)
 
                 if not data_list:
                     logger.warning(
@@ -438,6 +605,89 @@ class BaostockDataSource(FinancialDataSource):
         """Fetches quarterly DuPont analysis data using Baostock."""
         return _fetch_financial_data(bs.query_dupont_data, "DuPont Analysis", code, year, quarter)
 
+    def _get_financial_records(self, code: str, categories: List[str], quarters: List[Quarter]):
+        """
+        Returns {(category, quarter): row dict or None} for every combination, reading the local
+        financial store first and fetching only the missing ones from Baostock in one session.
+        """
+        store = get_financial_store()
+        records = store.get_many(code, categories, quarters) if store is not None else {}
+        missing = [(category, quarter) for quarter in quarters for category in categories
+                   if (category, quarter) not in records]
+        metrics.record_cache("baostock.financial_store", not missing)
+        if not missing:
+            return records
+
+        logger.info(f"Fetching {len(missing)} financial tables for {code} "
+                    f"({len(records)} served from the local store)")
+        fetched = {}
+        try:
+            # The helpers' nested login contexts reuse this session; the baostock client is
+            # single-socket, so the queries run back to back rather than in parallel
+            with baostock_login_context():
+                for category, (year, quarter) in missing:
+                    query_name, label = FINANCIAL_CATEGORIES[category]
+                    try:
+                        df = _fetch_financial_data(getattr(bs, query_name), label, code, str(year), quarter)
+                        fetched[(category, (year, quarter))] = df.iloc[0].to_dict()
+                    except NoDataFoundError:
+                        fetched[(category, (year, quarter))] = None
+        finally:
+            # Keep what was fetched even if a later query failed
+            if store is not None:
+                try:
+                    store.put_many(code, fetched)
+                except Exception as e:
+                    logger.warning(f"Financial store write failed for {code}: {e}")
+        records.update(fetched)
+        return records
+
+    def get_financial_snapshot(self, code: str, year: str, quarter: int) -> pd.DataFrame:
+        """
+        Fetches all six quarterly financial tables in one Baostock session and merges them
+        into one wide record. Tables without data for the quarter are left out.
+        """
+        logger.info(f"Fetching financial snapshot for {code}, year={year}, quarter={quarter}")
+        target = (int(year), int(quarter))
+        records = self._get_financial_records(code, list(FINANCIAL_CATEGORIES), [target])
+        sections = {label: records[(category, target)] for category, (_, label) in FINANCIAL_CATEGORIES.items()
+                    if records.get((category, target))}
+        if not sections:
+            raise NoDataFoundError(f"No financial data found for {code}, {year}Q{quarter}.")
+        return _merge_financial_sections(sections)
+
+    def get_financial_history(self, code: str, categories: Optional[List[str]] = None,
+                              start_quarter: str = "", end_quarter: str = "") -> pd.DataFrame:
+        """
+        Fetches a quarter-indexed panel of financial tables with QoQ / YoY changes. Quarters
+        already in the local financial store are not fetched again.
+        """
+        categories = list(categories or FINANCIAL_CATEGORIES)
+        unknown = [category for category in categories if category not in FINANCIAL_CATEGORIES]
+        if unknown:
+            raise ValueError(f"Unknown financial categories {unknown}. Valid: {list(FINANCIAL_CATEGORIES)}")
+        end = parse_quarter(end_quarter) if end_quarter else last_due_quarter()
+        start = parse_quarter(start_quarter) if start_quarter else next_quarter((end[0] - 2, end[1]))
+        quarters = quarter_range(start, end)
+        if not quarters:
+            raise ValueError(f"start_quarter {start_quarter} is after end_quarter {end_quarter}.")
+        if len(quarters) > MAX_HISTORY_QUARTERS:
+            raise ValueError(f"At most {MAX_HISTORY_QUARTERS} quarters per call ({len(quarters)} requested).")
+        logger.info(f"Fetching financial history for {code}: {categories}, "
+                    f"{format_quarter(start)} to {format_quarter(end)}")
+
+        # Four earlier quarters give the first year its YoY baseline
+        baseline = [start]
+        for _ in range(4):
+            baseline.insert(0, previous_quarter(baseline[0]))
+        window = baseline[:-1] + quarters
+        records = self._get_financial_records(code, categories, window)
+        if not any(records.get((category, quarter)) for category in categories for quarter in quarters):
+            raise NoDataFoundError(
+                f"No financial data found for {code} from {format_quarter(start)} to {format_quarter(end)}.")
+        labels = {category: label for category, (_, label) in FINANCIAL_CATEGORIES.items()}
+        return build_financial_panel(records, categories, window, labels, lookback=len(baseline) - 1)
+
     def get_performance_express_report(self, code: str, start_date: str, end_date: str) -> pd.DataFrame:
         """Fetches performance express reports (业绩快报) using Baostock."""
         logger.info(
@@ -457,9 +707,7 @@ class BaostockDataSource(FinancialDataSource):
                         raise DataSourceError(
                             f"Baostock API error fetching performance express report: {rs.error_msg} (code: {rs.error_code})")
 
-                data_list = []
-                while rs.next():
-                    data_list.append(rs.get_row_data())
+                data_list = _collect_rows(rs)
 
                 if not data_list:
                     logger.warning(
@@ -503,9 +751,7 @@ class BaostockDataSource(FinancialDataSource):
                         raise DataSourceError(
                             f"Baostock API error fetching performance forecast report: {rs.error_msg} (code: {rs.error_code})")
 
-                data_list = []
-                while rs.next():  # Loop should handle pagination implicitly if rs manages it
-                    data_list.append(rs.get_row_data())
+                data_list = _collect_rows(rs)
 
                 if not data_list:
                     logger.warning(
@@ -528,6 +774,7 @@ class BaostockDataSource(FinancialDataSource):
             raise DataSourceError(
                 f"Unexpected error fetching performance forecast report for {code}: {e}")
 
+    @cached_frame("baostock.industry", DAY)
     def get_stock_industry(self, code: Optional[str] = None, date: Optional[str] = None) -> pd.DataFrame:
         """Fetches industry classification using Baostock."""
         log_msg = f"Fetching industry data for code={code or 'all'}, date={date or 'latest'}"
@@ -546,9 +793,7 @@ class BaostockDataSource(FinancialDataSource):
                         raise DataSourceError(
                             f"Baostock API error fetching industry data: {rs.error_msg} (code: {rs.error_code})")
 
-                data_list = []
-                while rs.next():
-                    data_list.append(rs.get_row_data())
+                data_list = _collect_rows(rs)
 
                 if not data_list:
                     logger.warning(
@@ -571,18 +816,36 @@ class BaostockDataSource(FinancialDataSource):
             raise DataSourceError(
                 f"Unexpected error fetching industry data for {code}, {date}: {e}")
 
+    def _get_index_constituents(self, index: str, bs_query_func, date: Optional[str] = None) -> pd.DataFrame:
+        """Serves constituents from the local constituent history when the date is covered."""
+        day = date or datetime.now().strftime("%Y-%m-%d")
+        history = get_constituent_history()
+        if history is not None:
+            members = history.members(index, day)
+            metrics.record_cache("baostock.constituents", members is not None)
+            if members is not None:
+                return members
+        result_df = _fetch_index_constituent_data(bs_query_func, INDICES[index], date)
+        if history is not None:
+            try:
+                history.record(index, result_df, day)
+            except Exception as e:
+                logger.warning(f"Could not record {index} constituents for {day}: {e}")
+        return result_df
+
     def get_sz50_stocks(self, date: Optional[str] = None) -> pd.DataFrame:
         """Fetches SZSE 50 index constituents using Baostock."""
-        return _fetch_index_constituent_data(bs.query_sz50_stocks, "SZSE 50", date)
+        return self._get_index_constituents("sz50", bs.query_sz50_stocks, date)
 
     def get_hs300_stocks(self, date: Optional[str] = None) -> pd.DataFrame:
         """Fetches CSI 300 index constituents using Baostock."""
-        return _fetch_index_constituent_data(bs.query_hs300_stocks, "CSI 300", date)
+        return self._get_index_constituents("hs300", bs.query_hs300_stocks, date)
 
     def get_zz500_stocks(self, date: Optional[str] = None) -> pd.DataFrame:
         """Fetches CSI 500 index constituents using Baostock."""
-        return _fetch_index_constituent_data(bs.query_zz500_stocks, "CSI 500", date)
+        return self._get_index_constituents("zz500", bs.query_zz500_stocks, date)
 
+    @cached_frame("baostock.trade_dates", DAY)
     def get_trade_dates(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> pd.DataFrame:
         """Fetches trading dates using Baostock."""
         logger.info(
@@ -599,9 +862,7 @@ class BaostockDataSource(FinancialDataSource):
                     raise DataSourceError(
                         f"Baostock API error fetching trade dates: {rs.error_msg} (code: {rs.error_code})")
 
-                data_list = []
-                while rs.next():
-                    data_list.append(rs.get_row_data())
+                data_list = _collect_rows(rs)
 
                 if not data_list:
                     # This case should ideally not happen if the API returns a valid range
@@ -624,7 +885,93 @@ class BaostockDataSource(FinancialDataSource):
                 f"Unexpected error fetching trade dates: {e}")
 
     def get_all_stock(self, date: Optional[str] = None) -> pd.DataFrame:
-        """Fetches all stock list for a given date using Baostock."""
+        """Fetches all stock list for a given date, reconstructed from the universe store when saved."""
+        day = date or datetime.now().strftime("%Y-%m-%d")
+        store = get_universe_store()
+        if store is not None:
+            snapshot = store.snapshot(day)
+            metrics.record_cache("baostock.universe", snapshot is not None)
+            if snapshot is not None:
+                return snapshot
+        result_df = self._query_all_stock(date)
+        if store is not None:
+            try:
+                store.record(day, result_df)
+            except Exception as e:
+                logger.warning(f"Could not save the stock list for {day}: {e}")
+        return result_df
+
+    def _ensure_universe_days(self, start_date: str, end_date: str) -> Dict[str, object]:
+        """
+        Saves the stock lists missing from the universe store for every trading day in the range, plus the
+        trading day before it (the baseline the first day's changes are compared against).
+
+        Days whose list Baostock has not published yet (or returns empty) are skipped. At most
+        MAX_UNIVERSE_DOWNLOADS lists are downloaded per call, oldest first; the covered range then ends
+        before the first day left for a later call.
+
+        Returns:
+            Coverage: {"first", "last"} covered trading days, "skipped" days without a list and
+            "pending" days not downloaded in this call
+        """
+        store = get_universe_store()
+        if store is None:
+            raise DataSourceError("Universe store is unavailable")
+        days = self._trading_days(start_date, end_date)
+        if len(days) > MAX_UNIVERSE_DAYS:
+            raise ValueError(
+                f"Range {start_date} ~ {end_date} spans {len(days)} trading days; "
+                f"at most {MAX_UNIVERSE_DAYS} are supported per query.")
+        day_before = (datetime.strptime(start_date, "%Y-%m-%d") - timedelta(days=1))
+        baseline = self._trading_days(
+            (day_before - timedelta(days=UNIVERSE_BASELINE_LOOKBACK_DAYS)).strftime("%Y-%m-%d"),
+            day_before.strftime("%Y-%m-%d"))[-1:]
+        wanted = baseline + days
+        stored = set(store.days(wanted[0], end_date)) if wanted else set()
+        missing = [day for day in wanted if day not in stored]
+        download, pending = missing[:MAX_UNIVERSE_DOWNLOADS], missing[MAX_UNIVERSE_DOWNLOADS:]
+        skipped = []
+        if download:
+            logger.info(f"Fetching stock lists for {len(download)} trading days missing from the universe store"
+                        + (f" ({len(pending)} more left for later calls)" if pending else ""))
+            for batch_start in range(0, len(download), UNIVERSE_DOWNLOAD_BATCH):
+                fetched = []
+                with baostock_login_context():
+                    for day in download[batch_start:batch_start + UNIVERSE_DOWNLOAD_BATCH]:
+                        try:
+                            fetched.append((day, self._query_all_stock(day)))
+                        except NoDataFoundError:
+                            # Not published yet (typically today) or no list for this day
+                            logger.info(f"No stock list for {day}, leaving it out of the universe range")
+                            skipped.append(day)
+                # Saved outside the Baostock lock
+                for day, df in fetched:
+                    store.record(day, df)
+                count = min(batch_start + UNIVERSE_DOWNLOAD_BATCH, len(download))
+                if count < len(download):
+                    logger.info(f"Fetched stock lists for {count}/{len(download)} trading days")
+        covered = [day for day in store.days(start_date, end_date) if not pending or day < pending[0]]
+        if not covered:
+            raise NoDataFoundError(f"No stock lists available between {start_date} and {end_date}")
+        return {"first": covered[0], "last": covered[-1], "skipped": [day for day in skipped if day >= start_date],
+                "pending": pending}
+
+    def get_universe_changes(self, start_date: str, end_date: str) -> pd.DataFrame:
+        """Listing, removal, suspension, resumption and rename events between two dates."""
+        coverage = self._ensure_universe_days(start_date, end_date)
+        df = get_universe_store().changes(start_date, coverage["last"])
+        df.attrs[COVERAGE_ATTR] = coverage
+        return df
+
+    def get_suspended_stocks(self, start_date: str, end_date: str) -> pd.DataFrame:
+        """Securities suspended on at least one trading day between two dates."""
+        coverage = self._ensure_universe_days(start_date, end_date)
+        df = get_universe_store().suspended(start_date, coverage["last"])
+        df.attrs[COVERAGE_ATTR] = coverage
+        return df
+
+    def _query_all_stock(self, date: Optional[str] = None) -> pd.DataFrame:
+        """Queries the full stock list for a date from Baostock."""
         logger.info(f"Fetching all stock list for date={date or 'default'}")
         try:
             with baostock_login_context():
@@ -640,9 +987,7 @@ class BaostockDataSource(FinancialDataSource):
                         raise DataSourceError(
                             f"Baostock API error fetching all stock list: {rs.error_msg} (code: {rs.error_code})")
 
-                data_list = []
-                while rs.next():
-                    data_list.append(rs.get_row_data())
+                data_list = _collect_rows(rs)
 
                 if not data_list:
                     logger.warning(
@@ -665,29 +1010,110 @@ class BaostockDataSource(FinancialDataSource):
             raise DataSourceError(
                 f"Unexpected error fetching all stock list for date {date}: {e}")
 
+    @cached_frame("baostock.security_list", DAY)
+    def get_security_list(self, market: str = "a") -> pd.DataFrame:
+        """Fetches the listed securities master (stocks, indices, funds) using Baostock."""
+        if market != "a":
+            raise NoDataFoundError(
+                f"Security list for market '{market}' not supported by Baostock")
+        logger.info("Fetching security list from Baostock")
+        try:
+            with baostock_login_context():
+                rs = bs.query_stock_basic()
+
+                if rs.error_code != '0':
+                    logger.error(
+                        f"Baostock API error (Security List): {rs.error_msg} (code: {rs.error_code})")
+                    raise DataSourceError(
+                        f"Baostock API error fetching security list: {rs.error_msg} (code: {rs.error_code})")
+
+                data_list = _collect_rows(rs)
+
+                if not data_list:
+                    logger.warning("No securities returned (empty result set).")
+                    raise NoDataFoundError(
+                        "No security list found (empty result set).")
+
+                result_df = pd.DataFrame(data_list, columns=rs.fields)
+                # Only keep securities that are currently listed
+                result_df = result_df[result_df['status'] == '1'].reset_index(drop=True)
+                logger.info(f"Retrieved {len(result_df)} listed securities.")
+                return result_df
+
+        except (LoginError, NoDataFoundError, DataSourceError, ValueError) as e:
+            logger.warning(
+                f"Caught known error fetching security list: {type(e).__name__}")
+            raise e
+        except Exception as e:
+            logger.exception(f"Unexpected error fetching security list: {e}")
+            raise DataSourceError(
+                f"Unexpected error fetching security list: {e}")
+
+    def get_spot_quotes(self, market: str = "a") -> pd.DataFrame:
+        """Real-time quote snapshots are not provided by Baostock."""
+        raise NoDataFoundError("Real-time quotes not available in Baostock")
+
+    def _refresh_macro_series(self, key: str) -> None:
+        """Refreshes a macro series in the local macro store on its release schedule."""
+        series = MACRO_SERIES[key]
+        query = getattr(bs, series.query)
+        queried = get_macro_store().refresh(
+            key, lambda since: _fetch_macro_data(query, series.label, since, None, **dict(series.query_args)))
+        metrics.record_cache("baostock.macro", not queried)
+
+    def _get_macro_series(self, key: str, start_date: Optional[str] = None, end_date: Optional[str] = None,
+                          date_column: Optional[str] = None) -> pd.DataFrame:
+        """Slices a macro series from the local macro store, refreshing it on its release schedule."""
+        store = get_macro_store()
+        if store is None:
+            series = MACRO_SERIES[key]
+            query_args = dict(series.query_args)
+            if date_column == "effectiveDate":
+                # Without the store the upstream filters the range itself: yearType '1' selects by effective date
+                query_args["yearType"] = "1"
+            return _fetch_macro_data(getattr(bs, series.query), series.label, start_date, end_date, **query_args)
+        self._refresh_macro_series(key)
+        return store.slice(key, start_date, end_date, date_column)
+
+    def get_macro_panel(self, series: List[str], start_date: Optional[str] = None, end_date: Optional[str] = None,
+                        frequency: str = "monthly", growth: Optional[List[str]] = None) -> pd.DataFrame:
+        """Aligns several macro series from the local macro store onto one daily or monthly calendar."""
+        specs = parse_panel_series(series)
+        store = get_macro_store()
+        if store is None:
+            raise DataSourceError("Macro store is unavailable")
+        end_date = end_date or datetime.now().strftime("%Y-%m-%d")
+        start_date = start_date or (pd.Timestamp(end_date) - pd.DateOffset(years=PANEL_DEFAULT_YEARS)).strftime("%Y-%m-%d")
+        frames = {}
+        for key in specs:
+            self._refresh_macro_series(key)
+            frames[key] = store.frame(key)
+        return build_macro_panel(frames, specs, start_date, end_date, frequency, growth)
+
     def get_deposit_rate_data(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> pd.DataFrame:
         """Fetches benchmark deposit rates using Baostock."""
-        return _fetch_macro_data(bs.query_deposit_rate_data, "Deposit Rate", start_date, end_date)
+        return self._get_macro_series("deposit_rate", start_date, end_date)
 
     def get_loan_rate_data(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> pd.DataFrame:
         """Fetches benchmark loan rates using Baostock."""
-        return _fetch_macro_data(bs.query_loan_rate_data, "Loan Rate", start_date, end_date)
+        return self._get_macro_series("loan_rate", start_date, end_date)
 
     def get_required_reserve_ratio_data(self, start_date: Optional[str] = None, end_date: Optional[str] = None, year_type: str = '0') -> pd.DataFrame:
         """Fetches required reserve ratio data using Baostock."""
-        # Note the extra yearType parameter handled by kwargs
-        return _fetch_macro_data(bs.query_required_reserve_ratio_data, "Required Reserve Ratio", start_date, end_date, yearType=year_type)
+        # The store keeps the full series by announcement date; year_type '1' filters on the effective date
+        return self._get_macro_series("reserve_ratio", start_date, end_date,
+                                      "effectiveDate" if year_type == '1' else None)
 
     def get_money_supply_data_month(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> pd.DataFrame:
         """Fetches monthly money supply data (M0, M1, M2) using Baostock."""
         # Baostock expects YYYY-MM format for dates here
-        return _fetch_macro_data(bs.query_money_supply_data_month, "Monthly Money Supply", start_date, end_date)
+        return self._get_macro_series("money_supply_month", start_date, end_date)
 
     def get_money_supply_data_year(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> pd.DataFrame:
         """Fetches yearly money supply data (M0, M1, M2 - year end balance) using Baostock."""
         # Baostock expects YYYY format for dates here
-        return _fetch_macro_data(bs.query_money_supply_data_year, "Yearly Money Supply", start_date, end_date)
+        return self._get_macro_series("money_supply_year", start_date, end_date)
 
     def get_shibor_data(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> pd.DataFrame:
         """Fetches SHIBOR (Shanghai Interbank Offered Rate) data using Baostock."""
-        return _fetch_macro_data(bs.query_shibor_data, "SHIBOR", start_date, end_date)
+        return self._get_macro_series("shibor", start_date, end_date)
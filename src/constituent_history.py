@@ -0,0 +1,291 @@
+"""
+指数成分股历史模块
+
+把上证50、沪深300、中证500 的成分股快照（每次查询得到的一份名单）合并为成分区间
+(指数, 代码, 纳入日期, 剔除日期)：相邻两次调整的快照做差，新出现的代码开始一个区间，
+消失的代码结束所在的区间。区间上建立内存中的区间索引，以下查询不需要上游调用:
+
+- members(): 某一天的成分股（不含之后才纳入的股票，可用于无幸存者偏差的回测）
+- memberships(): 某只股票曾经属于哪些指数、在哪些时间段
+
+区间端点是本地观察到的快照日期，不是官方的纳入 / 剔除日期: 本地最早一份快照中已有的成分股，
+in_date 只是这份快照的日期（更早的纳入日期未知，见 earliest_snapshot()）；两份快照之间没有
+确认有效期的空档内发生的调整，也只能定位到空档之后的那份快照。无幸存者偏差只对本地最早快照
+之后、有效期连续覆盖的时间段成立。
+
+每份快照还记录已确认的有效期 [调整日期, verified_to]：查询日期 D 返回调整日期 U 的名单，
+说明 U 到 D 之间没有再调整。只有落在有效期内的日期直接由本地回答，其余日期仍向上游查询，
+查询结果再并入历史。
+
+历史保存在数据目录（STOCKREPORT_HOME，默认 ~/.stockreport-mcp）下的 constituents.sqlite3，
+多个服务器进程共享。
+
+作者: StockReport MCP Project
+许可证: MIT License
+"""
+from __future__ import annotations
+
+import bisect
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+try:
+    from .utils import get_data_dir, lazy_import
+except ImportError:
+    from utils import get_data_dir, lazy_import
+
+pd = lazy_import("pandas")
+
+logger = logging.getLogger(__name__)
+
+HISTORY_FILENAME = "constituents.sqlite3"
+# 支持的指数: 键 -> 显示名称
+INDICES = {"sz50": "SZSE 50", "hs300": "CSI 300", "zz500": "CSI 500"}
+# 与 Baostock 成分股查询结果一致的列
+CONSTITUENT_COLUMNS = ["updateDate", "code", "code_name"]
+
+
+class Membership(NamedTuple):
+    """一段成分区间；out_date 为 None 表示至今仍是成分股（左闭右开）"""
+    index: str
+    code: str
+    code_name: Optional[str]
+    in_date: str
+    out_date: Optional[str]
+
+
+class _IntervalIndex:
+    """
+    一个指数的成分区间索引。
+
+    全部区间端点把时间轴切成若干基本区间，每个基本区间内的成分股相同，
+    查询某一天的成分股只需一次二分查找。
+    """
+
+    def __init__(self, intervals: List[Membership], snapshots: List[Tuple[str, str]]):
+        self.snapshot_dates = [update_date for update_date, _ in snapshots]
+        self.verified_to = [verified_to for _, verified_to in snapshots]
+        self.names = {interval.code: interval.code_name for interval in intervals}
+        starts: Dict[str, List[str]] = {}
+        ends: Dict[str, List[str]] = {}
+        for interval in intervals:
+            starts.setdefault(interval.in_date, []).append(interval.code)
+            if interval.out_date is not None:
+                ends.setdefault(interval.out_date, []).append(interval.code)
+        self.boundaries = sorted(set(starts) | set(ends))
+        self.segments: List[List[str]] = []
+        current: Set[str] = set()
+        for boundary in self.boundaries:
+            current.difference_update(ends.get(boundary, []))
+            current.update(starts.get(boundary, []))
+            self.segments.append(sorted(current))
+
+    def snapshot_on(self, day: str) -> Optional[int]:
+        """day 所在快照的位置；day 不在任何快照的已确认有效期内时为 None"""
+        position = bisect.bisect_right(self.snapshot_dates, day) - 1
+        if position < 0 or day > self.verified_to[position]:
+            return None
+        return position
+
+    def members(self, day: str) -> List[str]:
+        position = bisect.bisect_right(self.boundaries, day) - 1
+        return self.segments[position] if position >= 0 else []
+
+
+def _build_intervals(index: str, snapshots: Dict[str, Dict[str, Optional[str]]]) -> List[Membership]:
+    """按调整日期顺序比较相邻快照，得到每只股票的成分区间"""
+    dates = sorted(snapshots)
+    intervals = []
+    open_since: Dict[str, str] = {}
+    names: Dict[str, Optional[str]] = {}
+    for update_date in dates:
+        members = snapshots[update_date]
+        for code in list(open_since):
+            if code not in members:
+                intervals.append(Membership(index, code, names.get(code), open_since.pop(code), update_date))
+        for code, name in members.items():
+            names[code] = name or names.get(code)
+            open_since.setdefault(code, update_date)
+    for code, in_date in open_since.items():
+        intervals.append(Membership(index, code, names.get(code), in_date, None))
+    return intervals
+
+
+class ConstituentHistory:
+    """SQLite 保存的指数成分区间和快照有效期，查询时在内存中建立区间索引"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._version: Optional[float] = None
+        self._indexes: Dict[str, _IntervalIndex] = {}
+        self._by_code: Dict[str, List[Membership]] = {}
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS intervals ("
+                    " index_name TEXT NOT NULL,"
+                    " code TEXT NOT NULL,"
+                    " code_name TEXT,"
+                    " in_date TEXT NOT NULL,"
+                    " out_date TEXT,"
+                    " PRIMARY KEY (index_name, code, in_date))"
+                )
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS snapshots ("
+                    " index_name TEXT NOT NULL,"
+                    " update_date TEXT NOT NULL,"
+                    " verified_to TEXT NOT NULL,"
+                    " PRIMARY KEY (index_name, update_date))"
+                )
+                conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value REAL NOT NULL)")
+        finally:
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _ensure_loaded(self) -> None:
+        """历史有变化（本进程或其他进程写入）时重建内存中的区间索引"""
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+            version = row[0] if row else 0.0
+            if version == self._version:
+                return
+            intervals = [Membership(*row) for row in conn.execute(
+                "SELECT index_name, code, code_name, in_date, out_date FROM intervals").fetchall()]
+            snapshots = conn.execute(
+                "SELECT index_name, update_date, verified_to FROM snapshots ORDER BY update_date").fetchall()
+        finally:
+            conn.close()
+        indexes = {}
+        for index in INDICES:
+            indexes[index] = _IntervalIndex(
+                [interval for interval in intervals if interval.index == index],
+                [(update_date, verified_to) for name, update_date, verified_to in snapshots if name == index])
+        by_code: Dict[str, List[Membership]] = {}
+        for interval in sorted(intervals, key=lambda interval: (interval.in_date, interval.index)):
+            by_code.setdefault(interval.code, []).append(interval)
+        with self._lock:
+            self._indexes, self._by_code, self._version = indexes, by_code, version
+
+    def record(self, index: str, df: pd.DataFrame, query_date: str) -> None:
+        """
+        并入一次成分股查询的结果。
+
+        Args:
+            index: 指数键（INDICES 中的一个）
+            df: 查询结果（含 updateDate、code 列，可选 code_name）
+            query_date: 查询的日期（查询最新名单时为今天）
+        """
+        if df is None or df.empty or "updateDate" not in df.columns or "code" not in df.columns:
+            return
+        update_date = str(df["updateDate"].max())
+        names = df["code_name"] if "code_name" in df.columns else [None] * len(df)
+        members = {str(code): (str(name) if name is not None else None) for code, name in zip(df["code"], names)}
+        verified_to = max(query_date, update_date)
+
+        conn = self._connect()
+        try:
+            with conn:
+                known = conn.execute(
+                    "SELECT verified_to FROM snapshots WHERE index_name = ? AND update_date = ?",
+                    (index, update_date)).fetchone()
+                if known is not None:
+                    if verified_to <= known[0]:
+                        return
+                    conn.execute(
+                        "UPDATE snapshots SET verified_to = ? WHERE index_name = ? AND update_date = ?",
+                        (verified_to, index, update_date))
+                else:
+                    snapshots = self._snapshots(conn, index)
+                    snapshots[update_date] = members
+                    conn.execute("DELETE FROM intervals WHERE index_name = ?", (index,))
+                    conn.executemany(
+                        "INSERT INTO intervals (index_name, code, code_name, in_date, out_date) "
+                        "VALUES (?, ?, ?, ?, ?)", _build_intervals(index, snapshots))
+                    conn.execute(
+                        "INSERT INTO snapshots (index_name, update_date, verified_to) VALUES (?, ?, ?)",
+                        (index, update_date, verified_to))
+                    logger.info(f"Constituent history of {index} now has {len(snapshots)} snapshots")
+                conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('version', ?)", (time.time(),))
+        finally:
+            conn.close()
+
+    def _snapshots(self, conn: sqlite3.Connection, index: str) -> Dict[str, Dict[str, Optional[str]]]:
+        """由已保存的区间还原每份快照的名单"""
+        dates = [row[0] for row in conn.execute(
+            "SELECT update_date FROM snapshots WHERE index_name = ?", (index,)).fetchall()]
+        intervals = conn.execute(
+            "SELECT code, code_name, in_date, out_date FROM intervals WHERE index_name = ?", (index,)).fetchall()
+        snapshots: Dict[str, Dict[str, Optional[str]]] = {update_date: {} for update_date in dates}
+        for code, name, in_date, out_date in intervals:
+            for update_date in dates:
+                if in_date <= update_date and (out_date is None or update_date < out_date):
+                    snapshots[update_date][code] = name
+        return snapshots
+
+    def members(self, index: str, day: str) -> Optional[pd.DataFrame]:
+        """
+        day 当天的成分股，列与上游查询结果相同；day 不在已确认的有效期内时返回 None。
+        """
+        self._ensure_loaded()
+        interval_index = self._indexes.get(index)
+        if interval_index is None:
+            return None
+        position = interval_index.snapshot_on(day)
+        if position is None:
+            return None
+        update_date = interval_index.snapshot_dates[position]
+        codes = interval_index.members(day)
+        return pd.DataFrame(
+            [[update_date, code, interval_index.names.get(code)] for code in codes],
+            columns=CONSTITUENT_COLUMNS)
+
+    def memberships(self, code: str, indices: Optional[Iterable[str]] = None) -> List[Membership]:
+        """code 的全部已知成分区间（按纳入日期排序）"""
+        self._ensure_loaded()
+        wanted = set(indices) if indices is not None else set(INDICES)
+        return [interval for interval in self._by_code.get(code, []) if interval.index in wanted]
+
+    def earliest_snapshot(self, index: str) -> Optional[str]:
+        """本地保存的最早一份快照的调整日期；从这一天开始的区间，实际纳入日期可能更早"""
+        coverage = self.coverage(index)
+        return coverage[0][0] if coverage else None
+
+    def coverage(self, index: str) -> List[Tuple[str, str]]:
+        """已确认的有效期 [(调整日期, verified_to)]，按时间排序"""
+        self._ensure_loaded()
+        interval_index = self._indexes.get(index)
+        if interval_index is None:
+            return []
+        return list(zip(interval_index.snapshot_dates, interval_index.verified_to))
+
+
+_constituent_history: Optional[ConstituentHistory] = None
+_constituent_history_initialized = False
+_constituent_history_lock = threading.Lock()
+
+
+def get_constituent_history() -> Optional[ConstituentHistory]:
+    """Returns the process-wide ConstituentHistory, or None when it is unavailable."""
+    global _constituent_history, _constituent_history_initialized
+    if _constituent_history_initialized:
+        return _constituent_history
+    with _constituent_history_lock:
+        if not _constituent_history_initialized:
+            try:
+                _constituent_history = ConstituentHistory(os.path.join(get_data_dir(), HISTORY_FILENAME))
+            except Exception as e:
+                logger.warning(f"Constituent history unavailable, fetching constituents directly: {e}")
+                _constituent_history = None
+            _constituent_history_initialized = True
+    return _constituent_history
@@ -0,0 +1,198 @@
+"""
+守护进程模式
+
+MCP 客户端通常为每个会话启动一个新的 stdio 服务器进程，数据源、缓存、交易日历等
+状态都要从零开始构建。守护进程模式让一个常驻的服务器进程监听 Unix 套接字，
+每个连接都是一个独立的 MCP 会话，所有会话共享同一份预热好的状态。
+
+客户端一侧使用 src.stdio_shim 作为入口：它连接到守护进程（不存在时自动拉起），
+并在 stdin/stdout 与套接字之间转发 JSON-RPC 消息。
+
+使用方法:
+    python -m src.mcp_server --transport unix [--socket-path PATH] [--idle-timeout 秒]
+
+协议格式与 stdio 传输相同：每行一条 JSON-RPC 消息。
+
+作者: StockReport MCP Project
+许可证: MIT License
+"""
+import errno
+import fcntl
+import logging
+import os
+import socket
+import time
+from contextlib import contextmanager
+
+import anyio
+import anyio.abc
+import mcp.types as types
+from mcp.shared.message import SessionMessage
+
+try:
+    from .utils import get_data_dir
+except ImportError:
+    from utils import get_data_dir
+
+logger = logging.getLogger(__name__)
+
+SOCKET_FILENAME = "mcp.sock"
+# 单条 JSON-RPC 消息的最大长度，防止异常客户端耗尽内存
+MAX_MESSAGE_BYTES = 64 * 1024 * 1024
+IDLE_CHECK_INTERVAL = 30.0
+
+
+def default_socket_path() -> str:
+    """Returns the daemon socket path (STOCKREPORT_MCP_SOCKET or <data dir>/mcp.sock)."""
+    return os.environ.get("STOCKREPORT_MCP_SOCKET") or os.path.join(get_data_dir(), SOCKET_FILENAME)
+
+
+def _is_daemon_listening(socket_path: str) -> bool:
+    """Checks whether another process is already accepting connections on the socket."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(socket_path)
+            return True
+        except OSError:
+            return False
+
+
+@contextmanager
+def _socket_lock(socket_path: str):
+    """
+    Holds an exclusive flock on <socket_path>.lock. Concurrently started daemons check, remove
+    and bind the socket one at a time, so the loser never removes the winner's socket.
+    """
+    with open(socket_path + ".lock", "a+b") as lock_file:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+async def _serve_connection(app, stream: anyio.abc.ByteStream) -> None:
+    """Runs one MCP session over a newline-delimited JSON socket stream."""
+    read_stream_writer, read_stream = anyio.create_memory_object_stream(0)
+    write_stream, write_stream_reader = anyio.create_memory_object_stream(0)
+
+    async def socket_reader():
+        buffer = bytearray()
+        async with read_stream_writer:
+            try:
+                async for chunk in stream:
+                    buffer.extend(chunk)
+                    if len(buffer) > MAX_MESSAGE_BYTES and b"\n" not in buffer:
+                        logger.warning("Closing daemon connection: message exceeds size limit")
+                        return
+                    while True:
+                        newline = buffer.find(b"\n")
+                        if newline < 0:
+                            break
+                        line = bytes(buffer[:newline])
+                        del buffer[:newline + 1]
+                        if not line.strip():
+                            continue
+                        try:
+                            message = types.JSONRPCMessage.model_validate_json(line)
+                        except Exception as exc:
+                            await read_stream_writer.send(exc)
+                            continue
+                        await read_stream_writer.send(SessionMessage(message))
+            except (anyio.BrokenResourceError, anyio.ClosedResourceError):
+                pass
+
+    async def socket_writer():
+        async with write_stream_reader:
+            try:
+                async for session_message in write_stream_reader:
+                    data = session_message.message.model_dump_json(by_alias=True, exclude_none=True)
+                    await stream.send(data.encode("utf-8") + b"\n")
+            except (anyio.BrokenResourceError, anyio.ClosedResourceError):
+                pass
+
+    async with stream:
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(socket_reader)
+            tg.start_soon(socket_writer)
+            await app._mcp_server.run(
+                read_stream,
+                write_stream,
+                app._mcp_server.create_initialization_options(),
+            )
+            tg.cancel_scope.cancel()
+
+
+async def serve_unix(app, socket_path: str, idle_timeout: float = 0) -> None:
+    """
+    在 Unix 套接字上运行守护进程，直到被终止或空闲超时。
+
+    Args:
+        app: 已注册工具的 StockReportMCP 实例
+        socket_path: 套接字文件路径
+        idle_timeout: 没有活动会话持续多少秒后退出，0 表示永不退出
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(socket_path)), exist_ok=True)
+    with _socket_lock(socket_path):
+        if os.path.exists(socket_path):
+            if _is_daemon_listening(socket_path):
+                logger.info(f"Another daemon is already listening on {socket_path}, exiting")
+                return
+            logger.info(f"Removing stale socket {socket_path}")
+            os.unlink(socket_path)
+        try:
+            listener = await anyio.create_unix_listener(socket_path)
+        except OSError as e:
+            if e.errno != errno.EADDRINUSE:
+                raise
+            # Another daemon bound the path without taking the lock (e.g. an older version)
+            logger.info(f"Socket {socket_path} is already in use, exiting")
+            return
+        os.chmod(socket_path, 0o600)
+        bound = os.stat(socket_path).st_ino
+    app.run_tools_in_threads = True
+
+    active_sessions = 0
+    last_activity = time.monotonic()
+
+    async def handle(stream: anyio.abc.ByteStream):
+        nonlocal active_sessions, last_activity
+        active_sessions += 1
+        logger.info(f"Daemon session opened ({active_sessions} active)")
+        try:
+            await _serve_connection(app, stream)
+        except Exception as e:
+            logger.exception(f"Daemon session failed: {e}")
+        finally:
+            active_sessions -= 1
+            last_activity = time.monotonic()
+            logger.info(f"Daemon session closed ({active_sessions} active)")
+
+    async def idle_watchdog(scope: anyio.CancelScope):
+        while True:
+            await anyio.sleep(min(IDLE_CHECK_INTERVAL, idle_timeout))
+            if active_sessions == 0 and time.monotonic() - last_activity >= idle_timeout:
+                logger.info(f"No sessions for {idle_timeout:.0f}s, shutting down daemon")
+                scope.cancel()
+                return
+
+    logger.info(f"Daemon listening on {socket_path}")
+    try:
+        async with listener, anyio.create_task_group() as tg:
+            if idle_timeout > 0:
+                tg.start_soon(idle_watchdog, tg.cancel_scope)
+            await listener.serve(handle, task_group=tg)
+    finally:
+        # Only remove the socket if it is still ours: a new daemon may already have replaced it
+        with _socket_lock(socket_path):
+            try:
+                if os.stat(socket_path).st_ino == bound:
+                    os.unlink(socket_path)
+            except OSError:
+                pass
+        logger.info("Daemon stopped")
+
+
+def run_daemon(app, socket_path: str = None, idle_timeout: float = 0) -> None:
+    """Blocking entry point used by `mcp_server --transport unix`."""
+    anyio.run(serve_unix, app, socket_path or default_socket_path(), idle_timeout)
@@ -20,9 +20,13 @@
 许可证: MIT License
 """
 
+from __future__ import annotations
+
 from abc import ABC, abstractmethod
-import pandas as pd
-from typing import Optional, List
+from typing import Optional, List, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 class DataSourceError(Exception):
     """Base exception for data source errors."""
@@ -0,0 +1,340 @@
+"""
+财报披露索引模块
+
+按股票记录已经披露的最新报告期，供财务数据查询直接定位到正确的季度，
+而不是从日历月份推测一个季度、再逐季度回退试探（每种数据类型最多 4 次失败的上游调用）。
+
+索引来源:
+- 成功查询到的财务数据（profit/growth/balance 等同属一份定期报告，一种数据命中后其他数据直接复用）
+- 业绩快报、业绩预告：尚未建立索引的股票，用它们判断公司是否已经披露了尚在法定期限内的季度
+- 逐季度回退全部落空的股票记为“无财务数据”，在复查间隔内不再试探
+
+try_get_financial_data_with_fallback() 按索引定位季度查询财务数据，失败时逐季度回退，并把结果写回索引。
+
+法定披露期限: 一季报 4 月 30 日、半年报 8 月 31 日、三季报 10 月 31 日、年报次年 4 月 30 日。
+记录的季度之后如果还有已经结束的季度（可能已经披露），每隔 RECHECK_INTERVAL 复查一次。
+
+索引保存在数据目录（STOCKREPORT_HOME，默认 ~/.stockreport-mcp）下的 disclosures.sqlite3，
+多个服务器进程共享。
+
+作者: StockReport MCP Project
+许可证: MIT License
+"""
+from __future__ import annotations
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, List, NamedTuple, Optional, Tuple
+
+try:
+    from .utils import get_data_dir
+    from .data_source_interface import FinancialDataSource, NoDataFoundError
+except ImportError:
+    from utils import get_data_dir
+    from data_source_interface import FinancialDataSource, NoDataFoundError
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILENAME = "disclosures.sqlite3"
+# 记录的季度之后还有可能已披露的季度时，多久复查一次
+RECHECK_INTERVAL = 12 * 60 * 60
+# 支持的财务数据类型，对应数据源的 get_<类型>_data 方法
+FINANCIAL_DATA_TYPES = ("profit", "growth", "balance", "dupont", "cash_flow")
+
+Quarter = Tuple[int, int]
+
+# 各季度报告的法定披露截止日: 季度 -> (相对报告年度的年份偏移, 月, 日)
+_DEADLINES = {1: (0, 4, 30), 2: (0, 8, 31), 3: (0, 10, 31), 4: (1, 4, 30)}
+
+
+def previous_quarter(quarter: Quarter) -> Quarter:
+    year, q = quarter
+    return (year, q - 1) if q > 1 else (year - 1, 4)
+
+
+def next_quarter(quarter: Quarter) -> Quarter:
+    year, q = quarter
+    return (year, q + 1) if q < 4 else (year + 1, 1)
+
+
+def last_ended_quarter(today: Optional[date] = None) -> Quarter:
+    """最近一个已经结束的季度（可能尚未披露）"""
+    today = today or date.today()
+    return previous_quarter((today.year, (today.month - 1) // 3 + 1))
+
+
+def last_due_quarter(today: Optional[date] = None) -> Quarter:
+    """法定披露期限已过的最近一个季度（正常披露的公司一定已经发布）"""
+    today = today or date.today()
+    quarter = last_ended_quarter(today)
+    while True:
+        offset, month, day = _DEADLINES[quarter[1]]
+        if date(quarter[0] + offset, month, day) < today:
+            return quarter
+        quarter = previous_quarter(quarter)
+
+
+def quarter_of(stat_date: str) -> Optional[Quarter]:
+    """报告期截止日（如 '2024-06-30'）对应的季度"""
+    try:
+        year, month = int(str(stat_date)[:4]), int(str(stat_date)[5:7])
+    except (TypeError, ValueError):
+        return None
+    return (year, (month - 1) // 3 + 1) if 1 <= month <= 12 else None
+
+
+class Disclosure(NamedTuple):
+    """一只股票的索引记录；quarter 为 None 表示没有查到任何财务数据"""
+    quarter: Optional[Quarter]
+    pub_date: Optional[str]
+    source: str
+    checked: float
+
+    def is_current(self, today: Optional[date] = None, now: Optional[float] = None) -> bool:
+        """记录的季度是否无需复查：之后没有已结束的季度，或者刚刚复查过"""
+        if (now or time.time()) - self.checked < RECHECK_INTERVAL:
+            return True
+        return self.quarter is not None and next_quarter(self.quarter) > last_ended_quarter(today)
+
+
+class DisclosureIndex:
+    """SQLite 保存的 代码 -> 最新已披露季度 索引"""
+
+    def __init__(self, path: str):
+        self.path = path
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS disclosures ("
+                    " code TEXT PRIMARY KEY,"
+                    " year INTEGER,"
+                    " quarter INTEGER,"
+                    " pub_date TEXT,"
+                    " source TEXT NOT NULL,"
+                    " checked REAL NOT NULL)"
+                )
+        finally:
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def get(self, code: str) -> Optional[Disclosure]:
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT year, quarter, pub_date, source, checked FROM disclosures WHERE code = ?",
+                (code,)).fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            return None
+        year, quarter, pub_date, source, checked = row
+        return Disclosure((year, quarter) if year is not None else None, pub_date, source, checked)
+
+    def record(self, code: str, quarter: Quarter, pub_date: Optional[str] = None, source: str = "observed") -> None:
+        """记录查询成功的季度并更新复查时间；不会用较早的季度覆盖较新的记录"""
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT INTO disclosures (code, year, quarter, pub_date, source, checked) "
+                    "VALUES (?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT(code) DO UPDATE SET year = excluded.year, quarter = excluded.quarter, "
+                    " pub_date = COALESCE(excluded.pub_date, disclosures.pub_date), "
+                    " source = excluded.source, checked = excluded.checked "
+                    "WHERE disclosures.year IS NULL OR excluded.year * 4 + excluded.quarter "
+                    " >= disclosures.year * 4 + disclosures.quarter",
+                    (code, quarter[0], quarter[1], pub_date, source, time.time()))
+        finally:
+            conn.close()
+
+    def record_missing(self, code: str) -> None:
+        """记录没有查到任何财务数据；已有季度的记录只更新复查时间"""
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT INTO disclosures (code, year, quarter, pub_date, source, checked) "
+                    "VALUES (?, NULL, NULL, NULL, 'missing', ?) "
+                    "ON CONFLICT(code) DO UPDATE SET checked = excluded.checked",
+                    (code, time.time()))
+        finally:
+            conn.close()
+
+
+_disclosure_index: Optional[DisclosureIndex] = None
+_disclosure_index_initialized = False
+_disclosure_index_lock = threading.Lock()
+
+
+def get_disclosure_index() -> Optional[DisclosureIndex]:
+    """Returns the process-wide DisclosureIndex, or None when it is unavailable."""
+    global _disclosure_index, _disclosure_index_initialized
+    if _disclosure_index_initialized:
+        return _disclosure_index
+    with _disclosure_index_lock:
+        if not _disclosure_index_initialized:
+            try:
+                _disclosure_index = DisclosureIndex(os.path.join(get_data_dir(), INDEX_FILENAME))
+            except Exception as e:
+                logger.warning(f"Disclosure index unavailable, falling back to quarter probing: {e}")
+                _disclosure_index = None
+            _disclosure_index_initialized = True
+    return _disclosure_index
+
+
+def get_latest_available_quarter() -> Tuple[int, int]:
+    """
+    获取最新可用的财务数据季度
+    
+    考虑财务数据发布滞后1-3个月的实际情况
+    
+    Returns:
+        Tuple[int, int]: (年份, 季度)
+    """
+    current_date = datetime.now()
+    current_year = current_date.year
+    current_month = current_date.month
+    
+    # 根据当前月份推算最可能有数据的季度
+    # 财务数据发布通常滞后1-3个月
+    if current_month <= 4:  # 1-4月，Q4数据可能还未发布
+        return current_year - 1, 4
+    elif current_month <= 7:  # 5-7月，Q1数据应该可用
+        return current_year, 1
+    elif current_month <= 10:  # 8-10月，Q2数据应该可用
+        return current_year, 2
+    else:  # 11-12月，Q3数据应该可用
+        return current_year, 3
+
+
+def _announced_quarter(data_source: FinancialDataSource, code: str) -> Optional[Tuple[int, int]]:
+    """
+    从业绩快报和业绩预告中找出公司最近已公布业绩的报告期
+
+    Returns:
+        Optional[Tuple[int, int]]: (年份, 季度)，没有快报或预告时为 None
+    """
+    end_date = datetime.now().strftime("%Y-%m-%d")
+    start_date = (datetime.now() - timedelta(days=366)).strftime("%Y-%m-%d")
+    reports = [
+        ("get_performance_express_report", "performanceExpStatDate", "performanceExpPubDate"),
+        ("get_forecast_report", "profitForcastExpStatDate", "profitForcastExpPubDate"),
+    ]
+    announced = []
+    for method, stat_column, pub_column in reports:
+        try:
+            df = getattr(data_source, method)(code, start_date, end_date)
+        except Exception as e:
+            logger.debug(f"{code} 业绩快报/预告不可用: {e}")
+            continue
+        if df is None or getattr(df, "empty", True) or stat_column not in df.columns:
+            continue
+        for stat_date, pub_date in zip(df[stat_column], df.get(pub_column, df[stat_column])):
+            quarter = quarter_of(stat_date)
+            if quarter is not None and str(pub_date) <= end_date:
+                announced.append(quarter)
+    return max(announced) if announced else None
+
+
+def _candidate_quarters(data_source: FinancialDataSource, code: str, max_attempts: int) -> List[Tuple[int, int]]:
+    """
+    按优先顺序排列要尝试的季度
+
+    - 披露索引中的记录仍然有效时，直接从记录的季度开始（通常一次调用即可）
+    - 记录已过复查间隔、之后又有季度结束时，先试探下一个季度
+    - 没有记录时，从法定期限已过的季度开始；业绩快报/预告显示公司已公布更新的季度时从该季度开始
+    - 记录为“无财务数据”且仍然有效时不尝试
+    - 披露索引不可用时沿用按月份推算的季度
+    """
+    index = get_disclosure_index()
+    entry = index.get(code) if index is not None else None
+    if index is None:
+        start = get_latest_available_quarter()
+    elif entry is not None and entry.is_current():
+        if entry.quarter is None:
+            logger.info(f"披露索引记录 {code} 没有财务数据，跳过查询")
+            return []
+        start = entry.quarter
+    elif entry is not None and entry.quarter is not None:
+        start = next_quarter(entry.quarter)
+    else:
+        start = last_due_quarter()
+        announced = _announced_quarter(data_source, code)
+        if announced is not None and start < announced <= last_ended_quarter():
+            start = announced
+
+    candidates = []
+    quarter = start
+    for _ in range(max_attempts):
+        # 避免回退到过早的年份
+        if quarter[0] < datetime.now().year - 3:
+            logger.warning(f"已回退到 {quarter[0]} 年，停止尝试")
+            break
+        candidates.append(quarter)
+        quarter = previous_quarter(quarter)
+    return candidates
+
+
+def try_get_financial_data_with_fallback(
+    data_source: FinancialDataSource,
+    code: str,
+    data_type: str,
+    max_attempts: int = 4
+) -> Tuple[Optional[Any], Optional[int], Optional[int]]:
+    """
+    获取最新已披露季度的财务数据：先查披露索引定位季度，失败时回退到上一季度
+    
+    Args:
+        data_source: 数据源实例
+        code: 股票代码
+        data_type: 数据类型 ('profit', 'growth', 'balance', 'dupont', 'cash_flow')
+        max_attempts: 最大尝试次数（季度数）
+    
+    Returns:
+        Tuple[Optional[Any], Optional[int], Optional[int]]: (数据, 年份, 季度)
+    """
+    if data_type not in FINANCIAL_DATA_TYPES:
+        logger.error(f"不支持的数据类型: {data_type}")
+        return None, None, None
+    # 只取所需的方法，数据源不必实现全部财务接口
+    fetch = getattr(data_source, f"get_{data_type}_data")
+
+    index = get_disclosure_index()
+    candidates = _candidate_quarters(data_source, code, max_attempts)
+    upstream_error = False
+    for attempt, (year, quarter) in enumerate(candidates):
+        try:
+            logger.info(f"尝试获取 {code} {year}年Q{quarter} {data_type} 数据 (第{attempt+1}次尝试)")
+            data = fetch(code, str(year), quarter)
+
+            # 检查数据是否有效
+            if data is not None and not data.empty and "暂无数据" not in str(data):
+                logger.info(f"成功获取 {code} {year}年Q{quarter} {data_type} 数据")
+                if index is not None:
+                    pub_date = str(data["pubDate"].iloc[0]) if "pubDate" in data.columns else None
+                    index.record(code, (year, quarter), pub_date)
+                return data, year, quarter
+            else:
+                logger.warning(f"{code} {year}年Q{quarter} {data_type} 数据为空或无效")
+
+        except NoDataFoundError as e:
+            logger.warning(f"获取 {code} {year}年Q{quarter} {data_type} 数据失败: {e}")
+        except Exception as e:
+            upstream_error = True
+            logger.warning(f"获取 {code} {year}年Q{quarter} {data_type} 数据失败: {e}")
+
+    # 上游出错时不能断定没有数据，不写入索引
+    if candidates and index is not None and not upstream_error:
+        index.record_missing(code)
+    if candidates:
+        logger.error(f"无法获取 {code} 的 {data_type} 数据，已尝试 {len(candidates)} 个季度")
+    return None, None, None
@@ -0,0 +1,230 @@
+"""
+财务报表本地存储模块
+
+把 Baostock 按 (股票代码, 数据类别, 年份, 季度) 查询到的财务数据保存在本地，
+多季度、多类别的查询只需向上游补齐缺失的部分：
+
+- FinancialStore: SQLite 存储（数据目录下的 financials.sqlite3，多个服务器进程共享）。
+  已发布的季度数据不再变化，长期保存；查询为空的季度也会记录，在一段时间内不再重复查询
+- quarter_range() / parse_quarter(): 'YYYYQn' 形式的季度区间
+- build_financial_panel(): 把各季度各类别的数据合并为按季度索引的宽表，并计算环比、同比变化
+
+作者: StockReport MCP Project
+许可证: MIT License
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    from .utils import get_data_dir, lazy_import
+    from .disclosure_index import last_due_quarter, next_quarter, previous_quarter
+except ImportError:
+    from utils import get_data_dir, lazy_import
+    from disclosure_index import last_due_quarter, next_quarter, previous_quarter
+
+pd = lazy_import("pandas")
+
+logger = logging.getLogger(__name__)
+
+STORE_FILENAME = "financials.sqlite3"
+# 查询为空的季度多久后重新查询：法定披露期限未过的季度可能随时发布，已过期限的季度很少补发
+MISSING_RECHECK_PENDING = 24 * 60 * 60
+MISSING_RECHECK_DUE = 30 * 24 * 60 * 60
+# 每个类别都重复出现的列，在宽表中只保留一份
+SHARED_COLUMNS = ["code", "pubDate", "statDate"]
+# DataFrame.attrs 中记录宽表各类别包含哪些列
+SECTIONS_ATTR = "sections"
+
+Quarter = Tuple[int, int]
+_QUARTER_RE = re.compile(r"^\s*(\d{4})\s*-?\s*[Qq]([1-4])\s*$")
+
+
+def parse_quarter(text: str) -> Quarter:
+    """'2024Q3' -> (2024, 3)"""
+    match = _QUARTER_RE.match(str(text))
+    if not match:
+        raise ValueError(f"Invalid quarter '{text}'. Use the form 'YYYYQn', e.g. '2024Q3'.")
+    return int(match.group(1)), int(match.group(2))
+
+
+def format_quarter(quarter: Quarter) -> str:
+    return f"{quarter[0]}Q{quarter[1]}"
+
+
+def quarter_range(start: Quarter, end: Quarter) -> List[Quarter]:
+    """start 到 end（含）的全部季度"""
+    quarters = []
+    quarter = start
+    while quarter <= end:
+        quarters.append(quarter)
+        quarter = next_quarter(quarter)
+    return quarters
+
+
+class FinancialStore:
+    """
+    SQLite 保存的财务数据，每行是一个 (代码, 类别, 年份, 季度) 的查询结果。
+
+    data 为 JSON 编码的 {列名: 值}，NULL 表示上游没有这个季度的数据。
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS statements ("
+                    " code TEXT NOT NULL,"
+                    " category TEXT NOT NULL,"
+                    " year INTEGER NOT NULL,"
+                    " quarter INTEGER NOT NULL,"
+                    " data TEXT,"
+                    " fetched REAL NOT NULL,"
+                    " PRIMARY KEY (code, category, year, quarter))"
+                )
+        finally:
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def get_many(self, code: str, categories: Iterable[str],
+                 quarters: Iterable[Quarter]) -> Dict[Tuple[str, Quarter], Optional[Dict[str, object]]]:
+        """
+        读取已保存的结果。
+
+        Returns:
+            {(类别, 季度): 数据字典或 None（已确认没有数据）}；未保存或需要重新查询的组合不在结果中
+        """
+        categories = list(categories)
+        quarters = list(quarters)
+        if not categories or not quarters:
+            return {}
+        wanted = {(category, quarter) for category in categories for quarter in quarters}
+        first, last = min(quarters), max(quarters)
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT category, year, quarter, data, fetched FROM statements "
+                "WHERE code = ? AND year * 4 + quarter BETWEEN ? AND ?",
+                (code, first[0] * 4 + first[1], last[0] * 4 + last[1])).fetchall()
+        finally:
+            conn.close()
+
+        now = time.time()
+        due = last_due_quarter()
+        found: Dict[Tuple[str, Quarter], Optional[Dict[str, object]]] = {}
+        for category, year, quarter, data, fetched in rows:
+            key = (category, (year, quarter))
+            if key not in wanted:
+                continue
+            if data is None:
+                recheck = MISSING_RECHECK_DUE if (year, quarter) <= due else MISSING_RECHECK_PENDING
+                if now - fetched > recheck:
+                    continue
+                found[key] = None
+            else:
+                found[key] = json.loads(data)
+        return found
+
+    def put_many(self, code: str, results: Dict[Tuple[str, Quarter], Optional[Dict[str, object]]]) -> None:
+        """保存查询结果（None 表示没有数据）"""
+        if not results:
+            return
+        now = time.time()
+        conn = self._connect()
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO statements (code, category, year, quarter, data, fetched) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    [(code, category, quarter[0], quarter[1],
+                      json.dumps(data, ensure_ascii=False, default=str) if data is not None else None, now)
+                     for (category, quarter), data in results.items()])
+        finally:
+            conn.close()
+
+
+def build_financial_panel(records: Dict[Tuple[str, Quarter], Optional[Dict[str, object]]],
+                          categories: List[str], quarters: List[Quarter],
+                          labels: Optional[Dict[str, str]] = None, lookback: int = 0) -> pd.DataFrame:
+    """
+    合并为按季度索引的宽表，数值指标附带环比（_QoQ，对比上一季度）和同比（_YoY，对比去年同季度）变化。
+
+    变化为相对变化 (本期 / 对比期 - 1)，任一期缺失或对比期为 0 时为空。
+
+    Args:
+        records: {(类别, 季度): 数据字典或 None}
+        categories: 按输出顺序排列的类别
+        quarters: 按时间顺序排列的季度，前 lookback 个只用于计算变化，不出现在结果中
+        labels: 类别的显示名称，用作 attrs 中的分组名
+        lookback: 见 quarters
+    """
+    labels = labels or {}
+    index = pd.Index([format_quarter(quarter) for quarter in quarters], name="quarter")
+    shared = pd.DataFrame(index=index, columns=SHARED_COLUMNS, dtype=object)
+    blocks = []
+    sections: Dict[str, List[str]] = {}
+    taken = set(SHARED_COLUMNS)
+    for category in categories:
+        rows = {format_quarter(quarter): records.get((category, quarter)) for quarter in quarters}
+        frame = pd.DataFrame.from_dict({key: row for key, row in rows.items() if row}, orient="index")
+        frame = frame.reindex(index)
+        for column in SHARED_COLUMNS:
+            if column in frame.columns:
+                shared[column] = shared[column].where(shared[column].notna(), frame[column])
+        metrics = [column for column in frame.columns if column not in taken]
+        taken.update(metrics)
+
+        columns = {}
+        for column in metrics:
+            values = pd.to_numeric(frame[column].replace("", None), errors="coerce")
+            if values.notna().any():
+                previous, year_ago = values.shift(1), values.shift(4)
+                columns[column] = values
+                columns[f"{column}_QoQ"] = (values / previous - 1).where(previous != 0).round(4)
+                columns[f"{column}_YoY"] = (values / year_ago - 1).where(year_ago != 0).round(4)
+            else:
+                columns[column] = frame[column]
+        if columns:
+            block = pd.DataFrame(columns, index=index)
+            blocks.append(block)
+            sections[labels.get(category, category)] = list(block.columns)
+
+    panel = pd.concat([shared] + blocks, axis=1).iloc[lookback:]
+    panel = panel.dropna(how="all", subset=[column for block in blocks for column in block.columns
+                                            if not column.endswith(("_QoQ", "_YoY"))] or None)
+    panel.attrs[SECTIONS_ATTR] = sections
+    return panel
+
+
+_financial_store: Optional[FinancialStore] = None
+_financial_store_initialized = False
+_financial_store_lock = threading.Lock()
+
+
+def get_financial_store() -> Optional[FinancialStore]:
+    """Returns the process-wide FinancialStore, or None when it is unavailable."""
+    global _financial_store, _financial_store_initialized
+    if _financial_store_initialized:
+        return _financial_store
+    with _financial_store_lock:
+        if not _financial_store_initialized:
+            try:
+                _financial_store = FinancialStore(os.path.join(get_data_dir(), STORE_FILENAME))
+            except Exception as e:
+                logger.warning(f"Financial store unavailable, fetching statements directly: {e}")
+                _financial_store = None
+            _financial_store_initialized = True
+    return _financial_store
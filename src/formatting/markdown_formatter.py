@@ -1,9 +1,14 @@
 """
 Markdown formatting utilities for StockReport MCP Server.
 """
-import pandas as pd
+from __future__ import annotations
+
 import logging
 from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 logger = logging.getLogger(__name__)
 
@@ -70,3 +75,59 @@ def format_df_to_markdown(df: pd.DataFrame, title: str = "", max_rows: int = Non
     else:
         logger.debug("Markdown table generated without truncation.")
         return markdown_table
+
+
+def format_record_to_markdown(df: pd.DataFrame, sections: Optional[Dict[str, List[str]]] = None) -> str:
+    """Formats the first row of a wide DataFrame as a vertical Markdown table (one row per column).
+
+    Args:
+        df: The DataFrame to format; only its first row is shown
+        sections: Optional mapping of section name to columns, adding a section column to the table.
+            Columns not listed in any section come first, under "Report".
+
+    Returns:
+        A markdown formatted string representation of the record
+    """
+    if df.empty:
+        logger.warning("Attempted to format an empty record to Markdown.")
+        return "(No data available to display)"
+
+    import pandas as pd
+
+    record = df.iloc[0]
+    if sections:
+        listed = {column for columns in sections.values() for column in columns}
+        layout = [("Report", [column for column in df.columns if column not in listed])]
+        layout += [(name, [column for column in columns if column in df.columns])
+                   for name, columns in sections.items()]
+        rows = [(name, column, record[column]) for name, columns in layout for column in columns]
+        table = pd.DataFrame(rows, columns=["section", "indicator", "value"])
+    else:
+        table = pd.DataFrame({"indicator": list(df.columns), "value": list(record)})
+    return format_df_to_markdown(table, max_rows=len(table))
+
+
+def format_sections_to_markdown(df: pd.DataFrame, sections: Dict[str, List[str]]) -> str:
+    """Formats a wide, indexed DataFrame as one Markdown table per section.
+
+    Args:
+        df: The DataFrame to format; its index becomes the first column of every table
+        sections: Mapping of section name to columns. Columns not listed in any section
+            form a leading "Report" table.
+
+    Returns:
+        A markdown formatted string with a heading and table per section
+    """
+    if df.empty:
+        logger.warning("Attempted to format an empty DataFrame to Markdown.")
+        return "(No data available to display)"
+
+    listed = {column for columns in sections.values() for column in columns}
+    layout = [("Report", [column for column in df.columns if column not in listed])]
+    layout += list(sections.items())
+    parts = []
+    for name, columns in layout:
+        columns = [column for column in columns if column in df.columns]
+        if columns:
+            parts.append(f"### {name}\n\n{format_df_to_markdown(df[columns].reset_index())}")
+    return "\n\n".join(parts)
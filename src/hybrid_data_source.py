@@ -212,6 +212,17 @@ class HybridDataSource(FinancialDataSource):
         source = self._get_appropriate_source(code)
         return source.get_dupont_data(code, year, quarter)
     
+    def get_financial_snapshot(self, code: str, year: str, quarter: int) -> str:
+        """获取完整的季度财务快照"""
+        source = self._get_appropriate_source(code)
+        return source.get_financial_snapshot(code, year, quarter)
+    
+    def get_financial_history(self, code: str, categories: Optional[List[str]] = None,
+                              start_quarter: str = "", end_quarter: str = "") -> str:
+        """获取多季度财务数据面板"""
+        source = self._get_appropriate_source(code)
+        return source.get_financial_history(code, categories, start_quarter, end_quarter)
+    
     # 其他方法 - 使用默认数据源或根据需要选择
     def get_performance_express_report(self, code: str, start_date: str, end_date: str) -> str:
         """获取业绩快报"""
@@ -244,10 +255,28 @@ class HybridDataSource(FinancialDataSource):
         """获取所有股票列表"""
         return self.baostock_source.get_all_stock(date)
     
+    def get_universe_changes(self, start_date: str, end_date: str) -> str:
+        """获取股票池变化（上市、移除、停复牌、更名）"""
+        return self.baostock_source.get_universe_changes(start_date, end_date)
+    
+    def get_suspended_stocks(self, start_date: str, end_date: str) -> str:
+        """获取区间内停牌过的证券"""
+        return self.baostock_source.get_suspended_stocks(start_date, end_date)
+    
     def get_trade_dates(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> str:
         """获取交易日历"""
         return self.baostock_source.get_trade_dates(start_date, end_date)
     
+    def get_security_list(self, market: str = "a") -> str:
+        """获取证券列表 - A股使用Baostock，港股美股使用AkShare"""
+        if market == "a":
+            return self.baostock_source.get_security_list(market)
+        return self.akshare_source.get_security_list(market)
+    
+    def get_spot_quotes(self, market: str = "a") -> str:
+        """获取实时行情快照 - 所有市场使用AkShare（Baostock不提供实时行情）"""
+        return self.akshare_source.get_spot_quotes(market)
+    
     # 宏观经济数据 - 使用Baostock
     def get_deposit_rate_data(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> str:
         """获取存款利率数据"""
@@ -274,6 +303,11 @@ class HybridDataSource(FinancialDataSource):
         """获取SHIBOR数据"""
         return self.baostock_source.get_shibor_data(start_date, end_date)
     
+    def get_macro_panel(self, series: List[str], start_date: Optional[str] = None, end_date: Optional[str] = None,
+                        frequency: str = "monthly", growth: Optional[List[str]] = None) -> str:
+        """获取对齐到同一日历的多个宏观序列"""
+        return self.baostock_source.get_macro_panel(series, start_date, end_date, frequency, growth)
+    
     def get_market_type_info(self, code: str) -> Dict[str, Any]:
         """
         获取股票代码的市场类型信息
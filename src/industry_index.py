@@ -0,0 +1,301 @@
+"""
+行业索引模块
+
+每天从行业分类快照（bs.query_stock_industry）建立一次 行业 -> 成分股、股票 -> 行业 的索引，
+并预先计算各行业的指标分布（市盈率、市净率、ROE、近半年涨跌幅的中位数和四分位数），
+同行业比较只需查字典再做一次百分位排名，不必每次下载全部约 5000 只股票的行业表再逐行过滤。
+
+行业指标分布在每天的行业快照刷新之后，由一个进程在后台对全部行业成分股统计一遍
+（见 profile_cards.refresh_industry_stats，用 claim_stats_pass() 保证同一份快照只统计一次）；
+统计完成前继续使用上一次的分布。每个指标记录参与统计的股票数量。
+
+刷新快照失败时记录失败时间，RETRY_AFTER_FAILURE 之内不再向上游请求。
+
+索引保存在数据目录（STOCKREPORT_HOME，默认 ~/.stockreport-mcp）下的 industries.sqlite3，
+多个服务器进程共享，每天只需一个进程向上游请求行业快照。
+
+作者: StockReport MCP Project
+许可证: MIT License
+"""
+from __future__ import annotations
+
+import bisect
+import json
+import logging
+import os
+import sqlite3
+import statistics
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+try:
+    from .utils import get_data_dir
+    from .data_source_interface import DataSourceError
+except ImportError:
+    from utils import get_data_dir
+    from data_source_interface import DataSourceError
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILENAME = "industries.sqlite3"
+# 行业快照刷新失败后多久之内不再向上游请求
+RETRY_AFTER_FAILURE = 30 * 60
+# 认领的统计过程超过这么久仍未完成（进程退出等）时，允许其他进程重新认领
+STATS_PASS_TIMEOUT = 6 * 60 * 60
+
+
+class IndustryStats(NamedTuple):
+    """一个行业某项指标的分布；values 为升序排列的全部取值"""
+    count: int
+    median: float
+    p25: float
+    p75: float
+    values: List[float]
+
+    def percentile(self, value: float) -> float:
+        """value 在行业内的百分位（0-100，相同取值各计一半）"""
+        below = bisect.bisect_left(self.values, value)
+        equal = bisect.bisect_right(self.values, value) - below
+        return (below + equal / 2) / self.count * 100
+
+
+def _distribution(values: List[float]) -> IndustryStats:
+    values = sorted(values)
+    if len(values) == 1:
+        return IndustryStats(1, values[0], values[0], values[0], values)
+    p25, median, p75 = statistics.quantiles(values, n=4, method="inclusive")
+    return IndustryStats(len(values), median, p25, p75, values)
+
+
+class IndustryIndex:
+    """SQLite 保存的行业分类快照和行业指标分布，读取时在内存中建立字典"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._version: Optional[Tuple[float, float]] = None
+        self._industry_of: Dict[str, str] = {}
+        self._members: Dict[str, List[str]] = {}
+        self._stats: Dict[str, Dict[str, IndustryStats]] = {}
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS members ("
+                    " code TEXT PRIMARY KEY,"
+                    " code_name TEXT,"
+                    " industry TEXT NOT NULL,"
+                    " update_date TEXT)"
+                )
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS stats ("
+                    " industry TEXT NOT NULL,"
+                    " metric TEXT NOT NULL,"
+                    " ordered TEXT NOT NULL,"
+                    " PRIMARY KEY (industry, metric))"
+                )
+                conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value REAL NOT NULL)")
+        finally:
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _meta(self, conn: sqlite3.Connection) -> Tuple[float, float]:
+        values = dict(conn.execute("SELECT key, value FROM meta").fetchall())
+        return values.get("snapshot", 0.0), values.get("stats", 0.0)
+
+    def _meta_value(self, key: str) -> float:
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        finally:
+            conn.close()
+        return row[0] if row else 0.0
+
+    def _set_meta(self, key: str, value: float) -> None:
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+        finally:
+            conn.close()
+
+    def _ensure_loaded(self) -> None:
+        """其他进程（或本进程）更新了快照或指标分布时重新载入内存字典"""
+        conn = self._connect()
+        try:
+            version = self._meta(conn)
+            if version == self._version:
+                return
+            members = conn.execute("SELECT code, industry FROM members").fetchall()
+            stats = conn.execute("SELECT industry, metric, ordered FROM stats").fetchall()
+        finally:
+            conn.close()
+        industry_of = dict(members)
+        by_industry: Dict[str, List[str]] = {}
+        for code, industry in members:
+            by_industry.setdefault(industry, []).append(code)
+        distributions: Dict[str, Dict[str, IndustryStats]] = {}
+        for industry, metric, ordered in stats:
+            distributions.setdefault(industry, {})[metric] = _distribution(json.loads(ordered))
+        with self._lock:
+            self._industry_of, self._members, self._stats = industry_of, by_industry, distributions
+            self._version = version
+
+    def snapshot_time(self) -> float:
+        """行业快照的刷新时间（从未刷新时为 0）"""
+        conn = self._connect()
+        try:
+            snapshot, _ = self._meta(conn)
+        finally:
+            conn.close()
+        return snapshot
+
+    def is_current(self) -> bool:
+        """行业快照是否是今天刷新的"""
+        snapshot = self.snapshot_time()
+        return bool(snapshot) and \
+            datetime.fromtimestamp(snapshot).strftime("%Y-%m-%d") == datetime.now().strftime("%Y-%m-%d")
+
+    def refresh(self, loader: Callable[[], "object"]) -> None:
+        """
+        用 loader() 返回的行业分类表（含 code、industry 列）替换快照。
+
+        没有行业的股票不进入索引。
+        """
+        df = loader()
+        rows = []
+        for record in df.to_dict("records"):
+            if record.get("industry"):
+                rows.append((record["code"], record.get("code_name"), record["industry"], record.get("updateDate")))
+        if not rows:
+            logger.warning("Industry snapshot is empty, keeping the previous index")
+            return
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("DELETE FROM members")
+                conn.executemany(
+                    "INSERT OR REPLACE INTO members (code, code_name, industry, update_date) VALUES (?, ?, ?, ?)",
+                    rows)
+                conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('snapshot', ?)", (time.time(),))
+        finally:
+            conn.close()
+        logger.info(f"Industry index refreshed with {len(rows)} stocks")
+
+    def ensure_current(self, loader: Callable[[], "object"]) -> None:
+        """
+        快照不是今天的时刷新；刷新失败时继续使用旧快照，并在 RETRY_AFTER_FAILURE 之内不再请求上游。
+
+        Raises:
+            DataSourceError: 没有任何快照且最近刷新失败过（不重复请求上游）
+        """
+        if self.is_current():
+            return
+        failed = self._meta_value("failed")
+        if failed > self.snapshot_time() and time.time() - failed < RETRY_AFTER_FAILURE:
+            if not self.snapshot_time():
+                raise DataSourceError("Industry snapshot unavailable: the last refresh failed, retrying later")
+            return
+        try:
+            self.refresh(loader)
+        except Exception as e:
+            self._set_meta("failed", time.time())
+            if not self.snapshot_time():
+                raise
+            logger.warning(f"Refreshing the industry index failed, using the previous snapshot: {e}")
+
+    def stats_time(self) -> float:
+        """行业指标分布的统计时间（从未统计时为 0）"""
+        return self._meta_value("stats")
+
+    def claim_stats_pass(self) -> bool:
+        """
+        认领当前快照的指标统计：快照是今天的、还没有为它统计过、也没有其他进程正在统计时返回 True。
+        """
+        if not self.is_current():
+            return False
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            values = dict(conn.execute("SELECT key, value FROM meta").fetchall())
+            snapshot = values.get("snapshot", 0.0)
+            started = values.get("stats_started", 0.0)
+            if values.get("stats", 0.0) >= snapshot or \
+                    (started >= snapshot and time.time() - started < STATS_PASS_TIMEOUT):
+                conn.rollback()
+                return False
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('stats_started', ?)", (time.time(),))
+            conn.commit()
+            return True
+        finally:
+            conn.close()
+
+    def rebuild_stats(self, observations: Iterable[Tuple[str, Dict[str, float]]]) -> None:
+        """
+        按行业重新统计指标分布，替换上一次的分布。
+
+        Args:
+            observations: (股票代码, {指标名: 数值}) 序列；不在索引中的股票、为 None 的数值忽略
+        """
+        self._ensure_loaded()
+        grouped: Dict[Tuple[str, str], List[float]] = {}
+        for code, values in observations:
+            industry = self._industry_of.get(code)
+            if industry is None:
+                continue
+            for metric, value in values.items():
+                if value is not None:
+                    grouped.setdefault((industry, metric), []).append(float(value))
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("DELETE FROM stats")
+                conn.executemany(
+                    "INSERT INTO stats (industry, metric, ordered) VALUES (?, ?, ?)",
+                    [(industry, metric, json.dumps(sorted(values)))
+                     for (industry, metric), values in grouped.items()])
+                conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('stats', ?)", (time.time(),))
+        finally:
+            conn.close()
+
+    def industry_of(self, code: str) -> Optional[str]:
+        self._ensure_loaded()
+        return self._industry_of.get(code)
+
+    def members(self, industry: Optional[str] = None) -> List[str]:
+        """industry 的成分股；industry 为 None 时返回索引中的全部股票"""
+        self._ensure_loaded()
+        if industry is None:
+            return list(self._industry_of)
+        return list(self._members.get(industry, []))
+
+    def stats(self, industry: str) -> Dict[str, IndustryStats]:
+        self._ensure_loaded()
+        return dict(self._stats.get(industry, {}))
+
+
+_industry_index: Optional[IndustryIndex] = None
+_industry_index_initialized = False
+_industry_index_lock = threading.Lock()
+
+
+def get_industry_index() -> Optional[IndustryIndex]:
+    """Returns the process-wide IndustryIndex, or None when it is unavailable."""
+    global _industry_index, _industry_index_initialized
+    if _industry_index_initialized:
+        return _industry_index
+    with _industry_index_lock:
+        if not _industry_index_initialized:
+            try:
+                _industry_index = IndustryIndex(os.path.join(get_data_dir(), INDEX_FILENAME))
+            except Exception as e:
+                logger.warning(f"Industry index unavailable, reading the industry table directly: {e}")
+                _industry_index = None
+            _industry_index_initialized = True
+    return _industry_index
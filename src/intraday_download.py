@@ -0,0 +1,306 @@
+"""
+分钟线分段并行下载模块
+
+Baostock 的分钟线（frequency 为 '5'、'15'、'30'、'60'）一次查询多年数据时，是一个
+逐页串行拉取的超长请求，耗时以分钟计，而且要等全部完成后才一次性构建成 DataFrame。
+本模块把长区间按交易日历切成若干段并发下载：
+
+- plan_chunks(): 按交易日切分区间，每段的起止日都是交易日，段内约 CHUNK_TARGET_ROWS 行
+- fill_intraday_store(): 只下载本地分钟线存储（intraday_store）中缺失的交易日，
+  各段完成后按时间顺序写入存储
+- download_intraday(): 不进入本地存储的请求（如前复权），各段完成后写入共享缓存
+- 两者都在进程池中并发下载，失败的段单独重试；最终仍失败时已完成的段已经保存，
+  再次请求只会下载失败的段
+
+baostock 客户端使用进程级的全局连接，同一进程内的多个线程不能并发查询，
+因此下载在独立的工作进程中进行（spawn 方式启动，每个进程登录一次并复用会话）。
+
+配置:
+- STOCKREPORT_DOWNLOAD_WORKERS: 下载进程数（默认 min(4, CPU 数)）
+
+作者: StockReport MCP Project
+许可证: MIT License
+"""
+from __future__ import annotations
+
+import json
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, List, Optional, Tuple
+
+try:
+    from .data_source_interface import DataSourceError, NoDataFoundError
+    from .utils import baostock_login_context, lazy_import
+    from .shared_cache import get_shared_cache, k_data_ttl
+    from .intraday_store import INTRADAY_K_FIELDS, IntradaySeries
+    from . import replay
+except ImportError:
+    from data_source_interface import DataSourceError, NoDataFoundError
+    from utils import baostock_login_context, lazy_import
+    from shared_cache import get_shared_cache, k_data_ttl
+    from intraday_store import INTRADAY_K_FIELDS, IntradaySeries
+    import replay
+
+bs = lazy_import("baostock")
+pd = lazy_import("pandas")
+
+logger = logging.getLogger(__name__)
+
+# 每个交易日的 K 线根数（A股每天交易 4 小时）
+INTRADAY_FREQUENCIES = {"5": 48, "15": 16, "30": 8, "60": 4}
+# 每段的目标行数：足够大以摊薄单次请求的开销，又足够小以便并发和重试
+CHUNK_TARGET_ROWS = 10_000
+MAX_CHUNK_ATTEMPTS = 3
+
+Chunk = Tuple[str, str]
+
+
+def plan_chunks(trading_days: List[str], frequency: str, chunk_days: Optional[int] = None) -> List[Chunk]:
+    """
+    把交易日列表切分为若干 (起始日, 结束日) 段。
+
+    Args:
+        trading_days: 区间内按升序排列的交易日（'YYYY-MM-DD'）
+        frequency: 分钟线频率（'5'、'15'、'30'、'60'）
+        chunk_days: 每段的交易日数，默认按 CHUNK_TARGET_ROWS 推算
+    """
+    size = chunk_days or max(1, CHUNK_TARGET_ROWS // INTRADAY_FREQUENCIES[frequency])
+    return [(trading_days[i], trading_days[min(i + size, len(trading_days)) - 1])
+            for i in range(0, len(trading_days), size)]
+
+
+def needs_chunking(trading_days: List[str], frequency: str) -> bool:
+    """分钟线区间超过一段时才值得分段下载"""
+    return frequency in INTRADAY_FREQUENCIES and len(plan_chunks(trading_days, frequency)) > 1
+
+
+# --- Worker Process ---
+_session = None
+
+
+def _init_worker() -> None:
+    # spawn 启动的进程不继承父进程安装的回放替身，按环境变量重新安装
+    replay.install_from_env()
+
+
+def _query_chunk(code: str, fields: str, start_date: str, end_date: str,
+                 frequency: str, adjust_flag: str) -> pd.DataFrame:
+    """Queries one chunk inside an active Baostock session; an empty frame means no bars in the range."""
+    try:
+        from .baostock_data_source import _collect_rows
+    except ImportError:
+        from baostock_data_source import _collect_rows
+
+    rs = bs.query_history_k_data_plus(code, fields, start_date=start_date, end_date=end_date,
+                                      frequency=frequency, adjustflag=adjust_flag)
+    if rs.error_code != '0':
+        if "no record found" in rs.error_msg.lower() or rs.error_code == '10002':
+            return pd.DataFrame(columns=fields.split(","))
+        raise DataSourceError(
+            f"Baostock API error fetching K-data: {rs.error_msg} (code: {rs.error_code})")
+    return pd.DataFrame(_collect_rows(rs), columns=rs.fields)
+
+
+def _fetch_chunk(code: str, fields: str, start_date: str, end_date: str,
+                 frequency: str, adjust_flag: str) -> pd.DataFrame:
+    """在工作进程中下载一段分钟线；会话在进程内复用，出错时丢弃以便重试时重新登录"""
+    global _session
+    if _session is None:
+        session = baostock_login_context()
+        session.__enter__()
+        _session = session
+    try:
+        return _query_chunk(code, fields, start_date, end_date, frequency, adjust_flag)
+    except Exception:
+        session, _session = _session, None
+        try:
+            session.__exit__(None, None, None)
+        except Exception:
+            pass
+        raise
+
+
+# --- Download ---
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            workers = int(os.environ.get("STOCKREPORT_DOWNLOAD_WORKERS", min(4, os.cpu_count() or 1)))
+            _executor = ProcessPoolExecutor(max_workers=max(1, workers),
+                                            mp_context=multiprocessing.get_context("spawn"),
+                                            initializer=_init_worker)
+            logger.info(f"Started intraday download pool with {workers} worker processes")
+        return _executor
+
+
+def _reset_executor(broken: ProcessPoolExecutor) -> None:
+    global _executor
+    with _executor_lock:
+        if _executor is broken:
+            _executor = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+def _chunk_key(code: str, fields: str, chunk: Chunk, frequency: str, adjust_flag: str) -> str:
+    arguments = {"code": code, "fields": fields, "start_date": chunk[0], "end_date": chunk[1],
+                 "frequency": frequency, "adjust_flag": adjust_flag}
+    return f"baostock.k_chunk:{json.dumps(arguments, sort_keys=True)}"
+
+
+def _download_chunks(code: str, fields: str, frequency: str, adjust_flag: str, chunks: List[Chunk],
+                     on_chunk: Callable[[Chunk, pd.DataFrame], None]) -> Dict[Chunk, BaseException]:
+    """
+    在进程池中并发下载各段，每段完成后调用 on_chunk(段, DataFrame)。
+
+    Returns:
+        重试 MAX_CHUNK_ATTEMPTS 次后仍然失败的段及其异常
+    """
+    attempts: Dict[Chunk, int] = {}
+    failures: Dict[Chunk, BaseException] = {}
+    pending = list(chunks)
+    while pending:
+        executor = _get_executor()
+        futures = {executor.submit(_fetch_chunk, code, fields, chunk[0], chunk[1], frequency, adjust_flag): chunk
+                   for chunk in pending}
+        pending = []
+        for future in as_completed(futures):
+            chunk = futures[future]
+            try:
+                df = future.result()
+            except Exception as e:
+                if isinstance(e, BrokenProcessPool):
+                    _reset_executor(executor)
+                attempts[chunk] = attempts.get(chunk, 0) + 1
+                if attempts[chunk] < MAX_CHUNK_ATTEMPTS:
+                    logger.warning(f"Chunk {chunk[0]}~{chunk[1]} of {code} failed (attempt {attempts[chunk]}), "
+                                   f"retrying: {e}")
+                    pending.append(chunk)
+                else:
+                    failures[chunk] = e
+                continue
+            on_chunk(chunk, df)
+    return failures
+
+
+def _failure_error(code: str, failures: Dict[Chunk, BaseException], total: int, kept: str) -> DataSourceError:
+    first = sorted(failures)[0]
+    return DataSourceError(
+        f"{len(failures)} of {total} chunks failed for {code} (first: {first[0]}~{first[1]}: "
+        f"{failures[first]}). Completed chunks are {kept}; retrying downloads only the failed chunks.")
+
+
+def download_intraday(code: str, fields: str, frequency: str, adjust_flag: str,
+                      trading_days: List[str]) -> pd.DataFrame:
+    """
+    分段并发下载分钟线并按时间顺序拼接（用于不进入本地分钟线存储的请求，如前复权）。
+
+    Args:
+        code: 股票代码（如 'sh.600000'）
+        fields: 逗号分隔的字段列表
+        frequency: 分钟线频率
+        adjust_flag: 复权标志
+        trading_days: 请求区间内的交易日
+
+    Raises:
+        NoDataFoundError: 所有分段都没有数据
+        DataSourceError: 有分段重试 MAX_CHUNK_ATTEMPTS 次后仍然失败（已完成的分段保留在缓存中）
+    """
+    chunks = plan_chunks(trading_days, frequency)
+    cache = get_shared_cache()
+    frames: Dict[Chunk, pd.DataFrame] = {}
+    pending: List[Chunk] = []
+    for chunk in chunks:
+        cached = cache.get_frame(_chunk_key(code, fields, chunk, frequency, adjust_flag)) if cache else None
+        if cached is not None:
+            frames[chunk] = cached
+        else:
+            pending.append(chunk)
+    logger.info(f"Downloading {code} freq={frequency} in {len(chunks)} chunks "
+                f"({len(chunks) - len(pending)} already cached)")
+
+    def keep(chunk: Chunk, df: pd.DataFrame) -> None:
+        frames[chunk] = df
+        if cache is not None and not df.empty:
+            try:
+                cache.put_frame(_chunk_key(code, fields, chunk, frequency, adjust_flag), df,
+                                k_data_ttl({"end_date": chunk[1], "adjust_flag": adjust_flag}))
+            except Exception as e:
+                logger.warning(f"Shared cache write failed for chunk {chunk[0]}~{chunk[1]} of {code}: {e}")
+
+    failures = _download_chunks(code, fields, frequency, adjust_flag, pending, keep)
+    if failures:
+        raise _failure_error(code, failures, len(chunks), "cached")
+
+    results = [frames[chunk] for chunk in chunks if not frames[chunk].empty]
+    if not results:
+        raise NoDataFoundError(f"No historical data found for {code} in the specified range (empty result set).")
+    return pd.concat(results, ignore_index=True)
+
+
+def fill_intraday_store(series: IntradaySeries, code: str, frequency: str, adjust_flag: str,
+                        trading_days: List[str], missing_days: List[str]) -> None:
+    """
+    下载 missing_days 并写入本地分钟线存储。
+
+    缺失的交易日按连续区间切段（已保存的交易日不会重复下载）。只有一段时在当前进程中直接查询，
+    多段时并发下载，并按时间顺序逐段写入存储，使新序列的写入都是追加。
+
+    Raises:
+        DataSourceError: 有分段重试后仍然失败（已完成的分段已经写入存储）
+    """
+    missing = set(missing_days)
+    runs: List[List[str]] = [[]]
+    for day in trading_days:
+        if day in missing:
+            runs[-1].append(day)
+        elif runs[-1]:
+            runs.append([])
+    chunk_days: Dict[Chunk, List[str]] = {}
+    for run in runs:
+        for chunk in plan_chunks(run, frequency):
+            chunk_days[chunk] = [day for day in run if chunk[0] <= day <= chunk[1]]
+    chunks = list(chunk_days)
+    if not chunks:
+        return
+    fields = ",".join(INTRADAY_K_FIELDS)
+    logger.info(f"Downloading {len(missing_days)} trading days of {code} freq={frequency} "
+                f"in {len(chunks)} chunks into the intraday store")
+
+    if len(chunks) == 1:
+        chunk = chunks[0]
+        with baostock_login_context():
+            df = _query_chunk(code, fields, chunk[0], chunk[1], frequency, adjust_flag)
+        series.write(df, chunk_days[chunk])
+        return
+
+    # 按段的时间顺序写入：先完成的后续段暂存，等前面的段完成后一起写入
+    completed: Dict[Chunk, pd.DataFrame] = {}
+    position = 0
+
+    def write(ready: List[Chunk]) -> None:
+        if ready:
+            frames = [completed.pop(chunk) for chunk in ready]
+            series.write(pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0],
+                         [day for chunk in ready for day in chunk_days[chunk]])
+
+    def store(chunk: Chunk, df: pd.DataFrame) -> None:
+        nonlocal position
+        completed[chunk] = df
+        ready = []
+        while position < len(chunks) and chunks[position] in completed:
+            ready.append(chunks[position])
+            position += 1
+        write(ready)
+
+    failures = _download_chunks(code, fields, frequency, adjust_flag, chunks, store)
+    write(sorted(completed))
+    if failures:
+        raise _failure_error(code, failures, len(chunks), "stored")
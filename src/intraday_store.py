@@ -0,0 +1,372 @@
+"""
+分钟线本地存储模块
+
+几千只股票多年的分钟线如果以 pandas 对象（字符串）DataFrame 的形式保存和传递，
+内存占用会随历史长度线性增长。本模块为每个 (股票代码, 频率, 复权方式) 维护一组
+定长的 NumPy 列文件，通过内存映射读取：
+
+- time: int64，沿用 Baostock 的 YYYYMMDDHHMMSSsss 表示（除以 10**9 即为交易日）
+- open / high / low / close / amount: float64
+- volume: int64
+- index: 每个已下载交易日一条 (交易日, 起始行, 结束行) 记录，停牌日记为空区间
+
+各列按时间顺序存放，区间读取只是对内存映射数组的切片（零拷贝），
+常驻内存只取决于实际访问的页面，与保存了多少历史无关。构建返回给调用方的 DataFrame 时
+数值列才转换为与 Baostock 查询结果相同的字符串列。
+
+写入规则:
+- 新交易日都晚于已有数据时直接追加到列文件末尾（先写数据，最后写索引）
+- 否则合并后写入新的版本目录，再原子地切换 CURRENT 指针；已打开的映射继续有效。
+  上一个版本保留到下一次切换时才删除，刚读到旧 CURRENT 的其他进程仍能打开它；
+  读取时版本目录已被删除则重新读取 CURRENT
+- 写入持有文件锁，多个进程可以同时读写同一份存储
+
+只保存已经收盘的交易日；前复权数据会随除权变化，不进入本地存储。
+
+配置:
+- STOCKREPORT_INTRADAY_STORE: 设为 0 关闭本地分钟线存储
+- 数据位于数据目录（STOCKREPORT_HOME，默认 ~/.stockreport-mcp）下的 intraday/
+
+作者: StockReport MCP Project
+许可证: MIT License
+"""
+from __future__ import annotations
+
+import logging
+import os
+import re
+import shutil
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+try:
+    from .utils import get_data_dir, lazy_import
+except ImportError:
+    from utils import get_data_dir, lazy_import
+
+try:
+    import fcntl
+except ImportError:  # Windows: writers in different processes are not serialized
+    fcntl = None
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+logger = logging.getLogger(__name__)
+
+STORE_DIRNAME = "intraday"
+# Baostock 分钟线支持的全部字段；请求其中的任意子集都可以由本地存储提供
+INTRADAY_K_FIELDS = ["date", "time", "code", "open", "high", "low", "close", "volume", "amount", "adjustflag"]
+COLUMN_DTYPES = {
+    "time": "<i8",
+    "open": "<f8",
+    "high": "<f8",
+    "low": "<f8",
+    "close": "<f8",
+    "volume": "<i8",
+    "amount": "<f8",
+}
+INDEX_DTYPE = [("day", "<i8"), ("start", "<i8"), ("stop", "<i8")]
+# 不复权和后复权的历史数据不会变化；前复权（'2'）每次除权都会改写历史
+STORED_ADJUST_FLAGS = ("1", "3")
+# 读取时版本目录被删除后，重新读取 CURRENT 的次数
+LOAD_ATTEMPTS = 3
+
+_DAY_DIVISOR = 10 ** 9
+_SAFE_CODE_RE = re.compile(r"^[A-Za-z0-9._-]+$")
+
+
+def day_number(day: str) -> int:
+    """'2024-01-02' -> 20240102"""
+    return int(day.replace("-", ""))
+
+
+def day_string(number: int) -> str:
+    """20240102 -> '2024-01-02'"""
+    return f"{number // 10000:04d}-{number // 100 % 100:02d}-{number % 100:02d}"
+
+
+def can_serve(code: str, adjust_flag: str, fields: Optional[List[str]]) -> bool:
+    """本地存储能否提供这次请求（字段都是分钟线字段、复权方式的历史不会变化）"""
+    return (adjust_flag in STORED_ADJUST_FLAGS and bool(_SAFE_CODE_RE.match(code))
+            and all(field in INTRADAY_K_FIELDS for field in (fields or [])))
+
+
+def frame_to_columns(df: pd.DataFrame) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    """
+    把 Baostock 返回的分钟线（字符串）转换为存储列，按时间排序。
+
+    Returns:
+        (每行所属的交易日编号, {列名: 定长数组})
+    """
+    times = pd.to_numeric(df["time"], errors="coerce")
+    valid = times.notna().to_numpy()
+    columns = {"time": times.to_numpy()[valid].astype("<i8")}
+    for name, dtype in COLUMN_DTYPES.items():
+        if name == "time":
+            continue
+        values = pd.to_numeric(df[name], errors="coerce").to_numpy(dtype="f8")[valid]
+        if dtype == "<i8":
+            values = np.nan_to_num(values, nan=0.0)
+        columns[name] = values.astype(dtype)
+    order = np.argsort(columns["time"], kind="stable")
+    columns = {name: values[order] for name, values in columns.items()}
+    return columns["time"] // _DAY_DIVISOR, columns
+
+
+def columns_to_frame(days: np.ndarray, counts: np.ndarray, columns: Dict[str, np.ndarray],
+                     code: str, adjust_flag: str, fields: List[str]) -> pd.DataFrame:
+    """
+    由存储列构建与 Baostock 查询结果相同的 DataFrame：列名相同，全部为字符串列
+    （数值按最短的十进制表示转换，与上游的小数位数可能不同，数值相同）。
+
+    Args:
+        days: 各交易日编号
+        counts: 各交易日的行数
+        columns: 按时间顺序排列的存储列
+    """
+    nrows = int(counts.sum())
+    data = {}
+    for field in fields:
+        if field == "date":
+            data[field] = np.repeat(np.array([day_string(int(day)) for day in days], dtype=object), counts)
+        elif field == "time":
+            data[field] = columns["time"].astype(str).astype(object)
+        elif field == "code":
+            data[field] = np.full(nrows, code, dtype=object)
+        elif field == "adjustflag":
+            data[field] = np.full(nrows, adjust_flag, dtype=object)
+        else:
+            data[field] = np.asarray(columns[field]).astype(str).astype(object)
+    return pd.DataFrame(data, columns=fields, copy=False)
+
+
+class IntradaySeries:
+    """
+    单个 (代码, 频率, 复权方式) 的分钟线文件。
+
+    目录布局: CURRENT（当前版本目录名）、lock、g<N>/{index,time,open,...}.bin
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock_path = os.path.join(path, "lock")
+        self._snapshot = None
+        self._snapshot_lock = threading.Lock()
+
+    # --- Reading ---
+    def _generation(self) -> Optional[str]:
+        try:
+            with open(os.path.join(self.path, "CURRENT"), encoding="utf-8") as f:
+                name = f.read().strip()
+        except FileNotFoundError:
+            return None
+        return name or None
+
+    @staticmethod
+    def _read_index(directory: str) -> np.ndarray:
+        # 版本目录在 CURRENT 指向它之前已写好索引；缺少索引说明目录已被删除，抛出 FileNotFoundError
+        path = os.path.join(directory, "index.bin")
+        count = os.path.getsize(path) // np.dtype(INDEX_DTYPE).itemsize
+        return np.fromfile(path, dtype=INDEX_DTYPE, count=count)
+
+    def _load(self):
+        """
+        Returns (index, columns) for the current generation. The memory maps are reused
+        until the generation changes or rows are appended.
+        """
+        for attempt in range(LOAD_ATTEMPTS):
+            generation = self._generation()
+            if generation is None:
+                return np.empty(0, dtype=INDEX_DTYPE), {}
+            try:
+                return self._load_generation(generation)
+            except FileNotFoundError:
+                # 读取 CURRENT 之后写入方又切换了两次版本、删除了这个版本：重新读取 CURRENT
+                if attempt == LOAD_ATTEMPTS - 1:
+                    raise
+                logger.debug(f"Generation {generation} of {self.path} was removed while loading, retrying")
+
+    def _load_generation(self, generation: str):
+        directory = os.path.join(self.path, generation)
+        key = (generation, os.path.getsize(os.path.join(directory, "index.bin")))
+        with self._snapshot_lock:
+            if self._snapshot is not None and self._snapshot[0] == key:
+                return self._snapshot[1], self._snapshot[2]
+            index = self._read_index(directory)
+            rows = int(index["stop"].max()) if len(index) else 0
+            columns = {}
+            for name, dtype in COLUMN_DTYPES.items():
+                if rows:
+                    columns[name] = np.memmap(os.path.join(directory, f"{name}.bin"), dtype=dtype,
+                                              mode="r", shape=(rows,))
+                else:
+                    columns[name] = np.empty(0, dtype=dtype)
+            self._snapshot = (key, index, columns)
+            return index, columns
+
+    def missing_days(self, trading_days: List[str]) -> List[str]:
+        """trading_days 中尚未下载的交易日"""
+        index, _ = self._load()
+        stored = set(index["day"].tolist())
+        return [day for day in trading_days if day_number(day) not in stored]
+
+    def read(self, start_date: str, end_date: str) -> Tuple[np.ndarray, np.ndarray, Dict[str, np.ndarray]]:
+        """
+        读取 [start_date, end_date] 内已保存的交易日。
+
+        Returns:
+            (交易日编号, 各交易日行数, {列名: 内存映射切片})
+        """
+        index, columns = self._load()
+        lo = int(np.searchsorted(index["day"], day_number(start_date), side="left"))
+        hi = int(np.searchsorted(index["day"], day_number(end_date), side="right"))
+        selected = index[lo:hi]
+        if not len(selected):
+            return selected["day"], np.zeros(0, dtype="<i8"), {name: values[:0] for name, values in columns.items()}
+        start, stop = int(selected["start"][0]), int(selected["stop"][-1])
+        return (selected["day"], selected["stop"] - selected["start"],
+                {name: values[start:stop] for name, values in columns.items()})
+
+    # --- Writing ---
+    @contextmanager
+    def _write_lock(self):
+        os.makedirs(self.path, exist_ok=True)
+        if fcntl is None:
+            yield
+            return
+        with open(self.lock_path, "a+b") as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def write(self, df: pd.DataFrame, trading_days: List[str]) -> None:
+        """
+        保存 trading_days 这些交易日的分钟线（df 为 Baostock 原始结果，可以为空）。
+
+        已经保存过的交易日保持不变；没有数据的交易日（停牌）也会记入索引，之后不再重复下载。
+        """
+        with self._write_lock():
+            generation = self._generation()
+            directory = os.path.join(self.path, generation) if generation else None
+            index = self._read_index(directory) if directory else np.empty(0, dtype=INDEX_DTYPE)
+            new_days = np.setdiff1d(np.array([day_number(day) for day in trading_days], dtype="<i8"),
+                                    index["day"])
+            if not len(new_days):
+                return
+            if df.empty:
+                row_days, columns = np.empty(0, dtype="<i8"), {name: np.empty(0, dtype=dtype)
+                                                              for name, dtype in COLUMN_DTYPES.items()}
+            else:
+                row_days, columns = frame_to_columns(df)
+                keep = np.isin(row_days, new_days)
+                row_days = row_days[keep]
+                columns = {name: values[keep] for name, values in columns.items()}
+
+            if directory is not None and (not len(index) or new_days[0] > index["day"][-1]):
+                self._append(directory, index, new_days, row_days, columns)
+            else:
+                self._rewrite(generation, index, new_days, row_days, columns)
+            logger.debug(f"Stored {len(row_days)} intraday rows for {len(new_days)} days in {self.path}")
+
+    @staticmethod
+    def _index_entries(days: np.ndarray, row_days: np.ndarray, offset: int) -> np.ndarray:
+        entries = np.empty(len(days), dtype=INDEX_DTYPE)
+        entries["day"] = days
+        entries["start"] = offset + np.searchsorted(row_days, days, side="left")
+        entries["stop"] = offset + np.searchsorted(row_days, days, side="right")
+        return entries
+
+    def _append(self, directory: str, index: np.ndarray, new_days: np.ndarray,
+                row_days: np.ndarray, columns: Dict[str, np.ndarray]) -> None:
+        rows = int(index["stop"].max()) if len(index) else 0
+        for name in COLUMN_DTYPES:
+            path = os.path.join(directory, f"{name}.bin")
+            with open(path, "r+b" if os.path.exists(path) else "wb") as f:
+                # 截掉上次中断的写入留下的、索引之外的尾部数据
+                f.truncate(rows * np.dtype(COLUMN_DTYPES[name]).itemsize)
+                f.seek(0, os.SEEK_END)
+                f.write(np.ascontiguousarray(columns[name]).tobytes())
+        # 索引最后写入：读取方只会看到完整写入的数据
+        with open(os.path.join(directory, "index.bin"), "ab") as f:
+            f.write(self._index_entries(new_days, row_days, rows).tobytes())
+
+    def _rewrite(self, generation: Optional[str], index: np.ndarray, new_days: np.ndarray,
+                 row_days: np.ndarray, columns: Dict[str, np.ndarray]) -> None:
+        number = int(generation[1:]) + 1 if generation else 1
+        name = f"g{number}"
+        directory = os.path.join(self.path, name)
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory)
+
+        if generation is not None:
+            old_directory = os.path.join(self.path, generation)
+            rows = int(index["stop"].max()) if len(index) else 0
+            old = {column: np.fromfile(os.path.join(old_directory, f"{column}.bin"), dtype=dtype, count=rows)
+                   for column, dtype in COLUMN_DTYPES.items()}
+            merged = {column: np.concatenate([old[column], columns[column]]) for column in COLUMN_DTYPES}
+            order = np.argsort(merged["time"], kind="stable")
+            columns = {column: values[order] for column, values in merged.items()}
+            row_days = columns["time"] // _DAY_DIVISOR
+        days = np.union1d(index["day"], new_days)
+
+        for column in COLUMN_DTYPES:
+            np.ascontiguousarray(columns[column]).tofile(os.path.join(directory, f"{column}.bin"))
+        self._index_entries(days, row_days, 0).tofile(os.path.join(directory, "index.bin"))
+
+        pointer = os.path.join(self.path, "CURRENT.tmp")
+        with open(pointer, "w", encoding="utf-8") as f:
+            f.write(name)
+        os.replace(pointer, os.path.join(self.path, "CURRENT"))
+        # 保留刚被替换的版本（其他进程可能刚读到旧的 CURRENT），删除更早的版本；
+        # 已经建立的映射不受删除影响（Windows 下删除失败则留到下次）
+        for entry in os.listdir(self.path):
+            if re.fullmatch(r"g\d+", entry) and int(entry[1:]) < number - 1:
+                shutil.rmtree(os.path.join(self.path, entry), ignore_errors=True)
+
+
+class IntradayStore:
+    """按 (代码, 频率, 复权方式) 管理 IntradaySeries，同一序列在进程内共享一个实例以复用内存映射"""
+
+    def __init__(self, root: str):
+        self.root = root
+        self._series: Dict[Tuple[str, str, str], IntradaySeries] = {}
+        self._lock = threading.Lock()
+
+    def series(self, code: str, frequency: str, adjust_flag: str) -> IntradaySeries:
+        key = (code, frequency, adjust_flag)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = IntradaySeries(
+                    os.path.join(self.root, f"{frequency}m-adj{adjust_flag}", code))
+            return series
+
+
+_intraday_store: Optional[IntradayStore] = None
+_intraday_store_initialized = False
+_intraday_store_lock = threading.Lock()
+
+
+def get_intraday_store() -> Optional[IntradayStore]:
+    """Returns the process-wide IntradayStore, or None when it is disabled or unavailable."""
+    global _intraday_store, _intraday_store_initialized
+    if _intraday_store_initialized:
+        return _intraday_store
+    with _intraday_store_lock:
+        if not _intraday_store_initialized:
+            if os.environ.get("STOCKREPORT_INTRADAY_STORE", "1") == "0":
+                logger.info("Intraday store disabled (STOCKREPORT_INTRADAY_STORE=0)")
+            else:
+                try:
+                    root = os.path.join(get_data_dir(), STORE_DIRNAME)
+                    os.makedirs(root, exist_ok=True)
+                    _intraday_store = IntradayStore(root)
+                    logger.info(f"Intraday store enabled at {root}")
+                except Exception as e:
+                    logger.warning(f"Intraday store unavailable, continuing without it: {e}")
+            _intraday_store_initialized = True
+    return _intraday_store
@@ -0,0 +1,397 @@
+"""
+宏观经济时间序列存储模块
+
+存贷款基准利率、存款准备金率、货币供应量、SHIBOR 在本地各保存一份完整序列，
+工具调用只在本地按日期截取，不再每次向上游下载整段数据:
+
+- 每个序列保存为按日期排序的表：数值列转换为 float64，另有一个排序键数组
+  （'YYYY-MM-DD'、'YYYY-MM' 或 'YYYY'），日期区间用二分查找截取
+- 按序列各自的发布规律判断是否需要向上游复查，复查时只请求最后一条记录之后的数据:
+  - daily（SHIBOR）: 每天复查一次
+  - monthly（月度货币供应量）: 上月数据尚未入库时每天复查一次，入库后到下个月再复查
+  - yearly（年度货币供应量）: 上一年数据尚未入库时每天复查一次
+  - change（基准利率、存款准备金率）: 政策调整没有固定日程，每天用一次增量查询检测是否有新记录
+- 复查失败时继续使用本地序列，并记录失败时间；RETRY_AFTER_FAILURE 之内不再向上游复查
+
+序列保存在数据目录（STOCKREPORT_HOME，默认 ~/.stockreport-mcp）下的 macro.sqlite3，
+使用共享缓存的列式编码，多个服务器进程共享。
+
+作者: StockReport MCP Project
+许可证: MIT License
+"""
+from __future__ import annotations
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+try:
+    from .utils import get_data_dir, lazy_import
+    from .shared_cache import DAY, MINUTE, decode_frame, encode_frame
+    from .data_source_interface import NoDataFoundError
+except ImportError:
+    from utils import get_data_dir, lazy_import
+    from shared_cache import DAY, MINUTE, decode_frame, encode_frame
+    from data_source_interface import NoDataFoundError
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+logger = logging.getLogger(__name__)
+
+STORE_FILENAME = "macro.sqlite3"
+# 同一序列两次向上游复查的最短间隔
+RECHECK_INTERVAL = DAY
+# 复查失败后多久再试
+RETRY_AFTER_FAILURE = 30 * MINUTE
+
+
+class MacroSeries(NamedTuple):
+    """一个宏观序列的来源和更新规律"""
+    query: str
+    label: str
+    key_columns: Tuple[str, ...]
+    schedule: str
+    text_columns: Tuple[str, ...] = ()
+    # 面板中表示数值生效日期的列；None 表示由排序键推出（月度取月末，年度取年末）
+    observed: Optional[str] = None
+    # 查询时固定传入的额外参数
+    query_args: Tuple[Tuple[str, str], ...] = ()
+
+
+# 序列键 -> 定义；key_columns 组成排序键（多列时依次以 '-' 连接，月份补足两位）
+MACRO_SERIES: Dict[str, MacroSeries] = {
+    "deposit_rate": MacroSeries("query_deposit_rate_data", "Deposit Rate", ("pubDate",), "change"),
+    "loan_rate": MacroSeries("query_loan_rate_data", "Loan Rate", ("pubDate",), "change"),
+    "reserve_ratio": MacroSeries("query_required_reserve_ratio_data", "Required Reserve Ratio",
+                                 ("pubDate",), "change", ("effectiveDate",), "effectiveDate",
+                                 (("yearType", "0"),)),
+    "money_supply_month": MacroSeries("query_money_supply_data_month", "Monthly Money Supply",
+                                      ("statYear", "statMonth"), "monthly"),
+    "money_supply_year": MacroSeries("query_money_supply_data_year", "Yearly Money Supply",
+                                     ("statYear",), "yearly"),
+    "shibor": MacroSeries("query_shibor_data", "SHIBOR", ("date",), "daily"),
+}
+
+
+def _series_keys(series: MacroSeries, df: pd.DataFrame) -> pd.Series:
+    """每行的排序键"""
+    parts = [df[column].astype(str).str.strip() for column in series.key_columns]
+    if len(parts) == 2:
+        return parts[0] + "-" + parts[1].str.zfill(2)
+    return parts[0]
+
+
+def _typed(series: MacroSeries, df: pd.DataFrame) -> pd.DataFrame:
+    """数值列转换为 float64（空串为 NaN），排序键和文本列保持字符串，按排序键排序去重"""
+    df = df.copy()
+    keep_text = set(series.key_columns) | set(series.text_columns)
+    for column in df.columns:
+        if column not in keep_text:
+            df[column] = pd.to_numeric(df[column].replace("", None), errors="coerce").astype("float64")
+    keys = _series_keys(series, df)
+    df = df.assign(_key=keys.values).drop_duplicates("_key", keep="last").sort_values("_key")
+    return df.reset_index(drop=True)
+
+
+def is_due(series: MacroSeries, latest: Optional[str], checked: float, now: Optional[datetime] = None,
+           failed: float = 0.0) -> bool:
+    """按序列的发布规律判断是否需要向上游复查；failed 为最近一次复查失败的时间（0 表示没有失败）"""
+    now = now or datetime.now()
+    if latest is None:
+        return True
+    if failed > checked and time.time() - failed < RETRY_AFTER_FAILURE:
+        return False
+    if series.schedule == "daily":
+        return datetime.fromtimestamp(checked).date() < now.date()
+    if time.time() - checked < RECHECK_INTERVAL:
+        return False
+    if series.schedule == "monthly":
+        year, month = (now.year, now.month - 1) if now.month > 1 else (now.year - 1, 12)
+        return latest < f"{year}-{month:02d}"
+    if series.schedule == "yearly":
+        return latest < str(now.year - 1)
+    return True
+
+
+class MacroStore:
+    """SQLite 保存的宏观序列（每个序列一行，列式编码），内存中缓存解码后的表"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._frames: Dict[str, Tuple[float, pd.DataFrame]] = {}
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS series ("
+                    " key TEXT PRIMARY KEY,"
+                    " data BLOB NOT NULL,"
+                    " latest TEXT,"
+                    " checked REAL NOT NULL,"
+                    " failed REAL NOT NULL DEFAULT 0)"
+                )
+                columns = {row[1] for row in conn.execute("PRAGMA table_info(series)").fetchall()}
+                if "failed" not in columns:
+                    # 早期版本的存储没有记录复查失败的时间
+                    conn.execute("ALTER TABLE series ADD COLUMN failed REAL NOT NULL DEFAULT 0")
+        finally:
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _status(self, key: str) -> Tuple[Optional[str], float, float]:
+        """(最后一条记录的排序键, 最近一次成功复查的时间, 最近一次复查失败的时间)"""
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT latest, checked, failed FROM series WHERE key = ?", (key,)).fetchone()
+        finally:
+            conn.close()
+        return (row[0], row[1], row[2]) if row else (None, 0.0, 0.0)
+
+    def frame(self, key: str) -> Optional[pd.DataFrame]:
+        """已保存的完整序列（含排序键列 _key）；尚未保存时为 None"""
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT checked FROM series WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            with self._lock:
+                cached = self._frames.get(key)
+            if cached is not None and cached[0] == row[0]:
+                return cached[1]
+            checked, data = conn.execute("SELECT checked, data FROM series WHERE key = ?", (key,)).fetchone()
+        finally:
+            conn.close()
+        frame = decode_frame(data)
+        with self._lock:
+            self._frames[key] = (checked, frame)
+        return frame
+
+    def refresh(self, key: str, fetch: Callable[[Optional[str]], pd.DataFrame], force: bool = False) -> bool:
+        """
+        按发布规律复查序列，把新记录并入本地序列。上游出错时保留本地序列并记录失败时间，
+        RETRY_AFTER_FAILURE 之后再复查。
+
+        Args:
+            key: MACRO_SERIES 中的序列键
+            fetch: fetch(start_date) 向上游查询 start_date 之后的数据（None 表示全部历史）
+            force: 忽略发布规律立即复查
+
+        Returns:
+            是否向上游查询过
+        """
+        series = MACRO_SERIES[key]
+        latest, checked, failed = self._status(key)
+        if not force and not is_due(series, latest, checked, failed=failed):
+            return False
+        existing = self.frame(key) if latest is not None else None
+        # 从最后一条记录所在的日期/月份/年份开始查（排序键即上游接受的日期格式），覆盖当期数据的修订
+        try:
+            fetched = fetch(latest)
+        except NoDataFoundError:
+            if existing is None:
+                raise
+            fetched = None
+        except Exception as e:
+            if existing is None:
+                raise
+            logger.warning(f"Refreshing macro series {key} failed, serving the stored series: {e}")
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.execute("UPDATE series SET failed = ? WHERE key = ?", (time.time(), key))
+            finally:
+                conn.close()
+            return True
+        if fetched is not None and not fetched.empty:
+            new_rows = _typed(series, fetched)
+            merged = new_rows if existing is None else _typed(series, pd.concat(
+                [existing.drop(columns="_key"), new_rows.drop(columns="_key")], ignore_index=True))
+            added = len(merged) - (len(existing) if existing is not None else 0)
+            if added:
+                logger.info(f"Macro series {key}: {added} new records")
+        else:
+            merged = existing
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO series (key, data, latest, checked, failed) VALUES (?, ?, ?, ?, 0)",
+                    (key, encode_frame(merged), str(merged["_key"].iloc[-1]) if len(merged) else None,
+                     time.time()))
+        finally:
+            conn.close()
+        return True
+
+    def slice(self, key: str, start_date: Optional[str] = None, end_date: Optional[str] = None,
+              date_column: Optional[str] = None) -> pd.DataFrame:
+        """
+        截取 [start_date, end_date] 的记录，列与上游查询结果相同。
+
+        日期按序列键的精度比较（月度序列只比较 'YYYY-MM'）。date_column 指定按另一列
+        （如准备金率的 effectiveDate）筛选。
+        """
+        frame = self.frame(key)
+        if frame is None:
+            raise NoDataFoundError(f"Macro series {key} has not been loaded")
+        if date_column is not None:
+            values = frame[date_column].astype(str)
+            mask = pd.Series(True, index=frame.index)
+            if start_date:
+                mask &= values >= start_date
+            if end_date:
+                mask &= values <= end_date
+            result = frame[mask.values]
+        else:
+            keys = frame["_key"].to_numpy(dtype=str)
+            width = len(keys[0]) if len(keys) else 10
+            first = np.searchsorted(keys, start_date[:width], side="left") if start_date else 0
+            last = np.searchsorted(keys, end_date[:width], side="right") if end_date else len(keys)
+            result = frame.iloc[first:last]
+        if result.empty:
+            raise NoDataFoundError(
+                f"No {MACRO_SERIES[key].label} data found for the specified criteria.")
+        return result.drop(columns="_key").reset_index(drop=True)
+
+
+# get_macro_panel 只给出序列键时选取的列
+PANEL_DEFAULT_COLUMNS = {
+    "deposit_rate": ["fixedDepositRate1Year"],
+    "loan_rate": ["loanRate6MonthTo1Year"],
+    "reserve_ratio": ["bigInstitutionsRatioAfter"],
+    "money_supply_month": ["m2YOY", "m1YOY"],
+    "money_supply_year": ["m2YearYOY"],
+    "shibor": ["shiborON", "shibor3M"],
+}
+# 派生增长率: 名称 -> 回看的月数
+PANEL_GROWTH = {"MoM": 1, "YoY": 12}
+PANEL_FREQUENCIES = ("daily", "monthly")
+
+
+def parse_panel_series(series: List[str]) -> Dict[str, List[Optional[str]]]:
+    """
+    解析 get_macro_panel 的序列参数: 'shibor'（默认列）或 'shibor.shibor3M'（指定列）。
+
+    Returns:
+        {序列键: [列名，None 表示默认列]}
+    """
+    specs: Dict[str, List[Optional[str]]] = {}
+    for item in series:
+        key, _, column = str(item).strip().partition(".")
+        if key not in MACRO_SERIES:
+            raise ValueError(f"Unknown macro series '{key}'. Valid options: {', '.join(MACRO_SERIES)}.")
+        specs.setdefault(key, []).append(column or None)
+    if not specs:
+        raise ValueError("At least one macro series is required.")
+    return specs
+
+
+def _observation_dates(key: str, frame: pd.DataFrame) -> np.ndarray:
+    """每行数值开始生效的日期（datetime64[D]）"""
+    series = MACRO_SERIES[key]
+    if series.observed is not None:
+        return pd.to_datetime(frame[series.observed], errors="coerce").to_numpy(dtype="datetime64[D]")
+    keys = frame["_key"].to_numpy(dtype=str)
+    width = len(keys[0]) if len(keys) else 10
+    if width == 7:
+        return (keys.astype("datetime64[M]") + 1).astype("datetime64[D]") - 1
+    if width == 4:
+        return (keys.astype("datetime64[Y]") + 1).astype("datetime64[D]") - 1
+    return keys.astype("datetime64[D]")
+
+
+def _as_of(dates: np.ndarray, values: np.ndarray, when: np.ndarray) -> np.ndarray:
+    """每个 when 日期之前（含）最近一次观测的值，没有观测时为 NaN（向量化的前向填充）"""
+    position = np.searchsorted(dates, when, side="right") - 1
+    result = values[np.maximum(position, 0)] if len(values) else np.full(len(when), np.nan)
+    return np.where(position >= 0, result, np.nan)
+
+
+def build_macro_panel(frames: Dict[str, pd.DataFrame], specs: Dict[str, List[Optional[str]]],
+                      start_date: str, end_date: str, frequency: str = "monthly",
+                      growth: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    把多个宏观序列对齐到同一日历（daily: 工作日，monthly: 月末），数值按观测日期前向填充。
+
+    Args:
+        frames: {序列键: MacroStore.frame() 返回的完整序列}
+        specs: parse_panel_series() 的结果
+        start_date / end_date: 'YYYY-MM-DD' 或 'YYYY-MM'
+        frequency: 'daily' 或 'monthly'
+        growth: 附加的增长率列（PANEL_GROWTH 中的名称），相对一个月/一年前的值 (本期 / 对比期 - 1)
+    """
+    if frequency not in PANEL_FREQUENCIES:
+        raise ValueError(f"Invalid frequency '{frequency}'. Valid options: {', '.join(PANEL_FREQUENCIES)}.")
+    growth = growth or []
+    for name in growth:
+        if name not in PANEL_GROWTH:
+            raise ValueError(f"Invalid growth '{name}'. Valid options: {', '.join(PANEL_GROWTH)}.")
+    if frequency == "monthly":
+        months = np.arange(np.datetime64(start_date[:7], "M"), np.datetime64(end_date[:7], "M") + 1)
+        calendar = (months + 1).astype("datetime64[D]") - 1
+        labels = months.astype(str)
+    else:
+        calendar = pd.bdate_range(start_date, end_date).to_numpy(dtype="datetime64[D]")
+        labels = calendar.astype(str)
+    if not len(calendar):
+        raise ValueError(f"Empty date range {start_date} ~ {end_date}.")
+    if frequency == "monthly":
+        lookbacks = {name: (months - PANEL_GROWTH[name] + 1).astype("datetime64[D]") - 1 for name in growth}
+    else:
+        lookbacks = {name: (pd.DatetimeIndex(calendar) - pd.DateOffset(months=PANEL_GROWTH[name]))
+                     .to_numpy(dtype="datetime64[D]") for name in growth}
+
+    columns: Dict[str, np.ndarray] = {"date": labels}
+    for key, wanted in specs.items():
+        frame = frames[key]
+        dates = _observation_dates(key, frame)
+        order = np.argsort(dates, kind="stable")
+        # 默认列只取上游实际返回的列，显式指定的列必须存在
+        selected = [column for entry in wanted
+                    for column in ([entry] if entry else
+                                   [c for c in PANEL_DEFAULT_COLUMNS[key] if c in frame.columns])]
+        for column in selected:
+            if column not in frame.columns or column in MACRO_SERIES[key].key_columns:
+                raise ValueError(f"Macro series '{key}' has no numeric column '{column}'.")
+            values = frame[column].to_numpy(dtype="float64")[order]
+            valid = ~np.isnan(values) & ~np.isnat(dates[order])
+            column_dates, column_values = dates[order][valid], values[valid]
+            name = column if column not in columns else f"{key}.{column}"
+            current = _as_of(column_dates, column_values, calendar)
+            columns[name] = np.round(current, 4)
+            for growth_name, when in lookbacks.items():
+                previous = _as_of(column_dates, column_values, when)
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    change = np.where(previous != 0, current / previous - 1, np.nan)
+                columns[f"{name}_{growth_name}"] = np.round(change, 4)
+    return pd.DataFrame(columns)
+
+
+_macro_store: Optional[MacroStore] = None
+_macro_store_initialized = False
+_macro_store_lock = threading.Lock()
+
+
+def get_macro_store() -> Optional[MacroStore]:
+    """Returns the process-wide MacroStore, or None when it is unavailable."""
+    global _macro_store, _macro_store_initialized
+    if _macro_store_initialized:
+        return _macro_store
+    with _macro_store_lock:
+        if not _macro_store_initialized:
+            try:
+                _macro_store = MacroStore(os.path.join(get_data_dir(), STORE_FILENAME))
+            except Exception as e:
+                logger.warning(f"Macro store unavailable, fetching macro series directly: {e}")
+                _macro_store = None
+            _macro_store_initialized = True
+    return _macro_store
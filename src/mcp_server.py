@@ -31,11 +31,12 @@
 
 import logging
 import argparse
+import os
 import sys
 from datetime import datetime
 
 try:
-    from mcp.server.fastmcp import FastMCP
+    from src.server_app import StockReportMCP
 except ImportError as e:
     print("❌ 缺少 FastMCP 依赖")
     print("💡 请运行以下命令安装依赖:")
@@ -50,6 +51,8 @@ from src.baostock_data_source import BaostockDataSource
 from src.akshare_data_source import AkshareDataSource
 from src.hybrid_data_source import HybridDataSource
 from src.utils import setup_logging
+from src.metrics import metrics, instrument_upstream
+from src import replay
 
 # 导入各模块工具的注册函数
 from src.tools.stock_market import register_stock_market_tools
@@ -61,6 +64,9 @@ from src.tools.date_utils import register_date_utils_tools
 from src.tools.analysis import register_analysis_tools
 from src.tools.hk_stocks import register_hk_stock_tools
 from src.tools.us_stocks import register_us_stock_tools
+from src.tools.search import register_search_tools
+from src.tools.metrics import register_metrics_tools
+from src.tools.realtime import register_realtime_tools
 
 # --- Logging Setup ---
 # Call the setup function from utils
@@ -106,10 +112,61 @@ def parse_arguments():
         default='INFO',
         help='设置日志级别 (默认: INFO)'
     )
+    parser.add_argument(
+        '--transport',
+        choices=['stdio', 'unix', 'http', 'sse'],
+        default='stdio',
+        help='传输方式 (默认: stdio；unix 为常驻守护进程，配合 stockreport-mcp-shim 使用；'
+             'http 为 Streamable HTTP，sse 为旧版 HTTP+SSE)'
+    )
+    parser.add_argument(
+        '--socket-path',
+        default=None,
+        help='守护进程的 Unix 套接字路径 (默认: ~/.stockreport-mcp/mcp.sock)'
+    )
+    parser.add_argument(
+        '--idle-timeout',
+        type=float,
+        default=0,
+        help='守护进程在没有会话多少秒后自动退出 (默认: 0，不退出)'
+    )
+    parser.add_argument('--host', default='127.0.0.1', help='HTTP 监听地址 (默认: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8000, help='HTTP 监听端口 (默认: 8000)')
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=1,
+        help='HTTP 工作进程数 (默认: 1；大于1时 Streamable HTTP 以无状态模式运行，便于负载均衡)'
+    )
+    parser.add_argument(
+        '--keep-alive',
+        type=int,
+        default=75,
+        help='HTTP keep-alive 空闲连接保持秒数，应大于前置负载均衡的空闲超时 (默认: 75)'
+    )
+    parser.add_argument(
+        '--graceful-timeout',
+        type=int,
+        default=30,
+        help='收到终止信号后等待进行中请求完成的最长秒数 (默认: 30)'
+    )
+    parser.add_argument(
+        '--upstream',
+        choices=list(replay.MODES),
+        default=None,
+        help='上游数据模式: live 访问真实接口；record 同时把响应录制为夹具；replay 只从夹具回放，不访问网络 '
+             '(默认: 环境变量 STOCKREPORT_UPSTREAM_MODE，未设置时为 live)'
+    )
+    parser.add_argument('--fixtures-dir', default=None, help='录制/回放夹具目录 (默认: ~/.stockreport-mcp/fixtures)')
+    parser.add_argument('--replay-latency', type=float, default=0, help='回放时每次上游调用注入的延迟毫秒数 (默认: 0)')
+    parser.add_argument('--replay-jitter', type=float, default=0, help='回放时额外注入的随机延迟上限毫秒数 (默认: 0)')
     
     # 如果是通过stdio运行（MCP模式），不解析命令行参数
     if len(sys.argv) == 1:
-        return argparse.Namespace(data_source='hybrid', log_level='INFO')
+        return argparse.Namespace(data_source='hybrid', log_level='INFO', transport='stdio',
+                                  socket_path=None, idle_timeout=0, host='127.0.0.1', port=8000,
+                                  workers=1, keep_alive=75, graceful_timeout=30, upstream=None,
+                                  fixtures_dir=None, replay_latency=0, replay_jitter=0)
     
     return parser.parse_args()
 
@@ -119,6 +176,17 @@ args = parse_arguments()
 # --- Update logging level ---
 setup_logging(level=getattr(logging, args.log_level))
 
+# --- Upstream Record / Replay ---
+# 必须在第一次上游调用之前安装（AkShare 健康检查在后台线程中延迟执行）
+if args.upstream is None:
+    replay.install_from_env()
+else:
+    replay.install(args.upstream, args.fixtures_dir, args.replay_latency, args.replay_jitter)
+
+# --- Upstream Instrumentation ---
+# 记录每个 Baostock 查询 / AkShare 接口调用的耗时（get_server_metrics 工具可查看）
+instrument_upstream("baostock", "akshare")
+
 # --- Dependency Injection ---
 # Create data source based on command line argument
 active_data_source: FinancialDataSource = create_data_source(args.data_source)
@@ -203,7 +271,7 @@ def create_system_instructions(data_source_type: str) -> str:
         return base_instructions
 
 # --- FastMCP App Initialization ---
-app = FastMCP(
+app = StockReportMCP(
     name="financial_data_provider",
     instructions=create_system_instructions(args.data_source),
     # Specify dependencies for installation if needed (e.g., when using `mcp install`)
@@ -217,6 +285,8 @@ def register_tools_based_on_data_source(app, data_source: FinancialDataSource, s
     register_stock_market_tools(app, data_source)
     register_date_utils_tools(app, data_source)
     register_analysis_tools(app, data_source)
+    register_search_tools(app, data_source)
+    register_metrics_tools(app, data_source)
     
     if source_type.lower() == 'baostock':
         # Baostock特有的工具
@@ -230,6 +300,7 @@ def register_tools_based_on_data_source(app, data_source: FinancialDataSource, s
         # AkShare特有的工具 - 包括港股和美股
         register_hk_stock_tools(app, data_source)
         register_us_stock_tools(app, data_source)
+        register_realtime_tools(app, data_source)
         logger.info("Registered AkShare-specific tools (including HK and US stocks)")
         
         # 部分支持的工具（如果AkShare数据源实现了相应方法）
@@ -252,35 +323,92 @@ def register_tools_based_on_data_source(app, data_source: FinancialDataSource, s
         # 港股和美股工具 (通过AkShare)
         register_hk_stock_tools(app, data_source)
         register_us_stock_tools(app, data_source)
+        register_realtime_tools(app, data_source)
         
         logger.info("Registered all tools for Hybrid data source (A-shares: Baostock, Others: AkShare)")
 
 # 注册工具
 register_tools_based_on_data_source(app, active_data_source, args.data_source)
 
+# --- HTTP Transport ---
+def create_http_app():
+    """
+    创建 HTTP 传输的 ASGI 应用。
+
+    多进程模式下 uvicorn 在每个工作进程中调用本函数（工作进程沿用父进程的命令行参数），
+    每个进程各自持有一份数据源和工具注册。
+    """
+    from starlette.responses import PlainTextResponse
+
+    @app.custom_route("/metrics", methods=["GET"])
+    async def prometheus_metrics(request):
+        # 每个工作进程只返回自身的指标
+        return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+    app.run_tools_in_threads = True
+    app.settings.host = args.host
+    app.settings.port = args.port
+    if args.transport == 'sse':
+        return app.sse_app()
+    if args.workers > 1:
+        # 负载均衡器不保证同一会话落在同一进程，会话状态不能保存在进程内存中
+        app.settings.stateless_http = True
+    return app.streamable_http_app()
+
+def run_http_server():
+    """使用 uvicorn 运行 HTTP 传输，支持多工作进程、keep-alive 和优雅停机"""
+    import uvicorn
+
+    workers = args.workers
+    if args.transport == 'sse' and workers > 1:
+        logger.warning("SSE transport keeps sessions in process memory; falling back to a single worker")
+        workers = 1
+
+    # 工作进程据此判断进程内存中的状态（如提醒规则）是否在各次调用之间共享
+    os.environ["STOCKREPORT_HTTP_WORKERS"] = str(workers)
+
+    options = dict(
+        host=args.host,
+        port=args.port,
+        timeout_keep_alive=args.keep_alive,
+        timeout_graceful_shutdown=args.graceful_timeout,
+        log_level=args.log_level.lower(),
+    )
+    if workers > 1:
+        # 多进程需要以导入字符串的形式指定应用工厂
+        uvicorn.run("src.mcp_server:create_http_app", factory=True, workers=workers, **options)
+    else:
+        uvicorn.run(create_http_app(), **options)
+
 # --- Main Execution Block ---
 def main():
     """主函数入口点"""
     logger.info(
-        f"Starting Financial Data MCP Server via stdio... "
+        f"Starting Financial Data MCP Server via {args.transport}... "
         f"Data Source: {args.data_source.upper()}, Today is {current_date}")
     
-    # 显示启动信息
+    # 显示启动信息（写到 stderr，stdio 模式下 stdout 是协议通道）
     if len(sys.argv) > 1:
-        print(f"[OK] 使用数据源: {args.data_source.upper()}")
+        print(f"[OK] 使用数据源: {args.data_source.upper()}", file=sys.stderr)
         if args.data_source.lower() == 'akshare':
-            print("[INFO] 支持市场: A股、港股、美股")
+            print("[INFO] 支持市场: A股、港股、美股", file=sys.stderr)
         elif args.data_source.lower() == 'hybrid':
-            print("[INFO] 智能混合数据源:")
-            print("       - A股: Baostock (详细财务数据)")
-            print("       - 港股/美股: AkShare (实时行情)")
-            print("       - 宏观数据: Baostock (权威指标)")
+            print("[INFO] 智能混合数据源:", file=sys.stderr)
+            print("       - A股: Baostock (详细财务数据)", file=sys.stderr)
+            print("       - 港股/美股: AkShare (实时行情)", file=sys.stderr)
+            print("       - 宏观数据: Baostock (权威指标)", file=sys.stderr)
         else:
-            print("[INFO] 支持市场: A股、指数、宏观数据")
-        print("=" * 50)
+            print("[INFO] 支持市场: A股、指数、宏观数据", file=sys.stderr)
+        print("=" * 50, file=sys.stderr)
     
     # 启动服务器
-    app.run(transport='stdio')
+    if args.transport == 'unix':
+        from src.daemon import run_daemon
+        run_daemon(app, args.socket_path, args.idle_timeout)
+    elif args.transport in ('http', 'sse'):
+        run_http_server()
+    else:
+        app.run(transport='stdio')
 
 if __name__ == "__main__":
     main()
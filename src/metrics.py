@@ -0,0 +1,211 @@
+"""
+运行指标模块
+
+记录每个 MCP 工具和每个上游调用（Baostock 查询函数、AkShare 接口函数）的
+调用次数、错误次数和耗时分布，以及共享缓存的命中率，用于定位真正的性能热点。
+
+主要功能:
+- metrics: 进程内全局指标注册表
+- metrics.observe(): 记录一次调用的耗时和是否出错（工具由 StockReportMCP 自动记录）
+- metrics.record_cache(): 记录一次缓存命中/未命中（由 cached_frame 自动记录）
+- instrument_upstream(): 为 baostock / akshare 的延迟导入代理加上计时包装
+- render_prometheus(): 以 Prometheus 文本格式输出全部指标
+
+耗时使用固定分桶直方图记录，p50/p95/p99 由分桶线性插值估算，内存占用与调用次数无关。
+多进程部署（HTTP 多工作进程）时每个进程各自统计。
+
+作者: StockReport MCP Project
+许可证: MIT License
+"""
+from __future__ import annotations
+
+import bisect
+import functools
+import logging
+import threading
+import time
+from typing import Dict, List, Tuple
+
+try:
+    from .utils import lazy_import
+except ImportError:
+    from utils import lazy_import
+
+pd = lazy_import("pandas")
+
+logger = logging.getLogger(__name__)
+
+# 直方图分桶上界（秒），覆盖本地计算到慢速上游请求
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+class LatencyStats:
+    """Count, error count and bucketed latency histogram of one tool or upstream function."""
+
+    __slots__ = ("count", "errors", "total", "max", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+
+    def observe(self, seconds: float, error: bool) -> None:
+        self.count += 1
+        self.errors += int(error)
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.buckets[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+
+    def quantile(self, q: float) -> float:
+        """Estimates the q-quantile in seconds by interpolating inside the matching bucket."""
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        cumulative = 0
+        for i, bucket_count in enumerate(self.buckets):
+            if bucket_count and cumulative + bucket_count >= rank:
+                lower = LATENCY_BUCKETS[i - 1] if i > 0 else 0.0
+                upper = LATENCY_BUCKETS[i] if i < len(LATENCY_BUCKETS) else self.max
+                estimate = lower + (upper - lower) * (rank - cumulative) / bucket_count
+                return min(estimate, self.max)
+            cumulative += bucket_count
+        return self.max
+
+
+class MetricsRegistry:
+    """Thread-safe in-process registry of call latencies and cache hit counts."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Tuple[str, str], LatencyStats] = {}
+        self._cache: Dict[str, List[int]] = {}
+        self.started = time.time()
+
+    def observe(self, kind: str, name: str, seconds: float, error: bool = False) -> None:
+        """
+        记录一次调用。
+
+        Args:
+            kind: 'tool' 或 'upstream'
+            name: 工具名，或 '<库名>.<函数名>'（如 'baostock.query_history_k_data_plus'）
+            seconds: 耗时（秒）
+            error: 是否出错
+        """
+        with self._lock:
+            stats = self._calls.get((kind, name))
+            if stats is None:
+                stats = self._calls[(kind, name)] = LatencyStats()
+            stats.observe(seconds, error)
+
+    def record_cache(self, namespace: str, hit: bool) -> None:
+        with self._lock:
+            counts = self._cache.setdefault(namespace, [0, 0])
+            counts[0 if hit else 1] += 1
+
+    def reset(self) -> None:
+        with self._lock:
+            self._calls.clear()
+            self._cache.clear()
+            self.started = time.time()
+
+    def calls_frame(self) -> pd.DataFrame:
+        """每个工具/上游函数一行，按总耗时降序排列，耗时单位为毫秒"""
+        with self._lock:
+            rows = [{
+                "kind": kind,
+                "name": name,
+                "count": stats.count,
+                "errors": stats.errors,
+                "error_rate": round(stats.errors / stats.count, 4) if stats.count else 0.0,
+                "total_ms": round(stats.total * 1000, 1),
+                "p50_ms": round(stats.quantile(0.50) * 1000, 1),
+                "p95_ms": round(stats.quantile(0.95) * 1000, 1),
+                "p99_ms": round(stats.quantile(0.99) * 1000, 1),
+                "max_ms": round(stats.max * 1000, 1),
+            } for (kind, name), stats in self._calls.items()]
+        columns = ["kind", "name", "count", "errors", "error_rate", "total_ms",
+                   "p50_ms", "p95_ms", "p99_ms", "max_ms"]
+        df = pd.DataFrame(rows, columns=columns)
+        return df.sort_values("total_ms", ascending=False, ignore_index=True)
+
+    def cache_frame(self) -> pd.DataFrame:
+        """每个缓存命名空间一行：命中、未命中次数和命中率"""
+        with self._lock:
+            rows = [{
+                "namespace": namespace,
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+            } for namespace, (hits, misses) in sorted(self._cache.items())]
+        return pd.DataFrame(rows, columns=["namespace", "hits", "misses", "hit_rate"])
+
+    def render_prometheus(self) -> str:
+        """Renders all metrics in the Prometheus text exposition format."""
+        lines = [
+            "# HELP stockreport_call_latency_seconds Latency of MCP tool handlers and upstream calls.",
+            "# TYPE stockreport_call_latency_seconds histogram",
+        ]
+        with self._lock:
+            calls = sorted(self._calls.items())
+            cache = sorted(self._cache.items())
+            for (kind, name), stats in calls:
+                labels = f'kind="{kind}",name="{_escape(name)}"'
+                cumulative = 0
+                for bound, bucket_count in zip(LATENCY_BUCKETS, stats.buckets):
+                    cumulative += bucket_count
+                    lines.append(f'stockreport_call_latency_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'stockreport_call_latency_seconds_bucket{{{labels},le="+Inf"}} {stats.count}')
+                lines.append(f"stockreport_call_latency_seconds_sum{{{labels}}} {stats.total:.6f}")
+                lines.append(f"stockreport_call_latency_seconds_count{{{labels}}} {stats.count}")
+
+            lines.append("# HELP stockreport_call_errors_total Failed MCP tool handlers and upstream calls.")
+            lines.append("# TYPE stockreport_call_errors_total counter")
+            for (kind, name), stats in calls:
+                lines.append(f'stockreport_call_errors_total{{kind="{kind}",name="{_escape(name)}"}} {stats.errors}')
+
+            lines.append("# HELP stockreport_cache_requests_total Shared cache lookups by result.")
+            lines.append("# TYPE stockreport_cache_requests_total counter")
+            for namespace, (hits, misses) in cache:
+                lines.append(f'stockreport_cache_requests_total{{namespace="{_escape(namespace)}",result="hit"}} {hits}')
+                lines.append(f'stockreport_cache_requests_total{{namespace="{_escape(namespace)}",result="miss"}} {misses}')
+
+        lines.append("# HELP stockreport_uptime_seconds Seconds since metrics were last reset.")
+        lines.append("# TYPE stockreport_uptime_seconds gauge")
+        lines.append(f"stockreport_uptime_seconds {time.time() - self.started:.0f}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+metrics = MetricsRegistry()
+
+
+def timed_upstream(library: str, name: str, fn):
+    """Wraps an upstream library function so every call is recorded under 'upstream'."""
+    metric_name = f"{library}.{name}"
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        error = True
+        try:
+            result = fn(*args, **kwargs)
+            # Baostock reports failures through error_code instead of raising
+            error = getattr(result, "error_code", "0") != "0"
+            return result
+        finally:
+            metrics.observe("upstream", metric_name, time.perf_counter() - start, error)
+
+    return wrapper
+
+
+def instrument_upstream(*libraries: str) -> None:
+    """为指定上游库的延迟导入代理安装计时包装（例如 instrument_upstream('baostock', 'akshare')）"""
+    for library in libraries:
+        lazy_import(library).set_call_wrapper(functools.partial(timed_upstream, library))
+        logger.debug(f"Instrumented upstream calls of {library}")
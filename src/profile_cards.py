@@ -0,0 +1,396 @@
+"""
+个股档案卡模块
+
+分析报告用到的事实（基本信息、所属行业及同行业数量、最新季度财务指标、近半年收盘价统计、
+市盈率/市净率）汇总成每只股票一张“档案卡”，保存在内存和数据目录下的 profiles.sqlite3 中
+（多个服务器进程共享）。
+生成报告只是把档案卡填入模板，常见情况下不需要任何上游调用。
+
+档案卡按输入分段、各自判断是否需要刷新，只重新获取发生变化的部分:
+- basic / industry: 每天刷新一次（行业及同行业数量取自每日刷新的行业索引，见 industry_index）
+- fundamentals: 披露索引显示有更新的季度、或记录的季度需要复查时刷新
+- price: 跨过交易日后刷新；当天盘中生成的统计几分钟后刷新（与 K 线缓存的过期时间一致）
+
+刷新失败时沿用档案卡中已有的旧数据。
+
+行业指标分布（市盈率、市净率、ROE、近半年涨跌幅）在每天的行业快照刷新之后，对全部行业成分股统计一遍
+（refresh_industry_stats）。统计在后台线程中进行，不占用工具调用的时间；同一份快照只由一个进程统计。
+
+作者: StockReport MCP Project
+许可证: MIT License
+"""
+from __future__ import annotations
+
+import json
+import math
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, Optional
+
+try:
+    from .data_source_interface import FinancialDataSource, NoDataFoundError
+    from .disclosure_index import RECHECK_INTERVAL, get_disclosure_index, try_get_financial_data_with_fallback
+    from .industry_index import get_industry_index
+    from .metrics import metrics
+    from .shared_cache import MINUTE
+    from .utils import get_data_dir
+except ImportError:
+    from data_source_interface import FinancialDataSource, NoDataFoundError
+    from disclosure_index import RECHECK_INTERVAL, get_disclosure_index, try_get_financial_data_with_fallback
+    from industry_index import get_industry_index
+    from metrics import metrics
+    from shared_cache import MINUTE
+    from utils import get_data_dir
+
+logger = logging.getLogger(__name__)
+
+STORE_FILENAME = "profiles.sqlite3"
+# 内存中最多保留的档案卡数量
+MEMORY_CARDS = 5000
+# 当天盘中生成的价格统计多久后刷新
+INTRADAY_PRICE_TTL = 5 * MINUTE
+# A 股收盘时间，之后生成的当天价格统计不再变化
+MARKET_CLOSE = "15:30"
+# 价格统计的回看天数
+PRICE_WINDOW_DAYS = 180
+# 两次检查是否需要统计行业指标分布的最小间隔（秒）
+STATS_CHECK_INTERVAL = 60
+
+# 档案卡中保留的财务数据类型
+FUNDAMENTAL_TYPES = ("profit", "growth", "balance")
+
+# 各分析类型用到的档案卡分段
+SECTIONS_BY_TYPE = {
+    "fundamental": ("basic", "industry", "fundamentals"),
+    "technical": ("basic", "industry", "price"),
+    "comprehensive": ("basic", "industry", "fundamentals", "price"),
+}
+
+
+def _today() -> str:
+    return datetime.now().strftime("%Y-%m-%d")
+
+
+def _same_day(timestamp: float) -> bool:
+    return datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d") == _today()
+
+
+def _to_float(value: object) -> Optional[float]:
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if math.isfinite(number) else None
+
+
+def _build_basic(data_source: FinancialDataSource, code: str) -> Dict[str, object]:
+    try:
+        basic_info = data_source.get_stock_basic_info(code=code)
+    except NoDataFoundError:
+        return {"name": None}
+    if basic_info.empty:
+        return {"name": None}
+    row = basic_info.iloc[0]
+    return {
+        "name": str(row["code_name"]),
+        "industry": str(row["industry"]) if "industry" in basic_info.columns else None,
+        "ipo_date": str(row["ipoDate"]) if "ipoDate" in basic_info.columns else None,
+    }
+
+
+def _build_industry(data_source: FinancialDataSource, code: str, industry: Optional[str]) -> Dict[str, object]:
+    """所属行业（基本信息中没有时取行业分类快照中的记录）及同行业股票数量"""
+    index = get_industry_index()
+    if index is not None:
+        index.ensure_current(lambda: data_source.get_stock_industry(date=None))
+        industry = industry or index.industry_of(code)
+        return {"name": industry, "peers": len(index.members(industry)) if industry else None}
+
+    try:
+        industry_stocks = data_source.get_stock_industry(date=None)
+    except NoDataFoundError:
+        return {"name": industry, "peers": None}
+    if industry_stocks.empty or "industry" not in industry_stocks.columns:
+        return {"name": industry, "peers": None}
+    if not industry and "code" in industry_stocks.columns:
+        own = industry_stocks.loc[industry_stocks["code"] == code, "industry"]
+        industry = str(own.iloc[0]) if not own.empty and own.iloc[0] else None
+    if not industry:
+        return {"name": None, "peers": None}
+    return {"name": industry, "peers": int((industry_stocks["industry"] == industry).sum())}
+
+
+def _build_fundamentals(data_source: FinancialDataSource, code: str) -> Dict[str, object]:
+    """最新已披露季度的盈利、成长、偿债能力数据（各取第一行）"""
+    profit_data, year, quarter = try_get_financial_data_with_fallback(data_source, code, "profit")
+    section: Dict[str, object] = {"year": year, "quarter": quarter}
+    for data_type in FUNDAMENTAL_TYPES:
+        data = profit_data if data_type == "profit" else \
+            try_get_financial_data_with_fallback(data_source, code, data_type)[0]
+        if data is None or data.empty:
+            section[data_type] = None
+            continue
+        section[data_type] = {column: None if value is None else str(value)
+                              for column, value in zip(data.columns, data.iloc[0].tolist())}
+    return section
+
+
+def _build_price(data_source: FinancialDataSource, code: str) -> Dict[str, object]:
+    now = datetime.now()
+    try:
+        price_data = data_source.get_historical_k_data(
+            code=code,
+            start_date=(now - timedelta(days=PRICE_WINDOW_DAYS)).strftime("%Y-%m-%d"),
+            end_date=now.strftime("%Y-%m-%d"),
+            fields=["date", "close", "peTTM", "pbMRQ"])
+    except NoDataFoundError:
+        return {"rows": 0}
+    section: Dict[str, object] = {"rows": len(price_data)}
+    if "close" not in price_data.columns or len(price_data) <= 1:
+        return section
+    closes = price_data["close"].astype(float)
+    section.update({
+        "latest": str(price_data["close"].iloc[-1]),
+        "change_pct": (closes.iloc[-1] / closes.iloc[0] - 1) * 100,
+        "ma20": float(closes.tail(20).mean()) if len(price_data) >= 20 else None,
+        "pe": _to_float(price_data["peTTM"].iloc[-1]) if "peTTM" in price_data.columns else None,
+        "pb": _to_float(price_data["pbMRQ"].iloc[-1]) if "pbMRQ" in price_data.columns else None,
+    })
+    return section
+
+
+class ProfileCardStore:
+    """
+    档案卡存储：内存 LRU + SQLite（每行是一只股票的 JSON 档案卡）。
+
+    每个分段记录生成时间 refreshed，是否过期由 is_fresh() 按分段类型判断。
+    """
+
+    def __init__(self, path: str, memory_cards: int = MEMORY_CARDS):
+        self.path = path
+        self.memory_cards = memory_cards
+        self._cards: "OrderedDict[str, Dict[str, object]]" = OrderedDict()
+        self._lock = threading.Lock()
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS profiles ("
+                    " code TEXT PRIMARY KEY,"
+                    " card TEXT NOT NULL,"
+                    " updated REAL NOT NULL)"
+                )
+        finally:
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _remember(self, code: str, card: Dict[str, object]) -> None:
+        with self._lock:
+            self._cards[code] = card
+            self._cards.move_to_end(code)
+            while len(self._cards) > self.memory_cards:
+                self._cards.popitem(last=False)
+
+    def load(self, code: str, sections: Iterable[str] = ()) -> Dict[str, object]:
+        """
+        读取档案卡；内存中的卡缺少或过期了 sections 中的分段时，再看其他进程是否已经写入了更新的版本。
+        """
+        with self._lock:
+            card = self._cards.get(code)
+        if card is not None and all(is_fresh(name, card.get(name), code) for name in sections):
+            return card
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT card FROM profiles WHERE code = ?", (code,)).fetchone()
+        finally:
+            conn.close()
+        if row is not None:
+            stored = json.loads(row[0])
+            if card is None or stored.get("updated", 0) > card.get("updated", 0):
+                card = stored
+        card = card if card is not None else {"code": code}
+        self._remember(code, card)
+        return card
+
+    def save(self, code: str, card: Dict[str, object]) -> None:
+        card["updated"] = time.time()
+        self._remember(code, card)
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO profiles (code, card, updated) VALUES (?, ?, ?)",
+                    (code, json.dumps(card, ensure_ascii=False), card["updated"]))
+        finally:
+            conn.close()
+
+
+def is_fresh(name: str, section: Optional[Dict[str, object]], code: str) -> bool:
+    """档案卡分段是否仍然有效"""
+    if not section:
+        return False
+    refreshed = section.get("refreshed", 0)
+    if name in ("basic", "industry"):
+        return _same_day(refreshed)
+    if name == "fundamentals":
+        index = get_disclosure_index()
+        entry = index.get(code) if index is not None else None
+        if entry is not None and entry.is_current():
+            recorded = (section["year"], section["quarter"]) if section.get("year") else None
+            return entry.quarter == recorded
+        return time.time() - refreshed < RECHECK_INTERVAL
+    if name == "price":
+        if not _same_day(refreshed):
+            return False
+        closed = datetime.fromtimestamp(refreshed).strftime("%H:%M") >= MARKET_CLOSE
+        return closed or time.time() - refreshed < INTRADAY_PRICE_TTL
+    return False
+
+
+def card_metrics(card: Dict[str, object]) -> Dict[str, Optional[float]]:
+    """档案卡中参与同行业比较的指标"""
+    price = card.get("price") or {}
+    profit = (card.get("fundamentals") or {}).get("profit") or {}
+    return {
+        "pe": price.get("pe"),
+        "pb": price.get("pb"),
+        "roe": _to_float(profit.get("roeAvg")),
+        "return_6m": price.get("change_pct"),
+    }
+
+
+def _member_metrics(data_source: FinancialDataSource, code: str) -> Dict[str, Optional[float]]:
+    """一只行业成分股参与统计的指标（与 card_metrics 相同的口径）"""
+    profit_data = try_get_financial_data_with_fallback(data_source, code, "profit")[0]
+    profit = {}
+    if profit_data is not None and not profit_data.empty and "roeAvg" in profit_data.columns:
+        profit = {"roeAvg": profit_data["roeAvg"].iloc[0]}
+    return card_metrics({"price": _build_price(data_source, code), "fundamentals": {"profit": profit}})
+
+
+def refresh_industry_stats(data_source: FinancialDataSource) -> None:
+    """
+    对行业索引中的全部股票取估值、ROE 和近半年涨跌幅，重新统计各行业的指标分布。
+
+    单只股票获取失败时跳过；全部失败时保留上一次的分布。
+    """
+    index = get_industry_index()
+    if index is None:
+        return
+    observations = []
+    failures = 0
+    for code in index.members():
+        try:
+            observations.append((code, _member_metrics(data_source, code)))
+        except Exception as e:
+            failures += 1
+            logger.debug(f"Collecting industry statistics for {code} failed: {e}")
+    if not observations:
+        raise NoDataFoundError(f"No industry member could be fetched ({failures} failed)")
+    index.rebuild_stats(observations)
+    logger.info(f"Industry statistics rebuilt from {len(observations)} stocks ({failures} failed)")
+
+
+_stats_refresh_lock = threading.Lock()
+_stats_refresh_running = False
+_stats_checked = 0.0
+
+
+def _refresh_industry_stats_in_background(data_source: FinancialDataSource) -> None:
+    global _stats_refresh_running
+    try:
+        refresh_industry_stats(data_source)
+    except Exception as e:
+        logger.warning(f"Refreshing industry statistics failed: {e}")
+    finally:
+        with _stats_refresh_lock:
+            _stats_refresh_running = False
+
+
+def schedule_industry_stats_refresh(data_source: FinancialDataSource) -> None:
+    """
+    今天的行业快照还没有统计指标分布时，认领统计并在后台线程中对全部成分股统计一遍，调用方不等待。
+    """
+    global _stats_refresh_running, _stats_checked
+    with _stats_refresh_lock:
+        if _stats_refresh_running or time.monotonic() - _stats_checked < STATS_CHECK_INTERVAL:
+            return
+        _stats_checked = time.monotonic()
+        index = get_industry_index()
+        if index is None or not index.claim_stats_pass():
+            return
+        _stats_refresh_running = True
+    threading.Thread(target=_refresh_industry_stats_in_background, args=(data_source,),
+                     name="industry-stats", daemon=True).start()
+
+
+def get_profile_card(data_source: FinancialDataSource, code: str,
+                     sections: Iterable[str] = SECTIONS_BY_TYPE["comprehensive"]) -> Dict[str, object]:
+    """
+    返回 code 的档案卡，只刷新 sections 中已经过期的分段。
+
+    档案卡存储不可用时每次都重新生成。
+    """
+    sections = list(sections)
+    store = get_profile_store()
+    card = store.load(code, sections) if store is not None else {"code": code}
+    builders: Dict[str, Callable[[], Dict[str, object]]] = {
+        "basic": lambda: _build_basic(data_source, code),
+        "industry": lambda: _build_industry(data_source, code, (card.get("basic") or {}).get("industry")),
+        "fundamentals": lambda: _build_fundamentals(data_source, code),
+        "price": lambda: _build_price(data_source, code),
+    }
+    changed = False
+    for name in sections:
+        fresh = is_fresh(name, card.get(name), code)
+        metrics.record_cache(f"profile.{name}", fresh)
+        if fresh:
+            continue
+        try:
+            section = builders[name]()
+        except Exception as e:
+            if card.get(name) is None:
+                raise
+            logger.warning(f"Refreshing {name} of {code} failed, using the stored profile: {e}")
+            continue
+        section["refreshed"] = time.time()
+        card = dict(card, **{name: section})
+        changed = True
+    if changed and store is not None:
+        store.save(code, card)
+    if "industry" in sections:
+        try:
+            schedule_industry_stats_refresh(data_source)
+        except Exception as e:
+            logger.warning(f"Scheduling the industry statistics refresh failed: {e}")
+    return card
+
+
+_profile_store: Optional[ProfileCardStore] = None
+_profile_store_initialized = False
+_profile_store_lock = threading.Lock()
+
+
+def get_profile_store() -> Optional[ProfileCardStore]:
+    """Returns the process-wide ProfileCardStore, or None when it is unavailable."""
+    global _profile_store, _profile_store_initialized
+    if _profile_store_initialized:
+        return _profile_store
+    with _profile_store_lock:
+        if not _profile_store_initialized:
+            try:
+                _profile_store = ProfileCardStore(os.path.join(get_data_dir(), STORE_FILENAME))
+            except Exception as e:
+                logger.warning(f"Profile store unavailable, building analysis profiles on every call: {e}")
+                _profile_store = None
+            _profile_store_initialized = True
+    return _profile_store
@@ -0,0 +1,467 @@
+"""
+实时行情缓冲模块
+
+*_realtime_data 工具原来每次调用都向上游请求最近几天的日K线，用最后一根代替实时行情。
+本模块在后台线程中按固定间隔成批拉取各市场的行情快照（每个市场一次请求覆盖全部关注的证券），
+把关注列表中每只证券的报价写入内存:
+
+- 每只证券一个定长的 NumPy 环形缓冲区保存逐笔快照（时间、最新价、累计成交量、累计成交额），
+  写满后覆盖最早的记录，内存占用与运行时长无关
+- 每次写入时增量更新当前这一分钟的 OHLCV 分钟线，跨分钟时开始新的一根，
+  分钟线同样保存在定长环形缓冲区中
+- 最新报价直接从内存读取，不发起上游请求
+
+关注列表由固定的证券（配置的证券、有提醒规则的证券，见 pin()）和实时行情工具查询过的证券组成；
+后者超过 MAX_WATCHED 时淘汰最久没有被读取的一只，超过 STOCKREPORT_QUOTE_IDLE_MINUTES 分钟没有被读取的
+也会移出关注列表。固定的证券不会被淘汰或移出。
+某个市场不在交易时段（含午休、周末）时不拉取该市场的快照；关注列表为空时拉取线程退出，
+再次有证券被关注时重新启动。
+
+配置:
+- STOCKREPORT_WATCHLIST: 逗号分隔的常驻关注证券（如 hk.00700,us.AAPL,sh.600000），启动后即开始拉取
+- STOCKREPORT_QUOTE_INTERVAL: 拉取间隔秒数（默认 5）
+- STOCKREPORT_QUOTE_IDLE_MINUTES: 自动关注的证券多少分钟没有被读取后移出关注列表（默认 30）
+
+作者: StockReport MCP Project
+许可证: MIT License
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, time as dt_time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+try:
+    from .metrics import metrics
+    from .utils import lazy_import
+except ImportError:
+    from metrics import metrics
+    from utils import lazy_import
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+logger = logging.getLogger(__name__)
+
+# 行情快照中每只证券的报价字段（数值）
+QUOTE_FIELDS = ("price", "open", "high", "low", "preclose", "pctChg", "volume", "amount")
+# 逐笔缓冲区的列: 时间戳（秒）、最新价、当日累计成交量、当日累计成交额
+TICK_COLUMNS = ("time", "price", "volume", "amount")
+# 分钟线缓冲区的列: 分钟起点时间戳（秒）、开高低收、本分钟成交量和成交额
+BAR_COLUMNS = ("time", "open", "high", "low", "close", "volume", "amount")
+# 每只证券保存的逐笔快照数和分钟线根数
+TICK_CAPACITY = 1024
+BAR_CAPACITY = 600
+# 最多同时关注的证券数量（不含固定的证券: STOCKREPORT_WATCHLIST 中的和有提醒规则的）
+MAX_WATCHED = 200
+DEFAULT_POLL_INTERVAL = 5.0
+# 市场快照超过这么多秒（且超过 3 个拉取间隔）没有更新时，不再使用内存中的报价
+STALE_QUOTE_SECONDS = 60
+# 启动后第一次拉取前的等待秒数，避免导入 AkShare 与 MCP 握手争抢 GIL
+POLL_STARTUP_DELAY = 2.0
+DEFAULT_IDLE_MINUTES = 30.0
+# 各市场的时区和交易时段（当地时间，前后各留几分钟余量以覆盖集合竞价和收盘后的最后一次更新）；
+# 不含节假日，节假日上游快照不变化，只多拉取几次
+MARKET_SESSIONS = {
+    "a": (ZoneInfo("Asia/Shanghai"), ((dt_time(9, 10), dt_time(11, 35)), (dt_time(12, 55), dt_time(15, 5)))),
+    "hk": (ZoneInfo("Asia/Hong_Kong"), ((dt_time(9, 15), dt_time(12, 5)), (dt_time(12, 55), dt_time(16, 15)))),
+    "us": (ZoneInfo("America/New_York"), ((dt_time(9, 25), dt_time(16, 5)),)),
+}
+
+
+def market_of(code: str) -> Optional[str]:
+    """证券代码所属的行情快照市场（'a'、'hk'、'us'），无法识别时为 None"""
+    prefix = code.split(".", 1)[0].lower() if "." in code else ""
+    if prefix in ("sh", "sz", "bj"):
+        return "a"
+    if prefix in ("hk", "us"):
+        return prefix
+    return None
+
+
+def market_open(market: str, timestamp: Optional[float] = None) -> bool:
+    """market 在 timestamp（默认当前时间）是否处于交易时段（周一至周五，不含节假日）"""
+    zone, sessions = MARKET_SESSIONS[market]
+    now = datetime.fromtimestamp(time.time() if timestamp is None else timestamp, zone)
+    if now.weekday() >= 5:
+        return False
+    clock = now.time()
+    return any(start <= clock <= end for start, end in sessions)
+
+
+class _Ring:
+    """一只证券的逐笔快照和分钟线环形缓冲区"""
+
+    __slots__ = ("ticks", "tick_count", "bars", "bar_count", "base_volume", "base_amount", "quote", "name")
+
+    def __init__(self):
+        self.ticks = np.zeros((TICK_CAPACITY, len(TICK_COLUMNS)))
+        self.tick_count = 0
+        self.bars = np.zeros((BAR_CAPACITY, len(BAR_COLUMNS)))
+        self.bar_count = 0
+        # 当前分钟线开始前的累计成交量 / 成交额
+        self.base_volume = 0.0
+        self.base_amount = 0.0
+        self.quote: Optional[np.ndarray] = None
+        self.name: Optional[str] = None
+
+    def append(self, timestamp: float, quote: np.ndarray) -> None:
+        price, volume, amount = quote[0], quote[6], quote[7]
+        if np.isnan(price):
+            return
+        new_day = False
+        if self.tick_count:
+            last = self.ticks[(self.tick_count - 1) % TICK_CAPACITY]
+            if last[2] == volume and last[1] == price:
+                # 上游报价没有变化（非交易时间或停牌），只更新最新报价
+                self.quote = quote
+                return
+            # 累计成交量变小说明进入了新的交易日
+            new_day = volume < last[2]
+        self.ticks[self.tick_count % TICK_CAPACITY] = (timestamp, price, volume, amount)
+        self.tick_count += 1
+        self.quote = quote
+
+        minute = timestamp - timestamp % 60
+        bar = self.bars[(self.bar_count - 1) % BAR_CAPACITY] if self.bar_count else None
+        if bar is None or bar[0] != minute or new_day:
+            if new_day:
+                self.base_volume = self.base_amount = 0.0
+            elif bar is not None:
+                self.base_volume, self.base_amount = self.base_volume + bar[5], self.base_amount + bar[6]
+            else:
+                # 第一笔快照之前的成交不属于任何一根已观察到的分钟线
+                self.base_volume, self.base_amount = volume, amount
+            bar = self.bars[self.bar_count % BAR_CAPACITY]
+            bar[:] = (minute, price, price, price, price, 0.0, 0.0)
+            self.bar_count += 1
+        bar[2] = max(bar[2], price)
+        bar[3] = min(bar[3], price)
+        bar[4] = price
+        bar[5] = max(volume - self.base_volume, 0.0)
+        bar[6] = max(amount - self.base_amount, 0.0)
+
+    @staticmethod
+    def _last(buffer: np.ndarray, count: int, limit: int) -> np.ndarray:
+        """环形缓冲区中最近 limit 条记录（按时间顺序）"""
+        size = len(buffer)
+        limit = min(limit, count, size)
+        positions = np.arange(count - limit, count) % size
+        return buffer[positions]
+
+
+class QuoteBuffer:
+    """关注列表中各证券的最新报价、逐笔快照和分钟线（进程内存）"""
+
+    def __init__(self, pinned: Iterable[str] = ()):
+        self._lock = threading.Lock()
+        # 代码 -> 固定次数（配置的证券固定一次且不解除）
+        self._pinned: Dict[str, int] = {code: 1 for code in pinned}
+        # 代码 -> 缓冲区；按最近读取时间排序，便于淘汰
+        self._rings: "OrderedDict[str, _Ring]" = OrderedDict((code, _Ring()) for code in self._pinned)
+        # 代码 -> 最近一次读取的时间（time.monotonic()），用于移出长时间没有被读取的证券
+        self._read: Dict[str, float] = {}
+        self._updated: Dict[str, float] = {}
+        self._listeners: List[Callable[[str, float, Dict[str, np.ndarray]], None]] = []
+
+    def watch(self, code: str) -> bool:
+        """把 code 加入关注列表；返回是否是新加入的"""
+        with self._lock:
+            self._read[code] = time.monotonic()
+            if code in self._rings:
+                self._rings.move_to_end(code)
+                return False
+            self._rings[code] = _Ring()
+            unpinned = [watched for watched in self._rings if watched not in self._pinned]
+            if len(unpinned) > MAX_WATCHED:
+                self._unwatch(unpinned[0])
+            return True
+
+    def pin(self, code: str) -> bool:
+        """
+        把 code 加入关注列表并固定，直到对应次数的 unpin()；固定期间不会被淘汰或因没有读取而移出。
+
+        Returns:
+            是否是新加入关注列表的
+        """
+        with self._lock:
+            self._pinned[code] = self._pinned.get(code, 0) + 1
+            self._read[code] = time.monotonic()
+            if code in self._rings:
+                return False
+            self._rings[code] = _Ring()
+            return True
+
+    def unpin(self, code: str) -> None:
+        """解除一次 pin()；全部解除后 code 按普通的自动关注证券处理（从现在起计算未读取时间）"""
+        with self._lock:
+            remaining = self._pinned.get(code, 0) - 1
+            if remaining > 0:
+                self._pinned[code] = remaining
+                return
+            self._pinned.pop(code, None)
+            if code in self._rings:
+                self._read[code] = time.monotonic()
+
+    def expire(self, idle_seconds: float) -> List[str]:
+        """把超过 idle_seconds 秒没有被读取的自动关注证券移出关注列表，返回移出的代码"""
+        cutoff = time.monotonic() - idle_seconds
+        with self._lock:
+            expired = [code for code in self._rings
+                       if code not in self._pinned and self._read.get(code, 0.0) < cutoff]
+            for code in expired:
+                self._unwatch(code)
+        return expired
+
+    def _unwatch(self, code: str) -> None:
+        del self._rings[code]
+        self._read.pop(code, None)
+        logger.info(f"Quote buffer stopped watching {code}")
+
+    def watched(self) -> Dict[str, List[str]]:
+        """按市场分组的关注列表"""
+        with self._lock:
+            codes = list(self._rings)
+        grouped: Dict[str, List[str]] = {}
+        for code in codes:
+            market = market_of(code)
+            if market is not None:
+                grouped.setdefault(market, []).append(code)
+        return grouped
+
+    def add_listener(self, listener: Callable[[str, float, Dict[str, np.ndarray]], None]) -> None:
+        """注册回调 listener(market, timestamp, columns)，每次写入一份快照后以关注证券的报价列调用"""
+        self._listeners.append(listener)
+
+    def ingest(self, market: str, df: pd.DataFrame, timestamp: Optional[float] = None) -> int:
+        """
+        写入一份行情快照（含 code、code_name 和 QUOTE_FIELDS 列），只保留关注列表中的证券。
+
+        Returns:
+            写入的证券数量
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        with self._lock:
+            watched = [code for code in self._rings if market_of(code) == market]
+            self._updated[market] = timestamp
+        rows = df[df["code"].isin(watched)]
+        if rows.empty:
+            return 0
+        codes = rows["code"].to_numpy(dtype=str)
+        names = rows["code_name"].tolist() if "code_name" in rows.columns else [None] * len(rows)
+        quotes = np.column_stack([pd.to_numeric(rows[field], errors="coerce").to_numpy(dtype="float64")
+                                  if field in rows.columns else np.full(len(rows), np.nan)
+                                  for field in QUOTE_FIELDS])
+        with self._lock:
+            for code, name, quote in zip(codes, names, quotes):
+                ring = self._rings.get(code)
+                if ring is None:
+                    continue
+                ring.append(timestamp, quote)
+                ring.name = name if name is not None else ring.name
+        columns = {"code": codes, **{field: quotes[:, i] for i, field in enumerate(QUOTE_FIELDS)}}
+        for listener in list(self._listeners):
+            try:
+                listener(market, timestamp, columns)
+            except Exception as e:
+                logger.warning(f"Quote listener failed: {e}")
+        return len(codes)
+
+    def updated(self, market: str) -> Optional[float]:
+        """market 最近一次写入快照的时间"""
+        return self._updated.get(market)
+
+    def latest(self, code: str) -> Optional[pd.DataFrame]:
+        """code 的最新报价（一行，列为 code、code_name、time 和 QUOTE_FIELDS）；没有报价时为 None"""
+        with self._lock:
+            ring = self._rings.get(code)
+            if ring is None or ring.quote is None:
+                return None
+            self._rings.move_to_end(code)
+            self._read[code] = time.monotonic()
+            quote, name = ring.quote, ring.name
+            updated = self._updated.get(market_of(code))
+        row = {"code": code, "code_name": name,
+               "time": datetime.fromtimestamp(updated).strftime("%Y-%m-%d %H:%M:%S") if updated else None}
+        row.update({field: float(value) for field, value in zip(QUOTE_FIELDS, quote)})
+        return pd.DataFrame([row])
+
+    def ticks(self, code: str, limit: int = TICK_CAPACITY) -> pd.DataFrame:
+        """code 最近 limit 笔快照（按时间顺序）"""
+        with self._lock:
+            ring = self._rings.get(code)
+            self._touch(code)
+            data = _Ring._last(ring.ticks, ring.tick_count, limit) if ring is not None else np.zeros((0, len(TICK_COLUMNS)))
+        return self._frame(data, TICK_COLUMNS)
+
+    def bars(self, code: str, limit: int = BAR_CAPACITY) -> pd.DataFrame:
+        """code 最近 limit 根 1 分钟线（按时间顺序，最后一根可能仍在形成中）"""
+        with self._lock:
+            ring = self._rings.get(code)
+            self._touch(code)
+            data = _Ring._last(ring.bars, ring.bar_count, limit) if ring is not None else np.zeros((0, len(BAR_COLUMNS)))
+        return self._frame(data, BAR_COLUMNS)
+
+    def _touch(self, code: str) -> None:
+        if code in self._rings:
+            self._rings.move_to_end(code)
+            self._read[code] = time.monotonic()
+
+    @staticmethod
+    def _frame(data: np.ndarray, columns) -> pd.DataFrame:
+        df = pd.DataFrame(data, columns=list(columns))
+        df["time"] = [datetime.fromtimestamp(stamp).strftime("%Y-%m-%d %H:%M:%S") for stamp in df["time"]]
+        return df
+
+
+class QuotePoller:
+    """
+    后台线程: 每隔 interval 秒为每个有关注证券且处于交易时段的市场拉取一份行情快照并写入 QuoteBuffer。
+
+    每轮先移出 idle_seconds 秒没有被读取的自动关注证券；关注列表为空时线程退出，
+    之后再调用 start() 会重新启动。
+    """
+
+    def __init__(self, buffer: QuoteBuffer, fetch: Callable[[str], pd.DataFrame],
+                 interval: float = DEFAULT_POLL_INTERVAL, idle_seconds: float = DEFAULT_IDLE_MINUTES * 60):
+        self.buffer = buffer
+        self.fetch = fetch
+        self.interval = interval
+        self.idle_seconds = idle_seconds
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, delay: Optional[float] = None) -> None:
+        """启动拉取线程（已在运行时不做任何事）；应在 QuoteBuffer.watch() 之后调用，以免线程恰好因列表为空而退出"""
+        with self._lock:
+            if self._thread is not None or self._stop.is_set():
+                return
+            delay = POLL_STARTUP_DELAY if delay is None else delay
+            self._thread = threading.Thread(target=self._run, args=(delay,), name="quote-poller", daemon=True)
+            self._thread.start()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+
+    def wake(self) -> None:
+        """立即开始下一轮拉取（新关注的证券不必等到下一个间隔）"""
+        self._wake.set()
+
+    def poll_once(self) -> None:
+        for market, codes in self.buffer.watched().items():
+            if not market_open(market):
+                continue
+            try:
+                written = self.buffer.ingest(market, self.fetch(market))
+                logger.debug(f"Quote poll {market}: {written}/{len(codes)} watched securities updated")
+            except Exception as e:
+                logger.warning(f"Quote poll for market '{market}' failed: {e}")
+
+    def _run(self, delay: float) -> None:
+        if self._stop.wait(delay):
+            return
+        while not self._stop.is_set():
+            started = time.monotonic()
+            self._wake.clear()
+            self.buffer.expire(self.idle_seconds)
+            with self._lock:
+                if not self.buffer.watched():
+                    self._thread = None
+                    logger.info("Quote poller stopped: watchlist is empty")
+                    return
+            self.poll_once()
+            self._wake.wait(max(self.interval - (time.monotonic() - started), 0.0))
+
+
+_quote_buffer: Optional[QuoteBuffer] = None
+_quote_poller: Optional[QuotePoller] = None
+_quote_lock = threading.Lock()
+
+
+def _configured_watchlist() -> List[str]:
+    return [code.strip() for code in os.environ.get("STOCKREPORT_WATCHLIST", "").split(",") if code.strip()]
+
+
+def get_quote_buffer() -> QuoteBuffer:
+    """Returns the process-wide QuoteBuffer (pre-populated with STOCKREPORT_WATCHLIST)."""
+    global _quote_buffer
+    if _quote_buffer is None:
+        with _quote_lock:
+            if _quote_buffer is None:
+                _quote_buffer = QuoteBuffer(_configured_watchlist())
+    return _quote_buffer
+
+
+def start_quote_poller(fetch: Callable[[str], pd.DataFrame], only_if_configured: bool = False) -> Optional[QuotePoller]:
+    """
+    启动（一次）后台行情拉取线程。
+
+    Args:
+        fetch: 按市场返回行情快照的函数（如数据源的 get_spot_quotes）
+        only_if_configured: 为 True 时只在配置了 STOCKREPORT_WATCHLIST 时启动
+    """
+    global _quote_poller
+    if _quote_poller is not None:
+        if not _quote_poller.running:
+            # 线程因关注列表为空退出后，有新的证券被关注
+            _quote_poller.start(delay=0.0)
+        return _quote_poller
+    if only_if_configured and not _configured_watchlist():
+        return None
+    with _quote_lock:
+        if _quote_poller is None:
+            interval = float(os.environ.get("STOCKREPORT_QUOTE_INTERVAL", DEFAULT_POLL_INTERVAL))
+            idle_minutes = float(os.environ.get("STOCKREPORT_QUOTE_IDLE_MINUTES", DEFAULT_IDLE_MINUTES))
+            _quote_poller = QuotePoller(get_quote_buffer(), fetch, interval, idle_minutes * 60)
+            _quote_poller.start()
+            logger.info(f"Quote poller started (every {interval:g}s)")
+    return _quote_poller
+
+
+def watch_code(code: str, fetch: Callable[[str], pd.DataFrame]) -> Tuple[QuotePoller, bool]:
+    """
+    把 code 加入关注列表并确保拉取线程在运行；新加入时唤醒线程立即拉取。
+
+    Returns:
+        (拉取线程, 是否是新加入的)
+    """
+    # 先加入关注列表再启动线程，线程不会在两步之间因列表为空而退出
+    added = get_quote_buffer().watch(code)
+    poller = start_quote_poller(fetch)
+    if added:
+        poller.wake()
+    return poller, added
+
+
+def get_buffered_quote(code: str, fetch: Callable[[str], pd.DataFrame]) -> Optional[pd.DataFrame]:
+    """
+    从内存读取 code 的最新报价。
+
+    code 尚未被关注时加入关注列表并唤醒拉取线程，本次返回 None（调用方使用原来的方式获取），
+    之后的调用直接读取内存。
+    """
+    if market_of(code) is None:
+        return None
+    poller, added = watch_code(code, fetch)
+    if added:
+        metrics.record_cache("quotes", False)
+        return None
+    buffer = get_quote_buffer()
+    updated = buffer.updated(market_of(code))
+    quote = None
+    if updated is not None and time.time() - updated <= max(STALE_QUOTE_SECONDS, 3 * poller.interval):
+        quote = buffer.latest(code)
+    metrics.record_cache("quotes", quote is not None)
+    return quote
@@ -0,0 +1,362 @@
+"""
+上游数据录制/回放模块
+
+性能优化和测试需要可复现、无网络依赖的上游数据。本模块为 baostock 和 akshare
+提供两种替身，通过延迟导入代理（src.utils.lazy_import）安装，数据源代码无需修改：
+
+- record: 包装真实模块，每次调用的参数和返回结果（Baostock 的查询结果集包括
+  error_code、fields 和全部数据行；AkShare 的 DataFrame）写入夹具文件，调用方拿到的结果不变
+- replay: 完全不导入真实模块，按函数名和参数从夹具文件返回结果，并可注入固定/随机延迟，
+  模拟真实网络耗时
+
+夹具目录结构: <fixtures>/<库名>/<函数名>/<参数摘要>.json
+同一函数下的 default.json 作为没有精确匹配时的默认结果（便于合成基准数据）。
+
+使用方法:
+    python -m src.mcp_server --upstream record --fixtures-dir fixtures/
+    python -m src.mcp_server --upstream replay --fixtures-dir fixtures/ --replay-latency 50
+
+也可以通过环境变量配置: STOCKREPORT_UPSTREAM_MODE、STOCKREPORT_FIXTURES_DIR、
+STOCKREPORT_REPLAY_LATENCY_MS、STOCKREPORT_REPLAY_JITTER_MS。
+
+record / replay 模式下数据目录（STOCKREPORT_HOME）改为本次运行专用的临时目录，退出时删除:
+回放的夹具数据不会写入真实的本地存储（披露索引、财务、档案卡、行业、成分股、证券列表、宏观、分钟线等），
+录制时也不会因为本地存储已有数据而跳过上游调用。
+
+作者: StockReport MCP Project
+许可证: MIT License
+"""
+from __future__ import annotations
+
+import atexit
+import base64
+import builtins
+import functools
+import hashlib
+import importlib
+import json
+import logging
+import os
+import pickle
+import random
+import shutil
+import tempfile
+import threading
+import time
+import types
+from typing import Any, Dict, Optional, Tuple
+
+try:
+    from .utils import get_data_dir, lazy_import
+    from .shared_cache import encode_frame, decode_frame
+except ImportError:
+    from utils import get_data_dir, lazy_import
+    from shared_cache import encode_frame, decode_frame
+
+pd = lazy_import("pandas")
+
+logger = logging.getLogger(__name__)
+
+MODES = ("live", "record", "replay")
+LIBRARIES = ("baostock", "akshare")
+DEFAULT_FIXTURE = "default"
+
+# 回放时即使没有夹具也视为成功的调用（会话管理，不携带数据）
+_IMPLICIT_SUCCESS = {"baostock": {"login", "logout"}}
+
+
+class FixtureNotFoundError(LookupError):
+    """Raised in replay mode when no fixture matches an upstream call."""
+
+
+class ReplayResultSet:
+    """
+    Stand-in for baostock's ResultData: error_code / error_msg / fields plus
+    next() / get_row_data() iteration over already materialized rows.
+    """
+
+    def __init__(self, error_code: str = "0", error_msg: str = "success", fields=None, rows=None):
+        self.error_code = error_code
+        self.error_msg = error_msg
+        self.fields = list(fields or [])
+        self.data = [list(row) for row in rows or []]
+        self._cursor = -1
+
+    def next(self) -> bool:
+        self._cursor += 1
+        return self._cursor < len(self.data)
+
+    def get_row_data(self) -> list:
+        return self.data[self._cursor]
+
+    def get_data(self) -> pd.DataFrame:
+        return pd.DataFrame(self.data, columns=self.fields)
+
+
+# --- Result Serialization ---
+def _is_result_set(value: Any) -> bool:
+    return hasattr(value, "error_code") and hasattr(value, "error_msg")
+
+
+def _drain_result_set(result) -> ReplayResultSet:
+    """Reads every row of a baostock result set (fetching all pages) into a ReplayResultSet."""
+    rows = []
+    if result.error_code == "0" and hasattr(result, "next"):
+        while result.next():
+            rows.append(result.get_row_data())
+    return ReplayResultSet(result.error_code, result.error_msg, getattr(result, "fields", []), rows)
+
+
+def encode_result(value: Any) -> Dict[str, Any]:
+    """Serializes an upstream return value into a JSON-compatible fixture payload."""
+    if isinstance(value, ReplayResultSet):
+        return {"kind": "resultset", "error_code": value.error_code, "error_msg": value.error_msg,
+                "fields": value.fields, "rows": value.data}
+    if isinstance(value, pd.DataFrame):
+        return {"kind": "dataframe", "frame": base64.b64encode(encode_frame(value)).decode("ascii")}
+    try:
+        return {"kind": "json", "value": json.loads(json.dumps(value))}
+    except (TypeError, ValueError):
+        return {"kind": "pickle", "data": base64.b64encode(pickle.dumps(value)).decode("ascii")}
+
+
+def decode_result(payload: Dict[str, Any]) -> Any:
+    """Rebuilds a fresh upstream return value from a fixture payload."""
+    kind = payload["kind"]
+    if kind == "resultset":
+        return ReplayResultSet(payload["error_code"], payload["error_msg"], payload["fields"], payload["rows"])
+    if kind == "dataframe":
+        return decode_frame(base64.b64decode(payload["frame"]))
+    if kind == "json":
+        return payload["value"]
+    return pickle.loads(base64.b64decode(payload["data"]))
+
+
+def _raise_recorded(error: Dict[str, str]):
+    exc_type = getattr(builtins, error.get("type", ""), None)
+    if not (isinstance(exc_type, type) and issubclass(exc_type, Exception)):
+        exc_type = RuntimeError
+    raise exc_type(error.get("message", ""))
+
+
+# --- Fixture Store ---
+class FixtureStore:
+    """夹具文件的读写：每次调用一个 JSON 文件，文件名为参数的摘要"""
+
+    def __init__(self, root: str):
+        self.root = root
+        self._memory: Dict[str, Optional[dict]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def call_key(args: Tuple, kwargs: Dict[str, Any]) -> str:
+        normalized = json.dumps({"args": list(args), "kwargs": kwargs}, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:16]
+
+    def _path(self, library: str, function: str, key: str) -> str:
+        return os.path.join(self.root, library, function, f"{key}.json")
+
+    def save(self, library: str, function: str, args: Tuple, kwargs: Dict[str, Any],
+             result: Any = None, error: Optional[BaseException] = None, key: Optional[str] = None) -> str:
+        """
+        写入一条夹具记录，返回文件路径。
+
+        Args:
+            key: 指定文件名（如 'default'），默认使用参数摘要
+        """
+        path = self._path(library, function, key or self.call_key(args, kwargs))
+        record = {
+            "library": library,
+            "function": function,
+            "args": json.loads(json.dumps(list(args), default=str)),
+            "kwargs": json.loads(json.dumps(kwargs, default=str)),
+            "recorded_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        if error is not None:
+            record["error"] = {"type": type(error).__name__, "message": str(error)}
+        else:
+            record["result"] = encode_result(result)
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(record, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._memory.pop(path, None)
+        return path
+
+    def _read(self, path: str) -> Optional[dict]:
+        with self._lock:
+            if path in self._memory:
+                return self._memory[path]
+        record = None
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                record = json.load(f)
+        with self._lock:
+            self._memory[path] = record
+        return record
+
+    def load(self, library: str, function: str, args: Tuple, kwargs: Dict[str, Any]) -> Optional[dict]:
+        """按参数精确匹配，找不到时退回到该函数的 default 夹具"""
+        record = self._read(self._path(library, function, self.call_key(args, kwargs)))
+        if record is None:
+            record = self._read(self._path(library, function, DEFAULT_FIXTURE))
+        return record
+
+
+# --- Module Stand-ins ---
+class RecordingModule(types.ModuleType):
+    """Wraps the real upstream module and writes every function call to the fixture store."""
+
+    def __init__(self, library: str, real_module: types.ModuleType, store: FixtureStore):
+        super().__init__(library)
+        self._library = library
+        self._real = real_module
+        self._store = store
+        self._functions = {}
+
+    def __getattr__(self, name):
+        value = getattr(self._real, name)
+        if not callable(value) or isinstance(value, type):
+            return value
+        cached = self._functions.get(name)
+        if cached is not None and cached.__wrapped__ is value:
+            return cached
+
+        @functools.wraps(value)
+        def record(*args, **kwargs):
+            try:
+                result = value(*args, **kwargs)
+            except Exception as e:
+                self._store.save(self._library, name, args, kwargs, error=e)
+                raise
+            if _is_result_set(result):
+                result = _drain_result_set(result)
+            self._store.save(self._library, name, args, kwargs, result=result)
+            return result
+
+        self._functions[name] = record
+        return record
+
+
+class ReplayModule(types.ModuleType):
+    """Serves recorded fixtures in place of the real upstream module, with injected latency."""
+
+    def __init__(self, library: str, store: FixtureStore, latency_ms: float = 0.0,
+                 jitter_ms: float = 0.0, seed: int = 0):
+        super().__init__(library)
+        self._library = library
+        self._store = store
+        self._latency = latency_ms / 1000.0
+        self._jitter = jitter_ms / 1000.0
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+        self._functions = {}
+
+    def _delay(self) -> float:
+        if not self._jitter:
+            return self._latency
+        with self._random_lock:
+            return self._latency + self._random.uniform(0, self._jitter)
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        if name in self._functions:
+            return self._functions[name]
+        library = self._library
+
+        def replay(*args, **kwargs):
+            delay = self._delay()
+            if delay > 0:
+                time.sleep(delay)
+            record = self._store.load(library, name, args, kwargs)
+            if record is None:
+                if name in _IMPLICIT_SUCCESS.get(library, ()):
+                    return ReplayResultSet()
+                raise FixtureNotFoundError(
+                    f"No fixture for {library}.{name} args={args} kwargs={kwargs} under {self._store.root}")
+            if "error" in record:
+                _raise_recorded(record["error"])
+            return decode_result(record["result"])
+
+        replay.__name__ = name
+        replay.__qualname__ = f"{library}.{name}"
+        self._functions[name] = replay
+        return replay
+
+
+def default_fixtures_dir() -> str:
+    return os.environ.get("STOCKREPORT_FIXTURES_DIR") or os.path.join(get_data_dir(), "fixtures")
+
+
+def _isolate_data_dir(mode: str) -> str:
+    """
+    把 STOCKREPORT_HOME 指向本次 record / replay 运行专用的临时目录（进程退出时删除）。
+
+    spawn 启动的子进程通过 STOCKREPORT_ISOLATED_HOME 继续使用父进程的目录，不再另建。
+    """
+    isolated = os.environ.get("STOCKREPORT_ISOLATED_HOME")
+    if not isolated or not os.path.isdir(isolated):
+        isolated = tempfile.mkdtemp(prefix=f"stockreport-{mode}-")
+        atexit.register(shutil.rmtree, isolated, ignore_errors=True)
+        os.environ["STOCKREPORT_ISOLATED_HOME"] = isolated
+    os.environ["STOCKREPORT_HOME"] = isolated
+    return isolated
+
+
+def install(mode: str, fixtures_dir: Optional[str] = None, latency_ms: float = 0.0,
+            jitter_ms: float = 0.0, libraries: Tuple[str, ...] = LIBRARIES) -> Optional[FixtureStore]:
+    """
+    为上游库安装录制或回放替身。必须在第一次上游调用之前执行。
+
+    Args:
+        mode: 'live'（不做任何处理）、'record' 或 'replay'
+        fixtures_dir: 夹具目录，默认 STOCKREPORT_FIXTURES_DIR 或 <数据目录>/fixtures
+        latency_ms: 回放时每次调用注入的固定延迟（毫秒）
+        jitter_ms: 回放时额外注入的 [0, jitter_ms) 随机延迟（固定种子，结果可复现）
+        libraries: 需要替换的库
+
+    Returns:
+        使用的 FixtureStore；live 模式返回 None
+    """
+    if mode not in MODES:
+        raise ValueError(f"Invalid upstream mode '{mode}'. Must be one of {MODES}.")
+    if mode == "live":
+        return None
+
+    store = FixtureStore(fixtures_dir or default_fixtures_dir())
+    # 导出到环境变量，让 spawn 启动的子进程（如分钟线下载进程）按同样的方式安装
+    os.environ.update({
+        "STOCKREPORT_UPSTREAM_MODE": mode,
+        "STOCKREPORT_FIXTURES_DIR": store.root,
+        "STOCKREPORT_REPLAY_LATENCY_MS": str(latency_ms),
+        "STOCKREPORT_REPLAY_JITTER_MS": str(jitter_ms),
+    })
+    # 夹具目录确定之后再切换数据目录（默认夹具目录位于真实数据目录下）
+    data_dir = _isolate_data_dir(mode)
+    if mode == "replay":
+        # 共享缓存位于隔离的数据目录中，但默认仍然关闭，每次调用都经过回放替身；显式设置容量时保留
+        os.environ.setdefault("STOCKREPORT_CACHE_MB", "0")
+    for library in libraries:
+        if mode == "record":
+            module = RecordingModule(library, importlib.import_module(library), store)
+        else:
+            module = ReplayModule(library, store, latency_ms, jitter_ms)
+        lazy_import(library).set_module(module)
+    logger.info(f"Upstream {mode} mode for {', '.join(libraries)} using fixtures in {store.root}"
+                + (f" (latency {latency_ms:.0f}+{jitter_ms:.0f} ms)" if mode == "replay" else "")
+                + f", local data in {data_dir}")
+    return store
+
+
+def install_from_env() -> Optional[FixtureStore]:
+    """按环境变量安装替身（未设置 STOCKREPORT_UPSTREAM_MODE 时为 live）"""
+    return install(
+        os.environ.get("STOCKREPORT_UPSTREAM_MODE", "live"),
+        os.environ.get("STOCKREPORT_FIXTURES_DIR"),
+        float(os.environ.get("STOCKREPORT_REPLAY_LATENCY_MS", 0)),
+        float(os.environ.get("STOCKREPORT_REPLAY_JITTER_MS", 0)),
+    )
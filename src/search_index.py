@@ -0,0 +1,386 @@
+"""
+证券搜索索引模块
+
+本模块基于证券代码表（symbol master）构建内存搜索索引，支持对A股、港股、美股的
+代码前缀、中英文名称以及拼音首字母的快速检索，替代此前按市场线性扫描的搜索实现。
+
+主要组件:
+- SecuritySearchIndex: 单个市场的搜索索引（代码前缀树、名称分词倒排索引、拼音前缀树）
+- SearchIndexManager: 按市场懒加载并定期刷新索引，对外提供统一的 search() 接口
+
+匹配与排序规则（得分从高到低）:
+- 代码完全匹配 > 名称完全匹配 > 代码前缀 > 拼音首字母 > 名称前缀 > 全拼前缀
+  > 英文单词前缀 > 名称包含
+- 同一匹配方式下，键越短、代码越短的证券排名越靠前
+
+拼音支持依赖可选的 pypinyin 库；未安装时自动跳过拼音索引。
+
+作者: StockReport MCP Project
+许可证: MIT License
+"""
+
+from __future__ import annotations
+
+import functools
+import logging
+import re
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+try:
+    from .utils import lazy_import
+except ImportError:
+    from utils import lazy_import
+
+pd = lazy_import("pandas")
+
+logger = logging.getLogger(__name__)
+
+# 支持的市场及其展示名称
+MARKETS = {
+    "a": "A股",
+    "hk": "港股",
+    "us": "美股",
+}
+
+# 索引刷新间隔（秒）：证券列表每日变动很少
+DEFAULT_INDEX_TTL = 24 * 60 * 60
+
+# 各匹配方式的基础得分
+SCORE_CODE_EXACT = 100
+SCORE_NAME_EXACT = 95
+SCORE_CODE_PREFIX = 80
+SCORE_INITIALS = 75
+SCORE_NAME_PREFIX = 70
+SCORE_PINYIN_PREFIX = 60
+SCORE_WORD_PREFIX = 50
+SCORE_NAME_CONTAINS = 40
+
+MATCH_LABELS = {
+    SCORE_CODE_EXACT: "代码",
+    SCORE_NAME_EXACT: "名称",
+    SCORE_CODE_PREFIX: "代码前缀",
+    SCORE_INITIALS: "拼音首字母",
+    SCORE_NAME_PREFIX: "名称前缀",
+    SCORE_PINYIN_PREFIX: "全拼",
+    SCORE_WORD_PREFIX: "英文名称",
+    SCORE_NAME_CONTAINS: "名称包含",
+}
+
+_CJK_RE = re.compile(r"[㐀-鿿]")
+_CJK_RUN_RE = re.compile(r"[㐀-鿿]+|[^㐀-鿿]+")
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_CODE_PREFIX_RE = re.compile(r"^(sh|sz|bj|hk|us)\.", re.IGNORECASE)
+_CODE_SUFFIX_RE = re.compile(r"\.(sh|sz|bj|hk|us)$", re.IGNORECASE)
+
+
+def _normalize_query(query: str) -> str:
+    """统一查询字符串：去除空白、转为小写。"""
+    return query.strip().lower()
+
+
+def _strip_code_decorations(query: str) -> str:
+    """去掉代码中的市场前缀/后缀，如 'sh.600000'、'00700.HK'。"""
+    query = _CODE_PREFIX_RE.sub("", query)
+    return _CODE_SUFFIX_RE.sub("", query)
+
+
+@functools.lru_cache(maxsize=1)
+def _get_lazy_pinyin() -> Optional[Callable]:
+    """延迟导入 pypinyin（加载拼音词典较慢），未安装时返回 None。"""
+    try:
+        from pypinyin import lazy_pinyin
+    except ImportError:
+        logger.warning("pypinyin not installed, pinyin search disabled")
+        return None
+    return lazy_pinyin
+
+
+def _pinyin_keys(name: str) -> Tuple[str, str]:
+    """
+    生成名称的拼音首字母与全拼键
+
+    中文片段转换为拼音，非中文片段保留其中的字母数字（如 '*ST' -> 'st'）。
+
+    Returns:
+        Tuple[str, str]: (首字母, 全拼)，不可用时为空字符串
+    """
+    lazy_pinyin = _get_lazy_pinyin()
+    if lazy_pinyin is None or not _CJK_RE.search(name):
+        return "", ""
+    initials = []
+    full = []
+    for segment in _CJK_RUN_RE.findall(name):
+        if _CJK_RE.match(segment):
+            syllables = [s.lower() for s in lazy_pinyin(segment)]
+            initials.extend(s[0] for s in syllables if s)
+            full.extend(syllables)
+        else:
+            words = _WORD_RE.findall(segment.lower())
+            initials.extend(words)
+            full.extend(words)
+    return "".join(initials), "".join(full)
+
+
+class _PrefixTrie:
+    """
+    前缀树：每个节点保存经过该节点的全部证券ID
+
+    构建完成后调用 finalize()，各节点的ID按 (键长度, 静态排名) 排序，
+    查询时只需截取前 limit 个即可得到该匹配方式下排名最靠前的结果。
+    """
+
+    __slots__ = ("_root", "_pending")
+
+    def __init__(self):
+        self._root: Dict = {}
+        self._pending: List[Tuple[str, Tuple, int]] = []
+
+    def add(self, key: str, rank: Tuple, item_id: int) -> None:
+        if key:
+            self._pending.append((key, rank, item_id))
+
+    def finalize(self) -> None:
+        # 先排序再插入，节点内的ID列表天然有序
+        self._pending.sort(key=lambda entry: (len(entry[0]), entry[1]))
+        for key, _, item_id in self._pending:
+            node = self._root
+            for char in key:
+                node = node.setdefault(char, {})
+                ids = node.setdefault("", [])
+                if not ids or ids[-1] != item_id:
+                    ids.append(item_id)
+            node.setdefault("$", []).append(item_id)
+        self._pending = []
+
+    def exact(self, key: str) -> List[int]:
+        node = self._find(key)
+        return node.get("$", []) if node is not None else []
+
+    def prefix(self, key: str, limit: int) -> List[int]:
+        node = self._find(key)
+        if node is None:
+            return []
+        return node.get("", [])[:limit]
+
+    def _find(self, key: str) -> Optional[Dict]:
+        node = self._root
+        for char in key:
+            node = node.get(char)
+            if node is None:
+                return None
+        return node
+
+
+class SecuritySearchIndex:
+    """
+    单个市场的证券搜索索引
+
+    Args:
+        market: 市场标识 ('a', 'hk', 'us')
+        securities: 证券列表 DataFrame，至少包含 'code' 与 'code_name' 列
+    """
+
+    def __init__(self, market: str, securities: pd.DataFrame):
+        self.market = market
+        self.built_at = time.time()
+
+        codes = securities["code"].astype(str).tolist()
+        names = securities["code_name"].fillna("").astype(str).tolist()
+        self._codes: List[str] = codes
+        self._names: List[str] = names
+
+        self._code_trie = _PrefixTrie()
+        self._name_trie = _PrefixTrie()
+        self._word_trie = _PrefixTrie()
+        self._initials_trie = _PrefixTrie()
+        self._pinyin_trie = _PrefixTrie()
+        self._grams: Dict[str, List[int]] = {}
+
+        for item_id, (code, name) in enumerate(zip(codes, names)):
+            rank = (len(code), code)
+            for key in self._code_keys(code, market):
+                self._code_trie.add(key, rank, item_id)
+
+            lowered = name.lower()
+            self._name_trie.add(lowered, rank, item_id)
+            for word in _WORD_RE.findall(lowered):
+                self._word_trie.add(word, rank, item_id)
+            for gram in self._name_grams(lowered):
+                self._grams.setdefault(gram, []).append(item_id)
+
+            initials, full = _pinyin_keys(name)
+            self._initials_trie.add(initials, rank, item_id)
+            self._pinyin_trie.add(full, rank, item_id)
+
+        for trie in (self._code_trie, self._name_trie, self._word_trie,
+                     self._initials_trie, self._pinyin_trie):
+            trie.finalize()
+
+        logger.info(f"Built {MARKETS.get(market, market)} search index with {len(codes)} securities")
+
+    def __len__(self) -> int:
+        return len(self._codes)
+
+    @staticmethod
+    def _code_keys(code: str, market: str) -> Iterable[str]:
+        """代码的检索键：去掉市场前缀后的代码；港股额外收录去掉前导零的形式（如 '700'）。"""
+        bare = _strip_code_decorations(code.lower())
+        keys = {bare}
+        if market == "hk":
+            stripped = bare.lstrip("0")
+            if stripped:
+                keys.add(stripped)
+        return keys
+
+    @staticmethod
+    def _name_grams(name: str) -> Iterable[str]:
+        """名称的一元与二元字符切分，用于中文名称的包含匹配。"""
+        chars = [c for c in name if not c.isspace()]
+        grams = set(chars)
+        grams.update(a + b for a, b in zip(chars, chars[1:]))
+        return grams
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[int, int]]:
+        """
+        在本市场内检索
+
+        Args:
+            query: 已规范化（小写、去空白）的查询串
+            limit: 最多返回的结果数
+
+        Returns:
+            List[Tuple[int, int]]: (得分, 证券ID) 列表，按得分降序
+        """
+        if not query:
+            return []
+
+        scores: Dict[int, int] = {}
+
+        def collect(item_ids: Iterable[int], score: int) -> None:
+            for item_id in item_ids:
+                if scores.get(item_id, 0) < score:
+                    scores[item_id] = score
+
+        code_query = _strip_code_decorations(query)
+        collect(self._code_trie.exact(code_query), SCORE_CODE_EXACT)
+        collect(self._name_trie.exact(query), SCORE_NAME_EXACT)
+        collect(self._code_trie.prefix(code_query, limit), SCORE_CODE_PREFIX)
+
+        if query.isascii():
+            compact = "".join(_WORD_RE.findall(query))
+            collect(self._initials_trie.prefix(compact, limit), SCORE_INITIALS)
+            collect(self._pinyin_trie.prefix(compact, limit), SCORE_PINYIN_PREFIX)
+            collect(self._word_trie.prefix(query, limit), SCORE_WORD_PREFIX)
+
+        collect(self._name_trie.prefix(query, limit), SCORE_NAME_PREFIX)
+        collect(self._contains(query, limit), SCORE_NAME_CONTAINS)
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], len(self._codes[item[0]]), self._codes[item[0]]))
+        return [(score, item_id) for item_id, score in ranked[:limit]]
+
+    def _contains(self, query: str, limit: int) -> List[int]:
+        """利用二元字符倒排索引查找名称中包含查询串的证券。"""
+        chars = [c for c in query if not c.isspace()]
+        if not chars:
+            return []
+        if len(chars) == 1:
+            grams = [chars[0]]
+        else:
+            grams = [a + b for a, b in zip(chars, chars[1:])]
+
+        postings = [self._grams.get(gram) for gram in grams]
+        if any(p is None for p in postings):
+            return []
+        postings.sort(key=len)
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            candidates.intersection_update(posting)
+            if not candidates:
+                return []
+
+        needle = "".join(chars)
+        matches = [item_id for item_id in sorted(candidates, key=lambda i: (len(self._codes[i]), self._codes[i]))
+                   if needle in self._names[item_id].lower().replace(" ", "")]
+        return matches[:limit]
+
+    def describe(self, item_id: int) -> Tuple[str, str]:
+        """返回 (代码, 名称)。"""
+        return self._codes[item_id], self._names[item_id]
+
+
+class SearchIndexManager:
+    """
+    按市场懒加载的搜索索引管理器
+
+    首次检索某市场时才加载其证券列表并构建索引，之后在 ttl 内复用。
+
+    Args:
+        loader: 加载证券列表的函数，参数为市场标识，返回含 'code'、'code_name' 的 DataFrame
+        ttl: 索引刷新间隔（秒）
+    """
+
+    def __init__(self, loader: Callable[[str], pd.DataFrame], ttl: int = DEFAULT_INDEX_TTL):
+        self._loader = loader
+        self._ttl = ttl
+        self._indexes: Dict[str, SecuritySearchIndex] = {}
+        self._lock = threading.Lock()
+
+    def get_index(self, market: str) -> SecuritySearchIndex:
+        """获取（必要时构建）指定市场的索引。"""
+        index = self._indexes.get(market)
+        if index is not None and time.time() - index.built_at < self._ttl:
+            return index
+        with self._lock:
+            index = self._indexes.get(market)
+            if index is None or time.time() - index.built_at >= self._ttl:
+                logger.info(f"Loading symbol master for market '{market}'")
+                index = SecuritySearchIndex(market, self._loader(market))
+                self._indexes[market] = index
+        return index
+
+    def search(self, query: str, market: str = "all", limit: int = 10) -> pd.DataFrame:
+        """
+        检索证券
+
+        Args:
+            query: 查询串（代码、代码前缀、中英文名称片段或拼音首字母）
+            market: 'all'、'a'、'hk' 或 'us'
+            limit: 最多返回的结果数
+
+        Returns:
+            pd.DataFrame: 列为 code, name, market, match, score，按相关度排序
+
+        Raises:
+            ValueError: 市场参数无效
+        """
+        market = market.lower()
+        if market == "all":
+            markets = list(MARKETS)
+        elif market in MARKETS:
+            markets = [market]
+        else:
+            raise ValueError(f"Invalid market '{market}'. Valid options are: {['all'] + list(MARKETS)}")
+
+        normalized = _normalize_query(query)
+        rows = []
+        for market_key in markets:
+            try:
+                index = self.get_index(market_key)
+            except Exception as e:
+                # 单个市场加载失败不影响其他市场的检索
+                logger.warning(f"Search index for market '{market_key}' unavailable: {e}")
+                continue
+            for score, item_id in index.search(normalized, limit):
+                code, name = index.describe(item_id)
+                rows.append({
+                    "code": code,
+                    "name": name,
+                    "market": MARKETS[market_key],
+                    "match": MATCH_LABELS[score],
+                    "score": score,
+                })
+
+        rows.sort(key=lambda row: -row["score"])
+        return pd.DataFrame(rows[:limit], columns=["code", "name", "market", "match", "score"])
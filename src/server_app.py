@@ -0,0 +1,92 @@
+"""
+MCP 应用封装模块
+
+在 FastMCP 的基础上提供 StockReportMCP，统一处理工具函数的执行方式：
+- stdio 模式下与 FastMCP 默认行为一致，同步工具直接在事件循环中执行
+- 守护进程 / HTTP 等多会话模式下，同步工具被派发到工作线程执行，
+  避免一个耗时的上游请求阻塞其他会话
+- 每次工具调用的耗时和是否出错都记录到 src.metrics
+
+注意: stdio 模式下 stdout 就是协议通道，而 baostock_login_context 会临时把文件描述符 1
+重定向到 /dev/null。传输层的写线程可能恰好在这段时间内写出响应（客户端连续发送多个请求时），
+响应就会丢失、客户端永远等不到结果。因此 stdio 模式下协议改用文件描述符 1 的私有副本，
+描述符 1 本身指向 stderr，上游库的输出和重定向都不再影响协议通道。
+
+作者: StockReport MCP Project
+许可证: MIT License
+"""
+import functools
+import io
+import logging
+import os
+import sys
+import time
+from typing import Any, Callable
+
+import anyio
+import anyio.to_thread
+from mcp.server.fastmcp import FastMCP
+from mcp.server.stdio import stdio_server
+
+try:
+    from .metrics import metrics
+except ImportError:
+    from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def _is_error_result(result: Any) -> bool:
+    # Tools report failures as "Error: ..." strings rather than raising
+    return isinstance(result, str) and result.startswith("Error")
+
+
+class StockReportMCP(FastMCP):
+    """FastMCP app that instruments every tool and can run synchronous tools in worker threads."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.run_tools_in_threads = False
+
+    def add_tool(self, fn: Callable[..., Any], name: str | None = None, *args, **kwargs) -> None:
+        super().add_tool(fn, name, *args, **kwargs)
+        tool_name = name or fn.__name__
+        tool = self._tool_manager.get_tool(tool_name)
+        if tool is not None:
+            # Metadata (argument schema, description) was derived from the
+            # original function above; only the callable used at run time changes.
+            tool.fn = self._dispatching(tool_name, fn, tool.is_async)
+            tool.is_async = True
+
+    def _dispatching(self, tool_name: str, fn: Callable[..., Any], is_async: bool) -> Callable[..., Any]:
+        @functools.wraps(fn)
+        async def run(**kwargs):
+            start = time.perf_counter()
+            error = True
+            try:
+                if is_async:
+                    result = await fn(**kwargs)
+                elif self.run_tools_in_threads:
+                    result = await anyio.to_thread.run_sync(functools.partial(fn, **kwargs))
+                else:
+                    result = fn(**kwargs)
+                error = _is_error_result(result)
+                return result
+            finally:
+                metrics.observe("tool", tool_name, time.perf_counter() - start, error)
+
+        return run
+
+    async def run_stdio_async(self) -> None:
+        """Runs the stdio transport on a private copy of stdout (see module docstring)."""
+        stdout_fd = sys.stdout.fileno()
+        sys.stdout.flush()
+        protocol_fd = os.dup(stdout_fd)
+        os.dup2(sys.stderr.fileno(), stdout_fd)
+        protocol_out = anyio.wrap_file(io.TextIOWrapper(os.fdopen(protocol_fd, "wb"), encoding="utf-8"))
+        async with stdio_server(stdout=protocol_out) as (read_stream, write_stream):
+            await self._mcp_server.run(
+                read_stream,
+                write_stream,
+                self._mcp_server.create_initialization_options(),
+            )
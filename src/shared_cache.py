@@ -0,0 +1,435 @@
+"""
+跨进程共享缓存模块
+
+同一台机器上的多个服务器进程（HTTP 工作进程、多个 stdio 会话、数据采集任务）
+共享一个基于 SQLite 的缓存层：一个进程拉取过的沪深300成分股或热门股票K线，
+其他进程可以直接复用，而不必再次请求上游。
+
+主要功能:
+- encode_frame() / decode_frame(): DataFrame 的紧凑列式二进制编码，
+  每列独立压缩，解码时可以只读取需要的列
+- SharedCache: SQLite 存储（WAL 模式，多进程并发读），写入时持有文件锁，
+  按容量预算以 LRU 策略淘汰
+- cached_frame(): 数据源方法装饰器，按方法参数生成缓存键并设置过期时间；
+  对列投影参数（如 K 线的 fields），同一份数据只缓存一次，读取时只解码请求的列
+
+配置:
+- STOCKREPORT_CACHE_MB: 缓存容量上限（MB，默认 512，设为 0 关闭缓存）
+- 缓存文件位于数据目录（STOCKREPORT_HOME，默认 ~/.stockreport-mcp）下的 cache.sqlite3
+
+作者: StockReport MCP Project
+许可证: MIT License
+"""
+from __future__ import annotations
+
+import functools
+import inspect
+import json
+import logging
+import os
+import pickle
+import sqlite3
+import struct
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+try:
+    from .utils import get_data_dir, lazy_import
+    from .metrics import metrics
+except ImportError:
+    from utils import get_data_dir, lazy_import
+    from metrics import metrics
+
+try:
+    import fcntl
+except ImportError:  # Windows: SQLite's own locking still serializes writers
+    fcntl = None
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+logger = logging.getLogger(__name__)
+
+MINUTE = 60
+HOUR = 60 * MINUTE
+DAY = 24 * HOUR
+
+DEFAULT_CACHE_MB = 512
+CACHE_FILENAME = "cache.sqlite3"
+# 淘汰时降到预算的 90%，避免每次写入都触发淘汰
+EVICTION_TARGET = 0.9
+# 读取时最多每隔多少秒更新一次访问时间，减少写操作
+ACCESS_RESOLUTION = 10.0
+
+_MAGIC = b"SRCF"
+_VERSION = 1
+_INDEX_COLUMN = "__index__"
+# DataFrame.attrs 中记录缓存条目是按哪些列请求得到的（见 cached_frame 的 projection）
+PROJECTION_ATTR = "cached_projection"
+
+
+# --- Columnar Encoding ---
+def _encode_column(series: pd.Series):
+    """Returns (kind, dtype, raw bytes) for one column."""
+    values = series.to_numpy()
+    if values.dtype.kind in "biufcmM" and not isinstance(series.dtype, pd.api.extensions.ExtensionDtype):
+        return "numpy", values.dtype.str, np.ascontiguousarray(values).tobytes()
+
+    inferred = pd.api.types.infer_dtype(values, skipna=True)
+    if inferred in ("string", "empty"):
+        mask = pd.isna(values)
+        strings = ["" if missing else value for value, missing in zip(values.tolist(), mask)]
+        if not any("\x00" in s for s in strings):
+            text = "\x00".join(strings).encode("utf-8")
+            return "utf8", str(series.dtype), mask.astype(np.uint8).tobytes() + text
+    if inferred == "date":
+        stamps = pd.to_datetime(pd.Series(values)).to_numpy(dtype="datetime64[ns]")
+        return "date", "<M8[ns]", stamps.tobytes()
+    return "pickle", str(series.dtype), pickle.dumps(series.array, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _decode_column(kind: str, dtype: str, raw: bytes, nrows: int):
+    if kind == "numpy":
+        return np.frombuffer(raw, dtype=np.dtype(dtype)).copy()
+    if kind == "utf8":
+        mask = np.frombuffer(raw[:nrows], dtype=np.uint8).astype(bool)
+        parts = raw[nrows:].decode("utf-8").split("\x00") if nrows else []
+        values = np.array(parts, dtype=object)
+        values[mask] = None
+        return pd.array(values, dtype=dtype) if dtype != "object" else values
+    if kind == "date":
+        stamps = np.frombuffer(raw, dtype=np.dtype(dtype))
+        values = np.array(pd.Series(stamps).dt.date, dtype=object)
+        values[np.isnat(stamps)] = None
+        return values
+    return pickle.loads(raw)
+
+
+def encode_frame(df: pd.DataFrame) -> bytes:
+    """
+    将 DataFrame 编码为列式二进制格式。
+
+    布局: 魔数 | 版本 | 头部长度 | JSON 头部（列名、类型、偏移） | 各列压缩数据
+    """
+    frame = df
+    index_name = None
+    has_index = not (isinstance(df.index, pd.RangeIndex) and df.index.start == 0 and df.index.step == 1)
+    if has_index:
+        index_name = df.index.name
+        frame = df.copy(deep=False)
+        frame.insert(0, _INDEX_COLUMN, df.index)
+        frame = frame.reset_index(drop=True)
+
+    if not all(isinstance(name, (str, int)) for name in frame.columns) or frame.columns.has_duplicates:
+        blob = zlib.compress(pickle.dumps(df, protocol=pickle.HIGHEST_PROTOCOL), 1)
+        header = json.dumps({"pickled": True}).encode("utf-8")
+        return _MAGIC + struct.pack("<BI", _VERSION, len(header)) + header + blob
+
+    columns = []
+    blobs = []
+    offset = 0
+    for position, name in enumerate(frame.columns):
+        kind, dtype, raw = _encode_column(frame.iloc[:, position])
+        blob = zlib.compress(raw, 1)
+        columns.append({"name": name, "kind": kind, "dtype": dtype, "offset": offset, "length": len(blob)})
+        blobs.append(blob)
+        offset += len(blob)
+
+    header = json.dumps({
+        "nrows": len(frame),
+        "index": has_index,
+        "index_name": index_name,
+        "columns": columns,
+        "attrs": df.attrs,
+    }, ensure_ascii=False, default=str).encode("utf-8")
+    return _MAGIC + struct.pack("<BI", _VERSION, len(header)) + header + b"".join(blobs)
+
+
+def decode_frame(data: bytes, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    解码 encode_frame() 生成的数据。
+
+    Args:
+        data: 编码后的字节串
+        columns: 只解码这些列（不存在的列会被忽略），None 表示全部列
+    """
+    if data[:4] != _MAGIC:
+        raise ValueError("Not an encoded DataFrame")
+    version, header_length = struct.unpack_from("<BI", data, 4)
+    if version != _VERSION:
+        raise ValueError(f"Unsupported frame encoding version {version}")
+    body_start = 9 + header_length
+    header = json.loads(data[9:body_start].decode("utf-8"))
+    body = memoryview(data)[body_start:]
+
+    if header.get("pickled"):
+        df = pickle.loads(zlib.decompress(body))
+        return df if columns is None else df[[c for c in columns if c in df.columns]]
+
+    wanted = None if columns is None else set(columns)
+    nrows = header["nrows"]
+    decoded: Dict[str, object] = {}
+    index_values = None
+    for column in header["columns"]:
+        name = column["name"]
+        is_index = header["index"] and name == _INDEX_COLUMN
+        if not is_index and wanted is not None and name not in wanted:
+            continue
+        raw = zlib.decompress(body[column["offset"]:column["offset"] + column["length"]])
+        values = _decode_column(column["kind"], column["dtype"], raw, nrows)
+        if is_index:
+            index_values = values
+        else:
+            decoded[name] = values
+
+    order = [c["name"] for c in header["columns"] if c["name"] in decoded]
+    if columns is not None:
+        order = [c for c in columns if c in decoded]
+    index = pd.Index(index_values, name=header["index_name"]) if index_values is not None else pd.RangeIndex(nrows)
+    df = pd.DataFrame({name: decoded[name] for name in order}, index=index, columns=order)
+    df.attrs.update(header.get("attrs") or {})
+    return df
+
+
+# --- SQLite Store ---
+class SharedCache:
+    """
+    SQLite 支持的跨进程 DataFrame 缓存。
+
+    读操作不加文件锁（WAL 模式下读写互不阻塞），写操作和淘汰在文件锁内进行，
+    保证多个进程同时写入时容量统计和淘汰顺序一致。
+    """
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.lock_path = path + ".lock"
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        with self._write_lock():
+            self._conn().execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " key TEXT PRIMARY KEY,"
+                " data BLOB NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " created REAL NOT NULL,"
+                " expires REAL,"
+                " last_access REAL NOT NULL)"
+            )
+            self._conn().execute("CREATE INDEX IF NOT EXISTS entries_lru ON entries(last_access)")
+
+    def _conn(self) -> sqlite3.Connection:
+        # 每个线程、每个进程（fork 之后）各自持有连接
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @contextmanager
+    def _write_lock(self):
+        if fcntl is None:
+            yield
+            return
+        with open(self.lock_path, "a+b") as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def get_frame(self, key: str, columns: Optional[List[str]] = None) -> Optional[pd.DataFrame]:
+        """返回缓存的 DataFrame；不存在或已过期时返回 None"""
+        now = time.time()
+        row = self._conn().execute(
+            "SELECT data, expires, last_access FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        data, expires, last_access = row
+        if expires is not None and expires < now:
+            self.misses += 1
+            with self._write_lock():
+                self._conn().execute("DELETE FROM entries WHERE key = ? AND expires < ?", (key, now))
+            return None
+        if now - last_access > ACCESS_RESOLUTION:
+            self._conn().execute("UPDATE entries SET last_access = ? WHERE key = ?", (now, key))
+        self.hits += 1
+        return decode_frame(data, columns)
+
+    def put_frame(self, key: str, df: pd.DataFrame, ttl: Optional[float] = None) -> None:
+        """写入 DataFrame，ttl 为过期秒数（None 表示不过期，只受容量淘汰影响）"""
+        data = encode_frame(df)
+        if len(data) > self.max_bytes:
+            logger.debug(f"Not caching {key}: {len(data)} bytes exceeds the cache budget")
+            return
+        now = time.time()
+        expires = now + ttl if ttl else None
+        with self._write_lock():
+            conn = self._conn()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO entries (key, data, size, created, expires, last_access) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, sqlite3.Binary(data), len(data), now, expires, now))
+                self._evict(conn, now)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        conn.execute("DELETE FROM entries WHERE expires IS NOT NULL AND expires < ?", (now,))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        target = self.max_bytes * EVICTION_TARGET
+        evicted = 0
+        for key, size in conn.execute("SELECT key, size FROM entries ORDER BY last_access").fetchall():
+            if total <= target:
+                break
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            total -= size
+            evicted += 1
+        logger.info(f"Shared cache evicted {evicted} entries, {total} bytes remain")
+
+    def delete(self, key: str) -> None:
+        with self._write_lock():
+            self._conn().execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def clear(self) -> None:
+        with self._write_lock():
+            self._conn().execute("DELETE FROM entries")
+
+    def stats(self) -> Dict[str, int]:
+        """Returns entry count and byte size of the shared store plus this process's hit/miss counts."""
+        entries, size = self._conn().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return {"entries": entries, "bytes": size, "max_bytes": self.max_bytes,
+                "hits": self.hits, "misses": self.misses}
+
+
+_shared_cache: Optional[SharedCache] = None
+_shared_cache_initialized = False
+_shared_cache_lock = threading.Lock()
+
+
+def get_shared_cache() -> Optional[SharedCache]:
+    """Returns the process-wide SharedCache, or None when caching is disabled or unavailable."""
+    global _shared_cache, _shared_cache_initialized
+    if _shared_cache_initialized:
+        return _shared_cache
+    with _shared_cache_lock:
+        if not _shared_cache_initialized:
+            try:
+                max_mb = float(os.environ.get("STOCKREPORT_CACHE_MB", DEFAULT_CACHE_MB))
+                if max_mb > 0:
+                    path = os.path.join(get_data_dir(), CACHE_FILENAME)
+                    _shared_cache = SharedCache(path, int(max_mb * 1024 * 1024))
+                    logger.info(f"Shared cache enabled at {path} ({max_mb:.0f} MB budget)")
+                else:
+                    logger.info("Shared cache disabled (STOCKREPORT_CACHE_MB=0)")
+            except Exception as e:
+                logger.warning(f"Shared cache unavailable, continuing without it: {e}")
+                _shared_cache = None
+            _shared_cache_initialized = True
+    return _shared_cache
+
+
+# --- Data Source Decorator ---
+def k_data_ttl(arguments: Dict[str, object]) -> float:
+    """
+    K线数据的缓存时间：已结束的历史区间长期有效（复权数据在除权后会变化，保留一天），
+    包含今天的区间只缓存几分钟。
+    """
+    end_date = str(arguments.get("end_date") or "").replace("-", "")
+    if end_date and end_date < datetime.now().strftime("%Y%m%d"):
+        return 7 * DAY if str(arguments.get("adjust_flag", "3")) == "3" else DAY
+    return 5 * MINUTE
+
+
+def _project(df: pd.DataFrame, columns: Optional[List[str]]) -> pd.DataFrame:
+    """只保留 columns 中存在的列（按 columns 的顺序）；不需要裁剪时原样返回"""
+    if columns is None or df is None:
+        return df
+    selected = [column for column in columns if column in df.columns]
+    return df if selected == list(df.columns) else df[selected]
+
+
+def cached_frame(namespace: str, ttl: Union[float, Callable[[Dict[str, object]], float]],
+                 projection: Optional[Tuple[str, List[str]]] = None):
+    """
+    为返回 DataFrame 的数据源方法加上共享缓存。
+
+    缓存键由 namespace 和方法的全部参数（含默认值）组成；异常不会被缓存，
+    缓存本身出错时直接回退到原方法。
+
+    Args:
+        namespace: 缓存键前缀，如 'baostock.k_data'
+        ttl: 过期秒数，或根据参数字典计算过期秒数的函数
+        projection: (参数名, 默认列)，声明该参数是列投影（为空时取默认列）：
+            - 返回值总是裁剪到请求的列（方法可以返回更多列，例如上游总是返回整张表）
+            - 缓存键不包含这个参数，同一区间的数据只存一份，保存方法返回的全部列
+            - 读取时只解码请求的列；条目当初覆盖的列不包含本次请求的列时按未命中处理
+    """
+    def decorator(method):
+        signature = inspect.signature(method)
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            bound = signature.bind(self, *args, **kwargs)
+            bound.apply_defaults()
+            arguments = dict(list(bound.arguments.items())[1:])
+            key_arguments = arguments
+            columns = None
+            if projection is not None:
+                parameter, default_columns = projection
+                columns = list(arguments.get(parameter) or default_columns)
+                key_arguments = {name: value for name, value in arguments.items() if name != parameter}
+
+            cache = get_shared_cache()
+            if cache is None:
+                return _project(method(self, *args, **kwargs), columns)
+
+            key = f"{namespace}:{json.dumps(key_arguments, sort_keys=True, ensure_ascii=False, default=str)}"
+            try:
+                df = cache.get_frame(key, columns)
+            except Exception as e:
+                logger.warning(f"Shared cache read failed for {key}: {e}")
+                df = None
+            if df is not None and columns is not None:
+                # 上游本身没有的列（如 AKShare 的 peTTM）不算缺失，以条目覆盖的列为准
+                covered = df.attrs.pop(PROJECTION_ATTR, list(df.columns))
+                if not set(columns) <= set(covered):
+                    df = None
+            metrics.record_cache(namespace, df is not None)
+            if df is not None:
+                logger.debug(f"Shared cache hit: {key}")
+                return df
+
+            df = method(self, *args, **kwargs)
+            seconds = ttl(arguments) if callable(ttl) else ttl
+            if seconds and df is not None and not df.empty:
+                try:
+                    stored = df
+                    if columns is not None:
+                        stored = df.copy(deep=False)
+                        stored.attrs[PROJECTION_ATTR] = list(dict.fromkeys(columns + list(df.columns)))
+                    cache.put_frame(key, stored, seconds)
+                except Exception as e:
+                    logger.warning(f"Shared cache write failed for {key}: {e}")
+            return _project(df, columns)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,145 @@
+"""
+stdio 转发入口
+
+供 MCP 客户端配置使用的轻量入口：连接到常驻的守护进程（src.daemon），
+若守护进程尚未运行则在后台拉起它，然后在 stdin/stdout 与 Unix 套接字之间
+原样转发字节流。本模块只依赖标准库，启动耗时只有几十毫秒。
+
+使用方法:
+    stockreport-mcp-shim [--data-source hybrid] [--socket-path PATH] [--idle-timeout 1800]
+    python -m src.stdio_shim
+
+不支持 Unix 套接字的平台（如旧版 Windows）会退回到普通的 stdio 服务器。
+
+作者: StockReport MCP Project
+许可证: MIT License
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SPAWN_TIMEOUT = 60.0
+CHUNK_SIZE = 65536
+
+
+def _default_socket_path() -> str:
+    # Mirrors src.daemon.default_socket_path() without importing the MCP stack.
+    if os.environ.get("STOCKREPORT_MCP_SOCKET"):
+        return os.environ["STOCKREPORT_MCP_SOCKET"]
+    data_dir = os.environ.get("STOCKREPORT_HOME") or os.path.join(os.path.expanduser("~"), ".stockreport-mcp")
+    return os.path.join(data_dir, "mcp.sock")
+
+
+def _connect(socket_path: str):
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path)
+        return sock
+    except OSError:
+        sock.close()
+        return None
+
+
+def _spawn_daemon(socket_path: str, data_source: str, idle_timeout: float) -> subprocess.Popen:
+    log_path = os.path.join(os.path.dirname(socket_path), "daemon.log")
+    os.makedirs(os.path.dirname(log_path), exist_ok=True)
+    command = [
+        sys.executable, "-m", "src.mcp_server",
+        "--transport", "unix",
+        "--socket-path", socket_path,
+        "--data-source", data_source,
+        "--idle-timeout", str(idle_timeout),
+    ]
+    with open(log_path, "ab") as log_file:
+        return subprocess.Popen(
+            command,
+            cwd=PROJECT_ROOT,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=log_file,
+            start_new_session=True,
+        )
+
+
+def connect_or_spawn(socket_path: str, data_source: str = "hybrid", idle_timeout: float = 1800):
+    """Connects to the daemon socket, starting the daemon first if nothing is listening."""
+    sock = _connect(socket_path)
+    if sock is not None:
+        return sock
+
+    proc = _spawn_daemon(socket_path, data_source, idle_timeout)
+    deadline = time.monotonic() + SPAWN_TIMEOUT
+    while time.monotonic() < deadline:
+        sock = _connect(socket_path)
+        if sock is not None:
+            return sock
+        # A concurrently started daemon may have won the race; ours then exits
+        # cleanly and we keep polling for the winner's socket.
+        if proc.poll() not in (None, 0):
+            raise RuntimeError(f"Daemon exited with code {proc.returncode}, see daemon.log next to {socket_path}")
+        time.sleep(0.05)
+    raise RuntimeError(f"Timed out waiting for daemon socket {socket_path}")
+
+
+def _pump_stdin(sock: socket.socket) -> None:
+    stdin_fd = sys.stdin.fileno()
+    try:
+        while True:
+            data = os.read(stdin_fd, CHUNK_SIZE)
+            if not data:
+                break
+            sock.sendall(data)
+    except OSError:
+        pass
+    finally:
+        try:
+            sock.shutdown(socket.SHUT_WR)
+        except OSError:
+            pass
+
+
+def forward(sock: socket.socket) -> None:
+    """Copies stdin to the socket and the socket to stdout until the daemon closes the session."""
+    threading.Thread(target=_pump_stdin, args=(sock,), name="stdin-pump", daemon=True).start()
+    stdout_fd = sys.stdout.fileno()
+    try:
+        while True:
+            data = sock.recv(CHUNK_SIZE)
+            if not data:
+                break
+            view = memoryview(data)
+            while view:
+                written = os.write(stdout_fd, view)
+                view = view[written:]
+    except OSError:
+        pass
+    finally:
+        sock.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="stdio forwarder for the StockReport MCP daemon")
+    parser.add_argument('--data-source', choices=['baostock', 'akshare', 'hybrid'], default='hybrid',
+                        help='数据源，仅在需要拉起守护进程时使用 (默认: hybrid)')
+    parser.add_argument('--socket-path', default=None, help='守护进程套接字路径')
+    parser.add_argument('--idle-timeout', type=float, default=1800,
+                        help='自动拉起的守护进程在无会话多少秒后退出 (默认: 1800)')
+    args = parser.parse_args()
+
+    if not hasattr(socket, "AF_UNIX"):
+        sys.argv = [sys.argv[0], "--data-source", args.data_source]
+        from src.mcp_server import main as server_main
+        server_main()
+        return
+
+    sock = connect_or_spawn(args.socket_path or _default_socket_path(), args.data_source, args.idle_timeout)
+    forward(sock)
+
+
+if __name__ == "__main__":
+    main()
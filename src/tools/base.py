@@ -4,7 +4,6 @@ Contains shared helper functions for calling data sources.
 """
 import logging
 from typing import Callable, Optional
-import pandas as pd
 
 from src.formatting.markdown_formatter import format_df_to_markdown
 from src.data_source_interface import NoDataFoundError, LoginError, DataSourceError
@@ -19,7 +18,8 @@ def call_financial_data_tool(
     data_type_name: str,
     code: str,
     year: str,
-    quarter: int
+    quarter: int,
+    formatter: Callable = format_df_to_markdown
 ) -> str:
     """
     Helper function to reduce repetition for financial data tools
@@ -31,6 +31,7 @@ def call_financial_data_tool(
         code: Stock code
         year: Year to query
         quarter: Quarter to query
+        formatter: Renders the resulting DataFrame (defaults to a Markdown table)
 
     Returns:
         Markdown formatted string with results or error message
@@ -50,7 +51,7 @@ def call_financial_data_tool(
         logger.info(
             f"Successfully retrieved {data_type_name} data for {code}, {year}Q{quarter}.")
         # Use smaller limits for financial tables?
-        return format_df_to_markdown(df)
+        return formatter(df)
 
     except NoDataFoundError as e:
         logger.warning(f"NoDataFoundError for {code}, {year}Q{quarter}: {e}")
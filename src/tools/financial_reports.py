@@ -5,7 +5,8 @@ import logging
 from typing import List, Optional
 
 from mcp.server.fastmcp import FastMCP
-from src.data_source_interface import FinancialDataSource
+from src.data_source_interface import FinancialDataSource, NoDataFoundError, LoginError, DataSourceError
+from src.formatting.markdown_formatter import format_record_to_markdown, format_sections_to_markdown
 from src.tools.base import call_financial_data_tool
 
 logger = logging.getLogger(__name__)
@@ -140,6 +141,79 @@ def register_financial_report_tools(app: FastMCP, active_data_source: FinancialD
             code, year, quarter
         )
 
+    @app.tool()
+    def get_financial_snapshot(code: str, year: str, quarter: int) -> str:
+        """
+        Fetches a stock's complete quarterly financials in one call: profitability, operation
+        capability, growth, balance sheet, cash flow and DuPont analysis.
+        Prefer this over calling the six individual tools for the same quarter.
+
+        Args:
+            code: The stock code (e.g., 'sh.600000').
+            year: The 4-digit year (e.g., '2023').
+            quarter: The quarter (1, 2, 3, or 4).
+
+        Returns:
+            Markdown table with one row per indicator, grouped by section, or an error message.
+        """
+        return call_financial_data_tool(
+            "get_financial_snapshot",
+            active_data_source.get_financial_snapshot,
+            "Financial Snapshot",
+            code, year, quarter,
+            formatter=lambda df: format_record_to_markdown(df, df.attrs.get("sections"))
+        )
+
+    @app.tool()
+    def get_financial_history(
+        code: str,
+        categories: Optional[List[str]] = None,
+        start_quarter: str = "",
+        end_quarter: str = ""
+    ) -> str:
+        """
+        Fetches several quarters of financial data at once, with quarter-over-quarter (_QoQ) and
+        year-over-year (_YoY) relative changes for every numeric indicator.
+        Prefer this over calling the per-quarter tools repeatedly for trend analysis.
+
+        Args:
+            code: The stock code (e.g., 'sh.600000').
+            categories: Optional subset of 'profit', 'operation', 'growth', 'balance',
+                        'cash_flow', 'dupont'. Defaults to all six.
+            start_quarter: First quarter as 'YYYYQn' (e.g., '2020Q1'). Defaults to eight
+                           quarters before end_quarter.
+            end_quarter: Last quarter as 'YYYYQn'. Defaults to the latest quarter past its
+                         statutory disclosure deadline. At most 40 quarters per call.
+
+        Returns:
+            One Markdown table per category with a row per quarter, or an error message.
+        """
+        logger.info(
+            f"Tool 'get_financial_history' called for {code}, categories={categories}, "
+            f"{start_quarter or 'default'} to {end_quarter or 'default'}")
+        try:
+            df = active_data_source.get_financial_history(
+                code=code, categories=categories, start_quarter=start_quarter, end_quarter=end_quarter)
+            logger.info(f"Successfully retrieved financial history for {code} ({len(df)} quarters).")
+            return format_sections_to_markdown(df, df.attrs.get("sections", {}))
+
+        except NoDataFoundError as e:
+            logger.warning(f"NoDataFoundError for {code}: {e}")
+            return f"Error: {e}"
+        except LoginError as e:
+            logger.error(f"LoginError for {code}: {e}")
+            return f"Error: Could not connect to data source. {e}"
+        except DataSourceError as e:
+            logger.error(f"DataSourceError for {code}: {e}")
+            return f"Error: An error occurred while fetching data. {e}"
+        except ValueError as e:
+            logger.warning(f"ValueError processing request for {code}: {e}")
+            return f"Error: Invalid input parameter. {e}"
+        except Exception as e:
+            logger.exception(
+                f"Unexpected Exception processing get_financial_history for {code}: {e}")
+            return f"Error: An unexpected error occurred: {e}"
+
     @app.tool()
     def get_performance_express_report(code: str, start_date: str, end_date: str) -> str:
         """
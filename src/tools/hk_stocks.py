@@ -4,6 +4,7 @@ from typing import Optional, List
 from datetime import datetime
 from ..data_source_interface import FinancialDataSource, NoDataFoundError, DataSourceError
 from ..formatting.markdown_formatter import format_df_to_markdown as format_dataframe_as_markdown
+from ..quote_buffer import get_buffered_quote
 from .quarter_utils import (
     try_get_financial_data_with_fallback,
     get_data_freshness_note,
@@ -12,6 +13,9 @@ from .quarter_utils import (
 
 logger = logging.getLogger(__name__)
 
+# 港股分析只用到收盘价和估值列（数据源没有的列会被忽略）
+HK_ANALYSIS_K_FIELDS = ["date", "close", "peTTM", "pbMRQ", "psTTM"]
+
 # 全局数据源变量，在注册时设置
 _data_source: Optional[FinancialDataSource] = None
 
@@ -134,7 +138,12 @@ def get_hk_stock_realtime_data(code: str) -> str:
         if not code.startswith("hk."):
             code = f"hk.{code}"
         
-        # 获取最近一天的数据作为实时数据的替代
+        # 后台拉取线程已写入内存的最新报价
+        quote = get_buffered_quote(code, data_source.get_spot_quotes)
+        if quote is not None:
+            return format_dataframe_as_markdown(quote, title=f"港股 {code} 实时行情")
+        
+        # 尚未关注（本次已加入关注列表）时，获取最近一天的数据作为实时数据的替代
         from datetime import datetime, timedelta
         end_date = datetime.now().strftime("%Y-%m-%d")
         start_date = (datetime.now() - timedelta(days=5)).strftime("%Y-%m-%d")
@@ -214,52 +223,6 @@ def get_popular_hk_stocks(limit: int = 20) -> str:
         logger.exception(f"Unexpected error getting popular HK stocks: {e}")
         return f"获取热门港股列表时发生意外错误: {str(e)}"
 
-def search_hk_stocks(keyword: str) -> str:
-    """
-    搜索港股股票
-    
-    Args:
-        keyword: 搜索关键词 (股票名称或代码)
-    
-    Returns:
-        Markdown格式的搜索结果
-    """
-    logger.info(f"Searching HK stocks with keyword: {keyword}")
-    try:
-        # 简单的搜索逻辑，实际应该连接到数据源
-        stock_database = [
-            {"code": "hk.00700", "name": "腾讯控股", "sector": "科技"},
-            {"code": "hk.09988", "name": "阿里巴巴-SW", "sector": "科技"},
-            {"code": "hk.03690", "name": "美团-W", "sector": "科技"},
-            {"code": "hk.00697", "name": "首程控股", "sector": "综合"},
-        ]
-        
-        # 搜索匹配的股票
-        results = []
-        keyword_lower = keyword.lower()
-        
-        for stock in stock_database:
-            if (keyword_lower in stock["name"].lower() or 
-                keyword_lower in stock["code"].lower() or
-                keyword_lower.replace("hk.", "") in stock["code"]):
-                results.append(stock)
-        
-        if not results:
-            return f"未找到与 '{keyword}' 相关的港股。"
-        
-        # 转换为DataFrame格式
-        import pandas as pd
-        df = pd.DataFrame(results)
-        
-        return format_dataframe_as_markdown(
-            df, 
-            title=f"港股搜索结果: '{keyword}'"
-        )
-        
-    except Exception as e:
-        logger.exception(f"Unexpected error searching HK stocks: {e}")
-        return f"搜索港股时发生意外错误: {str(e)}"
-
 # 财务分析函数
 
 def get_hk_profit_data(code: str, year: str, quarter: int) -> str:
@@ -603,7 +566,8 @@ def get_hk_stock_analysis(code: str, analysis_type: str = "fundamental") -> str:
                 end_date = datetime.now().strftime("%Y-%m-%d")
                 start_date = (datetime.now() - timedelta(days=180)).strftime("%Y-%m-%d")
                 
-                price_data = data_source.get_historical_k_data(code, start_date, end_date)
+                price_data = data_source.get_historical_k_data(
+                    code, start_date, end_date, fields=HK_ANALYSIS_K_FIELDS)
             except Exception as e:
                 logger.warning(f"Failed to get price data for {code}: {e}")
         
@@ -749,7 +713,6 @@ def register_hk_stock_tools(app, data_source: FinancialDataSource):
     app.tool()(get_hk_stock_basic_info)
     app.tool()(get_hk_stock_realtime_data)
     app.tool()(get_popular_hk_stocks)
-    app.tool()(search_hk_stocks)
     app.tool()(get_hk_profit_data)
     app.tool()(get_hk_operation_data)
     app.tool()(get_hk_growth_data)
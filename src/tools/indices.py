@@ -6,8 +6,13 @@ import logging
 from typing import Optional
 
 from mcp.server.fastmcp import FastMCP
-from src.data_source_interface import FinancialDataSource
+from src.constituent_history import INDICES, get_constituent_history
+from src.data_source_interface import DataSourceError, FinancialDataSource, NoDataFoundError
+from src.formatting.markdown_formatter import format_df_to_markdown
 from src.tools.base import call_index_constituent_tool
+from src.utils import lazy_import
+
+pd = lazy_import("pandas")
 
 logger = logging.getLogger(__name__)
 
@@ -101,3 +106,61 @@ def register_index_tools(app: FastMCP, active_data_source: FinancialDataSource):
             "CSI 500",
             date
         )
+
+    @app.tool()
+    def get_index_membership(code: str, date: Optional[str] = None) -> str:
+        """
+        Shows which of the SZSE 50 / CSI 300 / CSI 500 indices contain a stock on a given date,
+        together with the membership intervals observed in the locally stored constituent snapshots.
+
+        first_observed / first_absent are snapshot dates, not official inclusion / removal dates.
+        Intervals starting at the earliest stored snapshot are marked open_start: the stock may have
+        joined the index earlier.
+
+        Args:
+            code: The stock code (e.g., 'sh.600000').
+            date: Optional. The date in 'YYYY-MM-DD' format. If None, uses the latest available date.
+
+        Returns:
+            Markdown table with one row per index membership interval, or an error message.
+        """
+        logger.info(f"Tool 'get_index_membership' called for {code}, date={date or 'latest'}")
+        fetchers = {
+            "sz50": active_data_source.get_sz50_stocks,
+            "hs300": active_data_source.get_hs300_stocks,
+            "zz500": active_data_source.get_zz500_stocks,
+        }
+        try:
+            history = get_constituent_history()
+            rows = []
+            notes = []
+            for index, fetch in fetchers.items():
+                # 查询当天名单（有效期内由本地成分历史回答），同时把新快照并入历史；
+                # 单个指数查询失败时只标记该指数，其余指数照常列出
+                try:
+                    members = fetch(date=date)
+                    is_member = "yes" if "code" in members.columns and code in set(members["code"]) else "no"
+                except NoDataFoundError as e:
+                    logger.warning(f"NoDataFoundError for {INDICES[index]} on {date or 'latest'}: {e}")
+                    is_member = "unknown"
+                    notes.append(f"- {INDICES[index]}: no constituent data for {date or 'latest'} ({e})")
+                except DataSourceError as e:
+                    logger.error(f"DataSourceError for {INDICES[index]}: {e}")
+                    is_member = "unknown"
+                    notes.append(f"- {INDICES[index]}: an error occurred while fetching data ({e})")
+                intervals = history.memberships(code, [index]) if history is not None else []
+                earliest = history.earliest_snapshot(index) if history is not None else None
+                if not intervals:
+                    rows.append([INDICES[index], is_member, "", "", ""])
+                for interval in intervals:
+                    # 本地最早快照中已是成分股时，实际纳入日期未知
+                    open_start = "yes" if interval.in_date == earliest else "no"
+                    rows.append([INDICES[index], is_member, interval.in_date, interval.out_date or "", open_start])
+            table = format_df_to_markdown(pd.DataFrame(
+                rows, columns=["index", "member_on_date", "first_observed", "first_absent", "open_start"]))
+            if notes:
+                table += "\n\nmember_on_date is unknown for:\n" + "\n".join(notes)
+            return table
+        except Exception as e:
+            logger.exception(f"Exception processing get_index_membership for {code}: {e}")
+            return f"Error: An unexpected error occurred: {e}"
@@ -3,7 +3,7 @@ Macroeconomic data tools for MCP server.
 Contains tools for fetching interest rates, money supply data, and more.
 """
 import logging
-from typing import Optional
+from typing import List, Optional
 
 from mcp.server.fastmcp import FastMCP
 from src.data_source_interface import FinancialDataSource
@@ -144,3 +144,31 @@ def register_macroeconomic_tools(app: FastMCP, active_data_source: FinancialData
             "SHIBOR",
             start_date, end_date
         )
+
+    @app.tool()
+    def get_macro_panel(series: List[str], start_date: Optional[str] = None, end_date: Optional[str] = None,
+                        frequency: str = "monthly", growth: Optional[List[str]] = None) -> str:
+        """
+        Aligns several macro series onto one calendar in a single table (values forward-filled
+        from their last observation), e.g. to compare SHIBOR, M2 growth, RRR and benchmark rates.
+
+        Args:
+            series: Series to include. Either a series name ('shibor', 'money_supply_month',
+                    'money_supply_year', 'reserve_ratio', 'deposit_rate', 'loan_rate'), which adds its
+                    headline columns, or 'name.column' for a specific column (e.g. 'shibor.shibor1W', 'money_supply_month.m2Month').
+            start_date: Optional. Start date in 'YYYY-MM-DD' (or 'YYYY-MM') format. Defaults to 3 years before end_date.
+            end_date: Optional. End date in 'YYYY-MM-DD' (or 'YYYY-MM') format. Defaults to today.
+            frequency: 'monthly' (month ends, default) or 'daily' (weekdays).
+            growth: Optional. Derived growth columns to add for every series: 'MoM' and/or 'YoY'
+                    (relative change against one month / one year earlier). Defaults to none.
+
+        Returns:
+            Markdown table with one row per date and one column per series, or an error message.
+        """
+        return call_macro_data_tool(
+            "get_macro_panel",
+            active_data_source.get_macro_panel,
+            "Macro Panel",
+            start_date, end_date,
+            series=series, frequency=frequency, growth=growth
+        )
@@ -1,6 +1,6 @@
 """
 Market overview tools for MCP server.
-Contains tools for fetching trading dates and all stock data.
+Contains tools for fetching trading dates, all stock data and stock universe history.
 """
 import logging
 from typing import Optional
@@ -8,10 +8,24 @@ from typing import Optional
 from mcp.server.fastmcp import FastMCP
 from src.data_source_interface import FinancialDataSource, NoDataFoundError, LoginError, DataSourceError
 from src.formatting.markdown_formatter import format_df_to_markdown
+from src.universe_store import COVERAGE_ATTR
 
 logger = logging.getLogger(__name__)
 
 
+def format_universe_coverage(coverage: Optional[dict], start_date: str, end_date: str) -> str:
+    """Describes which trading days a universe result actually covers (skipped and pending days included)."""
+    if not coverage:
+        return ""
+    notes = [f"Covered trading days: {coverage['first']} ~ {coverage['last']} (requested {start_date} ~ {end_date})."]
+    if coverage.get("skipped"):
+        notes.append(f"No stock list published yet for: {', '.join(coverage['skipped'])}.")
+    if coverage.get("pending"):
+        notes.append(f"{len(coverage['pending'])} trading days from {coverage['pending'][0]} were not downloaded "
+                     f"in this call; call again to continue.")
+    return "\n\n" + "\n".join(notes)
+
+
 def register_market_overview_tools(app: FastMCP, active_data_source: FinancialDataSource):
     """
     Register market overview tools with the MCP app.
@@ -97,3 +111,57 @@ def register_market_overview_tools(app: FastMCP, active_data_source: FinancialDa
             logger.exception(
                 f"Unexpected Exception processing get_all_stock: {e}")
             return f"Error: An unexpected error occurred: {e}"
+
+    def _call_universe_tool(tool_name: str, data_source_method, start_date: str, end_date: str) -> str:
+        logger.info(f"Tool '{tool_name}' called for {start_date} ~ {end_date}")
+        try:
+            df = data_source_method(start_date=start_date, end_date=end_date)
+            logger.info(f"Successfully computed {tool_name} for {start_date} ~ {end_date}: {len(df)} rows.")
+            return format_df_to_markdown(df) + format_universe_coverage(
+                df.attrs.get(COVERAGE_ATTR), start_date, end_date)
+        except NoDataFoundError as e:
+            logger.warning(f"NoDataFoundError: {e}")
+            return f"Error: {e}"
+        except LoginError as e:
+            logger.error(f"LoginError: {e}")
+            return f"Error: Could not connect to data source. {e}"
+        except DataSourceError as e:
+            logger.error(f"DataSourceError: {e}")
+            return f"Error: An error occurred while fetching data. {e}"
+        except ValueError as e:
+            logger.warning(f"ValueError: {e}")
+            return f"Error: Invalid input parameter. {e}"
+        except Exception as e:
+            logger.exception(f"Unexpected Exception processing {tool_name}: {e}")
+            return f"Error: An unexpected error occurred: {e}"
+
+    @app.tool()
+    def get_universe_changes(start_date: str, end_date: str) -> str:
+        """
+        Lists changes to the stock universe between two dates: new listings, removals,
+        suspensions, resumptions and renames, one row per event and trading day.
+
+        Args:
+            start_date: Start date in 'YYYY-MM-DD' format.
+            end_date: End date in 'YYYY-MM-DD' format (at most about one year after start_date).
+
+        Returns:
+            Markdown table with columns day, code, code_name, event, tradeStatus.
+        """
+        return _call_universe_tool(
+            "get_universe_changes", active_data_source.get_universe_changes, start_date, end_date)
+
+    @app.tool()
+    def get_suspended_stocks(start_date: str, end_date: str) -> str:
+        """
+        Lists the securities that were suspended (tradeStatus 0) on at least one trading day between two dates.
+
+        Args:
+            start_date: Start date in 'YYYY-MM-DD' format.
+            end_date: End date in 'YYYY-MM-DD' format (at most about one year after start_date).
+
+        Returns:
+            Markdown table with columns code, code_name, suspended_days, first_day, last_day.
+        """
+        return _call_universe_tool(
+            "get_suspended_stocks", active_data_source.get_suspended_stocks, start_date, end_date)
@@ -0,0 +1,61 @@
+"""
+Server metrics tools for MCP server.
+Exposes per-tool and per-upstream latency statistics and cache hit rates.
+"""
+import logging
+
+from mcp.server.fastmcp import FastMCP
+from src.data_source_interface import FinancialDataSource
+from src.formatting.markdown_formatter import format_df_to_markdown
+from src.metrics import metrics
+from src.shared_cache import get_shared_cache
+
+logger = logging.getLogger(__name__)
+
+
+def register_metrics_tools(app: FastMCP, active_data_source: FinancialDataSource):
+    """
+    Register server metrics tools with the MCP app.
+
+    Args:
+        app: The FastMCP app instance
+        active_data_source: The active financial data source
+    """
+
+    @app.tool()
+    def get_server_metrics(format: str = "markdown") -> str:
+        """
+        获取服务器运行指标：每个工具和每个上游接口的调用次数、错误数、耗时分位数，以及缓存命中率。
+
+        Args:
+            format: 输出格式，'markdown'(默认) 或 'prometheus'（Prometheus 文本格式）
+
+        Returns:
+            指标报告
+        """
+        logger.info(f"Tool 'get_server_metrics' called with format={format}")
+        try:
+            if format == "prometheus":
+                return metrics.render_prometheus()
+            if format != "markdown":
+                return f"Error: Invalid format '{format}'. Must be 'markdown' or 'prometheus'."
+
+            sections = ["## 调用耗时（毫秒，按总耗时排序）"]
+            calls = metrics.calls_frame()
+            sections.append(format_df_to_markdown(calls) if not calls.empty else "暂无调用记录。")
+
+            sections.append("## 缓存命中率")
+            cache = metrics.cache_frame()
+            sections.append(format_df_to_markdown(cache) if not cache.empty else "暂无缓存访问记录。")
+
+            shared_cache = get_shared_cache()
+            if shared_cache is not None:
+                stats = shared_cache.stats()
+                sections.append(
+                    f"共享缓存: {stats['entries']} 条, "
+                    f"{stats['bytes'] / 1024 / 1024:.1f} MB / {stats['max_bytes'] / 1024 / 1024:.0f} MB")
+            return "\n\n".join(sections)
+
+        except Exception as e:
+            logger.exception(f"Unexpected Exception processing get_server_metrics: {e}")
+            return f"Error: An unexpected error occurred: {e}"
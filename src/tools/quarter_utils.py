@@ -1,104 +1,20 @@
 """
 智能季度回退工具模块
-提供财务数据查询的智能季度回退机制
+提供财务数据段落的格式化和时效性说明；季度回退查询本身在 src.disclosure_index 中（数据层也会用到）
 """
 import logging
 from datetime import datetime
-from typing import Tuple, Optional, Any
-from src.data_source_interface import FinancialDataSource
+from typing import Any
+# 季度回退查询保留在这里导出，供各工具模块沿用原来的导入路径
+from src.disclosure_index import (
+    FINANCIAL_DATA_TYPES,
+    get_latest_available_quarter,
+    try_get_financial_data_with_fallback
+)
 
 logger = logging.getLogger(__name__)
 
 
-def get_latest_available_quarter() -> Tuple[int, int]:
-    """
-    获取最新可用的财务数据季度
-    
-    考虑财务数据发布滞后1-3个月的实际情况
-    
-    Returns:
-        Tuple[int, int]: (年份, 季度)
-    """
-    current_date = datetime.now()
-    current_year = current_date.year
-    current_month = current_date.month
-    
-    # 根据当前月份推算最可能有数据的季度
-    # 财务数据发布通常滞后1-3个月
-    if current_month <= 4:  # 1-4月，Q4数据可能还未发布
-        return current_year - 1, 4
-    elif current_month <= 7:  # 5-7月，Q1数据应该可用
-        return current_year, 1
-    elif current_month <= 10:  # 8-10月，Q2数据应该可用
-        return current_year, 2
-    else:  # 11-12月，Q3数据应该可用
-        return current_year, 3
-
-
-def try_get_financial_data_with_fallback(
-    data_source: FinancialDataSource,
-    code: str,
-    data_type: str,
-    max_attempts: int = 4
-) -> Tuple[Optional[Any], Optional[int], Optional[int]]:
-    """
-    尝试获取财务数据，如果失败则回退到上一季度
-    
-    Args:
-        data_source: 数据源实例
-        code: 股票代码
-        data_type: 数据类型 ('profit', 'growth', 'balance', 'dupont', 'cash_flow')
-        max_attempts: 最大尝试次数（季度数）
-    
-    Returns:
-        Tuple[Optional[Any], Optional[int], Optional[int]]: (数据, 年份, 季度)
-    """
-    year, quarter = get_latest_available_quarter()
-    
-    for attempt in range(max_attempts):
-        try:
-            logger.info(f"尝试获取 {code} {year}年Q{quarter} {data_type} 数据 (第{attempt+1}次尝试)")
-            
-            # 根据数据类型调用相应的方法
-            if data_type == "profit":
-                data = data_source.get_profit_data(code, str(year), quarter)
-            elif data_type == "growth":
-                data = data_source.get_growth_data(code, str(year), quarter)
-            elif data_type == "balance":
-                data = data_source.get_balance_data(code, str(year), quarter)
-            elif data_type == "dupont":
-                data = data_source.get_dupont_data(code, str(year), quarter)
-            elif data_type == "cash_flow":
-                data = data_source.get_cash_flow_data(code, str(year), quarter)
-            else:
-                logger.error(f"不支持的数据类型: {data_type}")
-                return None, None, None
-            
-            # 检查数据是否有效
-            if data is not None and not data.empty and "暂无数据" not in str(data):
-                logger.info(f"成功获取 {code} {year}年Q{quarter} {data_type} 数据")
-                return data, year, quarter
-            else:
-                logger.warning(f"{code} {year}年Q{quarter} {data_type} 数据为空或无效")
-                
-        except Exception as e:
-            logger.warning(f"获取 {code} {year}年Q{quarter} {data_type} 数据失败: {e}")
-        
-        # 回退到上一季度
-        quarter -= 1
-        if quarter < 1:
-            quarter = 4
-            year -= 1
-        
-        # 避免回退到过早的年份
-        if year < datetime.now().year - 3:
-            logger.warning(f"已回退到 {year} 年，停止尝试")
-            break
-    
-    logger.error(f"无法获取 {code} 的 {data_type} 数据，已尝试 {max_attempts} 个季度")
-    return None, None, None
-
-
 def get_data_freshness_note(year: int, quarter: int) -> str:
     """
     生成数据时效性说明
@@ -144,7 +60,7 @@ def format_financial_section(
     格式化财务数据段落
     
     Args:
-        data: 财务数据
+        data: 财务数据（DataFrame，或 {字段名: 值} 形式的单行记录）
         section_title: 段落标题
         year: 数据年份
         quarter: 数据季度
@@ -153,14 +69,16 @@ def format_financial_section(
     Returns:
         str: 格式化的段落文本
     """
-    if data is None or data.empty:
+    if data is None or (not isinstance(data, dict) and data.empty):
         return f"\n### {section_title}\n- 暂无数据（可能由于财报发布时间或数据源限制）\n"
+    if not isinstance(data, dict):
+        data = {field: data[field].values[0] for field in data.columns}
     
     section = f"\n### {section_title}\n"
     
     for field, display_name in field_mappings.items():
-        if field in data.columns:
-            value = data[field].values[0]
+        if field in data:
+            value = data[field]
             if value is not None and str(value) != 'nan' and str(value) != '':
                 # 根据字段类型格式化数值
                 if 'ratio' in field.lower() or 'margin' in field.lower() or 'roe' in field.lower():
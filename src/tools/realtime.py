@@ -0,0 +1,184 @@
+"""
+Real-time quote tools for MCP server.
+Serves intraday 1-minute bars built in memory by the background quote poller,
+and watchlist alert rules evaluated on every quote snapshot.
+"""
+import logging
+import os
+from datetime import datetime
+from typing import Optional
+
+from mcp.server.fastmcp import FastMCP
+from src.alert_engine import DEFAULT_WINDOW, RULE_KINDS, get_alert_engine
+from src.data_source_interface import FinancialDataSource
+from src.formatting.markdown_formatter import format_df_to_markdown
+from src.quote_buffer import BAR_CAPACITY, get_quote_buffer, market_of, start_quote_poller, watch_code
+
+logger = logging.getLogger(__name__)
+
+# get_triggered_alerts 接受的 since 格式
+SINCE_FORMATS = ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d")
+
+
+def alerts_unavailable() -> Optional[str]:
+    """提醒规则保存在进程内存中；多个 HTTP 工作进程时各次调用可能落在不同进程上，返回错误信息"""
+    workers = int(os.environ.get("STOCKREPORT_HTTP_WORKERS", "1") or 1)
+    if workers > 1:
+        return (f"Error: Alert rules are kept in process memory and are not shared between the {workers} HTTP "
+                f"workers. Run the server with --workers 1 (or stdio / daemon mode) to use alerts.")
+    return None
+
+
+def register_realtime_tools(app: FastMCP, active_data_source: FinancialDataSource):
+    """
+    Register real-time quote tools with the MCP app.
+
+    Args:
+        app: The FastMCP app instance
+        active_data_source: The active financial data source
+    """
+    # Securities listed in STOCKREPORT_WATCHLIST are polled from startup
+    start_quote_poller(active_data_source.get_spot_quotes, only_if_configured=True)
+
+    @app.tool()
+    def get_realtime_bars(code: str, limit: int = 60) -> str:
+        """
+        获取股票当日的 1 分钟K线（由后台行情拉取线程在内存中逐笔合成，不访问上游）。
+
+        证券第一次被查询时加入关注列表，此后每隔几秒（STOCKREPORT_QUOTE_INTERVAL）随所在市场的
+        行情快照一起更新；分钟线从加入关注列表之后开始积累。
+
+        Args:
+            code: 股票代码，如 'sh.600000'、'hk.00700'、'us.AAPL'
+            limit: 返回最近多少根分钟线，默认60
+
+        Returns:
+            Markdown 表格（time 为分钟起点，volume/amount 为该分钟内的成交量和成交额），最后一根可能仍在形成中
+        """
+        logger.info(f"Tool 'get_realtime_bars' called for {code} (limit={limit})")
+        try:
+            if market_of(code) is None:
+                return f"Error: Invalid code '{code}'. Use a prefixed code such as 'sh.600000', 'hk.00700' or 'us.AAPL'."
+            if not 1 <= limit <= BAR_CAPACITY:
+                return f"Error: limit must be between 1 and {BAR_CAPACITY}."
+
+            poller, added = watch_code(code, active_data_source.get_spot_quotes)
+            if added:
+                return (f"已开始关注 {code}，分钟线将从下一次行情拉取（约 {poller.interval:g} 秒后）开始积累，"
+                        f"请稍后再查询。")
+            bars = get_quote_buffer().bars(code, limit)
+            if bars.empty:
+                return f"{code} 暂无分钟线，行情快照尚未包含该证券（可能代码有误或尚未完成第一次拉取）。"
+            return format_df_to_markdown(bars)
+
+        except Exception as e:
+            logger.exception(f"Unexpected Exception processing get_realtime_bars for {code}: {e}")
+            return f"Error: An unexpected error occurred: {e}"
+
+    @app.tool()
+    def add_alert_rule(code: str, kind: str, threshold: float, window: int = DEFAULT_WINDOW) -> str:
+        """
+        为关注列表中的证券登记提醒规则。规则在每次行情拉取（每隔几秒）后自动判断，
+        触发记录通过 get_triggered_alerts 读取，无需反复查询K线。
+
+        Args:
+            code: 股票代码，如 'sh.600000'、'hk.00700'、'us.AAPL'（自动加入关注列表）
+            kind: 规则类型:
+                'price_above' / 'price_below': 最新价向上 / 向下穿过 threshold;
+                'pct_change': 当日涨跌幅达到 threshold（%，正数为涨幅、负数为跌幅）;
+                'volume_spike': 两次拉取之间的成交量达到近 window 次平均值的 threshold 倍;
+                'ma_cross_above' / 'ma_cross_below': 最新价向上 / 向下穿过近 window 次拉取价格的指数移动平均（threshold 不使用，可填 0）
+            threshold: 阈值（含义见 kind）
+            window: volume_spike / ma_cross_* 的平均窗口（拉取次数），默认20
+
+        Returns:
+            登记的规则编号，或错误信息
+        """
+        logger.info(f"Tool 'add_alert_rule' called: {code} {kind} {threshold} (window={window})")
+        try:
+            unavailable = alerts_unavailable()
+            if unavailable:
+                return unavailable
+            if market_of(code) is None:
+                return f"Error: Invalid code '{code}'. Use a prefixed code such as 'sh.600000', 'hk.00700' or 'us.AAPL'."
+            # 登记规则时证券在行情缓冲中固定，删除规则后解除
+            rule = get_alert_engine().add_rule(code, kind, threshold, window)
+            start_quote_poller(active_data_source.get_spot_quotes).wake()
+            return f"已登记提醒规则 #{rule.rule_id}: {code} {kind} {threshold:g}"
+
+        except ValueError as e:
+            return f"Error: Invalid input parameter. {e}"
+        except Exception as e:
+            logger.exception(f"Unexpected Exception processing add_alert_rule: {e}")
+            return f"Error: An unexpected error occurred: {e}"
+
+    @app.tool()
+    def remove_alert_rule(rule_id: int) -> str:
+        """
+        删除提醒规则。
+
+        Args:
+            rule_id: add_alert_rule 返回的规则编号
+
+        Returns:
+            处理结果
+        """
+        unavailable = alerts_unavailable()
+        if unavailable:
+            return unavailable
+        if get_alert_engine().remove_rule(rule_id):
+            return f"已删除提醒规则 #{rule_id}。"
+        return f"Error: Alert rule #{rule_id} not found."
+
+    @app.tool()
+    def list_alert_rules() -> str:
+        """
+        列出当前登记的全部提醒规则。
+
+        Returns:
+            Markdown 表格（规则编号、代码、类型、阈值、窗口、登记时间）
+        """
+        unavailable = alerts_unavailable()
+        if unavailable:
+            return unavailable
+        rules = get_alert_engine().rules_frame()
+        if rules.empty:
+            return f"暂无提醒规则。可用类型: {', '.join(RULE_KINDS)}"
+        return format_df_to_markdown(rules)
+
+    @app.tool()
+    def get_triggered_alerts(after: Optional[int] = None, since: Optional[str] = None) -> str:
+        """
+        获取已触发的提醒（规则在条件由不满足变为满足时触发一次）。
+
+        Args:
+            after: 可选，只返回序号大于 after 的提醒。传入上次结果中最后一条的 sequence 即可只读取新的提醒（不重不漏）
+            since: 可选，只返回此时间及之后触发的提醒，格式 'YYYY-MM-DD HH:MM:SS'、'YYYY-MM-DD HH:MM' 或 'YYYY-MM-DD'。
+                   默认返回保留的全部记录
+
+        Returns:
+            Markdown 表格（序号、触发时间、规则编号、代码、类型、阈值、触发时的值）
+        """
+        logger.info(f"Tool 'get_triggered_alerts' called (after={after}, since={since})")
+        try:
+            unavailable = alerts_unavailable()
+            if unavailable:
+                return unavailable
+            since_stamp = None
+            if since:
+                for pattern in SINCE_FORMATS:
+                    try:
+                        since_stamp = datetime.strptime(since.strip(), pattern).timestamp()
+                        break
+                    except ValueError:
+                        continue
+                else:
+                    return f"Error: Invalid since '{since}'. Use 'YYYY-MM-DD HH:MM:SS' or 'YYYY-MM-DD'."
+            alerts = get_alert_engine().triggered(after, since_stamp)
+            if alerts.empty:
+                return "暂无新触发的提醒。"
+            return format_df_to_markdown(alerts)
+
+        except Exception as e:
+            logger.exception(f"Unexpected Exception processing get_triggered_alerts: {e}")
+            return f"Error: An unexpected error occurred: {e}"
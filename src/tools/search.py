@@ -0,0 +1,69 @@
+"""
+Security search tools for MCP server.
+Contains the unified search tool across A-share, HK and US markets.
+"""
+import logging
+
+from mcp.server.fastmcp import FastMCP
+from src.data_source_interface import FinancialDataSource, NoDataFoundError, LoginError, DataSourceError
+from src.formatting.markdown_formatter import format_df_to_markdown
+from src.search_index import SearchIndexManager
+
+logger = logging.getLogger(__name__)
+
+
+def register_search_tools(app: FastMCP, active_data_source: FinancialDataSource):
+    """
+    Register security search tools with the MCP app.
+
+    Args:
+        app: The FastMCP app instance
+        active_data_source: The active financial data source
+    """
+    search_manager = SearchIndexManager(active_data_source.get_security_list)
+
+    @app.tool()
+    def search_securities(query: str, market: str = "all", limit: int = 10) -> str:
+        """
+        在全市场证券代码表中搜索股票、指数或基金。
+
+        支持代码及代码前缀（如 '600519'、'sh.6005'、'00700'、'700'、'AAPL'）、
+        中英文名称片段（如 '茅台'、'腾讯'）以及拼音首字母（如 'gzmt' → 贵州茅台）。
+
+        Args:
+            query: 搜索关键词
+            market: 市场范围，可选 'all'(默认)、'a'(A股)、'hk'(港股)、'us'(美股)
+            limit: 最多返回的结果数，默认10
+
+        Returns:
+            按相关度排序的 Markdown 表格，包含代码、名称、市场和匹配方式
+        """
+        logger.info(
+            f"Tool 'search_securities' called with query='{query}', market={market}, limit={limit}")
+        try:
+            if not query or not query.strip():
+                return "Error: Please provide a non-empty search query."
+            if limit < 1:
+                return f"Error: Invalid limit '{limit}'. Must be a positive integer."
+
+            df = search_manager.search(query, market=market, limit=limit)
+            if df.empty:
+                return f"未找到与 '{query}' 匹配的证券。"
+            logger.info(f"Found {len(df)} securities matching '{query}'.")
+            return format_df_to_markdown(df)
+
+        except NoDataFoundError as e:
+            logger.warning(f"NoDataFoundError: {e}")
+            return f"Error: {e}"
+        except LoginError as e:
+            logger.error(f"LoginError: {e}")
+            return f"Error: Could not connect to data source. {e}"
+        except DataSourceError as e:
+            logger.error(f"DataSourceError: {e}")
+            return f"Error: An error occurred while fetching data. {e}"
+        except ValueError as e:
+            logger.warning(f"ValueError: {e}")
+            return f"Error: Invalid input parameter. {e}"
+        except Exception as e:
+            logger.exception(f"Unexpected Exception processing search_securities: {e}")
+            return f"Error: An unexpected error occurred: {e}"
@@ -3,6 +3,7 @@ import logging
 from typing import Optional, List
 from ..data_source_interface import FinancialDataSource, NoDataFoundError, DataSourceError
 from ..formatting.markdown_formatter import format_df_to_markdown as format_dataframe_as_markdown
+from ..quote_buffer import get_buffered_quote
 
 logger = logging.getLogger(__name__)
 
@@ -117,7 +118,12 @@ def register_us_stock_tools(app, data_source: FinancialDataSource):
             if not code.startswith("us."):
                 code = f"us.{code.upper()}"
             
-            # 获取最近一天的数据作为实时数据的替代
+            # 后台拉取线程已写入内存的最新报价
+            quote = get_buffered_quote(code, data_source.get_spot_quotes)
+            if quote is not None:
+                return format_dataframe_as_markdown(quote, f"美股 {code} 实时行情")
+            
+            # 尚未关注（本次已加入关注列表）时，获取最近一天的数据作为实时数据的替代
             from datetime import datetime, timedelta
             end_date = datetime.now().strftime("%Y-%m-%d")
             start_date = (datetime.now() - timedelta(days=5)).strftime("%Y-%m-%d")
@@ -186,63 +192,6 @@ def register_us_stock_tools(app, data_source: FinancialDataSource):
             logger.exception(f"Unexpected error getting popular US stocks: {e}")
             return f"获取热门美股列表时发生意外错误: {str(e)}"
     
-    @app.tool()
-    def search_us_stocks(keyword: str) -> str:
-        """
-        搜索美股股票
-        
-        Args:
-            keyword: 搜索关键词（股票名称或代码）
-        
-        Returns:
-            Markdown格式的搜索结果
-        """
-        logger.info(f"Searching US stocks with keyword: {keyword}")
-        try:
-            # 预定义的一些美股数据用于搜索
-            all_stocks = [
-                {"code": "us.AAPL", "name": "苹果公司", "sector": "科技"},
-                {"code": "us.MSFT", "name": "微软", "sector": "科技"},
-                {"code": "us.GOOGL", "name": "谷歌", "sector": "科技"},
-                {"code": "us.AMZN", "name": "亚马逊", "sector": "科技"},
-                {"code": "us.TSLA", "name": "特斯拉", "sector": "汽车"},
-                {"code": "us.META", "name": "Meta", "sector": "科技"},
-                {"code": "us.NVDA", "name": "英伟达", "sector": "科技"},
-                {"code": "us.NFLX", "name": "奈飞", "sector": "媒体"},
-                {"code": "us.JPM", "name": "摩根大通", "sector": "金融"},
-                {"code": "us.JNJ", "name": "强生", "sector": "医疗"},
-                {"code": "us.V", "name": "Visa", "sector": "金融"},
-                {"code": "us.WMT", "name": "沃尔玛", "sector": "零售"},
-                {"code": "us.PG", "name": "宝洁", "sector": "消费品"},
-                {"code": "us.UNH", "name": "联合健康", "sector": "医疗"},
-                {"code": "us.HD", "name": "家得宝", "sector": "零售"}
-            ]
-            
-            # 搜索匹配的股票
-            keyword_lower = keyword.lower()
-            matched_stocks = []
-            
-            for stock in all_stocks:
-                if (keyword_lower in stock["code"].lower() or 
-                    keyword_lower in stock["name"].lower() or
-                    keyword_lower in stock["sector"].lower()):
-                    matched_stocks.append(stock)
-            
-            if not matched_stocks:
-                return f"未找到与关键词 '{keyword}' 匹配的美股。"
-            
-            import pandas as pd
-            df = pd.DataFrame(matched_stocks)
-            
-            return format_dataframe_as_markdown(
-                df, 
-                f"美股搜索结果 (关键词: {keyword})"
-            )
-            
-        except Exception as e:
-            logger.exception(f"Unexpected error searching US stocks: {e}")
-            return f"搜索美股时发生意外错误: {str(e)}"
-    
     @app.tool()
     def get_us_market_indices() -> str:
         """
@@ -0,0 +1,260 @@
+"""
+全市场证券列表（股票池）历史存储模块
+
+bs.query_all_stock(day) 每次返回约 5500 行，而相邻两个交易日之间只有少数证券上市、退市、
+停牌或复牌。本模块只保存第一份快照（基准）和之后每个已保存交易日相对前一个已保存交易日的变化，
+任一已保存日期的名单都可以在本地还原:
+
+- snapshot(): 还原某一天的完整名单（每隔 CHECKPOINT_EVERY 天在内存中保留一份完整状态，
+  还原时最多应用 CHECKPOINT_EVERY - 1 份变化）
+- changes(): 一段时间内的上市、移除、停牌、复牌、更名事件
+- suspended(): 一段时间内停牌过的证券及停牌天数
+
+存储位于数据目录（STOCKREPORT_HOME，默认 ~/.stockreport-mcp）下的 universe.sqlite3，
+多个服务器进程共享。
+
+作者: StockReport MCP Project
+许可证: MIT License
+"""
+from __future__ import annotations
+
+import bisect
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+try:
+    from .utils import get_data_dir, lazy_import
+except ImportError:
+    from utils import get_data_dir, lazy_import
+
+pd = lazy_import("pandas")
+
+logger = logging.getLogger(__name__)
+
+STORE_FILENAME = "universe.sqlite3"
+# 与 bs.query_all_stock 结果一致的列
+UNIVERSE_COLUMNS = ["code", "tradeStatus", "code_name"]
+# 内存中每隔多少个交易日保留一份完整状态
+CHECKPOINT_EVERY = 32
+# DataFrame.attrs 中记录 changes() / suspended() 结果实际覆盖的交易日范围（由数据源填写）
+COVERAGE_ATTR = "universe_coverage"
+
+# 一只证券在某天的状态: (名称, 交易状态)
+Entry = Tuple[Optional[str], str]
+State = Dict[str, Entry]
+# 相对前一个已保存交易日的变化；None 表示从名单中移除
+Delta = Dict[str, Optional[Entry]]
+
+
+def _diff(before: State, after: State) -> Delta:
+    delta: Delta = {code: entry for code, entry in after.items() if before.get(code) != entry}
+    delta.update({code: None for code in before if code not in after})
+    return delta
+
+
+def _apply(state: State, delta: Delta) -> None:
+    for code, entry in delta.items():
+        if entry is None:
+            state.pop(code, None)
+        else:
+            state[code] = entry
+
+
+class UniverseStore:
+    """SQLite 保存的基准快照 + 逐日变化，读取时在内存中还原"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._version: Optional[float] = None
+        self._days: List[str] = []
+        self._deltas: Dict[str, Delta] = {}
+        self._checkpoints: Dict[int, State] = {}
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("CREATE TABLE IF NOT EXISTS days (day TEXT PRIMARY KEY)")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS changes ("
+                    " day TEXT NOT NULL,"
+                    " code TEXT NOT NULL,"
+                    " code_name TEXT,"
+                    " trade_status TEXT,"
+                    " PRIMARY KEY (day, code))"
+                )
+                conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value REAL NOT NULL)")
+        finally:
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _ensure_loaded(self, conn: Optional[sqlite3.Connection] = None) -> None:
+        """存储有变化（本进程或其他进程写入）时重新载入变化并重建检查点"""
+        own = conn is None
+        conn = conn or self._connect()
+        try:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+            version = row[0] if row else 0.0
+            if version == self._version:
+                return
+            days = [day for (day,) in conn.execute("SELECT day FROM days ORDER BY day").fetchall()]
+            rows = conn.execute("SELECT day, code, code_name, trade_status FROM changes").fetchall()
+        finally:
+            if own:
+                conn.close()
+        deltas: Dict[str, Delta] = {day: {} for day in days}
+        for day, code, name, status in rows:
+            if day in deltas:
+                deltas[day][code] = (name, status) if status is not None else None
+        checkpoints: Dict[int, State] = {}
+        state: State = {}
+        for position, day in enumerate(days):
+            _apply(state, deltas[day])
+            if position % CHECKPOINT_EVERY == 0:
+                checkpoints[position] = dict(state)
+        with self._lock:
+            self._days, self._deltas, self._checkpoints, self._version = days, deltas, checkpoints, version
+
+    def _state(self, position: int) -> State:
+        """第 position 个已保存交易日的完整名单"""
+        base = position - position % CHECKPOINT_EVERY
+        state = dict(self._checkpoints[base])
+        for day in self._days[base + 1:position + 1]:
+            _apply(state, self._deltas[day])
+        return state
+
+    def days(self, start_date: str = "", end_date: str = "9999-12-31") -> List[str]:
+        """已保存的交易日"""
+        self._ensure_loaded()
+        return self._days[bisect.bisect_left(self._days, start_date):bisect.bisect_right(self._days, end_date)]
+
+    def record(self, day: str, df: pd.DataFrame) -> None:
+        """保存 day 的完整名单（列同 UNIVERSE_COLUMNS）；同时改写下一个已保存交易日的变化"""
+        if df is None or df.empty:
+            return
+        names = df["code_name"] if "code_name" in df.columns else [None] * len(df)
+        new_state: State = {str(code): (name if name is None else str(name), str(status))
+                            for code, status, name in zip(df["code"], df["tradeStatus"], names)}
+        conn = self._connect()
+        try:
+            # 写锁内重新载入，保证改写的变化基于最新的已保存交易日
+            conn.execute("BEGIN IMMEDIATE")
+            self._ensure_loaded(conn)
+            days = self._days
+            position = bisect.bisect_left(days, day)
+            if position < len(days) and days[position] == day:
+                conn.rollback()
+                return
+            previous = self._state(position - 1) if position > 0 else {}
+            following = days[position] if position < len(days) else None
+            rewrites = {day: _diff(previous, new_state)}
+            if following is not None:
+                rewrites[following] = _diff(new_state, self._state(position))
+            for rewrite_day, delta in rewrites.items():
+                conn.execute("DELETE FROM changes WHERE day = ?", (rewrite_day,))
+                conn.executemany(
+                    "INSERT INTO changes (day, code, code_name, trade_status) VALUES (?, ?, ?, ?)",
+                    [(rewrite_day, code, entry[0] if entry else None, entry[1] if entry else None)
+                     for code, entry in delta.items()])
+            conn.execute("INSERT INTO days (day) VALUES (?)", (day,))
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('version', ?)", (time.time(),))
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        logger.info(f"Universe store saved {day} ({len(rewrites[day])} changes)")
+
+    def snapshot(self, day: str) -> Optional[pd.DataFrame]:
+        """day 的完整名单；未保存时返回 None"""
+        self._ensure_loaded()
+        position = bisect.bisect_left(self._days, day)
+        if position >= len(self._days) or self._days[position] != day:
+            return None
+        state = self._state(position)
+        return pd.DataFrame([[code, status, name] for code, (name, status) in sorted(state.items())],
+                            columns=UNIVERSE_COLUMNS)
+
+    def changes(self, start_date: str, end_date: str) -> pd.DataFrame:
+        """
+        [start_date, end_date] 内各已保存交易日相对前一个已保存交易日的变化。
+
+        事件类型: listed（新出现）、removed（从名单中消失）、suspended、resumed、renamed。
+        区间内第一个交易日之前没有已保存的交易日时，从区间内第一个交易日开始比较。
+        """
+        self._ensure_loaded()
+        first = bisect.bisect_left(self._days, start_date)
+        last = bisect.bisect_right(self._days, end_date)
+        if first >= last:
+            return pd.DataFrame(columns=["day", "code", "code_name", "event", "tradeStatus"])
+        start = max(first, 1)
+        state = self._state(start - 1)
+        events = []
+        for day in self._days[start:last]:
+            for code, entry in sorted(self._deltas[day].items()):
+                before = state.get(code)
+                if entry is None:
+                    events.append([day, code, before[0] if before else None, "removed", None])
+                elif before is None:
+                    events.append([day, code, entry[0], "listed", entry[1]])
+                else:
+                    if before[1] != entry[1]:
+                        events.append([day, code, entry[0], "suspended" if entry[1] == "0" else "resumed", entry[1]])
+                    if before[0] != entry[0]:
+                        events.append([day, code, entry[0], "renamed", entry[1]])
+            _apply(state, self._deltas[day])
+        return pd.DataFrame(events, columns=["day", "code", "code_name", "event", "tradeStatus"])
+
+    def suspended(self, start_date: str, end_date: str) -> pd.DataFrame:
+        """[start_date, end_date] 内已保存交易日中停牌（tradeStatus 为 0）过的证券"""
+        self._ensure_loaded()
+        first = bisect.bisect_left(self._days, start_date)
+        last = bisect.bisect_right(self._days, end_date)
+        found: Dict[str, List] = {}
+        if first < last:
+            state = self._state(first)
+            halted = {code for code, (_, status) in state.items() if status == "0"}
+            for position in range(first, last):
+                day = self._days[position]
+                if position > first:
+                    delta = self._deltas[day]
+                    _apply(state, delta)
+                    for code in delta:
+                        if code in state and state[code][1] == "0":
+                            halted.add(code)
+                        else:
+                            halted.discard(code)
+                for code in halted:
+                    record = found.setdefault(code, [code, None, 0, day, day])
+                    record[1], record[2], record[4] = state[code][0], record[2] + 1, day
+        return pd.DataFrame(sorted(found.values()),
+                            columns=["code", "code_name", "suspended_days", "first_day", "last_day"])
+
+
+_universe_store: Optional[UniverseStore] = None
+_universe_store_initialized = False
+_universe_store_lock = threading.Lock()
+
+
+def get_universe_store() -> Optional[UniverseStore]:
+    """Returns the process-wide UniverseStore, or None when it is unavailable."""
+    global _universe_store, _universe_store_initialized
+    if _universe_store_initialized:
+        return _universe_store
+    with _universe_store_lock:
+        if not _universe_store_initialized:
+            try:
+                _universe_store = UniverseStore(os.path.join(get_data_dir(), STORE_FILENAME))
+            except Exception as e:
+                logger.warning(f"Universe store unavailable, fetching stock lists directly: {e}")
+                _universe_store = None
+            _universe_store_initialized = True
+    return _universe_store
@@ -4,11 +4,15 @@
 本模块提供了项目中使用的各种工具函数，主要包括：
 - 日志配置管理
 - Baostock数据源的登录上下文管理器
+- 重量级第三方库的延迟导入
+- 本地数据目录（守护进程套接字、缓存等）
 - 其他通用工具函数
 
 主要功能:
 - setup_logging(): 配置应用程序的日志系统
 - baostock_login_context(): Baostock登录/登出的上下文管理器，自动处理连接生命周期
+- lazy_import(): 返回模块代理，首次访问属性时才真正导入（用于 akshare、baostock、pandas）
+- get_data_dir(): 返回本地数据目录（环境变量 STOCKREPORT_HOME，默认 ~/.stockreport-mcp）
 
 设计特点:
 - 使用上下文管理器确保资源正确释放
@@ -20,10 +24,12 @@
 许可证: MIT License
 """
 
-import baostock as bs
+import importlib
 import os
 import sys
 import logging
+import threading
+import types
 from contextlib import contextmanager
 try:
     from .data_source_interface import LoginError
@@ -44,10 +50,104 @@ def setup_logging(level=logging.INFO):
 # Get a logger instance for this module (optional, but good practice)
 logger = logging.getLogger(__name__)
 
+# --- Lazy Imports ---
+class LazyModule(types.ModuleType):
+    """
+    Module proxy that defers the real import until the first attribute access.
+
+    akshare alone takes several hundred milliseconds to import, and MCP clients
+    spawn a fresh server process per session, so heavy libraries are only loaded
+    when a tool actually needs them. A call wrapper can be installed to
+    instrument the module's functions (see src.metrics).
+    """
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self._lazy_name = name
+        self._lazy_module = None
+        self._lazy_call_wrapper = None
+        self._lazy_wrapped = {}
+
+    def _load(self) -> types.ModuleType:
+        if self._lazy_module is None:
+            logger.debug(f"Importing {self._lazy_name} on first use")
+            self._lazy_module = importlib.import_module(self._lazy_name)
+        return self._lazy_module
+
+    def set_module(self, module) -> None:
+        """Replaces the module served by this proxy (used by src.replay for recording/replay stand-ins)."""
+        self._lazy_module = module
+        self._lazy_wrapped = {}
+
+    def set_call_wrapper(self, wrapper) -> None:
+        """Installs `wrapper(name, fn) -> fn` applied to every function fetched from the module."""
+        self._lazy_call_wrapper = wrapper
+        self._lazy_wrapped = {}
+
+    def __getattr__(self, item):
+        value = getattr(self._load(), item)
+        if self._lazy_call_wrapper is None or not isinstance(value, (types.FunctionType, types.BuiltinFunctionType)):
+            return value
+        cached = self._lazy_wrapped.get(item)
+        if cached is None or getattr(cached, "__wrapped__", None) is not value:
+            cached = self._lazy_wrapped[item] = self._lazy_call_wrapper(item, value)
+        return cached
+
+    def __dir__(self):
+        return dir(self._load())
+
+
+_lazy_modules = {}
+
+
+def lazy_import(name: str) -> LazyModule:
+    """Returns the shared proxy for module `name`, imported on first attribute access."""
+    module = _lazy_modules.get(name)
+    if module is None:
+        module = _lazy_modules[name] = LazyModule(name)
+    return module
+
+
+bs = lazy_import("baostock")
+
+# --- Local Data Directory ---
+def get_data_dir() -> str:
+    """Returns the local data directory (STOCKREPORT_HOME or ~/.stockreport-mcp), creating it if needed."""
+    path = os.environ.get("STOCKREPORT_HOME") or os.path.join(os.path.expanduser("~"), ".stockreport-mcp")
+    os.makedirs(path, exist_ok=True)
+    return path
+
 # --- Baostock Context Manager ---
+# The baostock client keeps a single global socket, so concurrent tool calls
+# (daemon / HTTP modes run tools in worker threads) must take turns. The lock
+# is re-entrant and nested contexts in the same thread share one session.
+_baostock_lock = threading.RLock()
+_baostock_depth = 0
+
+
 @contextmanager
 def baostock_login_context():
     """Context manager to handle Baostock login and logout, suppressing stdout messages."""
+    global _baostock_depth
+    with _baostock_lock:
+        if _baostock_depth > 0:
+            _baostock_depth += 1
+            try:
+                yield
+            finally:
+                _baostock_depth -= 1
+            return
+        with _baostock_session():
+            _baostock_depth = 1
+            try:
+                yield
+            finally:
+                _baostock_depth = 0
+
+
+@contextmanager
+def _baostock_session():
+    """Logs in to Baostock for the duration of the block."""
     # Redirect stdout to suppress login/logout messages
     original_stdout_fd = sys.stdout.fileno()
     saved_stdout_fd = os.dup(original_stdout_fd)
@@ -0,0 +1,107 @@
+"""
+提醒规则引擎（src/alert_engine.py）的单元测试
+
+用合成的行情快照驱动 on_quotes()，覆盖穿越类规则的触发与重新布防、增删规则时保留其余规则的状态、
+volume_spike 的观察窗口，以及触发记录的序号分页和行情缓冲中的固定。
+"""
+import numpy as np
+
+from src.alert_engine import MIN_OBSERVATIONS, AlertEngine
+from src.quote_buffer import QuoteBuffer
+
+
+def quotes(prices, volumes=None, pct=None):
+    """prices: {代码: 最新价}"""
+    codes = sorted(prices)
+    return {
+        "code": np.array(codes, dtype=str),
+        "price": np.array([prices[code] for code in codes], dtype="float64"),
+        "pctChg": np.array([(pct or {}).get(code, np.nan) for code in codes], dtype="float64"),
+        "volume": np.array([(volumes or {}).get(code, np.nan) for code in codes], dtype="float64"),
+    }
+
+
+def fired(engine, after=None):
+    df = engine.triggered(after)
+    return list(zip(df["rule_id"], df["value"]))
+
+
+def test_price_cross_fires_once_and_rearms():
+    engine = AlertEngine()
+    rule = engine.add_rule("sh.600000", "price_above", 10.0)
+
+    # 登记时已在阈值之上不触发，需要先观察到阈值之下
+    engine.on_quotes("sh", 1.0, quotes({"sh.600000": 10.5}))
+    engine.on_quotes("sh", 2.0, quotes({"sh.600000": 9.5}))
+    assert fired(engine) == []
+    engine.on_quotes("sh", 3.0, quotes({"sh.600000": 10.2}))
+    engine.on_quotes("sh", 4.0, quotes({"sh.600000": 10.8}))
+    assert fired(engine) == [(rule.rule_id, 10.2)]
+
+    # 回到阈值之下后再次穿越时重新触发；快照中缺少该代码时保持状态
+    engine.on_quotes("sh", 5.0, quotes({"sh.600000": 9.9}))
+    engine.on_quotes("sh", 6.0, quotes({"sh.600001": 5.0}))
+    engine.on_quotes("sh", 7.0, quotes({"sh.600000": 10.1}))
+    assert fired(engine) == [(rule.rule_id, 10.2), (rule.rule_id, 10.1)]
+
+
+def test_pct_change_fires_immediately_in_both_directions():
+    engine = AlertEngine()
+    up = engine.add_rule("sh.600000", "pct_change", 5.0)
+    down = engine.add_rule("sh.600001", "pct_change", -3.0)
+
+    engine.on_quotes("sh", 1.0, quotes({"sh.600000": 10.6, "sh.600001": 9.6},
+                                       pct={"sh.600000": 6.0, "sh.600001": -4.0}))
+    assert sorted(fired(engine)) == [(up.rule_id, 6.0), (down.rule_id, -4.0)]
+    engine.on_quotes("sh", 2.0, quotes({"sh.600000": 10.7, "sh.600001": 9.5},
+                                       pct={"sh.600000": 7.0, "sh.600001": -5.0}))
+    assert len(fired(engine)) == 2
+
+
+def test_rule_changes_keep_other_rules_state():
+    engine = AlertEngine()
+    kept = engine.add_rule("sh.600000", "price_below", 9.0)
+    engine.on_quotes("sh", 1.0, quotes({"sh.600000": 9.5}))
+
+    # 同类型规则增删后，已有规则仍记得“不满足”的状态
+    removed = engine.add_rule("sh.600001", "price_below", 5.0)
+    assert engine.remove_rule(removed.rule_id)
+    assert not engine.remove_rule(removed.rule_id)
+    engine.on_quotes("sh", 2.0, quotes({"sh.600000": 8.8, "sh.600001": 4.0}))
+    assert fired(engine) == [(kept.rule_id, 8.8)]
+
+
+def test_volume_spike_waits_for_observations():
+    engine = AlertEngine()
+    rule = engine.add_rule("sh.600000", "volume_spike", 3.0, window=5)
+    volume = 0.0
+    for step in range(MIN_OBSERVATIONS + 1):
+        volume += 100.0
+        engine.on_quotes("sh", float(step), quotes({"sh.600000": 10.0}, volumes={"sh.600000": volume}))
+    assert fired(engine) == []
+
+    volume += 1000.0
+    engine.on_quotes("sh", 10.0, quotes({"sh.600000": 10.0}, volumes={"sh.600000": volume}))
+    assert [rule_id for rule_id, _ in fired(engine)] == [rule.rule_id]
+    assert fired(engine)[0][1] >= 3.0
+
+    # 累计成交量变小（新的交易日）时不计入，也不触发
+    engine.on_quotes("sh", 11.0, quotes({"sh.600000": 10.0}, volumes={"sh.600000": 50.0}))
+    assert len(fired(engine)) == 1
+
+
+def test_sequence_paging_and_pins():
+    buffer = QuoteBuffer()
+    engine = AlertEngine(buffer)
+    rules = [engine.add_rule("sh.600000", "pct_change", 1.0), engine.add_rule("sh.600000", "pct_change", 2.0)]
+
+    # 有规则的证券不会因为没有读取而移出关注列表
+    assert buffer.expire(0.0) == []
+    engine.on_quotes("sh", 1.0, quotes({"sh.600000": 10.3}, pct={"sh.600000": 3.0}))
+    first = engine.triggered()
+    assert first["sequence"].tolist() == [1, 2]
+    assert engine.triggered(after=first["sequence"].max()).empty
+
+    for rule in rules:
+        engine.remove_rule(rule.rule_id)
+    assert buffer.expire(0.0) == ["sh.600000"]
@@ -0,0 +1,78 @@
+"""
+指数成分股历史（src/constituent_history.py）的单元测试
+
+覆盖由快照重建成分区间（包括乱序并入更早的快照）、有效期判断和按股票查询成分区间。
+"""
+import pandas as pd
+
+from src.constituent_history import ConstituentHistory, Membership
+
+
+def snapshot(update_date: str, members) -> pd.DataFrame:
+    """members: {代码: 名称}"""
+    return pd.DataFrame([[update_date, code, name] for code, name in sorted(members.items())],
+                        columns=["updateDate", "code", "code_name"])
+
+
+JUNE = {"sh.600000": "浦发银行", "sh.600036": "招商银行"}
+DECEMBER = {"sh.600036": "招商银行", "sh.601318": "中国平安"}
+
+
+def codes(df):
+    return df["code"].tolist() if df is not None else None
+
+
+def test_intervals_from_snapshots(tmp_path):
+    history = ConstituentHistory(str(tmp_path / "constituents.sqlite3"))
+    history.record("hs300", snapshot("2023-06-12", JUNE), "2023-12-01")
+    history.record("hs300", snapshot("2023-12-11", DECEMBER), "2024-01-05")
+
+    assert codes(history.members("hs300", "2023-06-12")) == ["sh.600000", "sh.600036"]
+    assert codes(history.members("hs300", "2024-01-05")) == ["sh.600036", "sh.601318"]
+    assert history.members("hs300", "2023-12-05") is None  # 两份快照之间未确认的空档
+    assert history.members("hs300", "2024-01-08") is None
+    assert history.members("hs300", "2023-06-01") is None
+    assert history.members("hs300", "2024-01-02")["updateDate"].unique().tolist() == ["2023-12-11"]
+
+    assert history.memberships("sh.600000") == [
+        Membership("hs300", "sh.600000", "浦发银行", "2023-06-12", "2023-12-11")]
+    assert history.memberships("sh.601318") == [
+        Membership("hs300", "sh.601318", "中国平安", "2023-12-11", None)]
+    assert history.memberships("sh.600036", ["zz500"]) == []
+    assert history.earliest_snapshot("hs300") == "2023-06-12"
+    assert history.earliest_snapshot("sz50") is None
+
+
+def test_out_of_order_snapshot_rebuilds_intervals(tmp_path):
+    history = ConstituentHistory(str(tmp_path / "constituents.sqlite3"))
+    history.record("hs300", snapshot("2023-06-12", JUNE), "2023-06-30")
+    history.record("hs300", snapshot("2024-06-17", JUNE), "2024-06-30")
+    # 并入两者之间的快照：sh.600000 的区间被拆成两段
+    history.record("hs300", snapshot("2023-12-11", DECEMBER), "2023-12-29")
+
+    assert history.memberships("sh.600000") == [
+        Membership("hs300", "sh.600000", "浦发银行", "2023-06-12", "2023-12-11"),
+        Membership("hs300", "sh.600000", "浦发银行", "2024-06-17", None),
+    ]
+    assert history.memberships("sh.601318") == [
+        Membership("hs300", "sh.601318", "中国平安", "2023-12-11", "2024-06-17")]
+    assert codes(history.members("hs300", "2023-12-20")) == ["sh.600036", "sh.601318"]
+    assert codes(history.members("hs300", "2024-06-20")) == ["sh.600000", "sh.600036"]
+
+    # 另一个实例（其他进程）读取到同样的区间
+    other = ConstituentHistory(history.path)
+    assert other.memberships("sh.600000") == history.memberships("sh.600000")
+
+
+def test_later_query_extends_verified_range(tmp_path):
+    history = ConstituentHistory(str(tmp_path / "constituents.sqlite3"))
+    history.record("sz50", snapshot("2023-12-11", DECEMBER), "2023-12-20")
+    assert history.members("sz50", "2024-01-10") is None
+
+    history.record("sz50", snapshot("2023-12-11", DECEMBER), "2024-01-10")
+    assert history.coverage("sz50") == [("2023-12-11", "2024-01-10")]
+    assert codes(history.members("sz50", "2024-01-10")) == ["sh.600036", "sh.601318"]
+
+    # 更早的查询日期不缩短有效期
+    history.record("sz50", snapshot("2023-12-11", DECEMBER), "2023-12-15")
+    assert history.coverage("sz50") == [("2023-12-11", "2024-01-10")]
@@ -0,0 +1,61 @@
+"""
+财务报表存储（src/financial_store.py）中纯函数的单元测试
+
+覆盖季度文本的解析、季度区间，以及 build_financial_panel() 合并宽表时的共享列、环比/同比变化、
+回看季度和没有数据的季度。
+"""
+import math
+
+import pytest
+
+from src.financial_store import SECTIONS_ATTR, build_financial_panel, parse_quarter, quarter_range
+
+
+def test_parse_quarter_accepts_common_forms():
+    assert parse_quarter("2024Q3") == (2024, 3)
+    assert parse_quarter(" 2024-q1 ") == (2024, 1)
+    assert parse_quarter("2023 Q4") == (2023, 4)
+    for text in ("2024Q5", "2024Q0", "24Q1", "2024", "Q3 2024"):
+        with pytest.raises(ValueError):
+            parse_quarter(text)
+
+
+def test_quarter_range_crosses_years():
+    assert quarter_range((2023, 3), (2024, 2)) == [(2023, 3), (2023, 4), (2024, 1), (2024, 2)]
+    assert quarter_range((2024, 2), (2024, 2)) == [(2024, 2)]
+    assert quarter_range((2024, 3), (2024, 2)) == []
+
+
+def profit(quarter, roe):
+    year, q = quarter
+    return {"code": "sh.600000", "pubDate": f"{year}-{3 * q:02d}-28", "statDate": f"{year}-{3 * q:02d}-30",
+            "roeAvg": roe, "npMargin": ""}
+
+
+def test_panel_changes_and_lookback():
+    quarters = quarter_range((2023, 1), (2024, 3))
+    roe = dict(zip(quarters, ["0.02", "0.04", "0.06", "0", "0.03", "0.06"]))
+    records = {("profit", quarter): profit(quarter, value) for quarter, value in roe.items()}
+    records[("growth", (2024, 2))] = {"code": "sh.600000", "statDate": "2024-06-30", "YOYNI": "0.1"}
+    records[("growth", (2024, 1))] = None
+
+    panel = build_financial_panel(records, ["profit", "growth"], quarters,
+                                  labels={"profit": "盈利能力"}, lookback=4)
+
+    # 2024Q3 没有任何数据，不出现在结果中；回看的 2023 年季度只用于计算变化
+    assert panel.index.tolist() == ["2024Q1", "2024Q2"]
+    assert panel["pubDate"].tolist() == ["2024-03-28", "2024-06-28"]
+    assert panel["roeAvg"].tolist() == [0.03, 0.06]
+    # 上一季度为 0 时环比为空
+    assert math.isnan(panel.loc["2024Q1", "roeAvg_QoQ"])
+    assert panel.loc["2024Q2", "roeAvg_QoQ"] == 1.0
+    assert panel["roeAvg_YoY"].tolist() == [0.5, 0.5]
+    assert math.isnan(panel.loc["2024Q1", "YOYNI"]) and panel.loc["2024Q2", "YOYNI"] == 0.1
+
+    # 全部为空的指标保留原值且不计算变化；共享列只出现一次
+    assert "npMargin" in panel.columns and "npMargin_QoQ" not in panel.columns
+    assert panel.columns.tolist().count("statDate") == 1
+    assert panel.attrs[SECTIONS_ATTR] == {
+        "盈利能力": ["roeAvg", "roeAvg_QoQ", "roeAvg_YoY", "npMargin"],
+        "growth": ["YOYNI", "YOYNI_QoQ", "YOYNI_YoY"],
+    }
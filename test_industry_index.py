@@ -0,0 +1,103 @@
+"""
+行业索引（src/industry_index.py）与行业指标统计（profile_cards.refresh_industry_stats）的单元测试
+
+覆盖快照刷新失败后的退避、同一份快照只认领一次统计，以及对全部成分股统计指标分布（单只失败时跳过）。
+"""
+import pandas as pd
+import pytest
+
+from src import industry_index, profile_cards
+from src.data_source_interface import DataSourceError, NoDataFoundError
+from src.industry_index import IndustryIndex
+
+
+def industry_table(members) -> pd.DataFrame:
+    """members: {代码: 行业}"""
+    return pd.DataFrame([["2024-12-30", code, f"名称{code}", industry] for code, industry in sorted(members.items())],
+                        columns=["updateDate", "code", "code_name", "industry"])
+
+
+MEMBERS = {"sh.600000": "银行", "sh.600036": "银行", "sh.601318": "保险", "sh.600016": "银行"}
+
+
+class FailingLoader:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        raise DataSourceError("upstream down")
+
+
+def test_failed_refresh_backs_off(tmp_path, monkeypatch):
+    index = IndustryIndex(str(tmp_path / "industries.sqlite3"))
+    loader = FailingLoader()
+
+    # 没有快照时第一次失败抛出，退避期内不再请求上游
+    with pytest.raises(DataSourceError):
+        index.ensure_current(loader)
+    with pytest.raises(DataSourceError):
+        index.ensure_current(loader)
+    assert loader.calls == 1
+
+    # 退避期过后重新请求
+    monkeypatch.setattr(industry_index, "RETRY_AFTER_FAILURE", 0)
+    index.ensure_current(lambda: industry_table(MEMBERS))
+    assert index.is_current() and index.industry_of("sh.601318") == "保险"
+
+
+def test_failed_refresh_keeps_previous_snapshot(tmp_path, monkeypatch):
+    index = IndustryIndex(str(tmp_path / "industries.sqlite3"))
+    index.refresh(lambda: industry_table(MEMBERS))
+    monkeypatch.setattr(index, "is_current", lambda: False)
+    loader = FailingLoader()
+
+    index.ensure_current(loader)
+    index.ensure_current(loader)
+    assert loader.calls == 1
+    assert sorted(index.members("银行")) == ["sh.600000", "sh.600016", "sh.600036"]
+
+
+def test_stats_pass_claimed_once_per_snapshot(tmp_path):
+    index = IndustryIndex(str(tmp_path / "industries.sqlite3"))
+    assert not index.claim_stats_pass()
+    index.refresh(lambda: industry_table(MEMBERS))
+
+    assert index.claim_stats_pass()
+    # 其他进程（另一个实例）不能重复认领正在进行的统计
+    assert not IndustryIndex(index.path).claim_stats_pass()
+    index.rebuild_stats([])
+    assert not index.claim_stats_pass()
+
+
+def test_refresh_industry_stats_covers_all_members(tmp_path, monkeypatch):
+    index = IndustryIndex(str(tmp_path / "industries.sqlite3"))
+    index.refresh(lambda: industry_table(MEMBERS))
+    monkeypatch.setattr(profile_cards, "get_industry_index", lambda: index)
+
+    pe = {"sh.600000": 5.0, "sh.600036": 7.0, "sh.601318": 9.0}
+
+    def price(data_source, code):
+        if code not in pe:
+            raise DataSourceError("no k data")
+        return {"pe": pe[code], "pb": None, "change_pct": 1.0}
+
+    def financial(data_source, code, data_type):
+        return pd.DataFrame({"roeAvg": ["0.1"]}), 2024, 3
+
+    monkeypatch.setattr(profile_cards, "_build_price", price)
+    monkeypatch.setattr(profile_cards, "try_get_financial_data_with_fallback", financial)
+    profile_cards.refresh_industry_stats(object())
+
+    banks = index.stats("银行")
+    assert banks["pe"].count == 2 and banks["pe"].median == 6.0
+    assert "pb" not in banks
+    assert banks["roe"].values == [0.1, 0.1]
+    assert index.stats("保险")["return_6m"].count == 1
+    assert index.stats_time() > 0
+
+    # 全部失败时保留上一次的分布
+    pe.clear()
+    with pytest.raises(NoDataFoundError):
+        profile_cards.refresh_industry_stats(object())
+    assert index.stats("银行")["pe"].count == 2
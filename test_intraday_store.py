@@ -0,0 +1,164 @@
+"""
+分钟线存储（src/intraday_store.py）的单元测试
+
+覆盖追加写入、插入更早交易日时切换版本目录（上一个版本保留到下一次切换）、
+中断的写入在下次写入时被截掉，以及读取结果与 Baostock 查询结果的列类型一致。
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.intraday_store import COLUMN_DTYPES, IntradaySeries, columns_to_frame, day_number
+
+
+def minute_frame(day: str, minutes=(931, 932, 933), base: float = 10.0) -> pd.DataFrame:
+    """与 Baostock 返回格式相同（全部为字符串）的合成分钟线"""
+    stamp = day.replace("-", "")
+    rows = []
+    for i, minute in enumerate(minutes):
+        price = base + i
+        rows.append([day, f"{stamp}{minute:04d}00000", "sh.600000", f"{price:.2f}", f"{price + 0.5:.2f}",
+                     f"{price - 0.5:.2f}", f"{price + 0.1:.2f}", str(100 * (i + 1)), f"{1000.0 * (i + 1):.1f}", "3"])
+    return pd.DataFrame(rows, columns=["date", "time", "code", "open", "high", "low", "close", "volume",
+                                       "amount", "adjustflag"])
+
+
+def read_frame(series: IntradaySeries, start_date: str = "2024-01-01", end_date: str = "2024-12-31") -> pd.DataFrame:
+    """读取的分钟线，close / volume 转为数值便于比较"""
+    days, counts, columns = series.read(start_date, end_date)
+    df = columns_to_frame(days, counts, columns, "sh.600000", "3", ["date", "time", "close", "volume"])
+    for name in ("close", "volume"):
+        df[name] = pd.to_numeric(df[name])
+    return df
+
+
+def current_generation(series: IntradaySeries) -> str:
+    with open(os.path.join(series.path, "CURRENT"), encoding="utf-8") as f:
+        return f.read().strip()
+
+
+def test_append_keeps_generation(tmp_path):
+    series = IntradaySeries(str(tmp_path / "series"))
+    series.write(minute_frame("2024-01-02"), ["2024-01-02"])
+    generation = current_generation(series)
+    series.write(minute_frame("2024-01-03", base=20.0), ["2024-01-03"])
+
+    assert current_generation(series) == generation
+    df = read_frame(series)
+    assert df["date"].tolist() == ["2024-01-02"] * 3 + ["2024-01-03"] * 3
+    assert df["close"].tolist() == [10.1, 11.1, 12.1, 20.1, 21.1, 22.1]
+    assert df["time"].is_monotonic_increasing
+
+
+def test_out_of_order_insert_rewrites_new_generation(tmp_path):
+    series = IntradaySeries(str(tmp_path / "series"))
+    series.write(minute_frame("2024-01-04", base=30.0), ["2024-01-04"])
+    series.write(minute_frame("2024-01-08", base=40.0), ["2024-01-08"])
+    old_generation = current_generation(series)
+
+    series.write(minute_frame("2024-01-05", base=35.0), ["2024-01-05"])
+
+    new_generation = current_generation(series)
+    assert new_generation != old_generation
+    # 上一个版本保留，刚读到旧 CURRENT 的读取方仍能打开
+    assert os.path.exists(os.path.join(series.path, old_generation))
+    df = read_frame(series)
+    assert df["date"].tolist() == ["2024-01-04"] * 3 + ["2024-01-05"] * 3 + ["2024-01-08"] * 3
+    assert df["close"].tolist() == [30.1, 31.1, 32.1, 35.1, 36.1, 37.1, 40.1, 41.1, 42.1]
+
+    # 索引中的行号与重新排序后的数据一致
+    days, counts, _ = series.read("2024-01-05", "2024-01-05")
+    assert days.tolist() == [20240105] and counts.tolist() == [3]
+    assert read_frame(series, "2024-01-05", "2024-01-05")["close"].tolist() == [35.1, 36.1, 37.1]
+
+    # 之后的交易日仍然追加在新版本上
+    series.write(minute_frame("2024-01-09", base=50.0), ["2024-01-09"])
+    assert current_generation(series) == new_generation
+    assert read_frame(series)["date"].tolist()[-3:] == ["2024-01-09"] * 3
+
+
+def test_resumed_partial_write_truncates_tail(tmp_path):
+    series = IntradaySeries(str(tmp_path / "series"))
+    series.write(minute_frame("2024-01-02"), ["2024-01-02"])
+    directory = os.path.join(series.path, current_generation(series))
+
+    # 模拟中断的追加：数据列已写入一部分，索引尚未写入
+    for name, dtype in COLUMN_DTYPES.items():
+        with open(os.path.join(directory, f"{name}.bin"), "ab") as f:
+            f.write(np.full(2, 999, dtype=dtype).tobytes())
+    assert read_frame(series)["close"].tolist() == [10.1, 11.1, 12.1]
+    assert series.missing_days(["2024-01-02", "2024-01-03"]) == ["2024-01-03"]
+
+    series.write(minute_frame("2024-01-03", base=20.0), ["2024-01-03"])
+
+    df = read_frame(series)
+    assert df["close"].tolist() == [10.1, 11.1, 12.1, 20.1, 21.1, 22.1]
+    assert 999 not in df["volume"].tolist()
+    for name, dtype in COLUMN_DTYPES.items():
+        assert os.path.getsize(os.path.join(directory, f"{name}.bin")) == 6 * np.dtype(dtype).itemsize
+
+
+def test_suspended_day_and_stored_days_are_not_downloaded_again(tmp_path):
+    series = IntradaySeries(str(tmp_path / "series"))
+    series.write(minute_frame("2024-01-02"), ["2024-01-02"])
+    # 停牌日没有数据，也记入索引
+    series.write(minute_frame("2024-01-03").iloc[:0], ["2024-01-03"])
+    # 已保存的交易日即使再次传入也不改变
+    series.write(minute_frame("2024-01-02", base=99.0), ["2024-01-02"])
+
+    assert series.missing_days(["2024-01-02", "2024-01-03", "2024-01-04"]) == ["2024-01-04"]
+    days, counts, _ = series.read("2024-01-01", "2024-01-31")
+    assert days.tolist() == [day_number("2024-01-02"), day_number("2024-01-03")]
+    assert counts.tolist() == [3, 0]
+    assert read_frame(series)["close"].tolist() == [10.1, 11.1, 12.1]
+
+
+def test_rows_outside_requested_days_are_dropped(tmp_path):
+    series = IntradaySeries(str(tmp_path / "series"))
+    df = pd.concat([minute_frame("2024-01-03", base=20.0), minute_frame("2024-01-02")], ignore_index=True)
+    series.write(df, ["2024-01-03"])
+
+    assert series.missing_days(["2024-01-02", "2024-01-03"]) == ["2024-01-02"]
+    assert read_frame(series)["date"].tolist() == ["2024-01-03"] * 3
+
+
+def test_previous_generation_removed_on_next_switch(tmp_path):
+    series = IntradaySeries(str(tmp_path / "series"))
+    series.write(minute_frame("2024-01-08"), ["2024-01-08"])
+    first = current_generation(series)
+    series.write(minute_frame("2024-01-05"), ["2024-01-05"])
+    second = current_generation(series)
+    series.write(minute_frame("2024-01-04"), ["2024-01-04"])
+
+    assert not os.path.exists(os.path.join(series.path, first))
+    assert os.path.exists(os.path.join(series.path, second))
+    assert read_frame(series)["date"].unique().tolist() == ["2024-01-04", "2024-01-05", "2024-01-08"]
+
+
+def test_reader_with_stale_current_rereads_pointer(tmp_path, monkeypatch):
+    series = IntradaySeries(str(tmp_path / "series"))
+    series.write(minute_frame("2024-01-08"), ["2024-01-08"])
+    series.write(minute_frame("2024-01-05"), ["2024-01-05"])
+    series.write(minute_frame("2024-01-04"), ["2024-01-04"])
+    current = current_generation(series)
+
+    # 第一次读到的 CURRENT 指向已被删除的版本（期间写入方切换了两次版本）
+    pointers = iter(["g1", current])
+    monkeypatch.setattr(series, "_generation", lambda: next(pointers))
+    assert series.missing_days(["2024-01-04", "2024-01-05", "2024-01-08"]) == []
+
+
+def test_read_dtypes_match_upstream(tmp_path):
+    series = IntradaySeries(str(tmp_path / "series"))
+    upstream = minute_frame("2024-01-02")
+    series.write(upstream, ["2024-01-02"])
+
+    days, counts, columns = series.read("2024-01-02", "2024-01-02")
+    df = columns_to_frame(days, counts, columns, "sh.600000", "3", list(upstream.columns))
+    assert df.dtypes.tolist() == upstream.dtypes.tolist()
+    assert all(isinstance(value, str) for value in df.iloc[0])
+    for name in ("date", "time", "code", "adjustflag"):
+        assert df[name].tolist() == upstream[name].tolist()
+    for name in ("open", "high", "low", "close", "volume", "amount"):
+        assert pd.to_numeric(df[name]).tolist() == pd.to_numeric(upstream[name]).tolist()
@@ -0,0 +1,131 @@
+"""
+宏观序列存储（src/macro_store.py）中纯函数的单元测试
+
+覆盖各发布规律下的复查判断（is_due）以及复查失败后的退避，
+以及宏观面板的前向填充（_as_of）、对齐日历和增长率（build_macro_panel）。
+"""
+import math
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.macro_store import (
+    MACRO_SERIES,
+    RECHECK_INTERVAL,
+    RETRY_AFTER_FAILURE,
+    _as_of,
+    _typed,
+    build_macro_panel,
+    is_due,
+    parse_panel_series,
+)
+
+NOW = datetime(2024, 3, 10, 9, 30)
+
+
+def ago(seconds: float) -> float:
+    return time.time() - seconds
+
+
+def test_missing_series_is_always_due():
+    for series in MACRO_SERIES.values():
+        assert is_due(series, None, time.time(), NOW)
+
+
+def test_daily_series_rechecked_once_per_day():
+    shibor = MACRO_SERIES["shibor"]
+    assert not is_due(shibor, "2024-03-08", datetime(2024, 3, 10, 8, 0).timestamp(), NOW)
+    assert is_due(shibor, "2024-03-08", datetime(2024, 3, 9, 23, 0).timestamp(), NOW)
+
+
+def test_monthly_and_yearly_series_wait_for_the_next_period():
+    month = MACRO_SERIES["money_supply_month"]
+    stale = ago(RECHECK_INTERVAL + 60)
+    # 3 月时应有 2 月数据：缺少时每天复查，已入库后不再复查
+    assert is_due(month, "2024-01", stale, NOW)
+    assert not is_due(month, "2024-02", stale, NOW)
+    assert not is_due(month, "2024-01", ago(60), NOW)
+    # 1 月时对比的是上一年 12 月
+    assert is_due(month, "2023-11", stale, datetime(2024, 1, 15))
+    assert not is_due(month, "2023-12", stale, datetime(2024, 1, 15))
+
+    year = MACRO_SERIES["money_supply_year"]
+    assert is_due(year, "2022", stale, NOW)
+    assert not is_due(year, "2023", stale, NOW)
+
+
+def test_change_series_and_failure_backoff():
+    rate = MACRO_SERIES["deposit_rate"]
+    stale = ago(RECHECK_INTERVAL + 60)
+    assert is_due(rate, "2015-10-24", stale, NOW)
+    assert not is_due(rate, "2015-10-24", ago(60), NOW)
+
+    # 复查失败后在 RETRY_AFTER_FAILURE 之内不再复查，之后恢复
+    assert not is_due(rate, "2015-10-24", stale, NOW, failed=ago(60))
+    assert is_due(rate, "2015-10-24", stale, NOW, failed=ago(RETRY_AFTER_FAILURE + 60))
+    # 失败早于最近一次成功的复查时不影响判断
+    assert is_due(rate, "2015-10-24", stale, NOW, failed=stale - 60)
+
+
+def test_as_of_forward_fills():
+    dates = np.array(["2024-01-02", "2024-01-04"], dtype="datetime64[D]")
+    when = np.array(["2024-01-01", "2024-01-02", "2024-01-03", "2024-01-05"], dtype="datetime64[D]")
+    result = _as_of(dates, np.array([1.0, 3.0]), when)
+    assert math.isnan(result[0]) and result[1:].tolist() == [1.0, 1.0, 3.0]
+    assert np.isnan(_as_of(dates[:0], np.array([]), when)).all()
+
+
+def typed(key: str, rows, columns) -> pd.DataFrame:
+    """与上游格式相同（全部为字符串）的合成序列，转换为 MacroStore 保存的形式"""
+    return _typed(MACRO_SERIES[key], pd.DataFrame(rows, columns=columns))
+
+
+FRAMES = {
+    "money_supply_month": typed("money_supply_month", [
+        ["2023", "12", "9.7", "1.3"], ["2024", "1", "8.7", "5.9"],
+        ["2024", "2", "8.7", "1.2"], ["2024", "3", "8.3", ""],
+    ], ["statYear", "statMonth", "m2YOY", "m1YOY"]),
+    # 按生效日期而不是公告日期对齐
+    "reserve_ratio": typed("reserve_ratio", [
+        ["2023-09-01", "2023-09-15", "10.50"], ["2024-01-24", "2024-02-05", "10.00"],
+    ], ["pubDate", "effectiveDate", "bigInstitutionsRatioAfter"]),
+    "shibor": typed("shibor", [
+        ["2024-01-03", "1.70", "2.40"], ["2024-01-05", "1.60", "2.39"],
+    ], ["date", "shiborON", "shibor3M"]),
+}
+
+
+def test_monthly_panel_aligns_on_month_ends():
+    specs = parse_panel_series(["money_supply_month", "reserve_ratio"])
+    panel = build_macro_panel(FRAMES, specs, "2024-01-15", "2024-04", growth=["MoM"])
+
+    assert panel["date"].tolist() == ["2024-01", "2024-02", "2024-03", "2024-04"]
+    assert panel["m2YOY"].tolist() == [8.7, 8.7, 8.3, 8.3]
+    # 空值不参与前向填充：3 月沿用 2 月的 m1YOY
+    assert panel["m1YOY"].tolist() == [5.9, 1.2, 1.2, 1.2]
+    assert panel["bigInstitutionsRatioAfter"].tolist() == [10.5, 10.0, 10.0, 10.0]
+    assert panel["m2YOY_MoM"].tolist() == [round(8.7 / 9.7 - 1, 4), 0.0, round(8.3 / 8.7 - 1, 4), 0.0]
+
+
+def test_daily_panel_uses_business_days():
+    panel = build_macro_panel(FRAMES, parse_panel_series(["shibor.shibor3M"]), "2024-01-02", "2024-01-08",
+                              frequency="daily")
+    assert panel["date"].tolist() == ["2024-01-02", "2024-01-03", "2024-01-04", "2024-01-05", "2024-01-08"]
+    values = panel["shibor3M"].tolist()
+    assert math.isnan(values[0]) and values[1:] == [2.40, 2.40, 2.39, 2.39]
+    assert list(panel.columns) == ["date", "shibor3M"]
+
+
+def test_panel_rejects_invalid_arguments():
+    specs = parse_panel_series(["shibor"])
+    with pytest.raises(ValueError):
+        build_macro_panel(FRAMES, specs, "2024-01-01", "2024-02-01", frequency="weekly")
+    with pytest.raises(ValueError):
+        build_macro_panel(FRAMES, specs, "2024-01-01", "2024-02-01", growth=["QoQ"])
+    with pytest.raises(ValueError):
+        build_macro_panel(FRAMES, parse_panel_series(["shibor.shibor9M"]), "2024-01-01", "2024-02-01")
+    with pytest.raises(ValueError):
+        parse_panel_series(["gdp"])
@@ -0,0 +1,69 @@
+"""
+运行指标（src/metrics.py）的单元测试
+
+覆盖分桶直方图的分位数插值（以最大值为上限、溢出桶）、注册表的汇总表，以及 Prometheus 输出的累计分桶。
+"""
+import pytest
+
+from src.metrics import LATENCY_BUCKETS, LatencyStats, MetricsRegistry
+
+
+def stats_of(*samples) -> LatencyStats:
+    stats = LatencyStats()
+    for seconds in samples:
+        stats.observe(seconds, False)
+    return stats
+
+
+def test_quantile_interpolates_inside_bucket():
+    assert LatencyStats().quantile(0.5) == 0.0
+
+    # 5 次落在 (0.0025, 0.005]，5 次落在 (0.1, 0.25]
+    stats = stats_of(*[0.004] * 5, *[0.24] * 5)
+    assert stats.quantile(0.5) == pytest.approx(0.005)
+    assert stats.quantile(0.6) == pytest.approx(0.1 + 0.15 * 1 / 5)
+    assert stats.quantile(0.95) == pytest.approx(0.1 + 0.15 * 4.5 / 5)
+    # 插值结果不超过实际观测到的最大值
+    assert stats.quantile(0.99) == 0.24
+    quantiles = [stats.quantile(q / 20) for q in range(21)]
+    assert quantiles == sorted(quantiles)
+
+
+def test_quantile_bucket_bounds_and_overflow():
+    # 等于上界的观测落在该桶内
+    stats = stats_of(LATENCY_BUCKETS[0])
+    assert stats.buckets[0] == 1
+    assert stats.quantile(1.0) == LATENCY_BUCKETS[0]
+
+    # 超过最大分桶的观测在 (最大分桶, max] 之间插值
+    slow = stats_of(200.0, 300.0)
+    assert slow.buckets[-1] == 2
+    assert slow.quantile(0.5) == pytest.approx(LATENCY_BUCKETS[-1] + (300.0 - LATENCY_BUCKETS[-1]) / 2)
+    assert slow.quantile(1.0) == 300.0
+
+
+def test_registry_frames_and_prometheus():
+    registry = MetricsRegistry()
+    registry.observe("tool", "get_stock_basic_info", 0.004)
+    registry.observe("tool", "get_stock_basic_info", 0.3, error=True)
+    registry.observe("upstream", "baostock.query_history_k_data_plus", 2.0)
+    registry.record_cache("k_data", True)
+    registry.record_cache("k_data", False)
+    registry.record_cache("k_data", True)
+
+    calls = registry.calls_frame()
+    assert calls["name"].tolist() == ["baostock.query_history_k_data_plus", "get_stock_basic_info"]
+    tool = calls.iloc[1]
+    assert (tool["count"], tool["errors"], tool["error_rate"], tool["max_ms"]) == (2, 1, 0.5, 300.0)
+    assert registry.cache_frame().values.tolist() == [["k_data", 2, 1, 0.6667]]
+
+    text = registry.render_prometheus()
+    labels = 'kind="tool",name="get_stock_basic_info"'
+    assert f'stockreport_call_latency_seconds_bucket{{{labels},le="0.005"}} 1' in text
+    assert f'stockreport_call_latency_seconds_bucket{{{labels},le="0.5"}} 2' in text
+    assert f'stockreport_call_latency_seconds_bucket{{{labels},le="+Inf"}} 2' in text
+    assert f"stockreport_call_errors_total{{{labels}}} 1" in text
+    assert 'stockreport_cache_requests_total{namespace="k_data",result="miss"} 1' in text
+
+    registry.reset()
+    assert registry.calls_frame().empty and registry.cache_frame().empty
@@ -0,0 +1,116 @@
+"""
+证券搜索索引（src/search_index.py）的单元测试
+
+覆盖各匹配方式的得分与排序（代码完全匹配、名称完全匹配、代码前缀、拼音、名称前缀、英文单词、名称包含）、
+港股代码去前导零、多市场合并，以及单个市场加载失败时不影响其他市场。
+拼音用固定的字表代替 pypinyin（可选依赖），结果不依赖词典版本。
+"""
+import pandas as pd
+import pytest
+
+from src import search_index
+from src.search_index import (
+    SCORE_CODE_EXACT,
+    SCORE_CODE_PREFIX,
+    SCORE_INITIALS,
+    SCORE_NAME_CONTAINS,
+    SCORE_NAME_EXACT,
+    SCORE_NAME_PREFIX,
+    SCORE_PINYIN_PREFIX,
+    SCORE_WORD_PREFIX,
+    SearchIndexManager,
+    SecuritySearchIndex,
+)
+
+SECURITIES = {
+    "a": [("sh.600000", "浦发银行"), ("sh.600001", "*ST邯钢"), ("sh.600036", "招商银行"),
+          ("sh.601398", "工商银行"), ("sz.000001", "平安银行")],
+    "hk": [("00700", "腾讯控股"), ("03968", "招商银行")],
+    "us": [("AAPL", "Apple Inc."), ("APLE", "Apple Hospitality REIT"), ("MSFT", "Microsoft Corp")],
+}
+
+PINYIN = {"浦": "pu", "发": "fa", "银": "yin", "行": "hang", "邯": "han", "钢": "gang", "招": "zhao",
+          "商": "shang", "工": "gong", "平": "ping", "安": "an", "腾": "teng", "讯": "xun", "控": "kong",
+          "股": "gu"}
+
+
+def securities(market: str) -> pd.DataFrame:
+    return pd.DataFrame(SECURITIES[market], columns=["code", "code_name"])
+
+
+def ranked(index: SecuritySearchIndex, query: str, limit: int = 10):
+    return [(index.describe(item_id)[0], score) for score, item_id in index.search(query, limit)]
+
+
+@pytest.fixture
+def fake_pinyin(monkeypatch):
+    monkeypatch.setattr(search_index, "_get_lazy_pinyin",
+                        lambda: lambda text: [PINYIN.get(char, char) for char in text])
+
+
+def test_code_and_name_matches(fake_pinyin):
+    index = SecuritySearchIndex("a", securities("a"))
+
+    assert ranked(index, "sh.600000")[0] == ("sh.600000", SCORE_CODE_EXACT)
+    assert ranked(index, "6000") == [("sh.600000", SCORE_CODE_PREFIX), ("sh.600001", SCORE_CODE_PREFIX),
+                                     ("sh.600036", SCORE_CODE_PREFIX)]
+    assert ranked(index, "6000", limit=2) == ranked(index, "6000")[:2]
+    assert ranked(index, "招商银行") == [("sh.600036", SCORE_NAME_EXACT)]
+    assert ranked(index, "浦发") == [("sh.600000", SCORE_NAME_PREFIX)]
+    # 包含匹配按代码长度、代码排序
+    assert ranked(index, "银行") == [("sh.600000", SCORE_NAME_CONTAINS), ("sh.600036", SCORE_NAME_CONTAINS),
+                                   ("sh.601398", SCORE_NAME_CONTAINS), ("sz.000001", SCORE_NAME_CONTAINS)]
+    assert ranked(index, "银钢") == []
+    assert ranked(index, "  ") == ranked(index, "") == []
+
+
+def test_pinyin_matches(fake_pinyin):
+    index = SecuritySearchIndex("a", securities("a"))
+
+    assert ranked(index, "zsyh") == [("sh.600036", SCORE_INITIALS)]
+    assert ranked(index, "zhaoshang") == [("sh.600036", SCORE_PINYIN_PREFIX)]
+    # 非中文片段保留其中的字母数字：'*ST邯钢' -> 'sthg'
+    assert ranked(index, "sthg") == [("sh.600001", SCORE_INITIALS)]
+    assert ranked(index, "st") == [("sh.600001", SCORE_INITIALS)]
+
+
+def test_pinyin_disabled_without_pypinyin(monkeypatch):
+    monkeypatch.setattr(search_index, "_get_lazy_pinyin", lambda: None)
+    index = SecuritySearchIndex("a", securities("a"))
+    assert ranked(index, "zsyh") == []
+    assert ranked(index, "招商银行") == [("sh.600036", SCORE_NAME_EXACT)]
+
+
+def test_hk_and_us_matches(fake_pinyin):
+    hk = SecuritySearchIndex("hk", securities("hk"))
+    assert ranked(hk, "700") == [("00700", SCORE_CODE_EXACT)]
+    assert ranked(hk, "00700.hk") == [("00700", SCORE_CODE_EXACT)]
+
+    us = SecuritySearchIndex("us", securities("us"))
+    # 名称前缀高于英文单词前缀；同一匹配方式下代码短的在前
+    assert ranked(us, "apple") == [("AAPL", SCORE_NAME_PREFIX), ("APLE", SCORE_NAME_PREFIX)]
+    assert ranked(us, "hosp") == [("APLE", SCORE_WORD_PREFIX)]
+    assert ranked(us, "msft") == [("MSFT", SCORE_CODE_EXACT)]
+
+
+def test_manager_merges_markets_and_skips_failures(fake_pinyin):
+    loads = []
+
+    def loader(market):
+        loads.append(market)
+        if market == "us":
+            raise ConnectionError("symbol master unavailable")
+        return securities(market)
+
+    manager = SearchIndexManager(loader)
+    result = manager.search("招商银行")
+    assert result[["code", "market", "match"]].values.tolist() == [
+        ["sh.600036", "A股", "名称"], ["03968", "港股", "名称"]]
+    assert manager.search("银行", market="a", limit=2)["code"].tolist() == ["sh.600000", "sh.600036"]
+    # 索引在 ttl 内复用；加载失败的市场下次检索时重试
+    assert sorted(loads) == ["a", "hk", "us"]
+    manager.search("msft")
+    assert loads.count("a") == 1 and loads.count("us") == 2
+
+    with pytest.raises(ValueError):
+        manager.search("600000", market="jp")
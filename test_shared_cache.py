@@ -0,0 +1,68 @@
+"""
+共享缓存（src/shared_cache.py）列式编码的单元测试
+
+覆盖各种列类型的往返编码、非默认索引和 attrs、只解码部分列，以及退回 pickle 的情形。
+"""
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.shared_cache import decode_frame, encode_frame
+
+
+def mixed_frame() -> pd.DataFrame:
+    return pd.DataFrame({
+        "code": ["sh.600000", None, "sz.000001"],
+        "close": [10.5, np.nan, 12.25],
+        "volume": np.array([100, 200, 300], dtype="int64"),
+        "suspended": [False, True, False],
+        "time": pd.to_datetime(["2024-01-02 09:31", "2024-01-02 09:32", None]),
+        "day": [datetime.date(2024, 1, 2), None, datetime.date(2024, 1, 4)],
+        "name": pd.array(["浦发银行", pd.NA, "平安银行"], dtype="string"),
+        "board": pd.Categorical(["主板", "主板", "创业板"]),
+    })
+
+
+def test_round_trip_preserves_values_and_dtypes():
+    df = mixed_frame()
+    decoded = decode_frame(encode_frame(df))
+    pd.testing.assert_frame_equal(decoded, df)
+    assert decoded["day"].tolist()[1] is None
+    assert decoded["code"].tolist()[1] is None
+
+
+def test_index_and_attrs_round_trip():
+    df = pd.DataFrame({"close": [1.0, 2.0]}, index=pd.Index(["2024-01-02", "2024-01-03"], name="date"))
+    df.attrs["coverage"] = ["2024-01-02", "2024-01-03"]
+    decoded = decode_frame(encode_frame(df))
+    pd.testing.assert_frame_equal(decoded, df)
+    assert decoded.attrs == df.attrs
+
+    # 从非零位置开始的 RangeIndex（切片结果）也按索引保存
+    tail = mixed_frame().iloc[1:]
+    pd.testing.assert_frame_equal(decode_frame(encode_frame(tail)), tail)
+
+
+def test_projection_decodes_requested_columns_in_order():
+    decoded = decode_frame(encode_frame(mixed_frame()), columns=["close", "missing", "code"])
+    assert decoded.columns.tolist() == ["close", "code"]
+    pd.testing.assert_frame_equal(decoded, mixed_frame()[["close", "code"]])
+
+
+def test_fallbacks_round_trip():
+    # 含 NUL 的字符串列按单列 pickle 保存；重复列名时整个表 pickle
+    text = pd.DataFrame({"text": ["a\x00b", "c"]})
+    pd.testing.assert_frame_equal(decode_frame(encode_frame(text)), text)
+    duplicated = pd.DataFrame([[1, 2]], columns=["a", "a"])
+    pd.testing.assert_frame_equal(decode_frame(encode_frame(duplicated)), duplicated)
+    assert decode_frame(encode_frame(duplicated), columns=["b"]).empty
+
+    empty = pd.DataFrame({"code": pd.Series([], dtype=object), "close": pd.Series([], dtype="float64")})
+    pd.testing.assert_frame_equal(decode_frame(encode_frame(empty)), empty)
+
+
+def test_rejects_foreign_data():
+    with pytest.raises(ValueError):
+        decode_frame(b"not a frame")
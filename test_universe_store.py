@@ -0,0 +1,110 @@
+"""
+证券名单存储（src/universe_store.py）的单元测试
+
+覆盖按日期顺序和乱序保存名单（乱序插入时改写下一个已保存交易日的变化）、跨检查点还原快照，
+以及变化事件和停牌统计。
+"""
+import random
+
+import pandas as pd
+
+from src import universe_store
+from src.universe_store import UNIVERSE_COLUMNS, UniverseStore
+
+
+def universe(entries) -> pd.DataFrame:
+    """entries: {代码: (名称, 交易状态)}"""
+    return pd.DataFrame([[code, status, name] for code, (name, status) in sorted(entries.items())],
+                        columns=UNIVERSE_COLUMNS)
+
+
+def as_dict(df: pd.DataFrame):
+    return {code: (name, status) for code, status, name in zip(df["code"], df["tradeStatus"], df["code_name"])}
+
+
+DAY1 = {"sh.600000": ("浦发银行", "1"), "sh.600001": ("邯郸钢铁", "1")}
+DAY2 = {"sh.600000": ("浦发银行", "0"), "sh.600001": ("邯郸钢铁", "1"), "sh.600002": ("齐鲁石化", "1")}
+DAY3 = {"sh.600000": ("浦发银行", "1"), "sh.600002": ("ST齐鲁", "1")}
+
+
+def test_snapshot_and_changes_in_order(tmp_path):
+    store = UniverseStore(str(tmp_path / "universe.sqlite3"))
+    for day, entries in [("2024-01-02", DAY1), ("2024-01-03", DAY2), ("2024-01-04", DAY3)]:
+        store.record(day, universe(entries))
+
+    assert store.days() == ["2024-01-02", "2024-01-03", "2024-01-04"]
+    assert as_dict(store.snapshot("2024-01-03")) == DAY2
+    assert store.snapshot("2024-01-05") is None
+
+    events = store.changes("2024-01-03", "2024-01-04")
+    assert events[["day", "code", "event"]].values.tolist() == [
+        ["2024-01-03", "sh.600000", "suspended"],
+        ["2024-01-03", "sh.600002", "listed"],
+        ["2024-01-04", "sh.600000", "resumed"],
+        ["2024-01-04", "sh.600001", "removed"],
+        ["2024-01-04", "sh.600002", "renamed"],
+    ]
+    assert events.loc[events["event"] == "removed", "code_name"].tolist() == ["邯郸钢铁"]
+
+
+def test_out_of_order_insert_rewrites_following_delta(tmp_path):
+    store = UniverseStore(str(tmp_path / "universe.sqlite3"))
+    store.record("2024-01-02", universe(DAY1))
+    store.record("2024-01-04", universe(DAY3))
+    store.record("2024-01-03", universe(DAY2))
+
+    assert store.days() == ["2024-01-02", "2024-01-03", "2024-01-04"]
+    for day, entries in [("2024-01-02", DAY1), ("2024-01-03", DAY2), ("2024-01-04", DAY3)]:
+        assert as_dict(store.snapshot(day)) == entries
+    # 2024-01-04 的变化改为相对 2024-01-03：sh.600002 不再是新上市，而是改名
+    events = store.changes("2024-01-04", "2024-01-04")
+    assert sorted(events["event"]) == ["removed", "renamed", "resumed"]
+
+    # 另一个实例（其他进程）读取到同样的结果
+    other = UniverseStore(store.path)
+    assert as_dict(other.snapshot("2024-01-04")) == DAY3
+    assert other.changes("2024-01-02", "2024-01-04").equals(store.changes("2024-01-02", "2024-01-04"))
+
+
+def test_duplicate_day_is_ignored(tmp_path):
+    store = UniverseStore(str(tmp_path / "universe.sqlite3"))
+    store.record("2024-01-02", universe(DAY1))
+    store.record("2024-01-02", universe(DAY3))
+
+    assert store.days() == ["2024-01-02"]
+    assert as_dict(store.snapshot("2024-01-02")) == DAY1
+
+
+def test_random_order_across_checkpoints(tmp_path, monkeypatch):
+    monkeypatch.setattr(universe_store, "CHECKPOINT_EVERY", 4)
+    rng = random.Random(7)
+    codes = [f"sz.{i:06d}" for i in range(12)]
+    expected = {}
+    for n in range(20):
+        day = f"2024-02-{n + 1:02d}"
+        expected[day] = {code: (f"名称{rng.randint(0, 2)}", rng.choice("01"))
+                         for code in codes if rng.random() < 0.8}
+
+    store = UniverseStore(str(tmp_path / "universe.sqlite3"))
+    order = list(expected)
+    rng.shuffle(order)
+    for day in order:
+        store.record(day, universe(expected[day]))
+
+    assert store.days() == sorted(expected)
+    for day, entries in expected.items():
+        assert as_dict(store.snapshot(day)) == entries
+
+
+def test_suspended_counts_days(tmp_path):
+    store = UniverseStore(str(tmp_path / "universe.sqlite3"))
+    store.record("2024-01-02", universe({"sh.600000": ("浦发银行", "0"), "sh.600001": ("邯郸钢铁", "1")}))
+    store.record("2024-01-03", universe({"sh.600000": ("浦发银行", "0"), "sh.600001": ("邯郸钢铁", "0")}))
+    store.record("2024-01-04", universe({"sh.600000": ("浦发银行", "1"), "sh.600001": ("邯郸钢铁", "0")}))
+
+    suspended = store.suspended("2024-01-02", "2024-01-04")
+    assert suspended.values.tolist() == [
+        ["sh.600000", "浦发银行", 2, "2024-01-02", "2024-01-03"],
+        ["sh.600001", "邯郸钢铁", 2, "2024-01-03", "2024-01-04"],
+    ]
+    assert store.suspended("2024-01-04", "2024-01-04")["code"].tolist() == ["sh.600001"]